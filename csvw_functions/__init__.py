@@ -4,6 +4,12 @@ from .csvw_functions import get_embedded_metadata
 
 from .csvw_functions import create_annotated_table_group
 
+from .csvw_functions import iter_annotated_rows
+
+from .csvw_functions import create_columnar_annotated_table_group
+
+from .csvw_functions import validate_csvw
+
 from .csvw_functions import display_annotated_table_group_dict
 
 from .csvw_functions import get_errors
@@ -16,6 +22,18 @@ from .csvw_functions import CSVWError
 
 from .csvw_functions import CSVWWarning
 
+from .csvw_functions import CSVWMaxErrorsError
+
+from .csvw_functions import CSVWPrimaryKeyError
+
+from .csvw_functions import URLFetcher
+
+from .csvw_functions import MemoryURLFetcher
+
+from .csvw_functions import get_url_fetcher
+
+from .csvw_functions import set_url_fetcher
+
 from .csvw_functions import validate_table_group_metadata
 
 from .csvw_functions import validate_table_metadata
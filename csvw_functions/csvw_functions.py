@@ -28,6 +28,10 @@ Created on Sun Aug 14 17:32:29 2022
 import requests
 import json
 import os
+import csv
+import concurrent.futures
+import io
+import itertools
 import urllib
 import warnings
 import hyperlink
@@ -39,6 +43,22 @@ from uuid import uuid4
 import base64
 import dateutil.parser
 import copy
+import collections.abc
+import functools
+import hashlib
+import threading
+import time
+import email.utils
+import gc
+import codecs
+import mmap
+import sqlite3
+import tempfile
+
+try:
+    import numpy  # optional, used to parse numeric columns in batches
+except ImportError:
+    numpy=None
 
 
 #%% ---Module Level Variables---
@@ -788,6135 +808,12328 @@ class CSVWError(Exception):
     
 class CSVWWarning(Warning):
     ""
-
-
-#%% ---Model for Tabular Data and Metadata---
-
-#%% Section 4 - Tabular Data Models
-
-#%% 4.6 Datatypes
-
-def validate_value_for_datatype_base(
-        value,
-        errors,
-        datatype_base,
-        validate
-        ):
-    """
     
-    :returns: True if valid; otherwise False
     
-    """
-    #  All values of the datatype must be valid values of the base datatype.
+class CSVWMaxErrorsError(CSVWError):
+    """Raised when the number of errors found reaches the max_errors argument.
     
+    :param errors: The errors found before processing stopped, as a list of 
+        dictionaries with the keys 'table', 'column_name', 'row_number' and 
+        'errors'.
     
+    """
     
-    if datatype_base=='integer':
+    def __init__(self, message, errors):
+        super().__init__(message)
+        self.errors=errors
         
-        pass
-    
-    elif datatype_base=='long':
         
-        return check_value_constraints(
-            value,
-            errors,
-            datatype_base,
-            validate,
-            minimum=-9223372036854775808,
-            maximum=9223372036854775807
-            )
+class CSVWPrimaryKeyError(CSVWError):
+    """Raised when validating if the primary key of a table does not have a 
+    unique combination of values in each row.
     
-    elif datatype_base=='int':
-        
-        return check_value_constraints(
-            value,
-            errors,
-            datatype_base,
-            validate,
-            minimum=-2147483648,
-            maximum=2147483647
-            )
+    The message includes only the first duplicate primary keys.
     
-    elif datatype_base=='short':
-        
-        return check_value_constraints(
-            value,
-            errors,
-            datatype_base,
-            validate,
-            minimum=-32768,
-            maximum=32767
-            )
+    :param duplicate_primary_keys: All the primary key values which occur in 
+        more than one row, as a list of (primary key values, row numbers) 
+        tuples, see get_duplicate_primary_keys.
     
-    elif datatype_base=='byte':
-        
-        return check_value_constraints(
-            value,
-            errors,
-            datatype_base,
-            validate,
-            minimum=-128,
-            maximum=127
-            )
+    """
     
-    elif datatype_base=='nonNegativeInteger':
-        
-        return check_value_constraints(
-            value,
-            errors,
-            datatype_base,
-            validate,
-            minimum=0
-            )
+    def __init__(self, message, duplicate_primary_keys):
+        super().__init__(message)
+        self.duplicate_primary_keys=duplicate_primary_keys
+
+
+#%% ---Fetching Resources---
+
+# The metadata documents and tabular data files are opened using a URL 
+# fetcher. By default this is a URLFetcher, which reuses the connections 
+# to remote hosts. This can be replaced using set_url_fetcher, for example 
+# by a MemoryURLFetcher when testing.
+
+class URLFetcher():
+    """Opens the resources at URLs.
     
-    elif datatype_base=='positiveInteger':
-        
-        return check_value_constraints(
-            value,
-            errors,
-            datatype_base,
-            validate,
-            minimum_exclusive=0
-            )
+    Remote (http and https) resources are fetched using a single 
+    requests.Session, which keeps the connections alive and reuses them for 
+    later requests to the same host. 
+    Other URLs, such as file URLs, are opened using urllib.request.urlopen.
     
-    elif datatype_base=='unsignedLong':
-        
-        return check_value_constraints(
-            value,
-            errors,
-            datatype_base,
-            validate,
-            maximum=18446744073709551615,
-            minimum=0
-            )
+    The HTTP headers of a remote resource are found using a GET request 
+    rather than a HEAD request. The response is kept and its content is 
+    returned by a later call to open for the same URL, so that a tabular 
+    data file is only requested once.
     
-    elif datatype_base=='unsignedInt':
-        
-        return check_value_constraints(
-            value,
-            errors,
-            datatype_base,
-            validate,
-            maximum=4294967295,
-            minimum=0
-            )
+    Remote JSON documents, such as metadata documents, are cached following 
+    the Cache-Control, Expires, ETag and Last-Modified headers of their 
+    responses, see get_content_using_cache.
     
-    elif datatype_base=='unsignedShort':
-        
-        return check_value_constraints(
-            value,
-            errors,
-            datatype_base,
-            validate,
-            maximum=65535,
-            minimum=0
-            )
+    As for urllib.request.urlopen, a urllib.error.URLError is raised if a 
+    resource cannot be fetched, or its subclass urllib.error.HTTPError if 
+    the server returns an error status code.
     
-    elif datatype_base=='unsignedByte':
-        
-        return check_value_constraints(
-            value,
-            errors,
-            datatype_base,
-            validate,
-            maximum=255,
-            minimum=0
-            )
+    :param session: OPTIONAL. The session to use. If None a new 
+        requests.Session is created.
+    :type session: requests.Session
     
-    elif datatype_base=='nonPositiveInteger':
-        
-        return check_value_constraints(
-            value,
-            errors,
-            datatype_base,
-            validate,
-            maximum=0
-            )
+    :param max_pending_responses: The maximum number of responses kept 
+        from calls to head. If more are kept, the oldest is closed.
+    :type max_pending_responses: int
     
-    elif datatype_base=='negativeInteger':
-        
-        return check_value_constraints(
-            value,
-            errors,
-            datatype_base,
-            validate,
-            maximum_exclusive=0
-            )
+    :param cache: If True, remote JSON documents are cached in memory.
+    :type cache: bool
     
+    :param max_cache_entries: The maximum number of JSON documents cached 
+        in memory. If more are cached, the least recently used is removed.
+    :type max_cache_entries: int
     
-    return True
+    :param cache_directory: OPTIONAL. A directory where the cached JSON 
+        documents are also stored, so they can be used by later processes.
+    :type cache_directory: str
     
-
-
-
-
-#%% 4.6.1 Length Constraints
-
-def check_length_constraints(
-        value,
-        errors,
-        datatype_base,
-        validate,
-        length=None,
-        minimum_length=None,
-        maximum_length=None
-        ):
     """
-    """
-    # The length, minimum length and maximum length annotations indicate 
-    # the exact, minimum and maximum lengths for cell values.
-    
-    # The length of a value is determined as defined in [xmlschema11-2], 
-    # namely as follows:
-    # - if the value is null, its length is zero.
-    # - if the value is a string or one of its subtypes, its length is the
-    #   number of characters (ie [UNICODE] code points) in the value.
-    # - if the value is of a binary type, its length is the number of bytes 
-    #   in the binary value.
-    
-    # If the value is a list, the constraint applies to each element of the list.
     
-    #
-    if length is None and minimum_length is None and maximum_length is None:
+    def __init__(self, session=None, max_pending_responses=8, cache=True, 
+                 cache_directory=None, max_cache_entries=256):
+        self.session=requests.Session() if session is None else session
+        self.max_pending_responses=max_pending_responses
+        self.pending_responses={}  # url without fragment -> response
+        self.cache=cache
+        self.cache_directory=cache_directory
+        self.max_cache_entries=max_cache_entries
+        self.cache_entries={}  # url without fragment -> cache entry, least recently used first
+        self.lock=threading.Lock()
         
-        return True
-    
-    #
-    if value is None:
         
-        value_length=0
+    def request(self, method, url, stream=False, headers=None):
+        """Sends a request using the session.
         
-    elif datatype_base in datatypes_strings:
+        :returns: The response.
+        :rtype: requests.Response
         
-        value_length=len(value)
+        """
+        try:
+            
+            return self.session.request(method, url, stream=stream, 
+                                        headers=headers)
         
-    elif datatype_base=='base64Binary':
+        except requests.RequestException as e:
             
-        value_length=len(base64.b64decode(value))
+            raise urllib.error.URLError(e)
+        
+        
+    def open(self, url, stream=False):
+        """Opens the resource at a URL.
+        
+        :param stream: If True, the content of a remote resource is read from 
+            the connection as it is needed rather than all at once.
+        
+        :returns: A binary file object with the content of the resource. 
+            For a remote resource this has the HTTP headers of the response 
+            in its headers attribute.
+        
+        """
+        if not url.startswith(('http:','https:')):
             
-    elif datatype_base=='binary':
+            return urllib.request.urlopen(url)
+        
+        with self.lock:
             
-        value_length=len(value)  #??? a guess, needs testing...
+            response=self.pending_responses.pop(urllib.parse.urldefrag(url)[0],None)
             
-    elif datatype_base=='hexBinary':
+        if response is None and not stream and self.cache:
             
-        value_length=len(value)/2
+            return URLResponse(*self.get_content_using_cache(url))
+            
+        if response is None:
         
-    else:
+            response=self.request('GET', url, stream)
+        
+        if response.status_code>=400:
+            
+            response.close()
+            
+            raise urllib.error.HTTPError(
+                url, response.status_code, response.reason, 
+                response.headers, None
+                )
+            
+        if stream:
+            
+            #...the content is decoded if it is compressed, as it is when 
+            #...the whole content is read, and the stream stays open at the 
+            #...end of the content so it can be read by io.TextIOWrapper
+            response.raw.decode_content=True
+            response.raw.auto_close=False
+            
+            return response.raw
+        
+        else:
+            
+            return URLResponse(response.content, response.headers)
         
-        raise Exception(datatype_base)
-    
-    
-    if not length is None:
     
-        if not value_length==length:
+    def head(self, url):
+        """Returns the HTTP headers of a remote resource.
+        
+        The content of the response is not read, and is returned by the 
+        next call to open for the same URL.
+        
+        :rtype: requests.structures.CaseInsensitiveDict
+        
+        """
+        key=urllib.parse.urldefrag(url)[0]
+        
+        with self.lock:
             
-            message=f'value {value} does not have length equal to {length}.'
+            response=self.pending_responses.get(key)
             
-            if validate:
-                
-                raise CSVWError(message)
-                
-            else:
+        if not response is None:
+            
+            return response.headers
+        
+        response=self.request('GET', url, stream=True)
+        
+        with self.lock:
+            
+            self.pending_responses[key]=response
+            
+            #...a response which is not read keeps its connection open
+            if len(self.pending_responses)>self.max_pending_responses:
                 
-                errors.append(message)
+                oldest_key=next(iter(self.pending_responses))
                 
-                warnings.warn(message)
+                self.pending_responses.pop(oldest_key).close()
                 
-                return False
+        return response.headers
+    
+    
+    def get_content_using_cache(self, url):
+        """Returns the content of a remote resource, using the cache for 
+        JSON documents.
         
+        A cached document is returned without a request while it is fresh, 
+        which is for the max-age of the Cache-Control header, or otherwise 
+        until the time in the Expires header. 
+        After this, or if the Cache-Control header has no-cache, a 
+        conditional request is sent using the ETag and Last-Modified 
+        headers, and the cached document is returned if the server responds 
+        with 304 Not Modified. 
+        Documents are not cached if the Cache-Control header has no-store, 
+        if the Vary header is *, or if they can be neither fresh nor 
+        revalidated.
         
-    if not minimum_length is None:
+        :returns: (content, headers), where the headers are those of the 
+            response the content was received in.
+        :rtype: tuple
         
-        if value_length<minimum_length:
-            
-            message=f'value {value} does not have length less than {minimum_length}.'
+        """
+        key=urllib.parse.urldefrag(url)[0]
+        
+        cache_entry=self.get_cache_entry(key)
+        
+        request_headers={}
+        
+        if not cache_entry is None:
             
-            if validate:
-                
-                raise CSVWError(message)
+            if get_cache_entry_age(cache_entry)<get_freshness_lifetime(cache_entry['headers']):
                 
-            else:
+                return cache_entry['content'], cache_entry['headers']
+            
+            if 'ETag' in cache_entry['headers']:
                 
-                errors.append(message)
+                request_headers['If-None-Match']=cache_entry['headers']['ETag']
                 
-                warnings.warn(message)
+            if 'Last-Modified' in cache_entry['headers']:
                 
-                return False
+                request_headers['If-Modified-Since']=cache_entry['headers']['Last-Modified']
+            
+        response=self.request('GET', url, headers=request_headers)
         
+        if not cache_entry is None and response.status_code==304:
+            
+            #...the headers of the 304 response update the stored headers
+            headers=requests.structures.CaseInsensitiveDict(cache_entry['headers'])
+            headers.update(response.headers)
+            
+            cache_entry=dict(cache_entry,headers=headers,time=time.time())
+            
+            self.set_cache_entry(key,cache_entry)
+            
+            return cache_entry['content'], cache_entry['headers']
         
-    if not maximum_length is None:
+        if response.status_code>=400:
+            
+            raise urllib.error.HTTPError(
+                url, response.status_code, response.reason, 
+                response.headers, None
+                )
+            
+        cache_control=get_cache_control_directives(response.headers)
+        
+        if response.status_code==200 \
+            and 'json' in response.headers.get('Content-Type','') \
+            and not 'no-store' in cache_control \
+            and response.headers.get('Vary','').strip()!='*' \
+            and (get_freshness_lifetime(response.headers)>0 
+                 or 'ETag' in response.headers 
+                 or 'Last-Modified' in response.headers):
+                
+            self.set_cache_entry(
+                key,
+                {'url':key,
+                 'headers':response.headers,
+                 'time':time.time(),
+                 'content':response.content}
+                )
+            
+        return response.content, response.headers
+    
+    
+    def get_cache_entry(self, key):
+        """Returns a cache entry from memory, or from the cache directory.
         
-        if value_length>maximum_length:
+        :returns: A dictionary with the keys 'url', 'headers', 'time' and 
+            'content', or None.
+        
+        """
+        with self.lock:
             
-            message=f'value {value} does not have length greater than {maximum_length}.'
+            cache_entry=self.cache_entries.pop(key,None)
             
-            if validate:
-                
-                raise CSVWError(message)
+            #...the entry is moved to the end as the most recently used
+            if not cache_entry is None:
                 
-            else:
+                self.cache_entries[key]=cache_entry
+            
+        if cache_entry is None and not self.cache_directory is None:
+            
+            file_path=get_cache_file_path(self.cache_directory,key)
+            
+            try:
                 
-                errors.append(message)
+                with open(file_path+'.json') as f:
+                    cache_entry=json.load(f)
+                    
+                with open(file_path+'.body','rb') as f:
+                    cache_entry['content']=f.read()
+                    
+            except (OSError, ValueError):
                 
-                warnings.warn(message)
+                return None
+            
+            cache_entry['headers']=\
+                requests.structures.CaseInsensitiveDict(cache_entry['headers'])
+            
+            self.add_cache_entry_to_memory(key,cache_entry)
                 
-                return False
-        
-        
-    return True
+        return cache_entry
     
     
-#%% 4.6.2 Value Constraints
-
-def check_value_constraints(
-        value,
-        errors,
-        datatype_base,
-        validate,
-        minimum=None,
-        maximum=None,
-        minimum_exclusive=None,
-        maximum_exclusive=None
-        ):
-    """
+    def add_cache_entry_to_memory(self, key, cache_entry):
+        """Stores a cache entry in memory as the most recently used, and 
+        removes the least recently used entries if there are more than 
+        max_cache_entries.
+        
+        """
+        with self.lock:
+            
+            self.cache_entries.pop(key,None)
+            self.cache_entries[key]=cache_entry
+            
+            while len(self.cache_entries)>self.max_cache_entries:
+                
+                oldest_key=next(iter(self.cache_entries))
+                
+                del self.cache_entries[oldest_key]
+                
+                
+    def set_cache_entry(self, key, cache_entry):
+        """Stores a cache entry in memory, and in the cache directory.
+        
+        """
+        self.add_cache_entry_to_memory(key,cache_entry)
+            
+        if not self.cache_directory is None:
+            
+            os.makedirs(self.cache_directory, exist_ok=True)
+            
+            file_path=get_cache_file_path(self.cache_directory,key)
+            
+            #...the files are written under temporary names and then renamed, 
+            #...so other processes never read a partly written file
+            temporary_file_path=f'{file_path}.{os.getpid()}.{threading.get_ident()}'
+            
+            with open(temporary_file_path+'.body','wb') as f:
+                f.write(cache_entry['content'])
+                
+            with open(temporary_file_path+'.json','w') as f:
+                json.dump(
+                    {'url':cache_entry['url'],
+                     'headers':dict(cache_entry['headers']),
+                     'time':cache_entry['time']},
+                    f
+                    )
+                
+            os.replace(temporary_file_path+'.body',file_path+'.body')
+            os.replace(temporary_file_path+'.json',file_path+'.json')
     
-    :returns: True is value passes the constraints; otherwise False
+    
+class URLResponse(io.BytesIO):
+    """A binary file object with the content of a remote resource, as 
+    returned by URLFetcher.open.
+    
+    :param headers: The HTTP headers of the response, which are kept in the 
+        headers attribute.
     
     """
-    # The minimum, maximum, minimum exclusive, and maximum exclusive 
-    # annotations indicate limits on cell values. 
-    # These apply to numeric, date/time, and duration types.
     
-    # Validation of cell values against these datatypes is as defined 
-    # in [xmlschema11-2]. 
+    def __init__(self, content, headers):
+        super().__init__(content)
+        self.headers=headers
     
-    # If the value is a list, the constraint applies to each element of the list.
     
-    if not minimum is None:
+def get_cache_control_directives(
+        headers
+        ):
+    """Returns the directives of the Cache-Control header of a response.
+    
+    :returns: A dictionary of directive name (in lower case) to value, 
+        which is None for directives without a value.
+    :rtype: dict
+    
+    """
+    directives={}
+    
+    for directive in headers.get('Cache-Control','').split(','):
         
-        if value<minimum:
+        name,_,value=directive.partition('=')
+        
+        if name.strip():
             
-            message=f'value {value} is less than the minimum {minimum}'
-                
-            if validate:
-                
-                raise CSVWError(message)
-                
-            else:
+            directives[name.strip().lower()]=value.strip().strip('"') or None
             
-                errors.append(message)
-                
-                warnings.warn(message)
-                
-                return False
+    return directives
+
+
+def get_freshness_lifetime(
+        headers
+        ):
+    """Returns the number of seconds a response is fresh for, from the 
+    Cache-Control and Expires headers.
+    
+    :rtype: float
+    
+    """
+    directives=get_cache_control_directives(headers)
+    
+    if 'no-cache' in directives:
         
+        return 0
     
-    if not maximum is None:
+    if 'max-age' in directives:
         
-        if value>maximum:
+        try:
             
-            message=f'value {value} is greater than the maximum {maximum}'
+            return float(directives['max-age'])
+        
+        except (TypeError, ValueError):
             
-            if validate:
-                
-                raise CSVWError(message)
-                
-            else:
-                
-                errors.append(message)
-                
-                warnings.warn(message)
-                
-                return False
-    
+            return 0
         
-    if not minimum_exclusive is None:
+    if 'Expires' in headers:
         
-        if value<=minimum_exclusive:
+        try:
+            
+            expires=email.utils.parsedate_to_datetime(headers['Expires'])
+            date=email.utils.parsedate_to_datetime(headers['Date'])
+            
+            return (expires-date).total_seconds()
         
-            message=f'value {value} is less than or equal to the minimum_exclusive {minimum_exclusive}'
-                
-            if validate:
-                
-                raise CSVWError(message)
-                
-            else:
+        except (KeyError, TypeError, ValueError):
             
-                errors.append(message)
-                
-                warnings.warn(message)
-                
-                return False
+            return 0
+            
+    return 0
+
+
+def get_cache_entry_age(
+        cache_entry
+        ):
+    """Returns the age of a cache entry in seconds, including the Age header 
+    of the response.
     
+    :rtype: float
     
-    if not maximum_exclusive is None:
+    """
+    try:
         
-        if value>=maximum_exclusive:
+        age=float(cache_entry['headers'].get('Age',0))
         
-            message=f'value {value} is greater than or equal to the maximum_exclusive {maximum_exclusive}'
-                
-            if validate:
-                
-                raise CSVWError(message)
-                
-            else:
-            
-                errors.append(message)
-                
-                warnings.warn(message)
-                
-                return False
-    
+    except ValueError:
+        
+        age=0
     
-    return True
+    return age+time.time()-cache_entry['time']
 
-#%% Section 5 - Locating Metadata
 
-def locate_metadata(
-        tabular_data_file_url,  
-        tabular_data_file_headers,
-        overriding_metadata_file_path_or_url,
-        _link_header,
-        _well_known_text,
-        validate
+def get_cache_file_path(
+        cache_directory,
+        url
         ):
-    """
-    """
-    # As described in section 4. Tabular Data Models, tabular data may have 
-    # a number of annotations associated with it. 
-    # Here we describe the different methods that can be used to locate 
-    # metadata that provides those annotations.
-
-    # In the methods of locating metadata described here, metadata is 
-    # provided within a single document. 
-    # The syntax of such documents is defined in [tabular-metadata]. 
-    # Metadata is located using a specific order of precedence:
-    
-    # 1. metadata supplied by the user of the implementation that is 
-    #    processing the tabular data, see section 5.1 Overriding Metadata.
-    # 2. metadata in a document linked to using a Link header associated 
-    #    with the tabular data file, see section 5.2 Link Header.
-    # 3. metadata located through default paths which may be overridden 
-    #    by a site-wide location configuration, see section 5.3 Default 
-    #    Locations and Site-wide Location Configuration.
-    # 4. metadata embedded within the tabular data file itself, see 
-    #    section 5.4 Embedded Metadata.
+    """Returns the path of the files of a cached URL in the cache directory, 
+    without the file extension.
     
-    # Processors must use the first metadata found for processing a 
-    # tabular data file by using overriding metadata, if provided. 
-    # Otherwise processors must attempt to locate the first metadata 
-    # document from the Link header or the metadata located through 
-    # site-wide configuration. 
-    # If no metadata is supplied or found, processors must use 
-    # embedded metadata. 
-    # If the metadata does not originate from the embedded metadata, 
-    # validators must verify that the table group description within 
-    # that metadata is compatible with that in the embedded metadata, 
-    # as defined in [tabular-metadata].
+    """
+    return os.path.join(cache_directory,
+                        hashlib.sha256(url.encode()).hexdigest())
     
-    # NOTE
-    # When feasible, processors should start from a metadata file and 
-    # publishers should link to metadata files directly, rather than 
-    # depend on mechanisms outlined in this section for locating metadata 
-    # from a tabular data file. 
-    # Otherwise, if possible, publishers should provide a Link header 
-    # on the tabular data file as described in section 5.2 Link Header.
     
-    # NOTE
-    # If there is no site-wide location configuration, section 5.3 Default 
-    # Locations and Site-wide Location Configuration specifies default 
-    # URI patterns or paths to be used to locate metadata.    
-        
-    metadata_document_dict=None
+class MemoryURLFetcher():
+    """A stand-in for URLFetcher which serves resources held in memory, 
+    for testing.
     
-    # 1
-    if not overriding_metadata_file_path_or_url is None:
-        
-        metadata_document_dict, metadata_document_location=\
-            get_overriding_metadata(
-                overriding_metadata_file_path_or_url,
-                tabular_data_file_url
-                )
+    :param resources: A dictionary of URL to the content of the resource 
+        (bytes or str), or to a tuple of (content, HTTP headers).
+    :type resources: dict
     
-    # 2
+    The URLs of the requests are recorded in the requests attribute, as a 
+    list of (method, url) tuples.
     
-    if metadata_document_dict is None:
+    """
     
-        if not tabular_data_file_headers is None or not _link_header is None:
+    def __init__(self, resources):
+        self.resources=resources
+        self.requests=[]
+        
+        
+    def get_content_and_headers(self, method, url):
+        ""
+        self.requests.append((method, url))
+        
+        if not url in self.resources:
             
-            metadata_document_dict, metadata_document_location=\
-                get_metadata_from_link_header(
-                    tabular_data_file_headers or _link_header,
-                    tabular_data_file_url,
-                    validate
-                    )
+            raise urllib.error.HTTPError(url, 404, 'Not Found', {}, None)
             
+        resource=self.resources[url]
         
-    # 3
-    if metadata_document_dict is None:
+        content,headers=resource if isinstance(resource,tuple) else (resource,{})
         
-        metadata_document_dict, metadata_document_location=\
-            get_metadata_from_default_or_site_wide_location(
-                tabular_data_file_url,
-                tabular_data_file_headers,
-                _well_known_text
-                )
-    # 4
-    if metadata_document_dict is None:
-    
-        metadata_document_dict=None
-        metadata_document_location=None
+        if isinstance(content,str):
             
-    #print('-metadata_document_dict', metadata_document_dict)
+            content=content.encode()
+            
+        return content, requests.structures.CaseInsensitiveDict(headers)
+        
+        
+    def open(self, url, stream=False):
+        ""
+        return URLResponse(*self.get_content_and_headers('GET', url))
     
-    return metadata_document_dict, metadata_document_location
-
     
+    def head(self, url):
+        ""
+        return self.get_content_and_headers('HEAD', url)[1]
+    
+    
+#...the default URLFetcher is created when it is first used, so importing 
+#...this module does not create a requests.Session
+url_fetcher=None
+url_fetcher_lock=threading.Lock()
 
 
+def get_url_fetcher():
+    """Returns the URL fetcher used to open metadata documents and tabular 
+    data files, creating the default URLFetcher if none has been set.
+    
+    :returns: A URLFetcher, or the fetcher given to set_url_fetcher.
+    
+    """
+    global url_fetcher
+    
+    #...the fetcher is read once, as another thread may set it
+    fetcher=url_fetcher
+    
+    if fetcher is None:
+        
+        with url_fetcher_lock:
+            
+            if url_fetcher is None:
+                
+                url_fetcher=URLFetcher()
+                
+            fetcher=url_fetcher
+            
+    return fetcher
 
-#%% 5.1 Overriding Metadata
 
-def get_overriding_metadata(
-        overriding_metadata_file_path_or_url,
-        tabular_data_file_url
+def set_url_fetcher(
+        fetcher
         ):
-    """
-    """
-    # Processors should provide users with the facility to provide their 
-    # own metadata for tabular data files that they process. 
+    """Sets the URL fetcher used to open metadata documents and tabular 
+    data files.
     
-    # This might be provided:
-    # - through processor options, such as command-line options for a command-line implementation or checkboxes in a GUI.
-    # - by enabling the user to select an existing metadata file, which may be local or remote.
-    # - by enabling the user to specify a series of metadata files, which are merged by the processor and handled as if they were a single file.
+    :param fetcher: An object with the methods open(url, stream=False) and 
+        head(url), such as a URLFetcher or a MemoryURLFetcher.
     
-    # For example, a processor might be invoked with:
+    :returns: The previous URL fetcher, or None if the default URLFetcher 
+        has not been created yet. If None is set, a new default URLFetcher 
+        is created when it is next used.
     
-    # EXAMPLE 2: Command-line CSV processing with column types
-    # $ csvlint data.csv --datatypes:string,float,string,string
-    # to enable the testing of the types of values in the columns of a 
-    # CSV file, or with:
+    This also clears the cached /.well-known/csvm files and the cached 
+    metadata URLs which were not found.
     
-    # EXAMPLE 3: Command-line CSV processing with a schema
-    # $ csvlint data.csv --schema:schema.json
-    # to supply a schema that describes the contents of the file, against which it can be validated.
+    """
+    global url_fetcher
     
-    # Metadata supplied in this way is called overriding, or user-supplied, 
-    # metadata. 
-    # Implementations should define how any options they define are 
-    # mapped into the vocabulary defined in [tabular-metadata]. 
-    # If the user selects existing metadata files, implementations must 
-    # not use metadata located through the Link header (as described in 
-    # section 5.2 Link Header) or site-wide location configuration (as 
-    # described in section 5.3 Default Locations and Site-wide Location 
-    # Configuration).
-    
-    # NOTE
-    # Users should ensure that any metadata from those locations that 
-    # they wish to use is explicitly incorporated into the overriding 
-    # metadata that they use to process tabular data. 
-    # Processors may provide facilities to make this easier by 
-    # automatically merging metadata files from different locations, 
-    # but this specification does not define how such merging is carried out.
+    with url_fetcher_lock:
     
-    if os.path.isfile(overriding_metadata_file_path_or_url):
-        
-        x=os.path.abspath(overriding_metadata_file_path_or_url)
-        x=x.replace('\\','/')
-        x=r'file:///'+x
-        x=urllib.parse.quote(x,safe=':/#?%')
-        
-        metadata_document_location=normalize_url(x)
-            
-    else:
-        
-        metadata_document_location=\
-            normalize_url(
-                overriding_metadata_file_path_or_url
-                )
+        previous_url_fetcher=url_fetcher
         
+        url_fetcher=fetcher
     
-    with urllib.request.urlopen(metadata_document_location) as metadata_response:
-    
-        metadata_text=metadata_response.read().decode()
-    
-    metadata_document_dict=json.loads(metadata_text)
+    #...the cached site-wide location results were found using the 
+    #...previous fetcher
+    with site_wide_location_cache_lock:
+        
+        well_known_text_cache.clear()
+        missing_metadata_url_cache.clear()
     
-    return metadata_document_dict,metadata_document_location
+    return previous_url_fetcher
 
 
-#%% 5.2 Link Header
+#%% ---Model for Tabular Data and Metadata---
 
-def get_metadata_from_link_header(
-        link_header,
-        tabular_data_file_url,  # absolute_url
-        validate
+#%% Section 4 - Tabular Data Models
+
+#%% 4.6 Datatypes
+
+#...the value constraints of the integer datatypes which are derived from 
+#...the integer datatype in [xmlschema11-2]
+datatype_base_value_constraints={
+    'long':dict(minimum=-9223372036854775808,
+                maximum=9223372036854775807),
+    'int':dict(minimum=-2147483648,
+               maximum=2147483647),
+    'short':dict(minimum=-32768,
+                 maximum=32767),
+    'byte':dict(minimum=-128,
+                maximum=127),
+    'nonNegativeInteger':dict(minimum=0),
+    'positiveInteger':dict(minimum_exclusive=0),
+    'unsignedLong':dict(maximum=18446744073709551615,
+                        minimum=0),
+    'unsignedInt':dict(maximum=4294967295,
+                       minimum=0),
+    'unsignedShort':dict(maximum=65535,
+                         minimum=0),
+    'unsignedByte':dict(maximum=255,
+                        minimum=0),
+    'nonPositiveInteger':dict(maximum=0),
+    'negativeInteger':dict(maximum_exclusive=0)
+    }
+
+
+def validate_value_for_datatype_base(
+        value,
+        errors,
+        datatype_base,
+        validate,
+        warn=warnings.warn
         ):
     """
-    """
-    # If the user has not supplied a metadata file as overriding metadata, 
-    # described in section 5.1 Overriding Metadata, then when retrieving a 
-    # tabular data file via HTTP, processors must retrieve the metadata file 
-    # referenced by any Link header with:
-    # - rel="describedby", and
-    # - type="application/csvm+json", type="application/ld+json" or type="application/json".
     
-    # so long as this referenced metadata file describes the retrieved 
-    # tabular data file (ie, contains a table description whose url 
-    # matches the request URL).
+    :returns: True if valid; otherwise False
     
-    # If there is more than one valid metadata file linked to through 
-    # multiple Link headers, then implementations must use the metadata 
-    # file referenced by the last Link header.
+    """
+    #  All values of the datatype must be valid values of the base datatype.
     
-    # If the metadata file found at this location does not explicitly 
-    #  include a reference to the requested tabular data file then it must 
-    #  be ignored. 
-    #  URLs must be normalized as described in section 6.3 URL Normalization.
+    if datatype_base in datatype_base_value_constraints:
+        
+        return check_value_constraints(
+            value,
+            errors,
+            datatype_base,
+            validate,
+            warn=warn,
+            **datatype_base_value_constraints[datatype_base]
+            )
     
-    # NOTE
-    # The Link header of the metadata file may include references to the 
-    # CSV files it describes, using the describes relationship. 
-    # For example, in the countries' metadata example, the server might 
-    # return the following headers:
+    return True
     
-    # Link: <http://example.org/countries.csv>; rel="describes"; type="text/csv"
-    # Link: <http://example.org/country_slice.csv>; rel="describes"; type="text/csv"
+
+
+
+
+#%% 4.6.1 Length Constraints
+
+def check_length_constraints(
+        value,
+        errors,
+        datatype_base,
+        validate,
+        length=None,
+        minimum_length=None,
+        maximum_length=None,
+        warn=warnings.warn
+        ):
+    """
+    """
+    # The length, minimum length and maximum length annotations indicate 
+    # the exact, minimum and maximum lengths for cell values.
     
-    # However, locating the metadata should not depend on this mechanism.
-        
-    link_list=requests.utils.parse_header_links(link_header)
+    # The length of a value is determined as defined in [xmlschema11-2], 
+    # namely as follows:
+    # - if the value is null, its length is zero.
+    # - if the value is a string or one of its subtypes, its length is the
+    #   number of characters (ie [UNICODE] code points) in the value.
+    # - if the value is of a binary type, its length is the number of bytes 
+    #   in the binary value.
     
-    urls=[]
+    # If the value is a list, the constraint applies to each element of the list.
     
-    for link_dict in link_list:
-        
-        if link_dict.get('rel')=='describedby':
-            
-            if link_dict.get('type') in ['application/csvm+json',
-                                         'application/ld+json',
-                                         'application/json']:
-                
-                urls.append(link_dict['url'])
-        
-    #...look for the last valid link header
-    for url in urls[::-1]:
+    #
+    if length is None and minimum_length is None and maximum_length is None:
         
-        metadata_document_location=\
-            urllib.parse.urljoin(
-                tabular_data_file_url,
-                url
-                )  
+        return True
+    
+    #
+    if value is None:
         
-        #...load metadata document
+        value_length=0
         
-        try:
+    elif datatype_base in datatypes_strings:
         
-            with urllib.request.urlopen(metadata_document_location) as metadata_response:
-                
-                metadata_text=metadata_response.read().decode()
+        value_length=len(value)
         
-        except urllib.error.URLError:
+    elif datatype_base=='base64Binary':
             
-            continue
-        
-        metadata_document_dict=json.loads(metadata_text)
-        
-        #print('-metadata_document_dict',metadata_document_dict)
-        
-        #
-        if 'tables' in metadata_document_dict:  # it's a TableGroup object
+        value_length=len(base64.b64decode(value))
             
-            metadata_table_group_dict=metadata_document_dict
+    elif datatype_base=='binary':
             
-        elif 'url' in metadata_document_dict:  # it's a Table object
-        
-            #...convert to TableGroup object
-            metadata_table_group_dict={
-                '@context': metadata_document_dict['@context'],
-                'tables': [metadata_document_dict]
-                }
-            metadata_table_group_dict['tables'][0].pop('@context', None)
+        value_length=len(value)  #??? a guess, needs testing...
             
-        #...normalize metadata
-        base_url, default_language=\
-            validate_and_normalize_metadata_table_group_dict(
-                metadata_table_group_dict,
-                metadata_document_location,
-                validate
-                )     
+    elif datatype_base=='hexBinary':
             
-        #print('-base_url',base_url)
+        value_length=len(value)/2
+        
+    else:
+        
+        raise Exception(datatype_base)
+    
+    
+    if not length is None:
+    
+        if not value_length==length:
             
-        table_url=metadata_table_group_dict['tables'][0]['url']  
+            message=f'value {value} does not have length equal to {length}.'
+            
+            if validate:
+                
+                raise CSVWError(message)
+                
+            else:
+                
+                errors.append(message)
+                
+                warn(message)
+                
+                return False
         
-        x={'url':table_url}
-        normalize_link_property(
-            x, 
-            'url', 
-            base_url)
-        table_url_normalized=x['url']
         
-        #print('-table_url_normalized',table_url_normalized
-        #print('-tabular_data_file_url',tabular_data_file_url)
+    if not minimum_length is None:
         
-        if table_url_normalized==tabular_data_file_url:
-            
-            return metadata_table_group_dict, metadata_document_location
+        if value_length<minimum_length:
             
-        else:
+            message=f'value {value} does not have length less than {minimum_length}.'
             
-            message='Metadata file found does not explicitly '
-            message+='include a reference to the requested tabular data file. '
-            message+='Metadata file is ignored. '
+            if validate:
+                
+                raise CSVWError(message)
+                
+            else:
+                
+                errors.append(message)
+                
+                warn(message)
+                
+                return False
+        
+        
+    if not maximum_length is None:
+        
+        if value_length>maximum_length:
             
-            warnings.warn(message)
+            message=f'value {value} does not have length greater than {maximum_length}.'
             
-    return None, None
-
-
-#%% 5.3 Default Locations and Site-wide Location Configuration
-
+            if validate:
+                
+                raise CSVWError(message)
+                
+            else:
+                
+                errors.append(message)
+                
+                warn(message)
+                
+                return False
+        
+        
+    return True
+    
+    
+#%% 4.6.2 Value Constraints
 
-def get_metadata_from_default_or_site_wide_location(
-        tabular_data_file_url,
-        tabular_data_file_headers,
-        _well_known_text,
-        _print_intermediate_outputs=False
+def check_value_constraints(
+        value,
+        errors,
+        datatype_base,
+        validate,
+        minimum=None,
+        maximum=None,
+        minimum_exclusive=None,
+        maximum_exclusive=None,
+        warn=warnings.warn
         ):
     """
-    """
-    #print('-tabular_data_file_url',tabular_data_file_url)
-    #print('-tabular_data_file_headers',tabular_data_file_headers)
-    
-    # If the user has not supplied a metadata file as overriding metadata, 
-    # described in section 5.1 Overriding Metadata, and no applicable 
-    # metadata file has been discovered through a Link header, described 
-    # in section 5.2 Link Header, processors must attempt to locate a 
-    # metadata documents through site-wide configuration.
     
-    # In this case, processors must retrieve the file from the well-known 
-    # URI /.well-known/csvm. (Well-known URIs are defined by [RFC5785].) 
-    # If no such file is located (i.e. the response results in a client 
-    # error 4xx status code or a server error 5xx status code), processors 
-    # must proceed as if this file were found with the following content 
-    # which defines default locations:
-    #  {+url}-metadata.json
-    #  csv-metadata.json
+    :returns: True is value passes the constraints; otherwise False
     
-    # The response to retrieving /.well-known/csvm may be cached, subject 
-    # to cache control directives. 
-    # This includes caching an unsuccessful response such as a 404 Not Found.
+    """
+    # The minimum, maximum, minimum exclusive, and maximum exclusive 
+    # annotations indicate limits on cell values. 
+    # These apply to numeric, date/time, and duration types.
     
-    # This file must contain a URI template, as defined by [URI-TEMPLATE], 
-    # on each line. 
+    # Validation of cell values against these datatypes is as defined 
+    # in [xmlschema11-2]. 
     
-    #if tabular_data_file_headers is None:   # i.e. a local file
+    # If the value is a list, the constraint applies to each element of the list.
     
-    well_known_path_url=urllib.parse.urljoin(
-            tabular_data_file_url,
-            '/.well-known/csvm'
-            )
+    if not minimum is None:
         
-    if _print_intermediate_outputs: print('-well_known_path_url',well_known_path_url)
-    
-    #
-    try:
-    
-        with urllib.request.urlopen(well_known_path_url) as well_known_path_response:
+        if value<minimum:
             
-            well_known_text=well_known_path_response.read().decode()
-    
-    except urllib.error.URLError:
-        
-        well_known_text='{+url}-metadata.json\ncsv-metadata.json'
-    
-    
-    
-    #print('well_known_path_response',well_known_path_response)
-    #print(dir(well_known_path_response))
-    
-    
-    #...for testing
-    if not _well_known_text is None:
-    
-        well_known_text=_well_known_text
-    
-    # Starting with the first such URI template, processors must:
-        
-    locations=[x.strip() for x in well_known_text.split('\n')
-               if len(x.strip())>0]
-        
-    for uri_template in locations:
-        
-        #print('location',location)
-        
-        # 1. Expand the URI template, with the variable url being set to 
-        #    the URL of the requested tabular data file (with any fragment 
-        #    component of that URL removed).
-        
-        variables={'url':urllib.parse.urldefrag(tabular_data_file_url)[0]}
+            message=f'value {value} is less than the minimum {minimum}'
+                
+            if validate:
+                
+                raise CSVWError(message)
+                
+            else:
             
-        #print(variables)
-        
-        expanded_url_quoted=uritemplate.expand(uri_template,
-                                               variables)
-        #print('expanded_url_quoted',expanded_url_quoted)
-        
-        expanded_url=urllib.parse.unquote(expanded_url_quoted)   # needed for file paths as they get quoted in the expand process
-        #print('expanded_url', expanded_url)
-        
-        
-        # 2. Resolve the resulting URL against the URL of the requested 
-        #    tabular data file.
-        
-        metadata_url=\
-            urllib.parse.urljoin(
-                tabular_data_file_url,
-                expanded_url
-                )
-        if _print_intermediate_outputs: print('-metadata_url',metadata_url)
-        
-        
-        # 3. Attempt to retrieve a metadata document at that URL.
-        
-        try:
-        
-            with urllib.request.urlopen(metadata_url) as metadata_response:
+                errors.append(message)
                 
-                metadata_text=metadata_response.read().decode()
-                metadata_document_dict=json.loads(metadata_text)
+                warn(message)
+                
+                return False
         
-        except urllib.error.URLError:
+    
+    if not maximum is None:
         
-            metadata_document_dict=None
+        if value>maximum:
             
-       
+            message=f'value {value} is greater than the maximum {maximum}'
+            
+            if validate:
+                
+                raise CSVWError(message)
+                
+            else:
+                
+                errors.append(message)
+                
+                warn(message)
+                
+                return False
+    
         
+    if not minimum_exclusive is None:
         
-        # 4. If no metadata document is found at that location, or if the 
-        #    metadata file found at the location does not explicitly 
-        #    include a reference to the relevant tabular data file, 
-        #    perform these same steps on the next URI template, otherwise 
-        #    use that metadata document.
-    
-        if metadata_document_dict is None:
-            
-            continue
+        if value<=minimum_exclusive:
         
-        else:
-    
-            # top-level properties
-            base_url, default_language=\
-                validate_top_level_properties(
-                    metadata_document_dict,
-                    metadata_url
-                    )       
-            #print('base_url',base_url)
-            
-            if 'tables' in metadata_document_dict:
+            message=f'value {value} is less than or equal to the minimum_exclusive {minimum_exclusive}'
                 
-                table_url=metadata_document_dict['tables'][0]['url']
-            
-            elif 'url' in metadata_document_dict:
+            if validate:
+                
+                raise CSVWError(message)
                 
-                table_url=metadata_document_dict['url']
-            
             else:
             
-                raise CSVWError
-            #print('-table_url',table_url)
-            
-            x={'url':table_url}
-            normalize_link_property(
-                x, 
-                'url', 
-                base_url)
-            table_url_normalized=x['url']
+                errors.append(message)
                 
-            #print('-table_url_normalized',table_url_normalized)
-            #print('-tabular_data_file_url',tabular_data_file_url)
-            #print(table_url_normalized==tabular_data_file_url)
-            
-            if table_url_normalized==tabular_data_file_url:
-                    
-                #print('test')
+                warn(message)
                 
-                return metadata_document_dict,metadata_url
-            
-            else:
+                return False
+    
+    
+    if not maximum_exclusive is None:
+        
+        if value>=maximum_exclusive:
+        
+            message=f'value {value} is greater than or equal to the maximum_exclusive {maximum_exclusive}'
                 
-                #print('-table_url_resolved',table_url_resolved)
-                #print('-tabular_data_file_url',tabular_data_file_url)
+            if validate:
                 
-                message='Metadata file found from default or site wide location '
-                message+='does not explicitly '
-                message+='include a reference to the requested tabular data file. '
-                message+='Metadata file is ignored. '
+                raise CSVWError(message)
                 
-                #print(message)
+            else:
+            
+                errors.append(message)
                 
-                warnings.warn(message)
+                warn(message)
                 
+                return False
     
-    # if no matches
-    metadata_document_dict=None
-    metadata_url=None
     
-    return metadata_document_dict,metadata_url
-        
+    return True
 
-#%% 5.4 Embedded Metadata
 
-def get_metadata_from_embedded_metadata(
+def get_check_constraints_function(
+        datatype,
+        warn=warnings.warn
         ):
+    """Returns a function which checks a value against the length and value 
+    constraints of a datatype.
+    
+    The constraints are read from the datatype once, rather than for 
+    each value.
+    
+    :param datatype: The datatype annotation of a column.
+    :type datatype: dict
+    
+    :param warn: The function called with the message of each error, 
+        instead of warnings.warn.
+    
+    :returns: A function with arguments (value, errors, validate) which 
+        returns True if the value passes the constraints; otherwise False. 
+        None is returned if the datatype has no constraints.
+    
     """
-    """
-    # Most syntaxes for tabular data provide a facility for embedding 
-    # metadata within the tabular data file itself. 
-    # The definition of a syntax for tabular data should include a 
-    # description of how the syntax maps to an annotated data model, 
-    # and in particular how any embedded metadata is mapped into the 
-    # vocabulary defined in [tabular-metadata]. 
-    # Parsing based on the default dialect for CSV, as described in 8. 
-    # Parsing Tabular Data, will extract column titles from the first 
-    # row of a CSV file.
-
-    # EXAMPLE 6: http://example.org/tree-ops.csv
-    # GID,On Street,Species,Trim Cycle,Inventory Date
-    # 1,ADDISON AV,Celtis australis,Large Tree Routine Prune,10/18/2010
-    # 2,EMERSON ST,Liquidambar styraciflua,Large Tree Routine Prune,6/2/2010
-    # The results of this can be found in section 8.2.1 Simple Example.
+    datatype_base=datatype['base']
     
-    # For another example, the following tab-delimited file contains 
-    # embedded metadata where it is assumed that comments may be added 
-    # using a #, and that the column types may be indicated using a 
-    # #datatype annotation:
+    length=datatype.get('length')
+    minimum_length=datatype.get('minLength')
+    maximum_length=datatype.get('maxLength')
     
-    # EXAMPLE 7: Tab-separated file containing embedded metadata
-    # # publisher City of Palo Alto
-    # # updated 12/31/2010
-    # #name GID on_street species trim_cycle  inventory_date
-    # #datatype string  string  string  string  date:M/D/YYYY
-    #   GID On Street Species Trim Cycle  Inventory Date
-    #   1 ADDISON AV  Celtis australis  Large Tree Routine Prune  10/18/2010
-    #   2 EMERSON ST  Liquidambar styraciflua Large Tree Routine Prune  6/2/2010
+    minimum=datatype.get('minimum') or datatype.get('minInclusive')
+    maximum=datatype.get('maximum') or datatype.get('maxInclusive')
+    minimum_exclusive=datatype.get('minExclusive')
+    maximum_exclusive=datatype.get('maxExclusive')
     
-    # A processor that recognises this format may be able to extract and 
-    # make sense of this embedded metadata.
+    has_length_constraints=\
+        not (length is None and minimum_length is None 
+             and maximum_length is None)
         
-    pass
+    has_value_constraints=\
+        not (minimum is None and maximum is None 
+             and minimum_exclusive is None and maximum_exclusive is None)
+    
+    if not has_length_constraints and not has_value_constraints:
         
+        return None
     
-
-#%% Section 6 - Processing Tables
-
-#%% 6.1 Creating Annotated Tables
-
-def parse_tabular_data_from_text_non_normative_definition(
-        *args,
-        **kwargs
-        ):
-    """
-    """
-    return parse_tabular_data_from_text(*args,**kwargs)
-    
-
-def get_embedded_metadata(
-        input_file_path_or_url,
-        relative_path=False,
-        nrows=None,
-        encoding=None,
-        skip_rows=None,
-        parse_tabular_data_function=parse_tabular_data_from_text_non_normative_definition,
-        ):
-    """
-    """
-    embedded_metadata_dict=\
-        create_annotated_table_group(
-            input_file_path_or_url,
-            _return_embedded_metadata=True,
-            nrows=nrows,
-            encoding=encoding,
-            skip_rows=skip_rows,
-            parse_tabular_data_function=parse_tabular_data_function
-            )
+    def check_constraints(
+            value,
+            errors,
+            validate
+            ):
+        ""
         
-    if relative_path:
+        if has_length_constraints:
+            
+            result=\
+                check_length_constraints(
+                    value,
+                    errors,
+                    datatype_base,
+                    validate,
+                    length=length,
+                    minimum_length=minimum_length,
+                    maximum_length=maximum_length,
+                    warn=warn
+                    )
+                
+            if not result:
+                
+                return False
         
-        embedded_metadata_dict=replace_string(
-            embedded_metadata_dict,
-            'file:///'+os.getcwd().replace('\\','/')+'/',
-            ''
-            )
-      
-    return embedded_metadata_dict
+        #...value constraints are only checked if there are no errors, so 
+        #...that a value which is not converted is not compared with them
+        if has_value_constraints and len(errors)==0:
+            
+            result=\
+                check_value_constraints(
+                    value,
+                    errors,
+                    datatype_base,
+                    validate,
+                    minimum=minimum,
+                    maximum=maximum,
+                    minimum_exclusive=minimum_exclusive,
+                    maximum_exclusive=maximum_exclusive,
+                    warn=warn
+                    )
+            
+            if not result:
+                
+                return False
+            
+        return True
     
+    return check_constraints
     
-def create_annotated_table_group(
-        input_file_path_or_url,
-        overriding_metadata_file_path_or_url=None,
-        nrows=None,
-        validate=False,
-        encoding=None,
-        skip_rows=None,
-        parse_tabular_data_function=parse_tabular_data_from_text_non_normative_definition,
-        _return_embedded_metadata=False,  # returns only the embedded metadata
-        _link_header=None,  # for testing link headers,
-        _well_known_text=None,  # for testing well known paths
-        _save_intermediate_and_final_outputs_to_file=False,  # for testing, to see metadata objects etc.
-        _print_intermediate_outputs=False  # for testing, to see intermediate outputs as the code is running
+
+#%% Section 5 - Locating Metadata
+
+def locate_metadata(
+        tabular_data_file_url,  
+        tabular_data_file_headers,
+        overriding_metadata_file_path_or_url,
+        _link_header,
+        _well_known_text,
+        validate,
+        concurrent_metadata_requests=False
         ):
     """
     
-    :param input_file_path_or_url: Path/url to metadata document (json) or 
-        tabular data file (csv). 
-    :type input_file_path_ir_url: str
-    
-    :param overriding_metadata_file_path_or_url: Location of a metadata.json
-        file to be used as "overriding metadata".
-        Either a) a relative local file path; b) 
-        an absolute local file path; or c) a full URL
-    :type overriding_metadata_file_path_or_url: str
-    
-    :param validate: Sets validator
+    :param concurrent_metadata_requests: If True, the metadata documents 
+        which may be referenced by the Link header or the site-wide 
+        location configuration of a remote tabular data file are requested 
+        at the same time, see get_concurrent_metadata_documents.
     
     """
+    # As described in section 4. Tabular Data Models, tabular data may have 
+    # a number of annotations associated with it. 
+    # Here we describe the different methods that can be used to locate 
+    # metadata that provides those annotations.
+
+    # In the methods of locating metadata described here, metadata is 
+    # provided within a single document. 
+    # The syntax of such documents is defined in [tabular-metadata]. 
+    # Metadata is located using a specific order of precedence:
     
-    if _print_intermediate_outputs: print('---create_annotated_table_group---')
+    # 1. metadata supplied by the user of the implementation that is 
+    #    processing the tabular data, see section 5.1 Overriding Metadata.
+    # 2. metadata in a document linked to using a Link header associated 
+    #    with the tabular data file, see section 5.2 Link Header.
+    # 3. metadata located through default paths which may be overridden 
+    #    by a site-wide location configuration, see section 5.3 Default 
+    #    Locations and Site-wide Location Configuration.
+    # 4. metadata embedded within the tabular data file itself, see 
+    #    section 5.4 Embedded Metadata.
     
-    # After locating metadata, metadata is normalized and coerced into a 
-    # single table group description. 
-    # When starting with a metadata file, this involves normalizing the 
-    # provided metadata file and verifying that the embedded metadata for 
-    # each tabular data file referenced from the metadata is compatible 
-    # with the metadata. 
-    # When starting with a tabular data file, this involves locating the 
-    # first metadata file as described in section 5. Locating Metadata and 
-    # normalizing into a single descriptor.
+    # Processors must use the first metadata found for processing a 
+    # tabular data file by using overriding metadata, if provided. 
+    # Otherwise processors must attempt to locate the first metadata 
+    # document from the Link header or the metadata located through 
+    # site-wide configuration. 
+    # If no metadata is supplied or found, processors must use 
+    # embedded metadata. 
+    # If the metadata does not originate from the embedded metadata, 
+    # validators must verify that the table group description within 
+    # that metadata is compatible with that in the embedded metadata, 
+    # as defined in [tabular-metadata].
     
+    # NOTE
+    # When feasible, processors should start from a metadata file and 
+    # publishers should link to metadata files directly, rather than 
+    # depend on mechanisms outlined in this section for locating metadata 
+    # from a tabular data file. 
+    # Otherwise, if possible, publishers should provide a Link header 
+    # on the tabular data file as described in section 5.2 Link Header.
     
-    #...determine if input file is a metadata document or tabular data file
-    if input_file_path_or_url.endswith('.json'):
-        
-        input_is_tabular_data_file=False
+    # NOTE
+    # If there is no site-wide location configuration, section 5.3 Default 
+    # Locations and Site-wide Location Configuration specifies default 
+    # URI patterns or paths to be used to locate metadata.    
         
-    elif input_file_path_or_url.endswith('.csv'):
+    metadata_document_dict=None
+    
+    link_header=_link_header if tabular_data_file_headers is None \
+        else tabular_data_file_headers.get('Link','')
         
-        input_is_tabular_data_file=True
+    #...the candidate metadata documents are requested at the same time, 
+    #...and the steps below then use the first in order of precedence
+    prefetched_documents=None
     
-    else:
+    if concurrent_metadata_requests \
+        and overriding_metadata_file_path_or_url is None \
+        and tabular_data_file_url.startswith(('http:','https:')):
+            
+        prefetched_documents=\
+            get_concurrent_metadata_documents(
+                tabular_data_file_url,
+                link_header,
+                _well_known_text
+                )
     
-        input_is_tabular_data_file=True
+    # 1
+    if not overriding_metadata_file_path_or_url is None:
         
-        #if '?' in input_file_path_or_url:
+        metadata_document_dict, metadata_document_location=\
+            get_overriding_metadata(
+                overriding_metadata_file_path_or_url,
+                tabular_data_file_url
+                )
+    
+    # 2
+    
+    if metadata_document_dict is None:
+    
+        if not link_header is None:
+            
+            metadata_document_dict, metadata_document_location=\
+                get_metadata_from_link_header(
+                    link_header,
+                    tabular_data_file_url,
+                    validate,
+                    prefetched_documents
+                    )
             
-        #    input_file_path_or_url=input_file_path_or_url.split('?')[0]
         
+    # 3
+    if metadata_document_dict is None:
         
-        #message='"input_file_path_or_url" must end with either ".json" or ".csv"/'    
+        metadata_document_dict, metadata_document_location=\
+            get_metadata_from_default_or_site_wide_location(
+                tabular_data_file_url,
+                tabular_data_file_headers,
+                _well_known_text,
+                prefetched_documents=prefetched_documents
+                )
+    # 4
+    if metadata_document_dict is None:
     
-        #raise CSVWError(message)
-      
+        metadata_document_dict=None
+        metadata_document_location=None
+            
+    #print('-metadata_document_dict', metadata_document_dict)
     
-      
+    return metadata_document_dict, metadata_document_location
+
+
+def get_concurrent_metadata_documents(
+        tabular_data_file_url,
+        link_header,
+        _well_known_text,
+        max_workers=8
+        ):
+    """Requests the candidate metadata documents of a remote tabular data 
+    file at the same time, using a thread pool.
+    
+    The candidates are the documents referenced by the Link header and by 
+    the URI templates of the site-wide location configuration. 
+    The default locations are requested while /.well-known/csvm is being 
+    requested, and any other locations it gives are requested after this.
+    
+    No document is chosen here: get_metadata_from_link_header and 
+    get_metadata_from_default_or_site_wide_location read the results in 
+    order of precedence, so the metadata found is the same as when the 
+    documents are requested one at a time. 
+    All candidates are requested, so there may be more requests than when 
+    the first document found is used.
+    
+    :returns: A dictionary of metadata URL to a tuple of (content, error), 
+        where error is the urllib.error.URLError raised, or None. 
+        The URL of /.well-known/csvm is mapped to its text.
+    :rtype: dict
+    
+    """
+    well_known_path_url=urllib.parse.urljoin(
+            tabular_data_file_url,
+            '/.well-known/csvm'
+            )
+    
+    prefetched_documents={}
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
         
-    # If processing starts with a tabular data file, implementations:
+        futures={}
         
-    if input_is_tabular_data_file:
+        def submit(metadata_url):
+            
+            #...metadata documents which were recently not found are not 
+            #...requested
+            if not metadata_url in futures \
+                and not get_cached_site_wide_location_value(
+                        missing_metadata_url_cache,
+                        metadata_url
+                        ):
+                    
+                futures[metadata_url]=\
+                    executor.submit(
+                        get_metadata_document_content,
+                        metadata_url
+                        )
         
-        # 1. Retrieve the tabular data file.
+        well_known_future=\
+            executor.submit(
+                get_well_known_text,
+                tabular_data_file_url
+                )
         
-        #...set up the url
+        for metadata_url in get_link_header_metadata_urls(
+                link_header or '',
+                tabular_data_file_url
+                ):
+            
+            submit(metadata_url)
+            
+        for uri_template in ['{+url}-metadata.json','csv-metadata.json']:
+            
+            submit(get_site_wide_metadata_url(uri_template,tabular_data_file_url))
         
-        #... if it looks like a local file
-        if not hyperlink.parse(input_file_path_or_url).absolute:  # only returns true if e.g. 'http://...'
+        well_known_text=well_known_future.result()
+        
+        prefetched_documents[well_known_path_url]=well_known_text
+        
+        if not _well_known_text is None:
             
-            if input_file_path_or_url==os.path.abspath(input_file_path_or_url):
-                
-                x=input_file_path_or_url
+            well_known_text=_well_known_text
+        
+        for uri_template in get_uri_templates(well_known_text):
             
-            else:
-                
-                x=os.path.join(os.getcwd(),input_file_path_or_url)
+            submit(get_site_wide_metadata_url(uri_template,tabular_data_file_url))
             
-            x=x.replace('\\','/')
-            x=r'file:///'+x
-            x=urllib.parse.quote(x,safe=':/#?%')
-            x=normalize_url(x)
+        for metadata_url,future in futures.items():
             
-            tabular_data_file_url=x
-                
-            tabular_data_file_headers=None
+            prefetched_documents[metadata_url]=future.result()
             
-        #... if it looks like a remote file
-        else:
+    return prefetched_documents
+    
+    
+def get_metadata_document_content(
+        metadata_url
+        ):
+    """Requests a metadata document.
+    
+    :returns: (content, error) where content is the bytes of the document 
+        and error is None, or content is None and error is the 
+        urllib.error.URLError raised.
+    :rtype: tuple
+    
+    """
+    try:
+        
+        with get_url_fetcher().open(metadata_url) as metadata_response:
             
-            tabular_data_file_url=\
-                normalize_url(
-                    input_file_path_or_url
-                    )
-                
-            tabular_data_file_headers=requests.head(tabular_data_file_url).headers
+            return metadata_response.read(), None
             
-        if _print_intermediate_outputs: print('-tabular_data_file_url',tabular_data_file_url)     
-        if _print_intermediate_outputs: print('-tabular_data_file_headers',tabular_data_file_headers)
-
+    except urllib.error.URLError as e:
         
-        # 2. Retrieve the first metadata file (FM) as described in 
-        #    section 5. Locating Metadata:
-        
-        # 2.1. metadata supplied by the user (see section 5.1 
-        #      Overriding Metadata).
-        # 2.2. metadata referenced from a Link Header that may be returned 
-        #      when retrieving the tabular data file (see section 5.2 
-        #      Link Header).
-        # 2.3. metadata retrieved through a site-wide location configuration 
-        #      (see section 5.3 Default Locations and Site-wide Location 
-        #      Configuration).
-        # 2.4. embedded metadata as defined in section 5.4 Embedded 
-        #      Metadata with a single tables entry where the url property 
-        #      is set from that of the tabular data file.
+        return None, e
+    
+    
+def open_metadata_document(
+        metadata_url,
+        prefetched_documents=None
+        ):
+    """Opens a metadata document, using the result of an earlier request 
+    in prefetched_documents if there is one.
+    
+    :raises urllib.error.URLError: If the document could not be fetched.
+    
+    :returns: A binary file object.
+    
+    """
+    if not prefetched_documents is None and metadata_url in prefetched_documents:
         
-        metadata_document_dict, metadata_document_location=\
-            locate_metadata(
-                tabular_data_file_url,
-                tabular_data_file_headers,
-                overriding_metadata_file_path_or_url,
-                _link_header,
-                _well_known_text,
-                validate
-                )
+        content,error=prefetched_documents[metadata_url]
         
-        if metadata_document_dict is None:  # i.e. using embedded metadata
-            
-            metadata_document_dict={
-                '@context': 'http://www.w3.org/ns/csvw',
-                'url': tabular_data_file_url,
-                'tableSchema':{}
-                }
-            
-            metadata_document_location=''
-            
-            use_embedded_metadata_flag=True
+        if not error is None:
             
-        else:
+            raise error
             
-            use_embedded_metadata_flag=False
-        
-        # 3. Proceed as if the process starts with FM.
+        return io.BytesIO(content)
+    
+    return get_url_fetcher().open(metadata_url)
+
+
+#%% 5.1 Overriding Metadata
+
+def get_overriding_metadata(
+        overriding_metadata_file_path_or_url,
+        tabular_data_file_url
+        ):
+    """
+    """
+    # Processors should provide users with the facility to provide their 
+    # own metadata for tabular data files that they process. 
+    
+    # This might be provided:
+    # - through processor options, such as command-line options for a command-line implementation or checkboxes in a GUI.
+    # - by enabling the user to select an existing metadata file, which may be local or remote.
+    # - by enabling the user to specify a series of metadata files, which are merged by the processor and handled as if they were a single file.
+    
+    # For example, a processor might be invoked with:
+    
+    # EXAMPLE 2: Command-line CSV processing with column types
+    # $ csvlint data.csv --datatypes:string,float,string,string
+    # to enable the testing of the types of values in the columns of a 
+    # CSV file, or with:
+    
+    # EXAMPLE 3: Command-line CSV processing with a schema
+    # $ csvlint data.csv --schema:schema.json
+    # to supply a schema that describes the contents of the file, against which it can be validated.
+    
+    # Metadata supplied in this way is called overriding, or user-supplied, 
+    # metadata. 
+    # Implementations should define how any options they define are 
+    # mapped into the vocabulary defined in [tabular-metadata]. 
+    # If the user selects existing metadata files, implementations must 
+    # not use metadata located through the Link header (as described in 
+    # section 5.2 Link Header) or site-wide location configuration (as 
+    # described in section 5.3 Default Locations and Site-wide Location 
+    # Configuration).
+    
+    # NOTE
+    # Users should ensure that any metadata from those locations that 
+    # they wish to use is explicitly incorporated into the overriding 
+    # metadata that they use to process tabular data. 
+    # Processors may provide facilities to make this easier by 
+    # automatically merging metadata files from different locations, 
+    # but this specification does not define how such merging is carried out.
+    
+    if os.path.isfile(overriding_metadata_file_path_or_url):
         
-        # NO CODE NEEDED
+        x=os.path.abspath(overriding_metadata_file_path_or_url)
+        x=x.replace('\\','/')
+        x=r'file:///'+x
+        x=urllib.parse.quote(x,safe=':/#?%')
         
-    # If the process starts with a metadata file:
+        metadata_document_location=normalize_url(x)
+            
     else:
         
-        # 1. Retrieve the metadata file yielding the metadata UM (which is 
-        #    treated as overriding metadata, see section 5.1 Overriding 
-        #    Metadata).
-        
-        #...set up the url
+        metadata_document_location=\
+            normalize_url(
+                overriding_metadata_file_path_or_url
+                )
         
-        if not hyperlink.parse(input_file_path_or_url).absolute:  # only returns true if e.g. 'http://...'
-            
-            if input_file_path_or_url==os.path.abspath(input_file_path_or_url):
-                
-                x=input_file_path_or_url
-            
-            else:
-                
-                x=os.path.join(os.getcwd(),input_file_path_or_url)
-            
-            x=x.replace('\\','/')
-            x=r'file:///'+x
-            x=urllib.parse.quote(x,safe=':/#?%')
-            x=normalize_url(x)
+    
+    with get_url_fetcher().open(metadata_document_location) as metadata_response:
+    
+        metadata_text=metadata_response.read().decode()
+    
+    metadata_document_dict=json.loads(metadata_text)
+    
+    return metadata_document_dict,metadata_document_location
+
+
+#%% 5.2 Link Header
+
+def get_metadata_from_link_header(
+        link_header,
+        tabular_data_file_url,  # absolute_url
+        validate,
+        prefetched_documents=None
+        ):
+    """
+    """
+    # If the user has not supplied a metadata file as overriding metadata, 
+    # described in section 5.1 Overriding Metadata, then when retrieving a 
+    # tabular data file via HTTP, processors must retrieve the metadata file 
+    # referenced by any Link header with:
+    # - rel="describedby", and
+    # - type="application/csvm+json", type="application/ld+json" or type="application/json".
+    
+    # so long as this referenced metadata file describes the retrieved 
+    # tabular data file (ie, contains a table description whose url 
+    # matches the request URL).
+    
+    # If there is more than one valid metadata file linked to through 
+    # multiple Link headers, then implementations must use the metadata 
+    # file referenced by the last Link header.
+    
+    # If the metadata file found at this location does not explicitly 
+    #  include a reference to the requested tabular data file then it must 
+    #  be ignored. 
+    #  URLs must be normalized as described in section 6.3 URL Normalization.
+    
+    # NOTE
+    # The Link header of the metadata file may include references to the 
+    # CSV files it describes, using the describes relationship. 
+    # For example, in the countries' metadata example, the server might 
+    # return the following headers:
+    
+    # Link: <http://example.org/countries.csv>; rel="describes"; type="text/csv"
+    # Link: <http://example.org/country_slice.csv>; rel="describes"; type="text/csv"
+    
+    # However, locating the metadata should not depend on this mechanism.
         
-            metadata_document_location=x
+    #...look for the last valid link header
+    for metadata_document_location in get_link_header_metadata_urls(
+            link_header,
+            tabular_data_file_url
+            ):
         
-        else:
-            
-            metadata_document_location=\
-                normalize_url(
-                    input_file_path_or_url
-                    )
+        #...load metadata document
         
-        #...get metadata document
-        with urllib.request.urlopen(metadata_document_location) as metadata_response:
+        try:
         
-            metadata_text=metadata_response.read().decode()
+            with open_metadata_document(
+                    metadata_document_location,
+                    prefetched_documents
+                    ) as metadata_response:
+                
+                metadata_text=metadata_response.read().decode()
         
+        except urllib.error.URLError:
+            
+            continue
         
-        try:
+        metadata_document_dict=json.loads(metadata_text)
         
-            metadata_document_dict=json.loads(metadata_text)
+        #print('-metadata_document_dict',metadata_document_dict)
         
-        except json.decoder.JSONDecodeError as e: 
+        #
+        if 'tables' in metadata_document_dict:  # it's a TableGroup object
             
-            raise CSVWError(str(e))
+            metadata_table_group_dict=metadata_document_dict
+            
+        elif 'url' in metadata_document_dict:  # it's a Table object
         
-        #
-        tabular_data_file_text=None
+            #...convert to TableGroup object
+            metadata_table_group_dict={
+                '@context': metadata_document_dict['@context'],
+                'tables': [metadata_document_dict]
+                }
+            metadata_table_group_dict['tables'][0].pop('@context', None)
+            
+        #...normalize metadata
+        base_url, default_language=\
+            validate_and_normalize_metadata_table_group_dict(
+                metadata_table_group_dict,
+                metadata_document_location,
+                validate
+                )     
+            
+        #print('-base_url',base_url)
+            
+        table_url=metadata_table_group_dict['tables'][0]['url']  
         
-        use_embedded_metadata_flag=False
+        x={'url':table_url}
+        normalize_link_property(
+            x, 
+            'url', 
+            base_url)
+        table_url_normalized=x['url']
         
+        #print('-table_url_normalized',table_url_normalized
+        #print('-tabular_data_file_url',tabular_data_file_url)
         
+        if table_url_normalized==tabular_data_file_url:
+            
+            return metadata_table_group_dict, metadata_document_location
+            
+        else:
+            
+            message='Metadata file found does not explicitly '
+            message+='include a reference to the requested tabular data file. '
+            message+='Metadata file is ignored. '
+            
+            warnings.warn(message)
+            
+    return None, None
+
+
+def get_link_header_metadata_urls(
+        link_header,
+        tabular_data_file_url
+        ):
+    """Returns the URLs of the metadata files referenced by a Link header, 
+    starting with the last Link header.
     
-    if _print_intermediate_outputs: print('-metadata_document_location',metadata_document_location)
+    :rtype: list
     
-        
-    #...for testing
-    if _save_intermediate_and_final_outputs_to_file:
+    """
+    link_list=requests.utils.parse_header_links(link_header)
     
-        with open('metadata_table_group_dict.json','w') as f:
+    urls=[]
+    
+    for link_dict in link_list:
+        
+        if link_dict.get('rel')=='describedby':
             
-            if use_embedded_metadata_flag:
-                
-                json.dump(
-                    {},
-                    f,
-                    indent=4
-                    )
+            if link_dict.get('type') in ['application/csvm+json',
+                                         'application/ld+json',
+                                         'application/json']:
                 
-            else:
+                urls.append(link_dict['url'])
                 
-                json.dump(
-                    metadata_document_dict,
-                    f,
-                    indent=4
-                    )
-        
+    return [urllib.parse.urljoin(tabular_data_file_url,url) 
+            for url in urls[::-1]]
+
+
+#%% 5.3 Default Locations and Site-wide Location Configuration
+
+
+def get_metadata_from_default_or_site_wide_location(
+        tabular_data_file_url,
+        tabular_data_file_headers,
+        _well_known_text,
+        _print_intermediate_outputs=False,
+        prefetched_documents=None
+        ):
+    """
+    """
+    #print('-tabular_data_file_url',tabular_data_file_url)
+    #print('-tabular_data_file_headers',tabular_data_file_headers)
+    
+    # If the user has not supplied a metadata file as overriding metadata, 
+    # described in section 5.1 Overriding Metadata, and no applicable 
+    # metadata file has been discovered through a Link header, described 
+    # in section 5.2 Link Header, processors must attempt to locate a 
+    # metadata documents through site-wide configuration.
+    
+    # In this case, processors must retrieve the file from the well-known 
+    # URI /.well-known/csvm. (Well-known URIs are defined by [RFC5785].) 
+    # If no such file is located (i.e. the response results in a client 
+    # error 4xx status code or a server error 5xx status code), processors 
+    # must proceed as if this file were found with the following content 
+    # which defines default locations:
+    #  {+url}-metadata.json
+    #  csv-metadata.json
+    
+    # The response to retrieving /.well-known/csvm may be cached, subject 
+    # to cache control directives. 
+    # This includes caching an unsuccessful response such as a 404 Not Found.
+    
+    # This file must contain a URI template, as defined by [URI-TEMPLATE], 
+    # on each line. 
+    
+    #if tabular_data_file_headers is None:   # i.e. a local file
+    
+    well_known_text=\
+        get_well_known_text(
+            tabular_data_file_url,
+            _print_intermediate_outputs,
+            prefetched_documents
+            )
+    
+    
+    
+    #print('well_known_path_response',well_known_path_response)
+    #print(dir(well_known_path_response))
+    
+    
+    #...for testing
+    if not _well_known_text is None:
+    
+        well_known_text=_well_known_text
+    
+    # Starting with the first such URI template, processors must:
         
-    # 2. Normalize UM using the process defined in Normalization 
-    # in [tabular-metadata], coercing UM into a table group 
-    # description, if necessary.
+    for uri_template in get_uri_templates(well_known_text):
         
-    #...a TableGroup object
-    if 'tables' in metadata_document_dict:
+        #print('location',location)
         
-        metadata_table_group_dict=metadata_document_dict
+        # 1. Expand the URI template, with the variable url being set to 
+        #    the URL of the requested tabular data file (with any fragment 
+        #    component of that URL removed).
         
-    #... a Table object
-    elif 'url' in metadata_document_dict:
-    
-        #...convert to TableGroup object
-        metadata_table_group_dict={
-            '@context': metadata_document_dict['@context'],
-            'tables': [metadata_document_dict]
-            }
-        metadata_table_group_dict['tables'][0].pop('@context', None)
+        # 2. Resolve the resulting URL against the URL of the requested 
+        #    tabular data file.
         
-    elif metadata_document_dict.get('@type')=='TableGroup':  
+        metadata_url=\
+            get_site_wide_metadata_url(
+                uri_template,
+                tabular_data_file_url
+                )
+        if _print_intermediate_outputs: print('-metadata_url',metadata_url)
         
-        metadata_table_group_dict=metadata_document_dict
         
-    elif metadata_document_dict.get('@type')=='Table':  
+        # 3. Attempt to retrieve a metadata document at that URL.
         
-        #...convert to TableGroup object
-        metadata_table_group_dict={
-            '@context': metadata_document_dict['@context'],
-            'tables': [metadata_document_dict]
-            }
-        metadata_table_group_dict['tables'][0].pop('@context', None)
+        #...remote metadata documents which were recently not found are 
+        #...not requested again
+        if get_cached_site_wide_location_value(
+                missing_metadata_url_cache,
+                metadata_url
+                ):
+            
+            continue
         
-    else:
+        try:
         
-        message='Metadata document is not a Table Group description object'
-        message+='or a Table description object.'
+            with open_metadata_document(
+                    metadata_url,
+                    prefetched_documents
+                    ) as metadata_response:
+                
+                metadata_text=metadata_response.read().decode()
+                metadata_document_dict=json.loads(metadata_text)
         
-        raise CSVWError(message)
+        except urllib.error.HTTPError as e:
         
+            metadata_document_dict=None
+            
+            if e.code in missing_resource_status_codes:
+            
+                set_cached_site_wide_location_value(
+                    missing_metadata_url_cache,
+                    metadata_url,
+                    True,
+                    e.headers
+                    )
         
+        except urllib.error.URLError:
         
-    #...normalize metadata
-    base_url, default_language=\
-        validate_and_normalize_metadata_table_group_dict(
-            metadata_table_group_dict,
-            metadata_document_location,
-            validate
-            )
+            metadata_document_dict=None
+            
+       
         
         
-    # 3. For each table (TM) in UM in order, create one or more annotated tables:
-    
-    #...initial annotated table group object    
-    annotated_table_group_dict={
-        'id':None,
-        'notes':[],   # changed from False
-        'tables':[]
-        }
+        # 4. If no metadata document is found at that location, or if the 
+        #    metadata file found at the location does not explicitly 
+        #    include a reference to the relevant tabular data file, 
+        #    perform these same steps on the next URI template, otherwise 
+        #    use that metadata document.
     
-    #...loop through tables in metadata
-    for table_index,metadata_table_dict in \
-        enumerate(metadata_table_group_dict['tables']):
-            
-        #...set up table url and headers
+        if metadata_document_dict is None:
             
-        tabular_data_file_url=metadata_table_dict['url']
-        
+            continue
         
+        else:
+    
+            # top-level properties
+            base_url, default_language=\
+                validate_top_level_properties(
+                    metadata_document_dict,
+                    metadata_url
+                    )       
+            #print('base_url',base_url)
+            
+            if 'tables' in metadata_document_dict:
                 
-        if tabular_data_file_url.startswith('file'):
+                table_url=metadata_document_dict['tables'][0]['url']
             
-            tabular_data_file_headers=None
-        
-        else:
+            elif 'url' in metadata_document_dict:
                 
-            tabular_data_file_headers=requests.head(tabular_data_file_url).headers
+                table_url=metadata_document_dict['url']
             
-        #print('-tabular_data_file_url',tabular_data_file_url)     
+            else:
             
-        #print('-tabular_data_file_headers',tabular_data_file_headers)
-
+                raise CSVWError
+            #print('-table_url',table_url)
             
+            x={'url':table_url}
+            normalize_link_property(
+                x, 
+                'url', 
+                base_url)
+            table_url_normalized=x['url']
+                
+            #print('-table_url_normalized',table_url_normalized)
+            #print('-tabular_data_file_url',tabular_data_file_url)
+            #print(table_url_normalized==tabular_data_file_url)
             
-        # 3.1 Extract the dialect description (DD) from UM for the table 
-        #     associated with the tabular data file. If there is no such 
-        #     dialect description, extract the first available dialect 
-        #     description from a group of tables in which the tabular data 
-        #     file is described. Otherwise use the default dialect description.
-
-        dialect_description_dict=\
-            metadata_table_dict.get('dialect',None)
-            
-        #...gets the first dialect description in the group of tables
-        #...check the table group object
-        if dialect_description_dict is None:
-            dialect_description_dict=\
-                metadata_table_group_dict.get('dialect',None)
-        
-        #...check each table in turn
-        if dialect_description_dict is None:
-            for metadata_table_dict2 in \
-                metadata_table_group_dict['tables']:
-                    if 'dialect' in metadata_table_dict2:
-                        dialect_description_dict=\
-                            metadata_table_dict2['dialect']
-                        break
+            if table_url_normalized==tabular_data_file_url:
                     
-        #...if none found, gets the default dialect description
-        if dialect_description_dict is None:
-            
-            dialect_description_dict=dict(
-                commentPrefix='#',
-                delimiter=',',
-                doubleQuote=True,
-                encoding='utf-8',
-                header=True,
-                headerRowCount=1,
-                lineTerminators=["\r\n", "\n"],
-                quoteChar='"',
-                skipBlankRows=False,
-                skipColumns=0,
-                skipInitialSpace=False,
-                skipRows=0,
-                trim=True
-                )
-        
-        
-            # 3.2 If using the default dialect description, override default values 
-            #     in DD based on HTTP headers found when retrieving the tabular data file:
-            #     - If the media type from the Content-Type header is text/tab-separated-values, 
-            #       set delimiter to TAB in DD.
-            #     - If the Content-Type header includes the header parameter with a 
-            #       value of absent, set header to false in DD.
-            #     - If the Content-Type header includes the charset parameter, set 
-            #       encoding to this value in DD.
-            
-            if not tabular_data_file_headers is None:
-        
-                content_type=tabular_data_file_headers.get('Content-Type',None)
+                #print('test')
                 
-                if not content_type is None:
-                    
-                    if 'text/tab-separated-values' in content_type:  # NEEDS TESTING
-                    
-                        dialect_description_dict['delimter']='\t'
-                        
-                    if 'header=absent' in content_type:  # NEEDS TESTING
-                    
-                        dialect_description_dict['header']=False
-                        
-                    if 'charset' in content_type:  # NEEDS TESTING
-                    
-                        charset_value=\
-                            content_type.split('charset')[1].split(';')[0].strip()[1:]  # NEEDS TESTING
-                        
-                        dialect_description_dict['encoding']=charset_value
-            
-            
-            #... additional overrides from function arguments
-            
-            if not encoding is None:
-                dialect_description_dict['encoding']=encoding
-            
-            if not skip_rows is None:
-                dialect_description_dict['skipRows']=skip_rows
+                return metadata_document_dict,metadata_url
             
+            else:
+                
+                #print('-table_url_resolved',table_url_resolved)
+                #print('-tabular_data_file_url',tabular_data_file_url)
+                
+                message='Metadata file found from default or site wide location '
+                message+='does not explicitly '
+                message+='include a reference to the requested tabular data file. '
+                message+='Metadata file is ignored. '
+                
+                #print(message)
+                
+                warnings.warn(message)
+                
+    
+    # if no matches
+    metadata_document_dict=None
+    metadata_url=None
+    
+    return metadata_document_dict,metadata_url
         
-        # 3.3 Parse the tabular data file, using DD as a guide, to create a 
-        #     basic tabular data model (T) and extract embedded metadata (EM), 
-        #     for example from the header line.
 
+def get_uri_templates(
+        well_known_text
+        ):
+    """Returns the URI templates of a /.well-known/csvm file, one per line.
+    
+    :rtype: list
+    
+    """
+    return [x.strip() for x in well_known_text.split('\n')
+            if len(x.strip())>0]
+
+
+def get_site_wide_metadata_url(
+        uri_template,
+        tabular_data_file_url
+        ):
+    """Expands a URI template of the site-wide location configuration and 
+    resolves it against the URL of the tabular data file.
+    
+    :rtype: str
+    
+    """
+    variables={'url':urllib.parse.urldefrag(tabular_data_file_url)[0]}
         
+    expanded_url_quoted=uritemplate.expand(uri_template,
+                                           variables)
+    
+    expanded_url=urllib.parse.unquote(expanded_url_quoted)   # needed for file paths as they get quoted in the expand process
+    
+    return urllib.parse.urljoin(
+        tabular_data_file_url,
+        expanded_url
+        )
 
 
-        annotated_table_dict, embedded_metadata_dict=\
-            parse_tabular_data_function(
-                tabular_data_file_url,
-                dialect_description_dict
-                )
-            
-        annotated_table_group_dict['tables'].append(annotated_table_dict)
-            
-        #... returns only the embedded metadata if requested
-        if _return_embedded_metadata:
-            
-            return embedded_metadata_dict
-        
+#...the responses to /.well-known/csvm of each origin, including 
+#...unsuccessful responses, and the remote metadata URLs which were not 
+#...found, are cached for this number of seconds unless the responses 
+#...have Cache-Control or Expires headers
+site_wide_location_cache_ttl=300
+
+#...only these status codes show that a resource does not exist; other 
+#...errors, such as 500 Internal Server Error or 429 Too Many Requests, may 
+#...be temporary and so are not cached
+missing_resource_status_codes=(404,410)
+
+well_known_text_cache={}  # origin -> (expiry time, well known text)
+missing_metadata_url_cache={}  # metadata url -> (expiry time, True)
+site_wide_location_cache_lock=threading.Lock()
+
+
+def get_well_known_text(
+        tabular_data_file_url,
+        _print_intermediate_outputs=False,
+        prefetched_documents=None
+        ):
+    """Returns the content of the /.well-known/csvm file of the origin of a 
+    tabular data file, or the default locations if this is not found.
+    
+    For remote files, the result is cached for each origin, see 
+    site_wide_location_cache_ttl.
+    
+    :param prefetched_documents: See get_concurrent_metadata_documents.
+    
+    :rtype: str
+    
+    """
+    
+    well_known_path_url=urllib.parse.urljoin(
+            tabular_data_file_url,
+            '/.well-known/csvm'
+            )
         
-        #...for testing
-        if _save_intermediate_and_final_outputs_to_file:
-            with open('embedded_metadata_dict.json','w') as f:
-                
-                json.dump(
-                    embedded_metadata_dict,
-                    f,
-                    indent=4
-                    )
+    if _print_intermediate_outputs: print('-well_known_path_url',well_known_path_url)
+    
+    if not prefetched_documents is None and well_known_path_url in prefetched_documents:
         
+        return prefetched_documents[well_known_path_url]
+    
+    well_known_text=\
+        get_cached_site_wide_location_value(
+            well_known_text_cache,
+            well_known_path_url
+            )
+    
+    if not well_known_text is None:
         
-        #...if using embedded metadata
-        if use_embedded_metadata_flag:
-            
-            metadata_table_dict=copy.deepcopy(embedded_metadata_dict)
+        return well_known_text
+    
+    headers=None
+    
+    try:
+    
+        with get_url_fetcher().open(well_known_path_url) as well_known_path_response:
             
-            validate_and_normalize_metadata_table_dict(
-                metadata_table_dict,
-                metadata_document_location=None,
-                metadata_table_group_dict=None
-                )
+            well_known_text=well_known_path_response.read().decode()
             
-            metadata_table_dict.pop('@context')
+            headers=getattr(well_known_path_response,'headers',None)
+    
+    except urllib.error.HTTPError as e:
+        
+        if not e.code in missing_resource_status_codes:
             
-            metadata_table_group_dict['tables'][table_index]=metadata_table_dict
+            #...an error which may be temporary is not cached
+            return '{+url}-metadata.json\ncsv-metadata.json'
         
-        #print('-metadata_table_group_dict_NORMALIZED',metadata_table_group_dict)
+        well_known_text='{+url}-metadata.json\ncsv-metadata.json'
         
-        #...for testing
-        if _save_intermediate_and_final_outputs_to_file:
-            with open('metadata_table_group_dict_NORMALIZED.json','w') as f:
-                
-                json.dump(
-                    metadata_table_group_dict,
-                    f,
-                    indent=4
-                    )
+        headers=e.headers
         
+    except urllib.error.URLError:
         
+        #...a failed connection is not cached
+        return '{+url}-metadata.json\ncsv-metadata.json'
+    
+    set_cached_site_wide_location_value(
+        well_known_text_cache,
+        well_known_path_url,
+        well_known_text,
+        headers
+        )
+    
+    return well_known_text
+
+
+def get_cached_site_wide_location_value(
+        cache,
+        url
+        ):
+    """Returns a value cached for a remote URL, or None if there is no value 
+    or it has expired.
+    
+    The values in well_known_text_cache are cached by the origin of the URL.
+    
+    """
+    if not url.startswith(('http:','https:')):
         
-        #...REMOVED: setting column names to _col.1 etc.
-        #... as now done in annotating schema
-            
-        #...REMOVED: including virtual columns in annotated table dict
-        #...as now done in annotating tables
+        return None
+    
+    key=get_site_wide_location_cache_key(cache,url)
+    
+    with site_wide_location_cache_lock:
         
+        expiry_time,value=cache.get(key,(0,None))
         
-        # 3.4 If a Content-Language HTTP header was found when retrieving the 
-        #     tabular data file, and the value provides a single language, set 
-        #     the lang inherited property to this value in TM, unless TM 
-        #     already has a lang inherited property.
+    return value if time.time()<expiry_time else None
+    
+    
+def set_cached_site_wide_location_value(
+        cache,
+        url,
+        value,
+        headers=None
+        ):
+    """Caches a value for a remote URL.
+    
+    The value expires after site_wide_location_cache_ttl seconds, or after 
+    the time given by the Cache-Control or Expires headers of the response.
+    
+    """
+    if not url.startswith(('http:','https:')):
         
-        if not tabular_data_file_headers is None:
+        return
+    
+    if not headers is None and ('Cache-Control' in headers or 'Expires' in headers):
         
-            content_language=tabular_data_file_headers.get('Content-Language',None)
+        if 'no-store' in get_cache_control_directives(headers):
             
-            if not content_language is None:
-                
-                if not 'lang' in metadata_table_dict:
-                    
-                    metadata_table_dict['lang']=content_language  # NEEDS TESTING
-    
-        # 3.5 Verify that TM is compatible with EM using the procedure defined 
-        #     in Table Description Compatibility in [tabular-metadata]; if TM 
-        #     is not compatible with EM validators must raise an error, other 
-        #     processors must generate a warning and continue processing.
+            return
         
-        compare_table_descriptions(
-            metadata_table_dict,
-            embedded_metadata_dict,
-            validate=validate
-            )
+        ttl=get_freshness_lifetime(headers)
         
+    else:
         
-        #...REMOVED: section on merging the embedded metadata with the metadata document
-        #...was being used for Section 8.2.1.1.
+        ttl=site_wide_location_cache_ttl
         
+    key=get_site_wide_location_cache_key(cache,url)
         
-    # 3.6 Use the metadata TM to add annotations to the tabular data model 
-    #     T as described in Section 2 Annotating Tables in [tabular-metadata].
+    with site_wide_location_cache_lock:
+        
+        cache[key]=(time.time()+ttl,value)
+        
+        
+def get_site_wide_location_cache_key(
+        cache,
+        url
+        ):
+    """Returns the origin of the URL for well_known_text_cache, otherwise 
+    the URL without its fragment.
     
-    annotated_table_group_dict=\
-        annotate_table_group_dict(
-            annotated_table_group_dict,
-            metadata_table_group_dict,
-            base_url,
-            default_language,
-            validate
-            )
-            
-    #...Not directly in this section of the standard, but at this stage the 
-    #...cell values are parsed.
-    #...This is done after the metadata annotations are included in the 
-    #...annotated_table_group_dict (3.6)
+    """
+    if cache is well_known_text_cache:
+        
+        url_parts=urllib.parse.urlsplit(url)
+        
+        return f'{url_parts.scheme}://{url_parts.netloc}'
     
-    for annotated_table_dict in annotated_table_group_dict['tables']:
+    else:
         
-        for annotated_column_dict in annotated_table_dict['columns']:
-            
-            parse_cells_in_annotated_column_dict(
-                annotated_column_dict,
-                dialect_description_dict.get('trim',True),
-                validate
-                )
+        return urllib.parse.urldefrag(url)[0]
+        
+
+#%% 5.4 Embedded Metadata
+
+def get_metadata_from_embedded_metadata(
+        ):
+    """
+    """
+    # Most syntaxes for tabular data provide a facility for embedding 
+    # metadata within the tabular data file itself. 
+    # The definition of a syntax for tabular data should include a 
+    # description of how the syntax maps to an annotated data model, 
+    # and in particular how any embedded metadata is mapped into the 
+    # vocabulary defined in [tabular-metadata]. 
+    # Parsing based on the default dialect for CSV, as described in 8. 
+    # Parsing Tabular Data, will extract column titles from the first 
+    # row of a CSV file.
+
+    # EXAMPLE 6: http://example.org/tree-ops.csv
+    # GID,On Street,Species,Trim Cycle,Inventory Date
+    # 1,ADDISON AV,Celtis australis,Large Tree Routine Prune,10/18/2010
+    # 2,EMERSON ST,Liquidambar styraciflua,Large Tree Routine Prune,6/2/2010
+    # The results of this can be found in section 8.2.1 Simple Example.
     
-    #...generate URIs
-                
-    for annotated_table_dict in annotated_table_group_dict['tables']:
+    # For another example, the following tab-delimited file contains 
+    # embedded metadata where it is assumed that comments may be added 
+    # using a #, and that the column types may be indicated using a 
+    # #datatype annotation:
+    
+    # EXAMPLE 7: Tab-separated file containing embedded metadata
+    # # publisher City of Palo Alto
+    # # updated 12/31/2010
+    # #name GID on_street species trim_cycle  inventory_date
+    # #datatype string  string  string  string  date:M/D/YYYY
+    #   GID On Street Species Trim Cycle  Inventory Date
+    #   1 ADDISON AV  Celtis australis  Large Tree Routine Prune  10/18/2010
+    #   2 EMERSON ST  Liquidambar styraciflua Large Tree Routine Prune  6/2/2010
+    
+    # A processor that recognises this format may be able to extract and 
+    # make sense of this embedded metadata.
         
-        for annotated_column_dict in annotated_table_dict['columns']:
-            
-            for annotated_cell_dict in annotated_column_dict['cells']:
-                
-                #... from Section 6.4
-                # If there is a about URL annotation on the column, it becomes 
-                # the about URL annotation on the cell, after being transformed 
-                # into an absolute URL as described in URI Template Properties 
-                # of [tabular-metadata].
-                if not annotated_column_dict['aboutURL'] is None:
-                    
-                    annotated_cell_dict['aboutURL']=\
-                        get_URI_from_URI_template(
-                            annotated_column_dict['aboutURL'],
-                            annotated_cell_dict,
-                            annotated_table_dict['url']
-                            )  
-                        
-                        
-                # If there is a property URL annotation on the column, it becomes 
-                # the property URL annotation on the cell, after being transformed 
-                # into an absolute URL as described in URI Template Properties 
-                # of [tabular-metadata].
-                if not annotated_column_dict['propertyURL'] is None:
-                    
-                    annotated_cell_dict['propertyURL']=\
-                        get_URI_from_URI_template(
-                            annotated_column_dict['propertyURL'],
-                            annotated_cell_dict,
-                            annotated_table_dict['url']
-                            )  
-                        
-                        
-                # If there is a value URL annotation on the column, it becomes 
-                # the value URL annotation on the cell, after being transformed 
-                # into an absolute URL as described in URI Template Properties 
-                # of [tabular-metadata]. The value URL annotation is null if the cell value is null and the column virtual annotation is false.
-                if not annotated_column_dict['valueURL'] is None:
-                    
-                    
-                    annotated_cell_dict['valueURL']=\
-                        get_URI_from_URI_template(
-                            annotated_column_dict['valueURL'],
-                            annotated_cell_dict,
-                            annotated_table_dict['url']
-                            )  
-         
-                    #print(annotated_cell_dict['value'])
-                    #print(annotated_cell_dict['valueURL'])
+    pass
+        
+    
 
-    #...annotate row titles
-    for annotated_table_dict,metadata_table_dict \
-        in zip(annotated_table_group_dict['tables'],
-               metadata_table_group_dict['tables']
-               ):
-            
-        if 'tableSchema' in metadata_table_dict:
-            
-            metadata_schema_dict=metadata_table_dict['tableSchema']
+#%% Section 6 - Processing Tables
+
+#%% 6.1 Creating Annotated Tables
+
+def parse_tabular_data_from_text_non_normative_definition(
+        *args,
+        **kwargs
+        ):
+    """
+    """
+    return parse_tabular_data_from_text(*args,**kwargs)
     
-            if 'rowTitles' in metadata_schema_dict:
-                
-                # A column reference property that holds either a single reference 
-                # to a column description object or an array of references. 
-                # The value of this property determines the titles annotation for 
-                # each row within a table that uses this schema. 
-                # The titles annotation holds the list of the values of the cells 
-                # in that row that are in the referenced columns; if the value is 
-                # not a string or has no associated language, it is interpreted 
-                # as a string with an undefined language (und).
-                
-                row_titles=metadata_schema_dict['rowTitles']
-                
-                if not isinstance(row_titles,list):
-                    row_titles=[row_titles]
-                    
-                column_indexes=[]
-                
-                for row_titles_column_name in row_titles:
-                    
-                    for i,annotated_column_dict in enumerate(annotated_table_dict['columns']):
-                        
-                        if annotated_column_dict['name']==row_titles_column_name:
-                            
-                            column_indexes.append(i)
-                            
-                #            
-                for row in annotated_table_dict['rows']:
-                    
-                    for column_index in column_indexes:
-                        
-                        value=dict(**row['cells'][column_index]['value'])  # create a copy
-                        
-                        if value['@type']=='http://www.w3.org/2001/XMLSchema#string':
-                            
-                            if not '@language' in value:
-                                
-                                value['@language']='und'
-                                
-                        else:
-                            
-                            value['@type']=='http://www.w3.org/2001/XMLSchema#string'
-                            value['@language']='und'
-                        
-                        
-                        row['titles'].append(value)
-                
-      
-    #... annotate referenced rows
-    #... done here as the cell values are needed.          
-      
-    for annotated_table_dict,metadata_table_dict \
-        in zip(annotated_table_group_dict['tables'],
-               metadata_table_group_dict['tables']
-               ):
-            
-        #print('-url',annotated_table_dict['url'])
-        
-        if 'tableSchema' in metadata_table_dict:
-            
-            metadata_schema_dict=metadata_table_dict['tableSchema']
-        
-            if 'foreignKeys' in metadata_schema_dict:
-            
-                #foreign_key_definitions=metadata_schema_dict['foreignKeys']
-                
-                for j in range(len(annotated_table_dict['rows'])):
-                    
-                    #print('j',j)
-                    
-                    for foreign_key_definition in annotated_table_dict['foreignKeys']:
-                        
-                        # get foreign key values in this row of this table
-                        
-                        foreign_key_definition_columns=foreign_key_definition[0]
-                        
-                        foreign_key_definition_values=\
-                            [x['cells'][j]['value'] 
-                             for x in foreign_key_definition_columns]
-                            
-                        #print('foreign_key_definition_values',foreign_key_definition_values)
-                            
-                        # get rows that matches in the reference table
-                        
-                        foreign_key_reference_columns=foreign_key_definition[1]
-                        foreign_key_reference_table=foreign_key_reference_columns[0]['table']
-                        
-                        row_indexes=[]
-                        
-                        for k in range(len(foreign_key_reference_columns[0]['cells'])):
-                            
-                            #print('k',k)
-                            
-                            foreign_key_reference_values=\
-                                [x['cells'][k]['value'] 
-                                 for x in foreign_key_reference_columns]
-                                
-                            #print('foreign_key_reference_values',foreign_key_reference_values)
-                                
-                            if foreign_key_reference_values==foreign_key_definition_values:
-                                
-                                row_indexes.append(k)
-                                
-                              
-                         
-                            
-                            #print('test')
-                            
-                        if len(row_indexes)==0:
-                            
-                            message=f'Columns referenced by foreign key do not contain the value required: {foreign_key_definition_values}'
-                            
-                            if validate:  
-                            
-                                raise CSVWError(message)
-                                
-                            else:
-                                
-                                warnings.warn(message)
-                            
-                        elif len(row_indexes)==1:
-                            
-                            first_row=foreign_key_reference_table['rows'][row_indexes[0]]
-                            
-                            annotated_table_dict['rows'][j]['referencedRows'].append(
-                                [foreign_key_definition,
-                                 first_row]
-                                )
-                            
-                        else:
-                            
-                            message=f'Columns referenced by foreign key do not a unique row with the values required: {foreign_key_definition_values}'
-                            
-                            if validate:  
-                                
-                                raise CSVWError(message)
-                                
-                            else:
-                                
-                                warnings.warn(message)
-                            
-                        
-      
-    #... for testing
-    
-    # Section 6.6 - Validating tables
+
+def parse_tabular_data_from_text_csv_module(
+        *args,
+        **kwargs
+        ):
+    """Parses the tabular data using the csv module of the Python standard 
+    library when the dialect and the tabular data allow this, and as 
+    described in the standard otherwise. 
     
+    The tabular data are checked as each row is read, and from the first 
+    row which the csv module cannot read the rows are read as described in 
+    the standard.
     
+    The results are the same as parse_tabular_data_from_text_non_normative_definition.
+    """
+    return parse_tabular_data_from_text(*args,use_csv_module=True,**kwargs)
     
 
-    if _save_intermediate_and_final_outputs_to_file:
-        with open('annotated_table_group_dict.json','w') as f:
-            
-            json.dump(
-                display_annotated_table_group_dict(annotated_table_group_dict),
-                f,
-                indent=4
-                )
-        
-    #    
-    return annotated_table_group_dict
-
-
-def display_annotated_table_group_dict(
-        annotated_table_group_dict,
+def parse_tabular_data_from_text_process_pool(
+        *args,
+        **kwargs
         ):
-    ""
-    return remove_recursion(
-        annotated_table_group_dict,
-        []
+    """Parses the tabular data using a pool of worker processes, one per CPU. 
+    
+    Each process reads a byte range of a local tabular data file, using the 
+    csv module of the Python standard library when the dialect and the 
+    tabular data allow this. Remote files are read in one go. 
+    The results are the same as parse_tabular_data_from_text_non_normative_definition.
+    """
+    return parse_tabular_data_from_text(
+        *args,
+        use_csv_module=True,
+        processes=os.cpu_count(),
+        **kwargs
         )
+    
 
-
-def remove_recursion(
-        value,
-        ignore_list
+def get_embedded_metadata(
+        input_file_path_or_url,
+        relative_path=False,
+        nrows=None,
+        encoding=None,
+        skip_rows=None,
+        parse_tabular_data_function=parse_tabular_data_from_text_csv_module,
         ):
-    ""
-    if isinstance(value,dict):
+    """
+    """
+    embedded_metadata_dict=\
+        create_annotated_table_group(
+            input_file_path_or_url,
+            _return_embedded_metadata=True,
+            nrows=nrows,
+            encoding=encoding,
+            skip_rows=skip_rows,
+            parse_tabular_data_function=parse_tabular_data_function
+            )
         
-        d={}
-        for k,v in value.items():
+    if relative_path:
+        
+        embedded_metadata_dict=replace_string(
+            embedded_metadata_dict,
+            'file:///'+os.getcwd().replace('\\','/')+'/',
+            ''
+            )
+      
+    return embedded_metadata_dict
+    
+    
+def create_annotated_table_group(
+        input_file_path_or_url,
+        overriding_metadata_file_path_or_url=None,
+        nrows=None,
+        validate=False,
+        encoding=None,
+        skip_rows=None,
+        parse_tabular_data_function=parse_tabular_data_from_text_csv_module,
+        memoize_cell_values=False,
+        diagnostics=None,
+        max_diagnostic_examples=10,
+        max_errors=None,
+        concurrent_metadata_requests=False,
+        processes=None,
+        _return_embedded_metadata=False,  # returns only the embedded metadata
+        _link_header=None,  # for testing link headers,
+        _well_known_text=None,  # for testing well known paths
+        _save_intermediate_and_final_outputs_to_file=False,  # for testing, to see metadata objects etc.
+        _print_intermediate_outputs=False  # for testing, to see intermediate outputs as the code is running
+        ):
+    """
+    
+    :param input_file_path_or_url: Path/url to metadata document (json) or 
+        tabular data file (csv). 
+    :type input_file_path_ir_url: str
+    
+    :param overriding_metadata_file_path_or_url: Location of a metadata.json
+        file to be used as "overriding metadata".
+        Either a) a relative local file path; b) 
+        an absolute local file path; or c) a full URL
+    :type overriding_metadata_file_path_or_url: str
+    
+    :param validate: Sets validator
+    
+    :param memoize_cell_values: If True, the cell values of recently parsed 
+        string values in each column are remembered and reused, which is 
+        faster for columns with only a few different values.
+    
+    :param diagnostics: A dictionary which, if given and validate is False, 
+        is filled with the errors of the cells instead of a warning being 
+        given for each cell, see add_cell_errors_to_diagnostics. A single 
+        summary warning is given if any errors are found.
+    :type diagnostics: dict
+    
+    :param max_diagnostic_examples: The maximum number of example errors 
+        recorded in diagnostics.
+    
+    :param max_errors: If given and validate is False, the processing stops 
+        when this number of errors has been found in the cells, primary 
+        keys and foreign keys, or rows which cannot be parsed, and a 
+        CSVWMaxErrorsError is raised with the errors found. The tabular 
+        data files are then read as streams, see 
+        create_annotated_table_group_with_error_budget, so the reading stops 
+        as soon as the budget is used up.
+    :type max_errors: int
+    
+    :param concurrent_metadata_requests: If True, the candidate metadata 
+        documents of a remote tabular data file (from its Link header and 
+        the site-wide location configuration) are requested at the same 
+        time. The metadata found is the same as when they are requested 
+        in turn.
+    
+    :param processes: The number of worker processes used to parse the 
+        cell values of tables with more than 65536 cells. If None, this is 
+        the number of CPUs if parse_tabular_data_function is 
+        parse_tabular_data_from_text_process_pool, and otherwise the cells 
+        are parsed in this process. Not used if max_errors is given.
+    :type processes: int
+    
+    """
+    
+    if _print_intermediate_outputs: print('---create_annotated_table_group---')
+    
+    #...with an error budget, the rows are read and checked one at a time 
+    #...so the processing stops as soon as the budget is used up
+    if not max_errors is None and not validate and not _return_embedded_metadata:
+        
+        return create_annotated_table_group_with_error_budget(
+            input_file_path_or_url,
+            overriding_metadata_file_path_or_url,
+            encoding,
+            skip_rows,
+            max_errors,
+            memoize_cell_values,
+            diagnostics,
+            max_diagnostic_examples,
+            concurrent_metadata_requests,
+            _link_header,
+            _well_known_text
+            )
+    
+    metadata_table_group_dict, base_url, default_language, use_embedded_metadata_flag=\
+        get_normalized_metadata_table_group_dict(
+            input_file_path_or_url,
+            overriding_metadata_file_path_or_url,
+            validate,
+            _link_header,
+            _well_known_text,
+            _save_intermediate_and_final_outputs_to_file,
+            _print_intermediate_outputs,
+            concurrent_metadata_requests
+            )
+        
+        
+    # 3. For each table (TM) in UM in order, create one or more annotated tables:
+    
+    #...initial annotated table group object    
+    annotated_table_group_dict={
+        'id':None,
+        'notes':[],   # changed from False
+        'tables':[]
+        }
+    
+    #...loop through tables in metadata
+    for table_index,metadata_table_dict in \
+        enumerate(metadata_table_group_dict['tables']):
             
+        #...set up table url and headers
             
-            if k in ignore_list:
+        tabular_data_file_url=metadata_table_dict['url']
+        
+        
                 
-                d[k]='__removed__'
+        if tabular_data_file_url.startswith('file'):
             
-            elif k=='table':
+            tabular_data_file_headers=None
+        
+        else:
                 
-                d[k]={'__url__': v['url']}
+            tabular_data_file_headers=get_url_fetcher().head(tabular_data_file_url)
             
-            elif k=='column':
-                
-                d[k]={'__name__':v['name'],
-                      '__table_url__': v['table']['url']
-                      }
+        #print('-tabular_data_file_url',tabular_data_file_url)     
             
-            elif k=='row':
-                
-                d[k]={'__number__':v['number'],
-                      '__table_url__': v['table']['url']
-                      }
-                
+        #print('-tabular_data_file_headers',tabular_data_file_headers)
+
             
-            elif k=='primaryKey':
-                
-                
-                d[k]=remove_recursion(v,ignore_list+['cells'])
             
-            elif k=='foreignKeys':
-                
-                d[k]=remove_recursion(v,ignore_list+['cells'])
+        dialect_description_dict=\
+            get_dialect_description_dict(
+                metadata_table_dict,
+                metadata_table_group_dict,
+                tabular_data_file_headers,
+                encoding,
+                skip_rows
+                )
             
-            elif k=='referencedRows':
-                
-                d[k]={'__len__':len(v)}
-                
-                d[k]=remove_recursion(v,ignore_list+['referencedRows','cells'])
-                
-                #pass
-                
-            else:
-                
-                d[k]=remove_recursion(v,ignore_list)
-                
-                
-                
-        #     elif 
-        
-        
-        # d={k:remove_recursion(v) if not k in 
-        #         ['table','column','row',
-        #           'referencedRows',
-        #           #'primaryKey',
-        #           'foreignKeys'] else '__recursion__'
-        #         for k,v in value.items()
-        #         }
         
-        return d
-    
-    elif isinstance(value,list):
         
-        return [remove_recursion(x,ignore_list) for x in value]
+        # 3.3 Parse the tabular data file, using DD as a guide, to create a 
+        #     basic tabular data model (T) and extract embedded metadata (EM), 
+        #     for example from the header line.
 
-    else:
         
-        return value
-
-
-    
-
-
-#%% 6.3 URL Normalization
-
-def normalize_url(
-        url
-        ):
-    """
-    
-    'http://example.com/test001.csv' -> 'http://example.com/test001.csv' (same)
-    
-    'http://example.com/test/../test001.csv' -> 'http://example.com/test001.csv'
-    
-    'file:///c:/test 001.csv' -> 'file:///c:/test 001.csv'
-    
-    'file:///c:/test/../test001.csv' -> 'file:///c:/test001.csv'
-    
-    
-    see: https://hyperlink.readthedocs.io/en/latest/api.html?highlight=normalize#hyperlink.URL.normalize
-    
-    does not percent encode (except for stray percent characters in an already percent encoded url)
-    
-    
-    """
-    
-    # Metadata Discovery and Compatibility involve comparing URLs. 
-    # When comparing URLs, processors must use Syntax-Based Normalization 
-    # as defined in [RFC3968]. 
-    # Processors must perform Scheme-Based Normalization for HTTP (80) 
-    # and HTTPS (443) and should perform Scheme-Based Normalization for 
-    # other well-known schemes.
-    
-    return str(hyperlink.parse(url).normalize())
-    
 
-#%% 6.4 Parsing Cells
 
-def parse_cells_in_annotated_column_dict(
-        annotated_column_dict,
-        trim,
-        validate,
-        _print_intermediate_outputs=False
-        ):
-    """
-    """
-    # Unlike many other data formats, tabular data is designed to be read 
-    # by humans. 
-    # For that reason, it's common for data to be represented within 
-    # tabular data in a human-readable way. 
-    # The datatype, default, lang, null, required, and separator annotations 
-    # provide the information needed to parse the string value of a cell 
-    # into its (semantic) value annotation. 
-    # This is used:
-    # - by validators to check that the data in the table is in the 
-    #   expected format,
-    # - by converters to parse the values before mapping them into values 
-    #   in the target of the conversion,
-    # - when displaying data, to map it into formats that are meaningful 
-    #   for those viewing the data (as opposed to those publishing it), and
-    # - when inputting data, to turn entered values into representations 
-    #   in a consistent format.
-    
-    # The process of parsing a cell creates a cell with annotations based 
-    # on the original string value, parsed value and other column 
-    # annotations and adds the cell to the list of cells in a row and 
-    # cells in a column:
-    # - The raw string value becomes the string value annotation on the cell.
-    # - The ordered annotation on the column becomes the ordered annotation 
-    #   on the cell.
-    # - The text direction annotation on the column becomes the text 
-    #   direction annotation on the cell.
-    # - The row becomes the row annotation on the cell.
-    # - The column becomes the column annotation on the cell.
-    
-    # After parsing, the cell value can be:
-    # - null,
-    # - a single value with an associated optional datatype or language, or
-    # - a sequence of such values.
-    
-    # The process of parsing the string value into a single value or a 
-    # list of values is as follows:
+        annotated_table_dict, embedded_metadata_dict=\
+            parse_tabular_data_function(
+                tabular_data_file_url,
+                dialect_description_dict
+                )
+            
+        annotated_table_group_dict['tables'].append(annotated_table_dict)
+            
+        #... returns only the embedded metadata if requested
+        if _return_embedded_metadata:
+            
+            return embedded_metadata_dict
         
         
-    #...set up a function to parse the cell based on the column datatype
-    datatype=annotated_column_dict['datatype']
-    
-    # numbers
-    if datatype['base'] in datatypes_numbers:
+        #...for testing
+        if _save_intermediate_and_final_outputs_to_file:
+            with open('embedded_metadata_dict.json','w') as f:
+                
+                json.dump(
+                    embedded_metadata_dict,
+                    f,
+                    indent=4
+                    )
         
-        datatype_parse_function=\
-            get_parse_number_function(
-                datatype
+        
+        #...if using embedded metadata
+        if use_embedded_metadata_flag:
+            
+            metadata_table_dict=copy.deepcopy(embedded_metadata_dict)
+            
+            validate_and_normalize_metadata_table_dict(
+                metadata_table_dict,
+                metadata_document_location=None,
+                metadata_table_group_dict=None
                 )
+            
+            metadata_table_dict.pop('@context')
+            
+            metadata_table_group_dict['tables'][table_index]=metadata_table_dict
         
-    # booleans
-    elif datatype['base']=='boolean':
+        #print('-metadata_table_group_dict_NORMALIZED',metadata_table_group_dict)
         
-        datatype_parse_function=\
-            get_parse_boolean_function(
-                datatype
-                )
+        #...for testing
+        if _save_intermediate_and_final_outputs_to_file:
+            with open('metadata_table_group_dict_NORMALIZED.json','w') as f:
+                
+                json.dump(
+                    metadata_table_group_dict,
+                    f,
+                    indent=4
+                    )
         
-    # date
-    elif datatype['base']=='date':
         
-        datatype_parse_function=\
-            get_parse_date_function(
-                datatype
-                )
         
-    # time
-    elif datatype['base']=='time':
-       
-        datatype_parse_function=\
-            get_parse_time_function(
-                datatype
-                )
-    
-    # datetime
-    elif datatype['base'] in ['dateTime', 'datetime']:
+        #...REMOVED: setting column names to _col.1 etc.
+        #... as now done in annotating schema
+            
+        #...REMOVED: including virtual columns in annotated table dict
+        #...as now done in annotating tables
         
-        datatype_parse_function=\
-            get_parse_datetime_function(
-                datatype
-                )
-    
-    # datetimestamp
-    elif datatype['base']=='dateTimeStamp':
         
-        datatype_parse_function=\
-            get_parse_datetimestamp_function(
-                datatype
-                )
+        # 3.4 If a Content-Language HTTP header was found when retrieving the 
+        #     tabular data file, and the value provides a single language, set 
+        #     the lang inherited property to this value in TM, unless TM 
+        #     already has a lang inherited property.
         
-    # durations
-    elif datatype['base'] in ['duration','dayTimeDuration','yearMonthDuration']:
+        if not tabular_data_file_headers is None:
         
-        datatype_parse_function=\
-            get_parse_duration_function(
-                datatype
-                )
+            content_language=tabular_data_file_headers.get('Content-Language',None)
             
-    # other types
-    else:
+            if not content_language is None:
+                
+                if not 'lang' in metadata_table_dict:
+                    
+                    metadata_table_dict['lang']=content_language  # NEEDS TESTING
     
-       datatype_parse_function=\
-           get_parse_other_types_function(
-               datatype
-               )
+        # 3.5 Verify that TM is compatible with EM using the procedure defined 
+        #     in Table Description Compatibility in [tabular-metadata]; if TM 
+        #     is not compatible with EM validators must raise an error, other 
+        #     processors must generate a warning and continue processing.
         
+        compare_table_descriptions(
+            metadata_table_dict,
+            embedded_metadata_dict,
+            validate=validate
+            )
         
         
+        #...REMOVED: section on merging the embedded metadata with the metadata document
+        #...was being used for Section 8.2.1.1.
         
-    for annotated_cell_dict in annotated_column_dict['cells']:
         
-        cell_value,errors=\
-            parse_cell_steps_1_to_5(
-                annotated_cell_dict['stringValue'],
-                annotated_column_dict['datatype'],
-                annotated_column_dict['default'],
-                annotated_column_dict['lang'],
-                annotated_column_dict['null'],
-                annotated_column_dict['required'],
-                annotated_column_dict['separator'],
-                datatype_parse_function,
-                trim,
-                validate
-                )
-            
-        if _print_intermediate_outputs: print(cell_value,errors)
-        
-        annotated_cell_dict['value']=cell_value
-        annotated_cell_dict['errors'].extend(errors)
-        
-        
-def parse_cell_steps_1_to_5(
-        string_value,
-        datatype,
-        default,
-        lang,
-        null,
-        required,
-        separator,
-        datatype_parse_function,
-        trim,
-        validate
-        ):
-    """
-    
-    :returns: (cell_value, errors)
-    :rtype: tuple
+    # 3.6 Use the metadata TM to add annotations to the tabular data model 
+    #     T as described in Section 2 Annotating Tables in [tabular-metadata].
     
-    """
-    #...convert null to list if needed
-    if not isinstance(null,list):
-        null=[null]
+    annotated_table_group_dict=\
+        annotate_table_group_dict(
+            annotated_table_group_dict,
+            metadata_table_group_dict,
+            base_url,
+            default_language,
+            validate
+            )
+            
+    #...Not directly in this section of the standard, but at this stage the 
+    #...cell values are parsed.
+    #...This is done after the metadata annotations are included in the 
+    #...annotated_table_group_dict (3.6)
     
-    errors=[]
+    #...in diagnostics mode the errors of the cells are collected after each 
+    #...column is parsed, rather than a warning being given for each cell
+    use_diagnostics=not diagnostics is None and not validate
     
-    # The process of parsing the string value into a single value or a list 
-    # of values is as follows:
+    #...the cells of large tables are parsed in parallel by worker processes
+    if processes is None \
+        and parse_tabular_data_function is parse_tabular_data_from_text_process_pool:
         
+        processes=os.cpu_count()
         
-    # 1. unless the datatype base is string, json, xml, html or anyAtomicType, 
-    #    replace all carriage return (#xD), line feed (#xA), and tab (#x9) 
-    #    characters with space characters.
-    if datatype['base'] not in ['string','json','xml','html','anyAtomicType']:
-        
-        string_value=string_value.replace('\r',' ')
-        string_value=string_value.replace('\n',' ')
-        string_value=string_value.replace('\t',' ')
+    if not processes is None and processes>1:
         
+        #...the worker processes are forked from this process, so the objects 
+        #...they inherit are frozen to keep them out of their garbage collection
+        executor=concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=gc.freeze
+            )
         
-    # 2. unless the datatype base is string, json, xml, html, anyAtomicType, 
-    #    or normalizedString, strip leading and trailing whitespace from the 
-    #    string value and replace all instances of two or more whitespace #
-    #    characters with a single space character.
-    if datatype['base'] not in ['string','json','xml','html','anyAtomicType','normalizedString']:
+    else:
         
-        string_value=string_value.strip()
+        executor=None
         
-        string_value=" ".join(string_value.split()) # includes whitespace such as '\n' etc.
-                                                      # if this should be spaces only,  
-                                                      # could use st=re.sub(' +',' ', st)
-    
+    try:
     
-    # 3. if the normalized string is an empty string, apply the remaining 
-    #    steps to the string given by the column default annotation.
-    if separator is None and string_value=='':
-        
-        string_value=str(default)
-        
-        
-    # 4. if the column separator annotation is not null and the normalized 
-    #    string is an empty string, the cell value is an empty list. If the 
-    #    column required annotation is true, add an error to the list of errors for the cell.
-    if not separator is None and string_value=='':
-        
-        list_of_cell_values=[]
-        
-        if required:
+        for annotated_table_dict in annotated_table_group_dict['tables']:
             
-            message='Error in Section 6.4 Step 4. '
-            message+='Separator is not null and string value is an empty string. '
-            message+='Value set to an empty array. '
+            parse_cells_in_annotated_table_dict(
+                annotated_table_dict,
+                dialect_description_dict.get('trim',True),
+                validate,
+                memoize_cell_values,
+                use_diagnostics,
+                diagnostics,
+                max_diagnostic_examples,
+                executor,
+                _print_intermediate_outputs=_print_intermediate_outputs
+                )
             
-            errors.append(message)
+    finally:
+        
+        if not executor is None:
             
-        return list_of_cell_values,errors
+            executor.shutdown(cancel_futures=True)
+                
+    if use_diagnostics:
         
+        warn_diagnostics_summary(diagnostics)
     
-    # 5. if the column separator annotation is not null, the cell value is a 
-    #    list of values; set the list annotation on the cell to true, and create 
-    #    the cell value created by:
-        
-    if not separator is None:  # i.e. a list of value expected
-        
-        #..."set the list annotation on the cell to true"
-        #...- not done, as there is no 'list' annotation on the cell object
-        
+    #...generate URIs
+                
+    for annotated_table_dict in annotated_table_group_dict['tables']:
         
-        # 5.1. if the normalized string is the same as any one of the values 
-        #      of the column null annotation, then the resulting value is null.
-        if string_value in null:
+        for annotated_column_dict in annotated_table_dict['columns']:
             
-            cell_value=None
+            #... from Section 6.4
+            # If there is a about URL annotation on the column, it becomes 
+            # the about URL annotation on the cell, after being transformed 
+            # into an absolute URL as described in URI Template Properties 
+            # of [tabular-metadata].
             
-            return cell_value, errors
+            # If there is a property URL annotation on the column, it becomes 
+            # the property URL annotation on the cell, after being transformed 
+            # into an absolute URL as described in URI Template Properties 
+            # of [tabular-metadata].
             
-        
-        # 5.2. split the normalized string at the character specified by the 
-        #      column separator annotation.
-        else:
+            # If there is a value URL annotation on the column, it becomes 
+            # the value URL annotation on the cell, after being transformed 
+            # into an absolute URL as described in URI Template Properties 
+            # of [tabular-metadata]. The value URL annotation is null if the cell value is null and the column virtual annotation is false.
             
-            list_of_string_values=string_value.split(separator)
-                
+            #...the URI templates are parsed once for all the cells in the column
+            uri_template_functions=\
+                [(k,get_URI_template_function(annotated_column_dict[k],
+                                              annotated_column_dict))
+                 for k in ['aboutURL','propertyURL','valueURL']
+                 if not annotated_column_dict[k] is None]
             
-            # 5.3. unless the datatype base is string or anyAtomicType, strip 
-            #      leading and trailing whitespace from these strings.  
-            if not datatype['base'] not in ['string','anyAtomicType']:
-                list_of_string_values=[x.strip() for x in list_of_string_values]
+            #...the cells only change if the column has a URI template
+            if len(uri_template_functions)==0:
                 
-                
-            # 5.4. applying the remaining steps to each of the strings in turn.
+                continue
             
-            list_of_cell_values=[]
-            for string_value in list_of_string_values:
-                
-                json_value,language,type_,errors=\
-                    parse_cell_steps_6_to_9(
-                        string_value,
-                        errors,
-                        datatype,
-                        default,
-                        lang,
-                        null,
-                        required,
-                        separator,
-                        datatype_parse_function,
-                        validate
-                        )
+            for annotated_cell_dict in annotated_column_dict['cells']:
                 
-                #...needed for test036 ????????????????
-                if isinstance(json_value,str):
-                    json_value=get_trimmed_cell_value(
-                        json_value,
-                        trim
-                        )
+                for k,uri_template_function in uri_template_functions:
+                    
+                    annotated_cell_dict[k]=\
+                        uri_template_function(
+                            annotated_cell_dict,
+                            annotated_table_dict['url']
+                            )
+
+    #...annotate row titles
+    for annotated_table_dict,metadata_table_dict \
+        in zip(annotated_table_group_dict['tables'],
+               metadata_table_group_dict['tables']
+               ):
+            
+        if 'tableSchema' in metadata_table_dict:
+            
+            metadata_schema_dict=metadata_table_dict['tableSchema']
+    
+            if 'rowTitles' in metadata_schema_dict:
                 
-                cell_value={'@value':json_value,
-                            '@type':datatypes[type_]}
+                # A column reference property that holds either a single reference 
+                # to a column description object or an array of references. 
+                # The value of this property determines the titles annotation for 
+                # each row within a table that uses this schema. 
+                # The titles annotation holds the list of the values of the cells 
+                # in that row that are in the referenced columns; if the value is 
+                # not a string or has no associated language, it is interpreted 
+                # as a string with an undefined language (und).
                 
-                if not language is None:
-                    cell_value['@language']=lang
+                row_titles=metadata_schema_dict['rowTitles']
                 
-                list_of_cell_values.append(cell_value)
+                if not isinstance(row_titles,list):
+                    row_titles=[row_titles]
+                    
+                column_indexes=[]
                 
-            return list_of_cell_values,errors
+                for row_titles_column_name in row_titles:
+                    
+                    for i,annotated_column_dict in enumerate(annotated_table_dict['columns']):
+                        
+                        if annotated_column_dict['name']==row_titles_column_name:
+                            
+                            column_indexes.append(i)
+                            
+                #            
+                for row in annotated_table_dict['rows']:
+                    
+                    for column_index in column_indexes:
+                        
+                        value=dict(**row['cells'][column_index]['value'])  # create a copy
+                        
+                        if value['@type']=='http://www.w3.org/2001/XMLSchema#string':
+                            
+                            if not '@language' in value:
+                                
+                                value['@language']='und'
+                                
+                        else:
+                            
+                            value['@type']=='http://www.w3.org/2001/XMLSchema#string'
+                            value['@language']='und'
+                        
+                        
+                        row['titles'].append(value)
                 
-       
-    else:  # i.e. a single value expected         
-       
-        json_value,language,type_,errors=\
-            parse_cell_steps_6_to_9(
-                string_value,
-                errors,
-                datatype,
-                default,
-                lang,
-                null,
-                required,
-                separator,
-                datatype_parse_function,
-                validate
-                )
+      
+    #... annotate referenced rows
+    #... done here as the cell values are needed.          
+      
+    for annotated_table_dict,metadata_table_dict \
+        in zip(annotated_table_group_dict['tables'],
+               metadata_table_group_dict['tables']
+               ):
             
-        if not json_value is None:
+        #print('-url',annotated_table_dict['url'])
+        
+        if 'tableSchema' in metadata_table_dict:
             
-            cell_value={'@value':json_value,
-                        '@type':datatypes[type_]}
+            metadata_schema_dict=metadata_table_dict['tableSchema']
+        
+            if 'foreignKeys' in metadata_schema_dict:
+            
+                #foreign_key_definitions=metadata_schema_dict['foreignKeys']
                 
-            if not language is None:
-                cell_value['@language']=lang
+                #...index the rows of the referenced tables by the values 
+                #...of the referenced columns, one index per foreign key
+                foreign_key_indexes=[]
                 
-        else:
-            
-            cell_value=None
-            
-        return cell_value,errors
-
-
-def parse_cell_steps_6_to_9(
-        string_value,
-        errors,
-        datatype,
-        default,
-        lang,
-        null,
-        required,
-        separator,
-        datatype_parse_function,
-        validate
-        ):
-    """
-    :returns: (json_value, language, value_type, errors)
-    :rtype: tuple
-    
-    """
-    # 6. if the string is an empty string, apply the remaining steps to the 
-    #    string given by the column default annotation.
-    if string_value=='':
-        
-        string_value=str(default)
-        
-        
-    # 7. if the string is the same as any one of the values of the column null 
-    #    annotation, then the resulting value is null. If the column separator 
-    #    annotation is null and the column required annotation is true, add 
-    #    an error to the list of errors for the cell.
-    if string_value in null:
-        
-        json_value=None
-        
-        language=None
-        
-        if separator is None and required==True:
-            
-            # ADD ERROR
-            message='column separator annotation is null and the column required annotation is true'
-            
-            if validate:
+                for foreign_key_definition in annotated_table_dict['foreignKeys']:
+                    
+                    foreign_key_reference_columns=foreign_key_definition[1]
+                    
+                    index={}
+                    
+                    for k,foreign_key_reference_cells in \
+                        enumerate(zip(*[x['cells'] 
+                                        for x in foreign_key_reference_columns])):
+                        
+                        key=tuple(get_hashable_value(x['value']) 
+                                  for x in foreign_key_reference_cells)
+                        
+                        index.setdefault(key,[]).append(k)
+                        
+                    foreign_key_indexes.append(index)
                 
-                raise CSVWError(message)
-            
-            else:
-            
-                warnings.warn(message)
+                for j in range(len(annotated_table_dict['rows'])):
+                    
+                    #print('j',j)
+                    
+                    for foreign_key_definition, index in \
+                        zip(annotated_table_dict['foreignKeys'],
+                            foreign_key_indexes):
+                        
+                        # get foreign key values in this row of this table
+                        
+                        foreign_key_definition_columns=foreign_key_definition[0]
+                        
+                        foreign_key_definition_values=\
+                            [x['cells'][j]['value'] 
+                             for x in foreign_key_definition_columns]
+                            
+                        #print('foreign_key_definition_values',foreign_key_definition_values)
+                            
+                        # get rows that matches in the reference table
+                        
+                        foreign_key_reference_columns=foreign_key_definition[1]
+                        foreign_key_reference_table=foreign_key_reference_columns[0]['table']
+                        
+                        key=tuple(get_hashable_value(x) 
+                                  for x in foreign_key_definition_values)
+                        
+                        row_indexes=index.get(key,[])
+                            
+                        if len(row_indexes)==0:
+                            
+                            message=f'Columns referenced by foreign key do not contain the value required: {foreign_key_definition_values}'
+                            
+                            if validate:  
+                            
+                                raise CSVWError(message)
+                                
+                            else:
+                                
+                                warnings.warn(message)
+                            
+                        elif len(row_indexes)==1:
+                            
+                            first_row=foreign_key_reference_table['rows'][row_indexes[0]]
+                            
+                            annotated_table_dict['rows'][j]['referencedRows'].append(
+                                [foreign_key_definition,
+                                 first_row]
+                                )
+                            
+                        else:
+                            
+                            message=f'Columns referenced by foreign key do not a unique row with the values required: {foreign_key_definition_values}'
+                            
+                            if validate:  
+                                
+                                raise CSVWError(message)
+                                
+                            else:
+                                
+                                warnings.warn(message)
+                            
+                        
+      
+    #... for testing
+    
+    # Section 6.6 - Validating tables
+    
+    
+    
+
+    if _save_intermediate_and_final_outputs_to_file:
+        with open('annotated_table_group_dict.json','w') as f:
             
-                errors.append(message)
+            json.dump(
+                display_annotated_table_group_dict(annotated_table_group_dict),
+                f,
+                indent=4
+                )
         
-        return json_value, language, datatype['base'], errors  # returns None
+    #    
+    return annotated_table_group_dict
+
+
+def create_annotated_table_group_with_error_budget(
+        input_file_path_or_url,
+        overriding_metadata_file_path_or_url,
+        encoding,
+        skip_rows,
+        max_errors,
+        memoize_cell_values=False,
+        diagnostics=None,
+        max_diagnostic_examples=10,
+        concurrent_metadata_requests=False,
+        _link_header=None,
+        _well_known_text=None
+        ):
+    """Creates the annotated table group of create_annotated_table_group 
+    when max_errors is given.
     
+    The tabular data files are read as streams using the rows of 
+    iter_annotated_rows, so the errors of each row are counted as it is read 
+    and the reading stops as soon as max_errors is reached, without the rest 
+    of the file being read. 
+    Each row is appended to the rows of its table, and its cells to the 
+    cells of their columns.
     
-    # 8. parse the string using the datatype format if one is specified, as 
-    #    described below to give a value with an associated datatype. 
-    #    If the datatype base is string, or there is no datatype, the value has 
-    #    an associated language from the column lang annotation. 
-    #    If there are any errors, add them to the list of errors for the cell; 
-    #    in this case the value has a datatype of string; if the datatype base 
-    #    is string, or there is no datatype, the value has an associated language 
-    #    from the column lang annotation.
-    if datatype['base']=='string' or datatype['base'] is None:
-        
-        language=lang
-        
-    else:
-        
-        language=None
-        
-    json_value,value_type,errors=\
-        datatype_parse_function(
-            string_value,
-            errors,
-            validate
-            )
-        
-    # if error occurs as value not converted
-    if value_type=='string':
-        language=lang
+    :raises CSVWMaxErrorsError: If max_errors is reached.
     
+    :returns: An annotated table group dictionary.
+    :rtype: dict
     
-    # 9. validate the value based on the length constraints described in 
-    #    section 4.6.1 Length Constraints, the value constraints described 
-    #    in section 4.6.2 Value Constraints and the datatype format annotation 
-    #    if one is specified, as described below. 
-    #    If there are any errors, add them to the list of errors for the cell.
+    """
     
-    #
-    result=\
-        check_length_constraints(
-            json_value,
-            errors,
-            datatype['base'],
-            validate,
-            length=datatype.get('length'),
-            minimum_length=datatype.get('minLength'),
-            maximum_length=datatype.get('maxLength')
-            )
+    use_diagnostics=not diagnostics is None
     
-    if not result:
+    annotated_table_group_dict, annotated_row_dicts=\
+        get_annotated_table_group_and_row_iterator(
+            input_file_path_or_url,
+            overriding_metadata_file_path_or_url,
+            False,
+            encoding,
+            skip_rows,
+            _link_header,
+            _well_known_text,
+            max_errors,
+            concurrent_metadata_requests,
+            memoize_cell_values,
+            ignore_warning if use_diagnostics else warnings.warn,
+            diagnostics
+            )
         
-        language=lang
+    for annotated_row_dict in annotated_row_dicts:
         
-        return string_value, language, 'string', errors
-    
-    #
-    
-    if len(errors)==0:  # added 2023-03-01
-                        # to solve the issue that if say a string isn't converted to an integer (i.e. "100.0") then it should be checked against minimums and maximums etc.
-    
-        result=\
-            check_value_constraints(
-                json_value,
-                errors,
-                datatype['base'],
-                validate,
-                minimum=datatype.get('minimum') or datatype.get('minInclusive'),
-                maximum=datatype.get('maximum') or datatype.get('maxInclusive'),
-                minimum_exclusive=datatype.get('minExclusive'),
-                maximum_exclusive=datatype.get('maxExclusive')
-                )
+        annotated_row_dict['table']['rows'].append(annotated_row_dict)
         
-        if not result:
+        for annotated_cell_dict in annotated_row_dict['cells']:
             
-            language=lang
+            annotated_cell_dict['column']['cells'].append(annotated_cell_dict)
             
-            return string_value, language, 'string', errors
-    
-    return json_value, language,value_type, errors
+    #...the referenced rows were read separately to index them, so they are 
+    #...replaced by the rows of the table group with the same row numbers
+    rows_by_number={}  # id of annotated table -> row number -> row
     
-
-#%% 6.4.2 Formats for numeric type
+    for annotated_table_dict in annotated_table_group_dict['tables']:
+        
+        for annotated_row_dict in annotated_table_dict['rows']:
+            
+            for referenced_row in annotated_row_dict['referencedRows']:
+                
+                referenced_table_dict=referenced_row[1]['table']
+                
+                if not id(referenced_table_dict) in rows_by_number:
+                    
+                    rows_by_number[id(referenced_table_dict)]=\
+                        {x['number']:x for x in referenced_table_dict['rows']}
+                
+                referenced_row[1]=\
+                    rows_by_number[id(referenced_table_dict)][referenced_row[1]['number']]
+                    
+    if use_diagnostics:
+        
+        for annotated_table_dict in annotated_table_group_dict['tables']:
+            
+            for annotated_column_dict in annotated_table_dict['columns']:
+                
+                add_cell_errors_to_diagnostics(
+                    diagnostics,
+                    annotated_table_dict,
+                    annotated_column_dict,
+                    max_diagnostic_examples
+                    )
+                
+        warn_diagnostics_summary(diagnostics)
+        
+    return annotated_table_group_dict
 
 
-def get_parse_number_function(
-        datatype,
-        _print_intermediate_outputs=False
+def get_normalized_metadata_table_group_dict(
+        input_file_path_or_url,
+        overriding_metadata_file_path_or_url,
+        validate,
+        _link_header,
+        _well_known_text,
+        _save_intermediate_and_final_outputs_to_file=False,
+        _print_intermediate_outputs=False,
+        concurrent_metadata_requests=False
         ):
-    """
-    """
+    """Locates the metadata for a metadata document or tabular data file 
+    and normalizes it into a table group description.
     
-    datatype_format=datatype.get('format')
-    
-    datatype_base=datatype['base']
+    :returns: (metadata_table_group_dict, base_url, default_language, 
+        use_embedded_metadata_flag)
+    :rtype: tuple
     
-    # By default, numeric values must be in the formats defined in
-    # [xmlschema11-2]. 
-    # It is not uncommon for numbers within tabular data to be 
-    # formatted for human consumption, which may involve using 
-    # commas for decimal points, grouping digits in the number 
-    # using commas, or adding percent signs to the number.
+    """
 
-    # If the datatype base is a numeric type, the datatype format 
-    # annotation indicates the expected format for that number. 
-    # Its value must be either a single string or an object with 
-    # one or more of the properties:
+    # After locating metadata, metadata is normalized and coerced into a 
+    # single table group description. 
+    # When starting with a metadata file, this involves normalizing the 
+    # provided metadata file and verifying that the embedded metadata for 
+    # each tabular data file referenced from the metadata is compatible 
+    # with the metadata. 
+    # When starting with a tabular data file, this involves locating the 
+    # first metadata file as described in section 5. Locating Metadata and 
+    # normalizing into a single descriptor.
     
-    # decimalChar
-    # A string whose value is used to represent a decimal point within the number. 
-    # The default value is ".". If the supplied value is not a string, 
-    # implementations must issue a warning and proceed as if the property 
-    # had not been specified.
     
-    if isinstance(datatype_format,dict) and 'decimalChar' in datatype_format:
+    #...determine if input file is a metadata document or tabular data file
+    if input_file_path_or_url.endswith('.json'):
         
-        decimal_char=datatype_format['decimalChar']
+        input_is_tabular_data_file=False
         
-    else:
+    elif input_file_path_or_url.endswith('.csv'):
         
-        decimal_char='.'
-    
+        input_is_tabular_data_file=True
     
-    # groupChar
-    # A string whose value is used to group digits within the number. 
-    # The default value is null. If the supplied value is not a string, 
-    # implementations must issue a warning and proceed as if the property had 
-    # not been specified.
+    else:
     
-    if isinstance(datatype_format,dict) and 'groupChar' in datatype_format:
+        input_is_tabular_data_file=True
         
-        group_char=datatype_format['groupChar']
+        #if '?' in input_file_path_or_url:
+            
+        #    input_file_path_or_url=input_file_path_or_url.split('?')[0]
         
-    else:
         
-        group_char=None
-    
-    
-    # pattern
-    # A number format pattern as defined in [UAX35]. 
-    # Implementations must recognise number format patterns containing the 
-    # symbols 0, #, the specified decimalChar (or "." if unspecified), the 
-    # specified groupChar (or "," if unspecified), E, +, % and ‰. 
-    # Implementations may additionally recognise number format patterns 
-    # containing other special pattern characters defined in [UAX35]. 
-    # If the supplied value is not a string, or if it contains an invalid 
-    # number format pattern or uses special pattern characters that the 
-    # implementation does not recognise, implementations must issue a warning 
-    # and proceed as if the property had not been specified.
-    
-    # If the datatype format annotation is a single string, this is 
-    # interpreted in the same way as if it were an object with a pattern 
-    # property whose value is that string.
+        #message='"input_file_path_or_url" must end with either ".json" or ".csv"/'    
     
-    if not datatype_format is None:
+        #raise CSVWError(message)
+      
     
-        if isinstance(datatype_format,dict):
-            
-            pattern=datatype_format.get('pattern')
-            
-        else:  #... datatype_format is a string or None
-            
-            pattern=datatype_format
-            
-        #...check if pattern is valid
-        if not pattern is None:
-            
-            for x in pattern:
-                
-                if not x in ['0','#','.',',','E','+','-','%','‰','\u2030']:
-                
-                    message=f'Number format pattern with value "{pattern}" is invalid '
-                    message+=f'as it contains the character "{x}". '
-                    message+='Pattern is set to None.'
-                    
-                    if _print_intermediate_outputs: print(message)
-                    
-                    warnings.warn(message)
-                    
-                    pattern=None
-                    
-                    break
-                
-        if not pattern is None:
-                
-            pattern_dict=\
-                parse_LDML_number_pattern(
-                    pattern
-                    )
-                
-            #...sets a default group_char if present in the number pattern
-            if not pattern_dict['integral_part_primary_grouping_size'] is None \
-                or not pattern_dict['fractional_part_grouping_size'] is None:
-                
-                group_char=','
-                
-            #print(pattern_dict)
-                
-    else:
+      
         
-        pattern=None
+    # If processing starts with a tabular data file, implementations:
         
-    #print('-datatype',datatype)
-    #print('-pattern',pattern)
-    #print('-decimal_char',decimal_char)
-    #print('-group_char',group_char)
+    if input_is_tabular_data_file:
         
-    
-    def parse_number(
-            string_value,
-            errors,
-            validate
-            ):
-        """
-        """
-        #print('-string_value',string_value)
+        # 1. Retrieve the tabular data file.
         
-        def convert_string_value_to_number(
-                string_value,
-                datatype_base,
-                decimal_char,
-                group_char
-                ):
-            """
-            
-            :raises ValueError: if string_value cannot be converted
-            
-            :rtype: int or float
-            
-            """
-            #...deals with percent and permille
-            modifier=1
+        #...set up the url
+        
+        #... if it looks like a local file
+        if not hyperlink.parse(input_file_path_or_url).absolute:  # only returns true if e.g. 'http://...'
             
-            if string_value.startswith('%'):
-                
-                string_value=string_value[1:]
+            if input_file_path_or_url==os.path.abspath(input_file_path_or_url):
                 
-                modifier=0.01
+                x=input_file_path_or_url
             
-            elif string_value.endswith('%'):
-                
-                string_value=string_value[:-1]
-                
-                modifier=0.01
-                
-            elif string_value.startswith('‰') or string_value.startswith('\u2030'):
-                
-                string_value=string_value[1:]
-                
-                modifier=0.001
-                
-            elif string_value.endswith('‰') or string_value.endswith('\u2030'):
-                
-                string_value=string_value[:-1]
+            else:
                 
-                modifier=0.001
+                x=os.path.join(os.getcwd(),input_file_path_or_url)
             
+            x=x.replace('\\','/')
+            x=r'file:///'+x
+            x=urllib.parse.quote(x,safe=':/#?%')
+            x=normalize_url(x)
             
-            #...replace decimal_char 
-            string_value=string_value.replace(decimal_char,'X')
+            tabular_data_file_url=x
                 
+            tabular_data_file_headers=None
             
-            #...replace group_char
-            if not group_char is None: 
-                
-                string_value=string_value.replace(group_char,'')
+        #... if it looks like a remote file
+        else:
+            
+            tabular_data_file_url=\
+                normalize_url(
+                    input_file_path_or_url
+                    )
                 
-            string_value=string_value.replace('X','.')
+            tabular_data_file_headers=get_url_fetcher().head(tabular_data_file_url)
+            
+        if _print_intermediate_outputs: print('-tabular_data_file_url',tabular_data_file_url)     
+        if _print_intermediate_outputs: print('-tabular_data_file_headers',tabular_data_file_headers)
+
         
+        # 2. Retrieve the first metadata file (FM) as described in 
+        #    section 5. Locating Metadata:
         
-            #...convert
-            if datatype_base in datatypes_integers:
-                
-                return int(string_value)*modifier
-            
-            else:
-                
-                return float(string_value)*modifier
+        # 2.1. metadata supplied by the user (see section 5.1 
+        #      Overriding Metadata).
+        # 2.2. metadata referenced from a Link Header that may be returned 
+        #      when retrieving the tabular data file (see section 5.2 
+        #      Link Header).
+        # 2.3. metadata retrieved through a site-wide location configuration 
+        #      (see section 5.3 Default Locations and Site-wide Location 
+        #      Configuration).
+        # 2.4. embedded metadata as defined in section 5.4 Embedded 
+        #      Metadata with a single tables entry where the url property 
+        #      is set from that of the tabular data file.
         
+        metadata_document_dict, metadata_document_location=\
+            locate_metadata(
+                tabular_data_file_url,
+                tabular_data_file_headers,
+                overriding_metadata_file_path_or_url,
+                _link_header,
+                _well_known_text,
+                validate,
+                concurrent_metadata_requests
+                )
         
-        #---
-        #...convert the string value to a number
-        try:
+        if metadata_document_dict is None:  # i.e. using embedded metadata
             
-            json_value=convert_string_value_to_number(
-                    string_value,
-                    datatype_base,
-                    decimal_char,
-                    group_char
-                    )
-            conversion_error=False
+            metadata_document_dict={
+                '@context': 'http://www.w3.org/ns/csvw',
+                'url': tabular_data_file_url,
+                'tableSchema':{}
+                }
             
-        except ValueError:
+            metadata_document_location=''
             
-            json_value=None
-            conversion_error=True
+            use_embedded_metadata_flag=True
             
-        #print('-json_value',json_value)
-        #print('-conversion_error',conversion_error)
-        
+        else:
+            
+            use_embedded_metadata_flag=False
         
-        #  If the groupChar is specified, but no pattern is supplied, when parsing 
-        # the string value of a cell against this format specification, 
-        # implementations must recognise and parse numbers that consist of:
-    
-        # 1. an optional + or - sign,
-        # 2. followed by a decimal digit (0-9),
-        # 3. followed by any number of decimal digits (0-9) and the string 
-        #    specified as the groupChar,
-        # 4. followed by an optional decimalChar followed by one or more decimal 
-        #    digits (0-9),
-        # 5. followed by an optional exponent, consisting of an E followed by an 
-        #    optional + or - sign followed by one or more decimal digits (0-9), or
-        # 6. followed by an optional percent (%) or per-mille (‰) sign.
+        # 3. Proceed as if the process starts with FM.
         
-        #...DONE BELOW
+        # NO CODE NEEDED
         
+    # If the process starts with a metadata file:
+    else:
         
-        # or that are one of the special values:
+        # 1. Retrieve the metadata file yielding the metadata UM (which is 
+        #    treated as overriding metadata, see section 5.1 Overriding 
+        #    Metadata).
         
-        # 1. NaN,
-        # 2. INF, or
-        # 3. -INF.
+        #...set up the url
         
-        if string_value in ['NaN','INF','-INF']:
+        if not hyperlink.parse(input_file_path_or_url).absolute:  # only returns true if e.g. 'http://...'
             
-            json_value=string_value
+            if input_file_path_or_url==os.path.abspath(input_file_path_or_url):
+                
+                x=input_file_path_or_url
             
+            else:
                 
-        # Implementations may also recognise numeric values that are in any of the 
-        # standard-decimal, standard-percent or standard-scientific formats listed 
-        # in the Unicode Common Locale Data Repository.
+                x=os.path.join(os.getcwd(),input_file_path_or_url)
+            
+            x=x.replace('\\','/')
+            x=r'file:///'+x
+            x=urllib.parse.quote(x,safe=':/#?%')
+            x=normalize_url(x)
         
-        #...NOT DONE, ALTHOUGH ANY NUMBER THAT PYTHON CAN PARSE WILL WORK
+            metadata_document_location=x
         
-    
-        # Implementations must add a validation error to the errors annotation 
-        # for the cell, and set the cell value to a string rather than a number 
-        # if the string being parsed:
-    
-        # - is not in the format specified in the pattern, if one is defined
-        
-        if not pattern is None:
-            
-            result=validate_LDML_number(
-                string_value,
-                errors,
-                pattern_dict,
-                decimal_char,
-                group_char
-                )
-            
-            if not result:
-                
-                message=f'Cell value "{string_value}" is not in the format '
-                message+=f'specified "{pattern}". '
-                message+='Cell value is not converted to a number. '
-                
-                if validate:
-                    
-                    raise CSVWError(message)
-                    
-                else:
-                
-                    warnings.warn(message)
-                    
-                    errors.append(message)
-                    
-                    return string_value, 'string', errors
+        else:
             
+            metadata_document_location=\
+                normalize_url(
+                    input_file_path_or_url
+                    )
+        
+        #...get metadata document
+        with get_url_fetcher().open(metadata_document_location) as metadata_response:
+        
+            metadata_text=metadata_response.read().decode()
+        
+        
+        try:
+        
+            metadata_document_dict=json.loads(metadata_text)
+        
+        except json.decoder.JSONDecodeError as e: 
             
-        # - otherwise, if the string
-        #     - does not meet the numeric format defined above,
+            raise CSVWError(str(e))
         
-        else:
+        #
+        tabular_data_file_text=None
+        
+        use_embedded_metadata_flag=False
+        
+        
+    
+    if _print_intermediate_outputs: print('-metadata_document_location',metadata_document_location)
+    
+        
+    #...for testing
+    if _save_intermediate_and_final_outputs_to_file:
+    
+        with open('metadata_table_group_dict.json','w') as f:
             
-            if conversion_error:
-                
-                message=f'Cell string value "{string_value}" is not in a format '
-                message+='which can be converted to a number '
-                message+=f'of type "{datatype_base}". '
-                message+='Cell value is not converted to a number. '
-                
-                if validate:
-                    
-                    raise CSVWError(message)
-                    
-                else:
+            if use_embedded_metadata_flag:
                 
-                    warnings.warn(message)
-                    
-                    errors.append(message)
-                    
-                    return string_value, 'string', errors
+                json.dump(
+                    {},
+                    f,
+                    indent=4
+                    )
                 
             else:
                 
-                result=\
-                    validate_value_for_datatype_base(
-                        json_value,
-                        errors,
-                        datatype_base,
-                        validate
-                        )
-                    
-                if not result:
-                    
-                    return string_value, 'string', errors
-            
-            
-        #     - contains two consecutive groupChar strings,
-        if not group_char is None:
+                json.dump(
+                    metadata_document_dict,
+                    f,
+                    indent=4
+                    )
+        
+        
+    # 2. Normalize UM using the process defined in Normalization 
+    # in [tabular-metadata], coercing UM into a table group 
+    # description, if necessary.
+        
+    #...a TableGroup object
+    if 'tables' in metadata_document_dict:
+        
+        metadata_table_group_dict=metadata_document_dict
+        
+    #... a Table object
+    elif 'url' in metadata_document_dict:
     
-            if group_char+group_char in string_value:
-                
-                message=f'Cell value "{string_value}" contains '
-                message+='two consecutive groupChar strings. '
-                message+='Cell value is not converted to a number. '
-                
-                if validate:
-                    
-                    raise CSVWError(message)
-                
-                else:
-                
-                    warnings.warn(message)
-                    
-                    errors.append(message)
-                    
-                    return string_value, 'string', errors
-            
+        #...convert to TableGroup object
+        metadata_table_group_dict={
+            '@context': metadata_document_dict['@context'],
+            'tables': [metadata_document_dict]
+            }
+        metadata_table_group_dict['tables'][0].pop('@context', None)
+        
+    elif metadata_document_dict.get('@type')=='TableGroup':  
+        
+        metadata_table_group_dict=metadata_document_dict
+        
+    elif metadata_document_dict.get('@type')=='Table':  
+        
+        #...convert to TableGroup object
+        metadata_table_group_dict={
+            '@context': metadata_document_dict['@context'],
+            'tables': [metadata_document_dict]
+            }
+        metadata_table_group_dict['tables'][0].pop('@context', None)
+        
+    else:
+        
+        message='Metadata document is not a Table Group description object'
+        message+='or a Table description object.'
+        
+        raise CSVWError(message)
+        
+        
+        
+    #...normalize metadata
+    base_url, default_language=\
+        validate_and_normalize_metadata_table_group_dict(
+            metadata_table_group_dict,
+            metadata_document_location,
+            validate
+            )
+        
+    return (metadata_table_group_dict,
+            base_url,
+            default_language,
+            use_embedded_metadata_flag)
 
-        # - contains the decimalChar, if the datatype base is integer or one of 
-        #   its sub-types,
+
+def get_dialect_description_dict(
+        metadata_table_dict,
+        metadata_table_group_dict,
+        tabular_data_file_headers,
+        encoding,
+        skip_rows
+        ):
+    """Returns the dialect description (DD) for a table, as set out in 
+    steps 3.1 and 3.2 of Section 6.1.
+    
+    """
+
+    # 3.1 Extract the dialect description (DD) from UM for the table 
+    #     associated with the tabular data file. If there is no such 
+    #     dialect description, extract the first available dialect 
+    #     description from a group of tables in which the tabular data 
+    #     file is described. Otherwise use the default dialect description.
+
+    dialect_description_dict=\
+        metadata_table_dict.get('dialect',None)
         
-        if datatype['base'] in datatypes_integers:
-            
-            if decimal_char in string_value:
-                
-                message=f'Cell value "{string_value}" not valid as it '
-                message+=f'contains the decimalChar character "{decimal_char}". '
-                message+='Cell value is not converted to a number. '
-                
-                if validate:
-                    
-                    raise CSVWError(message)
-                
-                else:
-                
-                    warnings.warn(message)
-                    
-                    errors.append(message)
-                    
-                    return string_value, 'string', errors  
+    #...gets the first dialect description in the group of tables
+    #...check the table group object
+    if dialect_description_dict is None:
+        dialect_description_dict=\
+            metadata_table_group_dict.get('dialect',None)
+    
+    #...check each table in turn
+    if dialect_description_dict is None:
+        for metadata_table_dict2 in \
+            metadata_table_group_dict['tables']:
+                if 'dialect' in metadata_table_dict2:
+                    dialect_description_dict=\
+                        metadata_table_dict2['dialect']
+                    break
                 
-            
-        # - contains an exponent, if the datatype base is decimal or one of its 
-        #   sub-types, or
+    #...if none found, gets the default dialect description
+    if dialect_description_dict is None:
+        
+        dialect_description_dict=dict(
+            commentPrefix='#',
+            delimiter=',',
+            doubleQuote=True,
+            encoding='utf-8',
+            header=True,
+            headerRowCount=1,
+            lineTerminators=["\r\n", "\n"],
+            quoteChar='"',
+            skipBlankRows=False,
+            skipColumns=0,
+            skipInitialSpace=False,
+            skipRows=0,
+            trim=True
+            )
+    
+    
+        # 3.2 If using the default dialect description, override default values 
+        #     in DD based on HTTP headers found when retrieving the tabular data file:
+        #     - If the media type from the Content-Type header is text/tab-separated-values, 
+        #       set delimiter to TAB in DD.
+        #     - If the Content-Type header includes the header parameter with a 
+        #       value of absent, set header to false in DD.
+        #     - If the Content-Type header includes the charset parameter, set 
+        #       encoding to this value in DD.
         
-        elif datatype['base'] in datatypes_decimals:
+        if not tabular_data_file_headers is None:
+    
+            content_type=tabular_data_file_headers.get('Content-Type',None)
             
-            if 'E' in string_value or 'e' in string_value:
-                
-                message=f'Cell value "{string_value}" not valid as it '
-                message+='contains an exponent. '
-                message+='Cell value is not converted to a number. '
-                
-                if validate:
-                    
-                    raise CSVWError(message)
+            if not content_type is None:
                 
-                else:
+                if 'text/tab-separated-values' in content_type:  # NEEDS TESTING
                 
-                    warnings.warn(message)
+                    dialect_description_dict['delimter']='\t'
                     
-                    errors.append(message)
-                    
-                    return string_value, 'string', errors  
-                
-            
-        # - is one of the special values NaN, INF, or -INF, if the datatype base 
-        #   is decimal or one of its sub-types.
-            
-            if string_value in ['NaN','INF','-INF']:
-                
-                message=f'Cell value "{string_value}" not valid as its '
-                message+='datatype base is decimal or one of its sub-types. '
-                message+='Cell value is not converted to a number. '
+                if 'header=absent' in content_type:  # NEEDS TESTING
                 
-                if validate:
+                    dialect_description_dict['header']=False
                     
-                    raise CSVWError(message)
-                
-                else:
+                if 'charset' in content_type:  # NEEDS TESTING
                 
-                    warnings.warn(message)
-                    
-                    errors.append(message)  
+                    charset_value=\
+                        content_type.split('charset')[1].split(';')[0].strip()[1:]  # NEEDS TESTING
                     
-                    return string_value, 'string', errors  
-        
+                    dialect_description_dict['encoding']=charset_value
         
-        # Implementations must use the sign, exponent, percent, and per-mille signs 
-        # when parsing the string value of a cell to provide the value of the cell. 
-        # For example, the string value "-25%" must be interpreted as -0.25 and 
-        # the string value "1E6" as 1000000.
         
-        #...this is done in the convert_string_value_to_number function.
+        #... additional overrides from function arguments
         
+        if not encoding is None:
+            dialect_description_dict['encoding']=encoding
         
-        #
-        return json_value,  datatype_base, errors
-            
-        
-    return parse_number
+        if not skip_rows is None:
+            dialect_description_dict['skipRows']=skip_rows
+    
+    return dialect_description_dict
 
 
-def parse_LDML_number_pattern(
-        pattern,
-        p=False,
-        _print_intermediate_outputs=False
+def iter_annotated_rows(
+        input_file_path_or_url,
+        overriding_metadata_file_path_or_url=None,
+        validate=False,
+        encoding=None,
+        skip_rows=None,
+        max_errors=None,
+        concurrent_metadata_requests=False,
+        _link_header=None,  # for testing link headers,
+        _well_known_text=None,  # for testing well known paths
         ):
-    """Breaks down a number pattern into constituent components.
+    """Generator which yields the annotated rows of a table group one at a time.
     
-    :param pattern: A number pattern as specified in the Unicode Locale
-        Data Markup Language.
+    This is a streaming alternative to create_annotated_table_group for 
+    large tabular data files. 
+    The metadata is located and normalized once, and the tabular data files 
+    are then read as streams so that only the current row and its cells 
+    are held in memory.
+    
+    Each row is fully annotated (cell values, URIs, titles, primary key and 
+    referenced rows). 
+    The 'table' of each row is the annotated table, which has its columns 
+    but no rows, and the columns have no cells.
+    
+    The rows of any tables referenced by foreign keys are held in memory 
+    so the referenced rows can be found. 
+    When validating, the primary key values of each table are also held in 
+    memory to check that they are unique.
+    
+    :param input_file_path_or_url: Path/url to metadata document (json) or 
+        tabular data file (csv). 
+    :type input_file_path_ir_url: str
+    
+    :param overriding_metadata_file_path_or_url: Location of a metadata.json
+        file to be used as "overriding metadata".
+    :type overriding_metadata_file_path_or_url: str
+    
+    :param validate: Sets validator
+    
+    :param max_errors: If given and validate is False, the reading stops 
+        when this number of errors has been found in the cells, primary 
+        keys and foreign keys, and a CSVWMaxErrorsError is raised with 
+        the errors found. 
+        When max_errors is given, the primary key values of each table are 
+        held in memory as when validating.
+    :type max_errors: int
+    
+    :param concurrent_metadata_requests: See create_annotated_table_group.
+    
+    :returns: A generator of annotated row dictionaries.
+    
+    """
+    
+    annotated_table_group_dict, annotated_row_dicts=\
+        get_annotated_table_group_and_row_iterator(
+            input_file_path_or_url,
+            overriding_metadata_file_path_or_url,
+            validate,
+            encoding,
+            skip_rows,
+            _link_header,
+            _well_known_text,
+            max_errors,
+            concurrent_metadata_requests
+            )
         
-    :returns: (positive_subpattern, negative_subpattern)
+    yield from annotated_row_dicts
+    
+    
+def get_annotated_table_group_and_row_iterator(
+        input_file_path_or_url,
+        overriding_metadata_file_path_or_url,
+        validate,
+        encoding,
+        skip_rows,
+        _link_header,
+        _well_known_text,
+        max_errors=None,
+        concurrent_metadata_requests=False,
+        memoize_cell_values=False,
+        warn=warnings.warn,
+        diagnostics=None
+        ):
+    """Creates the annotated table group of iter_annotated_rows, with tables 
+    that have no rows and columns that have no cells.
+    
+    :param memoize_cell_values: See iter_annotated_rows_from_table.
+    :param warn: See iter_annotated_rows_from_table.
+    :param diagnostics: See iter_annotated_rows_from_table.
+    
+    :returns: (annotated_table_group_dict, annotated_row_dicts) where 
+        annotated_row_dicts is a generator of the annotated rows.
+    :rtype: tuple
     
     """
-    def zero_and_hash_count(
-            pattern2,
-            mode, # "integral" or "fractional"
-            ):
-        ""
-        #print('-pattern2',pattern2)
-        #print('-mode',mode)
+    
+    annotated_table_group_dict, metadata_table_group_dict, dialect_description_dicts=\
+        get_streaming_annotated_table_group(
+            input_file_path_or_url,
+            overriding_metadata_file_path_or_url,
+            validate,
+            encoding,
+            skip_rows,
+            _link_header,
+            _well_known_text,
+            concurrent_metadata_requests
+            )
         
-        zero_count=0
-        hash_count=0
+    #...index the rows of the referenced tables, one index per foreign key
+    referenced_rows_indexes=[]
+    
+    for annotated_table_dict in annotated_table_group_dict['tables']:
         
-        pattern2=pattern2.replace(',','')
-        i=0
-        end_of_zeros_flag=False
+        indexes=[]
         
-        #
-        if mode=='integral':
+        for foreign_key_definition in annotated_table_dict['foreignKeys']:
             
-            pattern2=pattern2[::-1]
-            
-        elif mode=='fractional':
-            
-            pass
-        
-        else:
+            foreign_key_reference_columns=foreign_key_definition[1]
+            foreign_key_reference_table=foreign_key_reference_columns[0]['table']
             
-            raise Exception
-        
-        #
-        while i<len(pattern2):
+            table_index=\
+                [i for i,x in enumerate(annotated_table_group_dict['tables'])
+                 if x is foreign_key_reference_table][0]
+                
+            column_indexes=\
+                get_column_indexes(
+                    foreign_key_reference_table,
+                    foreign_key_reference_columns
+                    )
+                
+            index={}
             
-            if pattern2[i]=='0':
+            #...warnings are given when the referenced table itself is read
+            with warnings.catch_warnings():
                 
-                if end_of_zeros_flag:
+                warnings.simplefilter('ignore')
+            
+                for row_dict in iter_annotated_rows_from_table(
+                        foreign_key_reference_table,
+                        metadata_table_group_dict['tables'][table_index],
+                        dialect_description_dicts[table_index],
+                        validate
+                        ):
                     
-                    raise Exception
-                
-                else:
+                    key=tuple(get_hashable_value(row_dict['cells'][i]['value']) 
+                              for i in column_indexes)
                     
-                    zero_count+=1
-            
-            elif pattern2[i]=='#':
+                    index.setdefault(key,[]).append(row_dict)
                 
-                end_of_zeros_flag=True
+            indexes.append(index)
             
-                hash_count+=1
+        referenced_rows_indexes.append(indexes)
             
-            else:
-                
-                raise Exception
-                
-            i+=1
+    annotated_row_dicts=\
+        iter_annotated_rows_from_table_group(
+            annotated_table_group_dict,
+            metadata_table_group_dict,
+            dialect_description_dicts,
+            referenced_rows_indexes,
+            validate,
+            max_errors,
+            memoize_cell_values,
+            warn,
+            diagnostics
+            )
         
-        #
-        return zero_count,hash_count
-                
-    #---
+    return annotated_table_group_dict, annotated_row_dicts
     
-    if _print_intermediate_outputs: print('-pattern',pattern)
     
-    # prefix
-    if pattern[0] in ['%','‰','\u2030']:
-        
-        prefix=pattern[0]
-        pattern_no_prefix=pattern[1:]
-        
-    else:
+def get_streaming_annotated_table_group(
+        input_file_path_or_url,
+        overriding_metadata_file_path_or_url,
+        validate,
+        encoding,
+        skip_rows,
+        _link_header,
+        _well_known_text,
+        concurrent_metadata_requests=False
+        ):
+    """Locates and normalizes the metadata and reads the header of each 
+    tabular data file to create an annotated table group with tables that 
+    have no rows and columns that have no cells.
+    
+    :returns: (annotated_table_group_dict, metadata_table_group_dict, 
+        dialect_description_dicts)
+    :rtype: tuple
+    
+    """
+    
+    metadata_table_group_dict, base_url, default_language, use_embedded_metadata_flag=\
+        get_normalized_metadata_table_group_dict(
+            input_file_path_or_url,
+            overriding_metadata_file_path_or_url,
+            validate,
+            _link_header,
+            _well_known_text,
+            concurrent_metadata_requests=concurrent_metadata_requests
+            )
         
-        prefix=''
-        pattern_no_prefix=pattern
+    annotated_table_group_dict={
+        'id':None,
+        'notes':[],
+        'tables':[]
+        }
+    
+    dialect_description_dicts=[]
+    
+    #...the header and first row of each table are read to set up the 
+    #...annotated tables and their columns
+    for table_index,metadata_table_dict in \
+        enumerate(metadata_table_group_dict['tables']):
+            
+        tabular_data_file_url=metadata_table_dict['url']
         
-    #print('-prefix',prefix)
+        if tabular_data_file_url.startswith('file'):
+            
+            tabular_data_file_headers=None
         
-    
-    # prefix_sign
-    if pattern_no_prefix[0] in ['+','-']:
+        else:
+                
+            tabular_data_file_headers=get_url_fetcher().head(tabular_data_file_url)
+            
+        dialect_description_dict=\
+            get_dialect_description_dict(
+                metadata_table_dict,
+                metadata_table_group_dict,
+                tabular_data_file_headers,
+                encoding,
+                skip_rows
+                )
+            
+        dialect_description_dicts.append(dialect_description_dict)
         
-        prefix_sign=pattern_no_prefix[0]
-        pattern_no_prefix_no_sign=pattern_no_prefix[1:]
+        annotated_table_dict, embedded_metadata_dict, row_dicts=\
+            stream_tabular_data_from_text(
+                tabular_data_file_url,
+                dialect_description_dict
+                )
         
-    else:
+        #...the columns are created when the first row is read
+        next(row_dicts,None)
         
-        prefix_sign=''
-        pattern_no_prefix_no_sign=pattern_no_prefix
-    
+        #...if using embedded metadata, the comments in all the rows become 
+        #...annotations of the table so all the rows are read
+        if use_embedded_metadata_flag \
+            and not dialect_description_dict.get('commentPrefix',None) is None:
+            
+            for _ in row_dicts: 
+                pass
         
-    # suffix
-    if pattern_no_prefix_no_sign[-1] in ['+','-','%','‰','\u2030']:
+        row_dicts.close()
+            
+        annotated_table_group_dict['tables'].append(annotated_table_dict)
         
-        suffix=pattern_no_prefix_no_sign[-1]
-        pattern_no_prefix_and_suffix=pattern_no_prefix_no_sign[:-1]
+        #...if using embedded metadata
+        if use_embedded_metadata_flag:
+            
+            metadata_table_dict=copy.deepcopy(embedded_metadata_dict)
+            
+            validate_and_normalize_metadata_table_dict(
+                metadata_table_dict,
+                metadata_document_location=None,
+                metadata_table_group_dict=None
+                )
+            
+            metadata_table_dict.pop('@context')
+            
+            metadata_table_group_dict['tables'][table_index]=metadata_table_dict
+            
+        # 3.4 Content-Language HTTP header
+        if not tabular_data_file_headers is None:
         
-    else:
+            content_language=tabular_data_file_headers.get('Content-Language',None)
+            
+            if not content_language is None:
+                
+                if not 'lang' in metadata_table_dict:
+                    
+                    metadata_table_dict['lang']=content_language
+                    
+        # 3.5 Verify that TM is compatible with EM
+        compare_table_descriptions(
+            metadata_table_dict,
+            embedded_metadata_dict,
+            validate=validate
+            )
         
-        suffix=''
-        pattern_no_prefix_and_suffix=pattern_no_prefix_no_sign
+    # 3.6 Use the metadata TM to add annotations to the tabular data model T
+    annotated_table_group_dict=\
+        annotate_table_group_dict(
+            annotated_table_group_dict,
+            metadata_table_group_dict,
+            base_url,
+            default_language,
+            validate
+            )
         
-    #print('-suffix',suffix)
-    #print('-pattern_no_prefix_and_suffix',pattern_no_prefix_and_suffix)
-    
-    #...check no invalid prefixes or suffixes remain
-    assert pattern_no_prefix_and_suffix[0] in ['#','0']
-    assert pattern_no_prefix_and_suffix[-1] in ['#','0']
+    return annotated_table_group_dict, metadata_table_group_dict, dialect_description_dicts
     
     
-    # mantissa and exponent in scientific notation
-    mantissa_part, _, exponent_part_with_prefix=\
-        pattern_no_prefix_and_suffix.partition('E')
+def iter_annotated_rows_from_table_group(
+        annotated_table_group_dict,
+        metadata_table_group_dict,
+        dialect_description_dicts,
+        referenced_rows_indexes,
+        validate,
+        max_errors=None,
+        memoize_cell_values=False,
+        warn=warnings.warn,
+        diagnostics=None
+        ):
+    """Generator which yields the annotated rows of each table in a table 
+    group, including the referenced rows.
+    
+    :param referenced_rows_indexes: For each table, a list with an index of 
+        the referenced rows for each foreign key.
+    :param max_errors: If given and validate is False, a CSVWMaxErrorsError 
+        is raised when this number of errors has been found, see 
+        add_errors_to_error_report.
+    :param memoize_cell_values: See iter_annotated_rows_from_table.
+    :param warn: See iter_annotated_rows_from_table.
+    :param diagnostics: See iter_annotated_rows_from_table.
     
+    """
     
-    # exponent_prefix
-    if exponent_part_with_prefix.startswith('+'):
+    if not max_errors is None and not validate:
         
-        exponent_prefix='+'
-        exponent_part=exponent_part_with_prefix[1:]
+        error_report={'error_count':0,'errors':[]}
         
     else:
         
-        exponent_prefix=''
-        exponent_part=exponent_part_with_prefix
-    
-    
-    # integral and fractional parts
-    integral_part, _, fractional_part=\
-        mantissa_part.partition('.')
-    
-    
-    # integral grouping size
-    reverse_integral_part=integral_part[::-1]
-    integral_part_primary_grouping_size=0
-    integral_part_secondary_grouping_size=0
+        error_report=None
     
-    positions_of_group_char=[i for i, x 
-                             in enumerate(reverse_integral_part) 
-                             if x==',']
-    
-    if len(positions_of_group_char)==0:
+    #...yield the rows of each table
+    for table_index,annotated_table_dict in \
+        enumerate(annotated_table_group_dict['tables']):
+            
+        foreign_key_column_indexes=\
+            [get_column_indexes(annotated_table_dict,foreign_key_definition[0])
+             for foreign_key_definition in annotated_table_dict['foreignKeys']]
         
-        integral_part_primary_grouping_size=None
-        integral_part_secondary_grouping_size=None
-    
-    elif len(positions_of_group_char)==1:
-        
-        integral_part_primary_grouping_size=positions_of_group_char[0]
-        integral_part_secondary_grouping_size=integral_part_primary_grouping_size 
-        
-    else:
-        
-        integral_part_primary_grouping_size=positions_of_group_char[0]
-        integral_part_secondary_grouping_size=\
-            positions_of_group_char[1]-positions_of_group_char[0]-1
+        for row_dict in iter_annotated_rows_from_table(
+                annotated_table_dict,
+                metadata_table_group_dict['tables'][table_index],
+                dialect_description_dicts[table_index],
+                validate,
+                error_report,
+                max_errors,
+                memoize_cell_values=memoize_cell_values,
+                warn=warn,
+                diagnostics=diagnostics
+                ):
+            
+            #... annotate referenced rows
+            for foreign_key_definition, column_indexes, index in \
+                zip(annotated_table_dict['foreignKeys'],
+                    foreign_key_column_indexes,
+                    referenced_rows_indexes[table_index]):
                 
-    
-    # integral zeros and hashes
-    integral_part_zero_padding_count,\
-        integral_part_hash_padding_count=\
-            zero_and_hash_count(
-                    integral_part,
-                    mode='integral'
-                    )
+                foreign_key_definition_values=\
+                    [row_dict['cells'][i]['value'] for i in column_indexes]
+                    
+                key=tuple(get_hashable_value(x) 
+                          for x in foreign_key_definition_values)
+                
+                referenced_row_dicts=index.get(key,[])
+                
+                if len(referenced_row_dicts)==0:
+                    
+                    message=f'Columns referenced by foreign key do not contain the value required: {foreign_key_definition_values}'
+                    
+                    if validate:  
+                    
+                        raise CSVWError(message)
+                        
+                    else:
+                        
+                        warnings.warn(message)
+                        
+                        if not error_report is None:
+                            
+                            add_errors_to_error_report(
+                                error_report,
+                                max_errors,
+                                annotated_table_dict['url'],
+                                None,
+                                row_dict['number'],
+                                [message]
+                                )
+                
+                elif len(referenced_row_dicts)==1:
+                    
+                    row_dict['referencedRows'].append(
+                        [foreign_key_definition,
+                         referenced_row_dicts[0]]
+                        )
+                    
+                else:
+                    
+                    message=f'Columns referenced by foreign key do not a unique row with the values required: {foreign_key_definition_values}'
+                    
+                    if validate:  
+                        
+                        raise CSVWError(message)
+                        
+                    else:
+                        
+                        warnings.warn(message)
+                        
+                        if not error_report is None:
+                            
+                            add_errors_to_error_report(
+                                error_report,
+                                max_errors,
+                                annotated_table_dict['url'],
+                                None,
+                                row_dict['number'],
+                                [message]
+                                )
             
-    # fractional grouping size
-    positions_of_group_char=[i for i, x 
-                             in enumerate(fractional_part) 
-                             if x==',']
-    
-    if len(positions_of_group_char)==0:
-        
-        fractional_part_grouping_size=None
-        
-    elif len(positions_of_group_char)==1:
-        
-        fractional_part_grouping_size=positions_of_group_char[0]
-        
-    else:
-        
-        raise Exception
-    
-    
-    # fractional zeros and hashes
-    fractional_part_zero_padding_count,\
-        fractional_part_hash_padding_count=\
-            zero_and_hash_count(
-                    fractional_part,
-                    mode='fractional'
-                    )
-    
-    
-    # exponent zeros and hashes
-    exponent_part_zero_padding_count,\
-        exponent_part_hash_padding_count=\
-            zero_and_hash_count(
-                    exponent_part,
-                    mode='integral'
-                    )
-    
-    return dict(
-        pattern=pattern,
-        prefix=\
-            prefix,
-        prefix_sign=\
-            prefix_sign,
-        suffix=\
-            suffix,
-        mantissa_part=\
-            mantissa_part,
-        integral_part=\
-            integral_part,
-        integral_part_primary_grouping_size=\
-            integral_part_primary_grouping_size,
-        integral_part_secondary_grouping_size=\
-            integral_part_secondary_grouping_size,
-        integral_part_zero_padding_count=\
-            integral_part_zero_padding_count,
-        integral_part_hash_padding_count=\
-            integral_part_hash_padding_count,
-        fractional_part=\
-            fractional_part,
-        fractional_part_grouping_size=\
-            fractional_part_grouping_size,
-        fractional_part_zero_padding_count=\
-            fractional_part_zero_padding_count,
-        fractional_part_hash_padding_count=\
-            fractional_part_hash_padding_count,
-        exponent_prefix=\
-            exponent_prefix,
-        exponent_part=\
-            exponent_part,
-        exponent_part_zero_padding_count=\
-            exponent_part_zero_padding_count,
-        exponent_part_hash_padding_count=\
-            exponent_part_hash_padding_count
-            )
-        
-    
-def validate_LDML_number(
-        string_value,
-        errors,
-        pattern_dict,
-        decimal_char,
-        group_char
+            yield row_dict
+            
+            
+def iter_annotated_rows_from_table(
+        annotated_table_dict,
+        metadata_table_dict,
+        dialect_description_dict,
+        validate,
+        error_report=None,
+        max_errors=None,
+        annotate_uris_and_titles=True,
+        memoize_cell_values=False,
+        warn=warnings.warn,
+        create_key_digest_set=set,
+        diagnostics=None
         ):
-    """
-    
-    :returns: True if valid; otherwise False
+    """Generator which reads the tabular data file of an annotated table and 
+    yields its rows with the annotations which do not depend on other tables.
+    
+    The cell values, URIs, row titles and primary keys are annotated as in 
+    create_annotated_table_group. 
+    Referenced rows are not annotated.
+    
+    :param error_report: If given, the errors of the cells and primary keys, 
+        and the rows which cannot be parsed, are added to this error report, 
+        see add_errors_to_error_report.
+    :param annotate_uris_and_titles: If False, the URIs of the cells and the 
+        titles of the rows are not annotated, which is faster when only the 
+        cell values are needed.
+    :param memoize_cell_values: See parse_cells_in_annotated_column_dict.
+    :param warn: The function called with the message of each error of a 
+        cell, see get_parse_cell_function.
+    :param create_key_digest_set: A function which returns an empty set for 
+        the digests of the primary keys, such as set or a function which 
+        returns a SQLiteKeyDigestSet.
+    :param diagnostics: If given and memoize_cell_values is True, the hit and 
+        miss statistics of the memo of each column are added to this when the 
+        reading of the rows ends, see add_memo_statistics_to_diagnostics.
     
     """
-    try:
+    
+    if error_report is None:
         
-        prefix, integral_sign, integral_part, fractional_part, exponent_sign, exponent_part, suffix=\
-            parse_LDML_number(
-                string_value,
-                errors,
-                decimal_char,
-                group_char
-                )
-            
-    except ValueError:
+        row_error_function=None
         
-        return False
+    else:
         
-    #print((prefix, integral_sign, integral_part, fractional_part, exponent_sign, exponent_part, suffix))
+        #...a row which cannot be parsed counts as one error
+        def row_error_function(message,row_number):
+            
+            warnings.warn(message)
+            
+            add_errors_to_error_report(
+                error_report,
+                max_errors,
+                annotated_table_dict['url'],
+                None,
+                row_number,
+                [message]
+                )
     
-    #print(pattern_dict)
+    annotated_table_dict, _, row_dicts=\
+        stream_tabular_data_from_text(
+            annotated_table_dict['url'],
+            dialect_description_dict,
+            table_dict=annotated_table_dict,
+            row_error_function=row_error_function
+            )
         
-    
-    # prefix
-    if not prefix==pattern_dict['prefix']:
-            
-        message='prefix'
+    trim=dialect_description_dict.get('trim',True)
         
-        warnings.warn(message)
+    #...virtual columns are added by annotate_schema_dict and have no source number
+    virtual_column_dicts=\
+        [x for x in annotated_table_dict['columns'] 
+         if x['sourceNumber'] is None]
         
-        return False
-            
+    #...the parse functions for each column
+    parse_cell_functions={}
     
-    # prefix sign
-    if pattern_dict['prefix_sign']:
+    for annotated_column_dict in annotated_table_dict['columns']:
         
-        if not integral_sign==pattern_dict['prefix_sign']:
+        parse_cell_functions[annotated_column_dict['number']]=\
+            get_parse_cell_function(
+                annotated_column_dict,
+                trim,
+                validate,
+                warn
+                )
             
-            message='prefix sign'
+        if memoize_cell_values:
             
-            warnings.warn(message)
+            parse_cell_functions[annotated_column_dict['number']]=\
+                get_memoized_parse_cell_function(
+                    parse_cell_functions[annotated_column_dict['number']]
+                    )
             
-            return False
-    
+    #...the URI template functions for each column
+    uri_template_functions={}
     
-    
-    # integral_part
-    if not group_char is None:
-        
-        x=integral_part.replace(group_char,'')
+    for annotated_column_dict in annotated_table_dict['columns']:
         
-    else:
-    
-        x=integral_part
+        uri_template_functions[annotated_column_dict['number']]=\
+            [(k,get_URI_template_function(annotated_column_dict[k],
+                                          annotated_column_dict))
+             for k in ['aboutURL','propertyURL','valueURL']
+             if not annotated_column_dict[k] is None
+             and annotate_uris_and_titles]
+            
+    #...row titles and primary key columns
+    metadata_schema_dict=metadata_table_dict.get('tableSchema',{})
     
-    if len(x)<pattern_dict['integral_part_zero_padding_count']:
-        
-        message='integral part zero padding'
+    row_titles_column_indexes=\
+        get_column_indexes_from_column_names(
+            annotated_table_dict,
+            metadata_schema_dict.get('rowTitles',[]) 
+            if annotate_uris_and_titles else []
+            )
         
-        warnings.warn(message)
+    primary_key_column_indexes=\
+        get_column_indexes_from_column_names(
+            annotated_table_dict,
+            metadata_schema_dict.get('primaryKey',[])
+            )
         
-        return False
-    
-    # integral part group sizes
-    
-    #print(pattern_dict['integral_part_primary_grouping_size'])
-    #print(pattern_dict['integral_part_secondary_grouping_size'])
-    
-    x=integral_part[::-1]
-    
-    # positions_of_group_char=[i for i, y 
-    #                          in enumerate(x) 
-    #                          if y==(group_char or ',')]
-    
-    # print(positions_of_group_char)
-    
-    i=0
-    gs1=pattern_dict['integral_part_primary_grouping_size']
-    gs2=pattern_dict['integral_part_secondary_grouping_size']
-    
-    while i<len(x):
+    #...the digests of the primary keys are held rather than the keys
+    primary_key_digests=create_key_digest_set()
         
-        #print('i',i, 'x[i]', x[i], 'gs1', gs1, 'gs2', gs2, '(i-gs1)%(gs2+1)', (i-gs1)%(gs2+1) if gs1 else '')
+    try:
         
-        if not gs1 is None and i==gs1:
+        for annotated_row_dict in row_dicts:
             
-            if not x[i]==(group_char or ','):
+            #...virtual cells
+            for annotated_column_dict in virtual_column_dicts:
                 
-                message='integral part primary grouping size #1'
-                
-                #print(message)
-                            
-                warnings.warn(message)
+                annotated_row_dict['cells'].append(
+                    AnnotatedCell(
+                        table=annotated_table_dict, 
+                        column=annotated_column_dict, 
+                        row=annotated_row_dict, 
+                        stringValue='',
+                        value=None,
+                        errors=[]
+                        )
+                    )
+            
+            #...parse cells
+            for annotated_cell_dict in annotated_row_dict['cells']:
                 
-                return False
-        
-        elif not gs1 is None and not gs2 is None and i>gs1 and \
-            (i-gs1)%(gs2+1)==0:  # changed from (gs1-i)%gs2==0:
+                cell_value,errors=\
+                    parse_cell_functions[annotated_cell_dict['column']['number']](
+                        annotated_cell_dict['stringValue']
+                        )
+                    
+                annotated_cell_dict['value']=cell_value
+                annotated_cell_dict['errors'].extend(errors)
                 
-            if not x[i]==(group_char or ','):
+                if len(errors)>0 and not error_report is None:
+                    
+                    add_errors_to_error_report(
+                        error_report,
+                        max_errors,
+                        annotated_table_dict['url'],
+                        annotated_cell_dict['column']['name'],
+                        annotated_row_dict['number'],
+                        errors
+                        )
                 
-                #print('x',x)
+            #...generate URIs
+            for annotated_cell_dict in annotated_row_dict['cells']:
                 
-                message='integral part primary grouping size #2'
+                for k,uri_template_function in \
+                    uri_template_functions[annotated_cell_dict['column']['number']]:
+                    
+                    annotated_cell_dict[k]=\
+                        uri_template_function(
+                            annotated_cell_dict,
+                            annotated_table_dict['url']
+                            )  
+                        
+            #...annotate row titles
+            for column_index in row_titles_column_indexes:
                 
-                #print(message)
-                            
-                warnings.warn(message)
+                value=dict(**annotated_row_dict['cells'][column_index]['value'])  # create a copy
                 
-                return False
-            
-        elif x[i]==(group_char or ','):
-    
-            message='integral part primary grouping size #3'
-            
-            #print(message)
+                if value['@type']=='http://www.w3.org/2001/XMLSchema#string':
+                    
+                    if not '@language' in value:
                         
-            warnings.warn(message)
+                        value['@language']='und'
+                        
+                else:
+                    
+                    value['@language']='und'
+                
+                annotated_row_dict['titles'].append(value)
+                
+            #...annotate primary key
+            for column_index in primary_key_column_indexes:
+                
+                annotated_row_dict['primaryKey'].append(
+                    annotated_row_dict['cells'][column_index]
+                    )
+                
+            if (validate or not error_report is None) \
+                and len(primary_key_column_indexes)>0:
+                
+                pk=[x['stringValue'] for x in annotated_row_dict['primaryKey']]
+                
+                primary_key_digest=get_key_digest(tuple(pk))
+                
+                if primary_key_digest in primary_key_digests:
+                    
+                    message=f'Primary key does not have a unique comination of values: {pk}.'
+                
+                    if validate:
+                        
+                        raise CSVWError(message)
+                        
+                    else:
+                        
+                        warnings.warn(message)
+                        
+                        add_errors_to_error_report(
+                            error_report,
+                            max_errors,
+                            annotated_table_dict['url'],
+                            None,
+                            annotated_row_dict['number'],
+                            [message]
+                            )
+                    
+                else:
+                    
+                    primary_key_digests.add(primary_key_digest)
+                    
+            yield annotated_row_dict
             
-            return False
+    finally:
+        
+        if memoize_cell_values and not diagnostics is None:
+            
+            for annotated_column_dict in annotated_table_dict['columns']:
+                
+                add_memo_statistics_to_diagnostics(
+                    diagnostics,
+                    annotated_table_dict,
+                    annotated_column_dict,
+                    parse_cell_functions[annotated_column_dict['number']].cache_info()
+                    )
+        
+        
+def get_column_indexes(
+        annotated_table_dict,
+        annotated_column_dicts
+        ):
+    """Returns the indexes of columns within the columns of a table.
     
-        i+=1
+    """
+    return [i 
+            for annotated_column_dict in annotated_column_dicts
+            for i,x in enumerate(annotated_table_dict['columns']) 
+            if x is annotated_column_dict]
+
+
+def get_column_indexes_from_column_names(
+        annotated_table_dict,
+        column_names
+        ):
+    """Returns the indexes of the columns of a table with the given names.
     
+    :param column_names: A column name or a list of column names, as in 
+        a column reference property.
     
-    # if not pattern_dict['integral_part_primary_grouping_size'] is None:
+    """
+    if not isinstance(column_names,list):
+        column_names=[column_names]
         
-    #     try:
-            
-    #         if not x[pattern_dict['integral_part_primary_grouping_size']]\
-    #             ==(group_char or ','):
-                
-    #             message='integral part primary grouping size'
-                
-    #             warnings.warn(message)
-                
-    #             return False
+    return [i 
+            for column_name in column_names
+            for i,x in enumerate(annotated_table_dict['columns']) 
+            if x['name']==column_name]
+
+
+def get_hashable_value(
+        value
+        ):
+    """Returns a hashable version of a cell value, for use as a dictionary key.
+    
+    Two cell values are equal if and only if their hashable versions are equal.
+    
+    """
+    if isinstance(value,dict):
+        
+        return tuple(sorted((k,get_hashable_value(v)) for k,v in value.items()))
+    
+    elif isinstance(value,list):
+        
+        return tuple(get_hashable_value(x) for x in value)
+    
+    else:
+        
+        return value
     
-    #     except IndexError:
-            
-    #         pass
     
+def get_key_digest(
+        key
+        ):
+    """Returns a 16 byte digest of a key, such as a tuple of the string 
+    values of the primary key of a row.
+    
+    The digests are used instead of the keys when checking the keys of 
+    large tables, as they take less memory. Two different keys have the 
+    same digest with negligible probability.
     
+    :param key: A tuple of strings or hashable values, see get_hashable_value.
+    :type key: tuple
     
+    :rtype: bytes
     
+    """
+    return hashlib.blake2b(repr(key).encode(),digest_size=16).digest()
     
     
+class SQLiteKeyDigestSet():
+    """A set of key digests which is stored in a SQLite database file rather 
+    than in memory.
     
+    A Python set uses about 100 bytes for each 16 byte digest, so the memory 
+    used by the primary key and foreign key checks grows with the number of 
+    rows. This set can be used instead, for example by validate_csvw, when 
+    the tables are too large for this. SQLite holds only a fixed size cache 
+    of the database pages in memory.
     
+    The digests are not committed, as the file is only used while the set 
+    is in use.
     
+    :param file_path: The path of the database file, which must not exist.
+    :type file_path: str
     
+    """
     
+    def __init__(self, file_path):
+        self.connection=sqlite3.connect(file_path)
+        self.connection.execute('PRAGMA journal_mode=OFF')
+        self.connection.execute('PRAGMA synchronous=OFF')
+        self.connection.execute(
+            'CREATE TABLE digests (digest BLOB PRIMARY KEY) WITHOUT ROWID'
+            )
         
-    # fractional_part
+        
+    def __contains__(self, digest):
+        ""
+        return not self.connection.execute(
+            'SELECT 1 FROM digests WHERE digest=?', (digest,)
+            ).fetchone() is None
     
-    if not group_char is None:
+    
+    def add(self, digest):
+        ""
+        self.connection.execute(
+            'INSERT OR IGNORE INTO digests VALUES (?)', (digest,)
+            )
         
-        x=fractional_part.replace(group_char,'')
         
-    else:
+    def close(self):
+        "Closes the database file."
+        self.connection.close()
     
-        x=fractional_part
     
-    if len(x)<pattern_dict['fractional_part_zero_padding_count']:
+#%% 6.1 Creating Annotated Tables - columnar
+
+# In the annotated table group created by create_annotated_table_group each 
+# row and each cell is a dictionary, with references back to its table, 
+# column and row. For large tables this uses several hundred bytes per cell.
+# The functions and classes below create an annotated table group where the 
+# cells of each table are stored in lists, one list per column and 
+# annotation, and the rows and cells are created as read-only views when 
+# they are accessed. The views support the same dictionary interface, so 
+# functions such as create_json_ld, create_rdf and get_errors work unchanged.
+
+def create_columnar_annotated_table_group(
+        input_file_path_or_url,
+        overriding_metadata_file_path_or_url=None,
+        validate=False,
+        encoding=None,
+        skip_rows=None,
+        max_errors=None,
+        concurrent_metadata_requests=False,
+        _link_header=None,  # for testing link headers,
+        _well_known_text=None,  # for testing well known paths
+        ):
+    """Creates an annotated table group which stores the cells of each table 
+    in columns.
+    
+    The tabular data files are read as streams using iter_annotated_rows and 
+    each row is added to the columns of its table. 
+    The 'rows' of each table and the 'cells' of each column are sequences of 
+    row and cell views. 
+    The tables, columns and table group are dictionaries as in 
+    create_annotated_table_group.
+    
+    :param max_errors: See iter_annotated_rows.
+    
+    :param concurrent_metadata_requests: See create_annotated_table_group.
+    
+    :returns: An annotated table group dictionary.
+    :rtype: dict
+    
+    """
+    
+    annotated_table_group_dict, annotated_row_dicts=\
+        get_annotated_table_group_and_row_iterator(
+            input_file_path_or_url,
+            overriding_metadata_file_path_or_url,
+            validate,
+            encoding,
+            skip_rows,
+            _link_header,
+            _well_known_text,
+            max_errors,
+            concurrent_metadata_requests
+            )
         
-        message='fractional part zero padding'
+    table_stores={}  # id of annotated table -> table store
+    
+    for annotated_table_dict in annotated_table_group_dict['tables']:
         
-        warnings.warn(message)
+        table_stores[id(annotated_table_dict)]=\
+            create_table_store(
+                annotated_table_dict,
+                annotated_table_group_dict
+                )
+    
+    for annotated_row_dict in annotated_row_dicts:
         
-        return False
+        table_store=table_stores[id(annotated_row_dict['table'])]
         
-    if len(x)> \
-        pattern_dict['fractional_part_zero_padding_count']\
-            + pattern_dict['fractional_part_hash_padding_count']:
+        append_row_to_table_store(
+            table_store,
+            annotated_row_dict
+            )
         
-        message='fractional part hash padding'
+    for table_store in table_stores.values():
         
-        warnings.warn(message)
+        annotated_table_dict=table_store['table']
         
-        return False
-    
-    
-    # exponent prefix
-    if exponent_sign=='+':
+        annotated_table_dict['rows']=ColumnarRows(table_store)
         
-        if not pattern_dict['exponent_prefix']=='+':
+        for column_index,annotated_column_dict in \
+            enumerate(annotated_table_dict['columns']):
             
-            message='exponent prefix'
-            
-            warnings.warn(message)
+            annotated_column_dict['cells']=\
+                ColumnarColumnCells(table_store,column_index)
             
-            return False
-        
+    return annotated_table_group_dict
+
+
+def create_table_store(
+        annotated_table_dict,
+        annotated_table_group_dict
+        ):
+    """Returns an empty table store for an annotated table.
     
-    # exponent part
+    The table store is a dictionary with a list for each row annotation 
+    and a column store for each column.
     
-    if not group_char is None:
-        
-        x=exponent_part.replace(group_char,'')
-        
-    else:
+    """
     
-        x=exponent_part
+    table_store=dict(
+        table=annotated_table_dict,
+        table_group=annotated_table_group_dict,
+        number=[],
+        sourceNumber=[],
+        titles={},  # row index -> titles, for rows with titles
+        referencedRows={},  # row index -> list of (foreign key index, table index, row number)
+        primaryKey=None,  # the column indexes of the primary key
+        columns=[],
+        column_indexes={},  # id of annotated column -> column index
+        row_indexes_by_number=None  # created when needed
+        )
     
-    if len(x)<pattern_dict['exponent_part_zero_padding_count']:
-        
-        message='exponent part'
+    for annotated_column_dict in annotated_table_dict['columns']:
         
-        warnings.warn(message)
+        add_column_to_table_store(
+            table_store,
+            annotated_column_dict
+            )
         
-        return False
-    
-    
-    #
-    return True
+    return table_store
+
+
+def add_column_to_table_store(
+        table_store,
+        annotated_column_dict
+        ):
+    """Adds a column store to a table store.
     
+    A column store is a dictionary with a list for each cell annotation. 
+    The stringValue is None if a row has no cell in the column. 
+    The value list holds the @value of each value, and the @type and 
+    @language shared by most values of a column are stored once, so a 
+    dictionary is only stored for the other values (such as a list of 
+    values, or an invalid value which has the type string). 
+    Errors are only stored for the cells which have errors, and the URIs are 
+    only stored if the column has a URI template.
     
-def parse_LDML_number(
-        string_value,
-        errors,
-        decimal_char,
-        group_char,
-        _print_intermediate_outputs=False
-        ):
     """
     
-    :returns: (prefix, 
-              integral_sign,
-            integral_part, 
-            fractional_part, 
-            exponent_prefix, 
-            exponent_part, 
-            suffix)
-    
+    number_of_rows=len(table_store['number'])
     
-    """
+    column_store=dict(
+        column=annotated_column_dict,
+        stringValue=[None]*number_of_rows,
+        value=[None]*number_of_rows,
+        value_type=None,  # the @type and @language items of the first value
+        value_dicts={},  # row index -> value, for the other values
+        cell_count=0,  # the number of rows which have a cell in the column
+        errors={}  # row index -> errors, for cells with errors
+        )
     
-    # prefix
-    if string_value[0] in ['%','‰','\u2030']:
+    for k in ['aboutURL','propertyURL','valueURL']:
         
-        prefix=string_value[0]
-        string_value_no_prefix=string_value[1:]
+        if annotated_column_dict[k] is None:
+            column_store[k]=None
+        else:
+            column_store[k]=[None]*number_of_rows
         
-    else:
+    table_store['column_indexes'][id(annotated_column_dict)]=\
+        len(table_store['columns'])
         
-        prefix=''
-        string_value_no_prefix=string_value
+    table_store['columns'].append(column_store)
+    
+    
+#...the keys of the values which can be stored as their @value
+value_keys={('@value','@type'),('@value','@type','@language')}
+
+
+def append_row_to_table_store(
+        table_store,
+        annotated_row_dict
+        ):
+    """Appends an annotated row, and its cells, to a table store.
+    
+    """
+    
+    row_index=len(table_store['number'])
+    
+    #...columns which are created when reading the rows
+    for annotated_column_dict in \
+        annotated_row_dict['table']['columns'][len(table_store['columns']):]:
         
-    #print('-prefix',prefix)
-    #print('-string_value_no_prefix',string_value_no_prefix)
+        add_column_to_table_store(
+            table_store,
+            annotated_column_dict
+            )
         
+    column_indexes=table_store['column_indexes']
+    
+    #...the row
+    table_store['number'].append(annotated_row_dict['number'])
+    table_store['sourceNumber'].append(annotated_row_dict['sourceNumber'])
+    
+    if len(annotated_row_dict['titles'])>0:
+        table_store['titles'][row_index]=annotated_row_dict['titles']
         
-    # integral sign
-    if string_value_no_prefix[0] in ['+','-']:
+    if table_store['primaryKey'] is None:
+        table_store['primaryKey']=\
+            [column_indexes[id(x['column'])] for x in annotated_row_dict['primaryKey']]
+            
+    if len(annotated_row_dict['referencedRows'])>0:
         
-        integral_sign=string_value_no_prefix[0]
-        string_value_no_prefix_no_sign=string_value_no_prefix[1:]
+        annotated_table_dicts=table_store['table_group']['tables']
+        foreign_key_definitions=table_store['table']['foreignKeys']
         
-    else:
+        table_store['referencedRows'][row_index]=\
+            [([i for i,x in enumerate(foreign_key_definitions) 
+               if x is foreign_key_definition][0],
+              [i for i,x in enumerate(annotated_table_dicts) 
+               if x is referenced_row_dict['table']][0],
+              referenced_row_dict['number'])
+             for foreign_key_definition,referenced_row_dict 
+             in annotated_row_dict['referencedRows']]
         
-        integral_sign=''
-        string_value_no_prefix_no_sign=string_value_no_prefix
+    #...the cells
+    for column_store in table_store['columns']:
+        column_store['stringValue'].append(None)
+        column_store['value'].append(None)
+        for k in ['aboutURL','propertyURL','valueURL']:
+            if not column_store[k] is None:
+                column_store[k].append(None)
     
+    for annotated_cell_dict in annotated_row_dict['cells']:
         
-    # suffix
-    if string_value_no_prefix_no_sign[-1] in ['%','‰','\u2030']:
-        
-        suffix=string_value_no_prefix_no_sign[-1]
-        string_value_no_prefix_no_sign_no_suffix=string_value_no_prefix_no_sign[:-1]
+        column_store=\
+            table_store['columns'][column_indexes[id(annotated_cell_dict['column'])]]
         
-    else:
+        column_store['stringValue'][row_index]=annotated_cell_dict['stringValue']
+        column_store['cell_count']+=1
         
-        suffix=''
-        string_value_no_prefix_no_sign_no_suffix=string_value_no_prefix_no_sign
-    
-    if _print_intermediate_outputs: print('-string_value_no_prefix_no_sign_no_suffix',string_value_no_prefix_no_sign_no_suffix)
-    
-    #...check start
-    if not string_value_no_prefix_no_sign_no_suffix[0] in ['0','1','2','3','4','5','6','7','8','9']:
+        value=annotated_cell_dict['value']
         
-        message='start does not contain a number or sign'
+        #...a value with the same @type and @language as the first value of 
+        #...the column is stored as its @value
+        if type(value) is dict and tuple(value) in value_keys \
+            and not value['@value'] is None:
             
-        errors.append(message)
+            value_type=tuple(value.items())[1:]
             
-        raise ValueError
-        
-        
-    #...check end
-    if not string_value_no_prefix_no_sign_no_suffix[-1] in ['0','1','2','3','4','5','6','7','8','9']:
-        
-        message='end does not contain a number'
+            if column_store['value_type'] is None:
+                column_store['value_type']=value_type
+                
+            if value_type==column_store['value_type']:
+                column_store['value'][row_index]=value['@value']
+            else:
+                column_store['value_dicts'][row_index]=value
             
-        errors.append(message)
+        elif not value is None:
+            column_store['value_dicts'][row_index]=value
+        
+        if len(annotated_cell_dict['errors'])>0:
+            column_store['errors'][row_index]=annotated_cell_dict['errors']
             
-        raise ValueError
+        for k in ['aboutURL','propertyURL','valueURL']:
+            if not column_store[k] is None:
+                column_store[k][row_index]=annotated_cell_dict[k]
+                
+                
+class ColumnarRows(collections.abc.Sequence):
+    """The rows of a table in a table store, as a sequence of row views.
+    """
     
+    __slots__=('table_store',)
     
-    # mantissa and exponent in scientific notation
-    mantissa_part, _, exponent_part=\
-        string_value_no_prefix_no_sign_no_suffix.partition('E')
+    def __init__(self,table_store):
+        self.table_store=table_store
+        
+    def __len__(self):
+        return len(self.table_store['number'])
     
+    def __getitem__(self,i):
+        if isinstance(i,slice):
+            return [self[j] for j in range(len(self))[i]]
+        if i<0:
+            i+=len(self)
+        if not 0<=i<len(self):
+            raise IndexError('row index out of range')
+        return ColumnarRow(self.table_store,i)
     
-    # integral and fractional parts
-    integral_part, _, fractional_part=\
-        mantissa_part.partition(decimal_char)
-        
-    #print('-integral_part',integral_part)
-        
-        
-    # exponent sign
-    if exponent_part and exponent_part[0] in ['+','-']:
-        
-        exponent_sign=exponent_part[0]
-        exponent_part_no_sign=exponent_part[1:]
-        
-    else:
+    def __repr__(self):
+        return f'<ColumnarRows of {self.table_store["table"]["url"]}: {len(self)} rows>'
+    
+    
+class ColumnarColumnCells(collections.abc.Sequence):
+    """The cells of a column in a table store, as a sequence of cell views.
+    """
+    
+    __slots__=('table_store','column_index','_row_indexes')
+    
+    def __init__(self,table_store,column_index):
+        self.table_store=table_store
+        self.column_index=column_index
+        self._row_indexes=None
         
-        exponent_sign=''
-        exponent_part_no_sign=exponent_part
+    @property
+    def row_indexes(self):
+        "The rows which have a cell in this column, found when first needed."
+        if self._row_indexes is None:
+            column_store=self.table_store['columns'][self.column_index]
+            if column_store['cell_count']==len(self.table_store['number']):
+                self._row_indexes=range(column_store['cell_count'])
+            else:
+                self._row_indexes=[i for i,x in enumerate(column_store['stringValue']) 
+                                   if not x is None]
+        return self._row_indexes
+        
+    def __len__(self):
+        return self.table_store['columns'][self.column_index]['cell_count']
+    
+    def __getitem__(self,i):
+        if isinstance(i,slice):
+            return [self[j] for j in range(len(self))[i]]
+        return ColumnarCell(
+            self.table_store,
+            self.row_indexes[i],
+            self.column_index
+            )
+    
+    def __repr__(self):
+        return f'<ColumnarColumnCells: {len(self)} cells>'
+    
+    
+class ColumnarRow(collections.abc.Mapping):
+    """A read-only view of a row in a table store, with the same keys as the 
+    row dictionaries of create_annotated_table_group.
+    """
+    
+    __slots__=('table_store','row_index')
+    
+    keys_=('table','number','sourceNumber','primaryKey','referencedRows',
+           'cells','titles')
+    
+    def __init__(self,table_store,row_index):
+        self.table_store=table_store
+        self.row_index=row_index
         
+    def __getitem__(self,k):
         
-    #...check integral part
-    for x in integral_part:
+        table_store=self.table_store
+        row_index=self.row_index
         
-        if not x in ['0','1','2','3','4','5','6','7','8','9',group_char]:
-            
-            message='error in integral part'
-            
-            errors.append(message)
-            
-            raise ValueError
+        if k=='table':
+            return table_store['table']
         
+        elif k=='number' or k=='sourceNumber':
+            return table_store[k][row_index]
         
-    #...check fractional part
-    for x in fractional_part:
+        elif k=='primaryKey':
+            return [ColumnarCell(table_store,row_index,i) 
+                    for i in table_store['primaryKey'] or []]
         
-        if not x in ['0','1','2','3','4','5','6','7','8','9',group_char]:
-            
-            message='error in fractional part'
+        elif k=='referencedRows':
             
-            errors.append(message)
+            result=[]
             
-            raise ValueError
+            for foreign_key_index,table_index,row_number in \
+                table_store['referencedRows'].get(row_index,[]):
+                    
+                foreign_key_definition=\
+                    table_store['table']['foreignKeys'][foreign_key_index]
+                    
+                referenced_table_store=\
+                    table_store['table_group']['tables'][table_index]['rows'].table_store
+                
+                if referenced_table_store['row_indexes_by_number'] is None:
+                    referenced_table_store['row_indexes_by_number']=\
+                        {x:i for i,x in enumerate(referenced_table_store['number'])}
+                        
+                result.append(
+                    [foreign_key_definition,
+                     ColumnarRow(
+                         referenced_table_store,
+                         referenced_table_store['row_indexes_by_number'][row_number]
+                         )
+                     ]
+                    )
+                
+            return result
         
+        elif k=='cells':
+            return [ColumnarCell(table_store,row_index,i) 
+                    for i,x in enumerate(table_store['columns'])
+                    if not x['stringValue'][row_index] is None]
         
-    #...check exponent part
-    for x in exponent_part_no_sign:
+        elif k=='titles':
+            return list(table_store['titles'].get(row_index,[]))
         
-        if not x in ['0','1','2','3','4','5','6','7','8','9']:
-            
-            message='error in exponent part'
-            
-            errors.append(message)
+        else:
+            raise KeyError(k)
             
-            raise ValueError
-        
-    
-    #
-    return (prefix, 
-            integral_sign,
-            integral_part, 
-            fractional_part, 
-            exponent_sign, 
-            exponent_part, 
-            suffix)
+    def __iter__(self):
+        return iter(self.keys_)
     
+    def __len__(self):
+        return len(self.keys_)
     
+    def __eq__(self,other):
+        return (isinstance(other,ColumnarRow)
+                and self.table_store is other.table_store
+                and self.row_index==other.row_index)
     
-            
+    def __hash__(self):
+        return hash((id(self.table_store),self.row_index))
     
+    def __repr__(self):
+        return f'<ColumnarRow {self["number"]} of {self.table_store["table"]["url"]}>'
         
         
-
-#%% 6.4.3 Formats for booleans
-
-def get_parse_boolean_function(
-        datatype
-        ):
+class ColumnarCell(collections.abc.Mapping):
+    """A read-only view of a cell in a table store, with the same keys as the 
+    cell dictionaries of create_annotated_table_group.
     """
-    """
-    # Boolean values may be represented in many ways aside from the standard 
-    # 1 and 0 or true and false.
     
-    # If the datatype base for a cell is boolean, the datatype format 
-    # annotation provides the true value followed by the false value, 
-    # separated by |. 
-    # For example if format is Y|N then cells must hold either Y or N with 
-    # Y meaning true and N meaning false. 
-    # If the format does not follow this syntax, implementations must 
-    # issue a warning and proceed as if no format had been provided.
+    __slots__=('table_store','row_index','column_index')
     
-    # The resulting cell value will be one or more boolean true or false values.
+    keys_=('table','column','row','stringValue','value','errors',
+           'textDirection','ordered','aboutURL','propertyURL','valueURL')
     
-    datatype_base=datatype['base']
+    def __init__(self,table_store,row_index,column_index):
+        self.table_store=table_store
+        self.row_index=row_index
+        self.column_index=column_index
+        
+    def __getitem__(self,k):
+        
+        column_store=self.table_store['columns'][self.column_index]
+        
+        if k=='table':
+            return self.table_store['table']
+        
+        elif k=='column':
+            return column_store['column']
+        
+        elif k=='row':
+            return ColumnarRow(self.table_store,self.row_index)
+        
+        elif k=='stringValue':
+            return column_store[k][self.row_index]
+        
+        elif k=='value':
+            value=column_store['value'][self.row_index]
+            if value is None:
+                return column_store['value_dicts'].get(self.row_index)
+            return dict((('@value',value),*column_store['value_type']))
+        
+        elif k=='errors':
+            return column_store['errors'].get(self.row_index,[])
+        
+        elif k=='textDirection' or k=='ordered':
+            return column_store['column'][k]
+        
+        elif k=='aboutURL' or k=='propertyURL' or k=='valueURL':
+            if column_store[k] is None:
+                return None
+            else:
+                return column_store[k][self.row_index]
+            
+        else:
+            raise KeyError(k)
+            
+    def __iter__(self):
+        return iter(self.keys_)
     
-    datatype_format=datatype.get('format')
+    def __len__(self):
+        return len(self.keys_)
     
-    true_values=['1','true']
+    def __eq__(self,other):
+        return (isinstance(other,ColumnarCell)
+                and self.table_store is other.table_store
+                and self.row_index==other.row_index
+                and self.column_index==other.column_index)
     
-    false_values=['0','false']
-
+    def __hash__(self):
+        return hash((id(self.table_store),self.row_index,self.column_index))
     
-    #
-    if isinstance(datatype_format,str):
+    def __repr__(self):
+        return f'<ColumnarCell {self["stringValue"]!r}>'
     
-        x=datatype_format.split('|')
-        
-        if not len(x)==2:
-            
-            message='Boolean format "{datatype_format}" must contain exactly one "|" character.'
-            
-            warnings.warn(message)
-            
     
-        elif x[0]==x[1]:
-                
-            message='Boolean format "{datatype_format}" must contain different string values for true and false. '
-            
-            warnings.warn(message)
-                    
-        else:
-            
-            true_values=[x[0]]
-            
-            false_values=[x[1]]
-            
-    else:
-        
-        message='Boolean format "{datatype_format}" must be a string.'
-        
-        warnings.warn(message)
-            
-            
-    #print('-true_values',true_values)
-    #print('-false_values',false_values)
+def display_annotated_table_group_dict(
+        annotated_table_group_dict,
+        ):
+    ""
+    return remove_recursion(
+        annotated_table_group_dict,
+        []
+        )
 
 
-    def parse_boolean(
-            string_value,
-            errors,
-            validate
-            ):
-        """
-        """
-        if string_value in true_values:
+def remove_recursion(
+        value,
+        ignore_list
+        ):
+    ""
+    if isinstance(value,collections.abc.Mapping):
+        
+        d={}
+        for k,v in value.items():
             
-            json_value=True
             
-        elif string_value in false_values:
+            if k in ignore_list:
+                
+                d[k]='__removed__'
             
-            json_value=False
+            elif k=='table':
+                
+                d[k]={'__url__': v['url']}
             
-        else:
+            elif k=='column':
+                
+                d[k]={'__name__':v['name'],
+                      '__table_url__': v['table']['url']
+                      }
             
-            message=f'Boolean value "{string_value}" does not match either '
-            message+=f'the true values "{true_values}" '
-            message+=f'or false values "{false_values}". '
-            message+='Boolean value is not converted to boolean, string value returned.'
+            elif k=='row':
+                
+                d[k]={'__number__':v['number'],
+                      '__table_url__': v['table']['url']
+                      }
+                
             
-            if validate:
+            elif k=='primaryKey':
                 
-                raise CSVWError(message)
+                
+                d[k]=remove_recursion(v,ignore_list+['cells'])
             
-            else:
+            elif k=='foreignKeys':
+                
+                d[k]=remove_recursion(v,ignore_list+['cells'])
             
-                errors.append(message)
+            elif k=='referencedRows':
                 
-                warnings.warn(message)
+                d[k]={'__len__':len(v)}
                 
-                return string_value, 'string', errors
+                d[k]=remove_recursion(v,ignore_list+['referencedRows','cells'])
+                
+                #pass
+                
+            else:
+                
+                d[k]=remove_recursion(v,ignore_list)
+                
+                
+                
+        #     elif 
         
         
-        #
-        return json_value, datatype_base, errors
+        # d={k:remove_recursion(v) if not k in 
+        #         ['table','column','row',
+        #           'referencedRows',
+        #           #'primaryKey',
+        #           'foreignKeys'] else '__recursion__'
+        #         for k,v in value.items()
+        #         }
         
+        return d
+    
+    elif isinstance(value,(list,ColumnarRows,ColumnarColumnCells)):
         
+        return [remove_recursion(x,ignore_list) for x in value]
+
+    else:
         
-          
-    return parse_boolean
-      
- 
-#%% 6.4.4. Formats for dates and times
+        return value
 
-def get_timezone_format(
-        datatype_format
+
+    
+
+
+#%% 6.3 URL Normalization
+
+def normalize_url(
+        url
         ):
     """
-    """
-    x=datatype_format#  .strip()
     
-    if x.endswith('XXX'):
-        
-        timezone_format='XXX'
-        
-    elif x.endswith('XX'):
-        
-        timezone_format='XX'
+    'http://example.com/test001.csv' -> 'http://example.com/test001.csv' (same)
+    
+    'http://example.com/test/../test001.csv' -> 'http://example.com/test001.csv'
+    
+    'file:///c:/test 001.csv' -> 'file:///c:/test 001.csv'
+    
+    'file:///c:/test/../test001.csv' -> 'file:///c:/test001.csv'
+    
+    
+    see: https://hyperlink.readthedocs.io/en/latest/api.html?highlight=normalize#hyperlink.URL.normalize
+    
+    does not percent encode (except for stray percent characters in an already percent encoded url)
+    
+    
+    """
+    
+    # Metadata Discovery and Compatibility involve comparing URLs. 
+    # When comparing URLs, processors must use Syntax-Based Normalization 
+    # as defined in [RFC3968]. 
+    # Processors must perform Scheme-Based Normalization for HTTP (80) 
+    # and HTTPS (443) and should perform Scheme-Based Normalization for 
+    # other well-known schemes.
+    
+    return str(hyperlink.parse(url).normalize())
+    
+
+#%% 6.4 Parsing Cells
+
+def parse_cells_in_annotated_column_dict(
+        annotated_column_dict,
+        trim,
+        validate,
+        memoize_cell_values=False,
+        ignore_cell_warnings=False,
+        warn=None,
+        _print_intermediate_outputs=False
+        ):
+    """
+    
+    :param memoize_cell_values: If True, the cell values of recently parsed 
+        string values are remembered, see get_memoized_parse_cell_function.
+    :param ignore_cell_warnings: If True, no warnings are given for the 
+        errors of the cells. The errors are still added to the errors 
+        annotations of the cells.
+    :param warn: The function called with the message of each warning for 
+        the cells. If None, this is warnings.warn, or ignore_warning if 
+        ignore_cell_warnings is True.
         
-    elif x.endswith('X'):
+    :returns: The hit and miss statistics of the memo if memoize_cell_values 
+        is True; otherwise None.
+    
+    """
+    # Unlike many other data formats, tabular data is designed to be read 
+    # by humans. 
+    # For that reason, it's common for data to be represented within 
+    # tabular data in a human-readable way. 
+    # The datatype, default, lang, null, required, and separator annotations 
+    # provide the information needed to parse the string value of a cell 
+    # into its (semantic) value annotation. 
+    # This is used:
+    # - by validators to check that the data in the table is in the 
+    #   expected format,
+    # - by converters to parse the values before mapping them into values 
+    #   in the target of the conversion,
+    # - when displaying data, to map it into formats that are meaningful 
+    #   for those viewing the data (as opposed to those publishing it), and
+    # - when inputting data, to turn entered values into representations 
+    #   in a consistent format.
+    
+    # The process of parsing a cell creates a cell with annotations based 
+    # on the original string value, parsed value and other column 
+    # annotations and adds the cell to the list of cells in a row and 
+    # cells in a column:
+    # - The raw string value becomes the string value annotation on the cell.
+    # - The ordered annotation on the column becomes the ordered annotation 
+    #   on the cell.
+    # - The text direction annotation on the column becomes the text 
+    #   direction annotation on the cell.
+    # - The row becomes the row annotation on the cell.
+    # - The column becomes the column annotation on the cell.
+    
+    # After parsing, the cell value can be:
+    # - null,
+    # - a single value with an associated optional datatype or language, or
+    # - a sequence of such values.
+    
+    # The process of parsing the string value into a single value or a 
+    # list of values is as follows:
         
-        timezone_format='X'
         
-    elif x.endswith('xxx'):
+    #...set up a function to parse the cells based on the column annotations
+    #...the errors of the cells are only recorded in their errors annotations 
+    #...if the warnings are ignored; warnings about the column annotations 
+    #...themselves are still given
+    parse_cell_function=\
+        get_parse_cell_function(
+            annotated_column_dict,
+            trim,
+            validate,
+            warn if not warn is None
+            else ignore_warning if ignore_cell_warnings 
+            else warnings.warn
+            )
         
-        timezone_format='xxx'
+    if memoize_cell_values:
         
-    elif x.endswith('xx'):
+        parse_cell_function=\
+            get_memoized_parse_cell_function(
+                parse_cell_function
+                )
         
-        timezone_format='xx'
+    #...numeric columns are first converted in batches if NumPy is installed
+    parse_numbers_function=\
+        get_parse_numbers_function(
+            annotated_column_dict
+            )
         
-    elif x.endswith('x'):
+    if parse_numbers_function is None:
         
-        timezone_format='x'
+        json_values=itertools.repeat(None)
         
     else:
         
-        timezone_format=None
-        timezone_gap=None
-    
-    #
-    if not timezone_format is None:
+        json_values=\
+            parse_numbers_function(
+                [x['stringValue'] for x in annotated_column_dict['cells']]
+                )
+            
+        datatype_iri=datatypes.get(annotated_column_dict['datatype']['base'])
         
-        x=len(timezone_format)
+    for annotated_cell_dict, json_value in \
+        zip(annotated_column_dict['cells'],json_values):
         
-        if datatype_format[-x-1]==' ':
-            
-            timezone_gap=' '
-            
+        #...string values which are not converted in a batch are parsed 
+        #...one at a time
+        if json_value is None:
+        
+            cell_value,errors=\
+                parse_cell_function(
+                    annotated_cell_dict['stringValue']
+                    )
+                
         else:
             
-            timezone_gap=''
-    
-    #
-    return timezone_format,timezone_gap
-
-
-def get_timezone_string(
-        string_value,
-        timezone_format
+            cell_value,errors={'@value':json_value,'@type':datatype_iri},[]
+            
+        if _print_intermediate_outputs: print(cell_value,errors)
+        
+        annotated_cell_dict['value']=cell_value
+        annotated_cell_dict['errors'].extend(errors)
+        
+    if memoize_cell_values:
+        
+        return parse_cell_function.cache_info()
+        
+        
+def parse_cells_in_annotated_table_dict(
+        annotated_table_dict,
+        trim,
+        validate,
+        memoize_cell_values=False,
+        use_diagnostics=False,
+        diagnostics=None,
+        max_diagnostic_examples=10,
+        executor=None,
+        minimum_cell_count=2**16,
+        chunk_size=2**16,
+        _print_intermediate_outputs=False
         ):
+    """Parses the cells of each column of a table, as in 
+    create_annotated_table_group.
+    
+    :param use_diagnostics: If True, no warnings are given for the cells and 
+        their errors are added to diagnostics.
+    :param diagnostics: If given and memoize_cell_values is True, the hit and 
+        miss statistics of the memo of each column are added to this, see 
+        add_memo_statistics_to_diagnostics.
+    :param executor: If given, a concurrent.futures.ProcessPoolExecutor which 
+        is used to parse the cells of tables with more than minimum_cell_count 
+        cells, in chunks of chunk_size cells, see submit_cells_to_process_pool.
+    
     """
-    """
-    x=string_value#  .strip()
     
-    if timezone_format is None:
+    if not executor is None \
+        and sum(len(x['cells']) for x in annotated_table_dict['columns'])>minimum_cell_count:
     
-        if x.endswith('Z'):
+        futures=\
+            submit_cells_to_process_pool(
+                executor,
+                annotated_table_dict,
+                trim,
+                validate,
+                memoize_cell_values,
+                use_diagnostics,
+                chunk_size
+                )
             
-            return 'Z'
+    else:
         
-        elif len(x)>5 and x[-3]==':' and x[-6] in ['+','-']:
+        futures=None
+    
+    for annotated_column_dict in annotated_table_dict['columns']:
         
-            return x[-6:]
+        if futures is None:
         
+            cache_info=\
+                parse_cells_in_annotated_column_dict(
+                    annotated_column_dict,
+                    trim,
+                    validate,
+                    memoize_cell_values,
+                    use_diagnostics
+                    )
+                
+            if _print_intermediate_outputs and memoize_cell_values:
+                print(annotated_column_dict['name'],cache_info)
+                
         else:
             
-            return ''
+            cache_info=\
+                set_cells_from_process_pool(
+                    annotated_column_dict,
+                    futures[annotated_column_dict['number']],
+                    trim,
+                    validate
+                    )
+            
+        if memoize_cell_values and not diagnostics is None:
+            
+            add_memo_statistics_to_diagnostics(
+                diagnostics,
+                annotated_table_dict,
+                annotated_column_dict,
+                cache_info
+                )
+            
+        if use_diagnostics:
+            
+            add_cell_errors_to_diagnostics(
+                diagnostics,
+                annotated_table_dict,
+                annotated_column_dict,
+                max_diagnostic_examples
+                )
+
+
+# The cells of a large table can be parsed in parallel by splitting the 
+# cells of each column into chunks. 
+# Each chunk is parsed in a worker process using the same function as 
+# parse_cells_in_annotated_column_dict, and the cell values, errors and 
+# warnings of the chunks are then set and given in order, so the results are 
+# the same as when the cells are parsed in this process.
+
+def submit_cells_to_process_pool(
+        executor,
+        annotated_table_dict,
+        trim,
+        validate,
+        memoize_cell_values=False,
+        ignore_cell_warnings=False,
+        chunk_size=2**16
+        ):
+    """Submits chunks of the string values of the cells of each column of 
+    a table to be parsed by a pool of worker processes.
     
+    :param executor: A concurrent.futures.ProcessPoolExecutor.
+    :param chunk_size: The number of cells in each chunk.
     
-    else:
+    :returns: A dictionary of column number to a list of futures, one for 
+        each chunk, with the results of parse_string_values_in_chunk.
+    :rtype: dict
     
-        if timezone_format=='':
-            
-            return ''
+    """
+    futures={}
+    
+    for annotated_column_dict in annotated_table_dict['columns']:
         
+        column_annotations={k:annotated_column_dict[k] 
+                            for k in ['datatype','default','lang','null',
+                                      'required','separator']}
         
-        elif timezone_format=='X':
-            
-            if string_value.endswith('Z'):
-                
-                return 'Z'
+        string_values=[x['stringValue'] for x in annotated_column_dict['cells']]
         
-            elif x[-3] in ['+','-']:
-                
-                return x[-3:]
-            
-            elif x[-5] in ['+','-']:
-                
-                return x[-5:]
-            
-            else:
-                
-                raise ValueError
-            
+        futures[annotated_column_dict['number']]=\
+            [executor.submit(
+                parse_string_values_in_chunk,
+                column_annotations,
+                string_values[i:i+chunk_size],
+                trim,
+                validate,
+                memoize_cell_values,
+                ignore_cell_warnings
+                )
+             for i in range(0,len(string_values),chunk_size)]
+        
+    return futures
+
+
+def parse_string_values_in_chunk(
+        column_annotations,
+        string_values,
+        trim,
+        validate,
+        memoize_cell_values=False,
+        ignore_cell_warnings=False
+        ):
+    """Parses a chunk of the string values of the cells of a column.
+    
+    This is run in the worker processes of submit_cells_to_process_pool. 
+    The warnings for the cells are recorded rather than given, and 
+    warnings about the column annotations are ignored as they are given by 
+    set_cells_from_process_pool.
+    
+    :param column_annotations: The datatype, default, lang, null, required 
+        and separator annotations of the column.
+    :type column_annotations: dict
+    
+    :returns: (cell_values, cell_errors, warning_messages, error, 
+        cache_info) where cell_values is a list of the values of the cells, 
+        cell_errors is a dictionary of the index of each cell with errors to 
+        its errors, error is the CSVWError raised when validating, or None, 
+        and cache_info is the hit and miss statistics of the memo if 
+        memoize_cell_values is True, or None.
+    :rtype: tuple
     
-        elif timezone_format=='XX':
+    """
+    annotated_column_dict=dict(
+        column_annotations,
+        cells=[{'stringValue':x,'value':None,'errors':[]} 
+               for x in string_values]
+        )
+    
+    warning_messages=[]
+    
+    try:
+        
+        #...a worker process runs one chunk at a time, so changing the 
+        #...warnings filters here does not affect other threads
+        with warnings.catch_warnings():
             
-            if string_value.endswith('Z'):
-                
-                return 'Z'
+            warnings.simplefilter('ignore')
         
-            elif x[-5] in ['+','-']:
-                
-                return x[-5:]
+            cache_info=\
+                parse_cells_in_annotated_column_dict(
+                    annotated_column_dict,
+                    trim,
+                    validate,
+                    memoize_cell_values,
+                    warn=ignore_warning if ignore_cell_warnings 
+                        else warning_messages.append
+                    )
             
-            else:
-                
-                raise ValueError
+    except CSVWError as error:
         
+        return None, None, warning_messages, error, None
+    
+    #...most cells have no errors, so only the errors of the cells which have 
+    #...them are returned, as each list unpickled in the parent process adds 
+    #...to the work of its garbage collector
+    return ([x['value'] for x in annotated_column_dict['cells']],
+            {i:x['errors'] for i,x in enumerate(annotated_column_dict['cells'])
+             if len(x['errors'])>0},
+            warning_messages,
+            None,
+            cache_info)
+
+
+def set_cells_from_process_pool(
+        annotated_column_dict,
+        futures,
+        trim,
+        validate
+        ):
+    """Sets the values and errors of the cells of a column from the results 
+    of the chunks parsed by the worker processes, and gives their warnings.
+    
+    :param futures: The futures of the chunks of the column, in order, 
+        see submit_cells_to_process_pool.
         
-        elif timezone_format=='XXX':
+    :returns: The hit and miss statistics of the memos of the chunks added 
+        together, if the cell values were memoized; otherwise None.
+    
+    """
+    #...the warnings about the column annotations are given once
+    get_parse_cell_function(
+        annotated_column_dict,
+        trim,
+        validate
+        )
+    
+    cells=annotated_column_dict['cells']
+    i=0  # the index of the first cell of the chunk
+    
+    statistics=None
+    
+    for future in futures:
+        
+        cell_values, cell_errors, warning_messages, error, cache_info=\
+            future.result()
+        
+        for message in warning_messages:
             
-            if string_value.endswith('Z'):
-                
-                return 'Z'
+            warnings.warn(message)
+            
+        if not error is None:
+            
+            raise error
         
-            elif x[-6] in ['+','-']:
-                
-                return x[-6:]
+        for annotated_cell_dict,cell_value in \
+            zip(cells[i:i+len(cell_values)],cell_values):
             
-            else:
-                
-                raise ValueError
-                
+            annotated_cell_dict['value']=cell_value
+            
+        for j,errors in cell_errors.items():
+            
+            cells[i+j]['errors'].extend(errors)
+            
+        i+=len(cell_values)
         
-        elif timezone_format=='x':
+        #...each chunk has its own memo
+        if not cache_info is None:
             
-            if x[-3] in ['+','-']:
+            if statistics is None:
                 
-                return x[-3:]
-            
-            elif x[-5] in ['+','-']:
+                statistics=dict(cache_info)
                 
-                return x[-5:]
-            
             else:
                 
-                raise ValueError
+                for k in ['hits','misses','currsize']:
+                    statistics[k]+=cache_info[k]
+                    
+                statistics['enabled']=statistics['enabled'] or cache_info['enabled']
                 
+    return statistics
         
-        elif timezone_format=='xx':
-            
-            if x[-5] in ['+','-']:
-                
-                return x[-5:]
-            
-            else:
-                
-                raise ValueError
+        
+def ignore_warning(
+        message
+        ):
+    """Used in place of warnings.warn for the errors of cells when their 
+    warnings are not given.
+    
+    """
+    
+    
+@functools.lru_cache(maxsize=1024)
+def get_message_type(
+        message
+        ):
+    """Returns the type of an error message, which is the message with any 
+    quoted text and numbers replaced by '...'.
+    
+    :param message: The error message.
+    :type message: str
+    
+    :returns: The message type.
+    :rtype: str
+    
+    """
+    return message_type_regex.sub('...',message).strip()
+
+
+message_type_regex=re.compile(r'"[^"]*"|\d[\w.:+-]*')
+
+
+def warn_diagnostics_summary(
+        diagnostics
+        ):
+    """Gives a single warning with the number of errors in a diagnostics 
+    dictionary, if there are any, see add_cell_errors_to_diagnostics.
+    
+    """
+    if diagnostics.get('error_count',0)>0:
+        
+        message=f'{diagnostics["error_count"]} errors found when parsing '
+        message+=f'the cell values, in {len(diagnostics["message_types"])} '
+        message+='message types. See the diagnostics dictionary or the '
+        message+='errors annotations of the cells for details.'
+        warnings.warn(message)
         
         
-        elif timezone_format=='xxx':
+def add_memo_statistics_to_diagnostics(
+        diagnostics,
+        annotated_table_dict,
+        annotated_column_dict,
+        statistics
+        ):
+    """Adds the hit and miss statistics of the memo of a column to a 
+    diagnostics dictionary.
+    
+    :param diagnostics: The diagnostics dictionary, which is updated in place. 
+        The statistics are added to its 'memo' item, by table url and column 
+        name.
+    :type diagnostics: dict
+    :param statistics: The statistics returned by the cache_info attribute 
+        of a function returned by get_memoized_parse_cell_function.
+    :type statistics: dict
+    
+    """
+    diagnostics.setdefault('memo',{})\
+        .setdefault(annotated_table_dict['url'],{})[annotated_column_dict['name']]=\
+            statistics
+        
+        
+def add_cell_errors_to_diagnostics(
+        diagnostics,
+        annotated_table_dict,
+        annotated_column_dict,
+        max_examples=10
+        ):
+    """Adds the errors of the cells of a column to a diagnostics dictionary.
+    
+    :param diagnostics: The diagnostics dictionary, which is updated in place.
+        It has the keys 'error_count', 'message_types' (the number of errors 
+        of each message type), 'columns' (the number of errors of each 
+        message type for each column, by table url and column name) and 
+        'examples' (the first errors found, with the table url, column name, 
+        row number, string value and message).
+    :type diagnostics: dict
+    :param max_examples: The maximum number of examples to record.
+    
+    :returns: The number of errors added.
+    :rtype: int
+    
+    """
+    diagnostics.setdefault('error_count',0)
+    diagnostics.setdefault('message_types',{})
+    diagnostics.setdefault('columns',{})
+    diagnostics.setdefault('examples',[])
+    
+    table_url=annotated_table_dict['url']
+    column_name=annotated_column_dict['name']
+    
+    column_message_types=None
+    error_count=0
+    
+    for annotated_cell_dict in annotated_column_dict['cells']:
+        
+        for message in annotated_cell_dict['errors']:
             
-            if x[-6] in ['+','-']:
+            if column_message_types is None:
                 
-                return x[-6:]
+                column_message_types=\
+                    diagnostics['columns'].setdefault(table_url,{})\
+                        .setdefault(column_name,{})
             
-            else:
+            message_type=get_message_type(message)
+            
+            diagnostics['message_types'][message_type]=\
+                diagnostics['message_types'].get(message_type,0)+1
+            column_message_types[message_type]=\
+                column_message_types.get(message_type,0)+1
+            
+            if len(diagnostics['examples'])<max_examples:
                 
-                raise ValueError
-        
-        
-        else:
+                diagnostics['examples'].append(
+                    {'table':table_url,
+                     'column':column_name,
+                     'row_number':annotated_cell_dict['row']['number'],
+                     'stringValue':annotated_cell_dict['stringValue'],
+                     'message':message}
+                    )
+                
+            error_count+=1
             
-            raise Exception
+    diagnostics['error_count']+=error_count
+    
+    return error_count
         
-
-def parse_timezone_string(
-        timezone_string
+        
+def get_datatype_parse_function(
+        datatype,
+        warn=warnings.warn
         ):
-    ""
+    """Returns the function used to parse a string value for the datatype 
+    of a column and check it against the constraints of the datatype.
     
-    if timezone_string=='':
-        
-        return ''
+    :param datatype: The datatype annotation of the column.
+    :type datatype: dict
+    :param warn: The function called with the message of each error of a 
+        string value, instead of warnings.warn. Warnings about the datatype 
+        itself are still given using warnings.warn.
     
-    elif timezone_string=='Z':
-        
-        return 'Z'
+    :returns: A function with arguments (string_value, errors, validate) 
+        which returns (json_value, value_type, errors). If the value does 
+        not pass the length or value constraints, the string value is 
+        returned with a value type of 'string'.
     
-    elif len(timezone_string)==3:
+    """
+    
+    # numbers
+    if datatype['base'] in datatypes_numbers:
         
-        sign=timezone_string[0]
-        hours=int(timezone_string[1:])
-        minutes=0
+        datatype_parse_function=\
+            get_parse_number_function(
+                datatype,
+                warn=warn
+                )
         
-    elif len(timezone_string)==5:
+    # booleans
+    elif datatype['base']=='boolean':
         
-        sign=timezone_string[0]
-        hours=int(timezone_string[1:3])
-        minutes=int(timezone_string[3:])
+        datatype_parse_function=\
+            get_parse_boolean_function(
+                datatype,
+                warn=warn
+                )
         
-    elif len(timezone_string)==6:
+    # date
+    elif datatype['base']=='date':
         
-        sign=timezone_string[0]
-        hours=int(timezone_string[1:3])
-        minutes=int(timezone_string[4:])
+        datatype_parse_function=\
+            get_parse_date_function(
+                datatype,
+                warn=warn
+                )
         
-    else:
+    # time
+    elif datatype['base']=='time':
+       
+        datatype_parse_function=\
+            get_parse_time_function(
+                datatype,
+                warn=warn
+                )
+    
+    # datetime
+    elif datatype['base'] in ['dateTime', 'datetime']:
         
-        raise ValueError
+        datatype_parse_function=\
+            get_parse_datetime_function(
+                datatype,
+                warn=warn
+                )
     
-    #    
-    if not sign in ['+','-']:
+    # datetimestamp
+    elif datatype['base']=='dateTimeStamp':
         
-        raise ValueError
+        datatype_parse_function=\
+            get_parse_datetimestamp_function(
+                datatype,
+                warn=warn
+                )
         
-    if hours<0 or hours>23:
+    # durations
+    elif datatype['base'] in ['duration','dayTimeDuration','yearMonthDuration']:
         
-        raise ValueError
+        datatype_parse_function=\
+            get_parse_duration_function(
+                datatype,
+                warn=warn
+                )
+            
+    # other types
+    else:
+    
+       datatype_parse_function=\
+           get_parse_other_types_function(
+               datatype,
+               warn=warn
+               )
+       
+    # constraints
+    check_constraints_function=\
+        get_check_constraints_function(
+            datatype,
+            warn
+            )
         
-    if minutes<0 or minutes>59:
+    if check_constraints_function is None:
         
-        raise ValueError
+        return datatype_parse_function
+    
+    def parse_and_check_constraints(
+            string_value,
+            errors,
+            validate
+            ):
+        ""
         
-    return f'{sign}{hours:02}:{minutes:02}'
+        json_value,value_type,errors=\
+            datatype_parse_function(
+                string_value,
+                errors,
+                validate
+                )
+            
+        if check_constraints_function(json_value,errors,validate):
+            
+            return json_value,value_type,errors
+        
+        else:
+            
+            return string_value,'string',errors
+        
+    return parse_and_check_constraints
 
 
-def get_parse_date_function(
+def parse_cell_steps_1_to_5(
+        string_value,
         datatype,
-        _print_intermediate_outputs=False
+        default,
+        lang,
+        null,
+        required,
+        separator,
+        datatype_parse_function,
+        trim,
+        validate
         ):
     """
-    """
-    # By default, dates and times are assumed to be in the format defined 
-    # in [xmlschema11-2]. However dates and times are commonly represented 
-    # in tabular data in other formats.
-    
-    # If the datatype base is a date or time type, the datatype format 
-    # annotation indicates the expected format for that date or time.
-    
-    # The supported date and time format patterns listed here are 
-    # expressed in terms of the date field symbols defined in [UAX35]. 
-    # These formats must be recognised by implementations and must be 
-    # interpreted as defined in that specification. 
-    # Implementations may additionally recognise other date format patterns. 
-    # Implementations must issue a warning if the date format pattern is 
-    # invalid or not recognised and proceed as if no date format 
-    # pattern had been provided.
-    
-    # NOTE
-    # For interoperability, authors of metadata documents should use 
-    # only the formats listed in this section.
-    
-    # The following date format patterns must be recognized by implementations:
-    # yyyy-MM-dd e.g., 2015-03-22
-    # yyyyMMdd e.g., 20150322
-    # dd-MM-yyyy e.g., 22-03-2015
-    # d-M-yyyy e.g., 22-3-2015
-    # MM-dd-yyyy e.g., 03-22-2015
-    # M-d-yyyy e.g., 3-22-2015
-    # dd/MM/yyyy e.g., 22/03/2015
-    # d/M/yyyy e.g., 22/3/2015
-    # MM/dd/yyyy e.g., 03/22/2015
-    # M/d/yyyy e.g., 3/22/2015
-    # dd.MM.yyyy e.g., 22.03.2015
-    # d.M.yyyy e.g., 22.3.2015
-    # MM.dd.yyyy e.g., 03.22.2015
-    # M.d.yyyy e.g., 3.22.2015
-    
-    # Implementations must also recognise date, time, and date/time format patterns that end with timezone markers consisting of between one and three x or X characters, possibly after a single space. These must be interpreted as follows:
-
-    # X e.g., -08, +0530, or Z (minutes are optional)
-    # XX e.g., -0800, +0530, or Z
-    # XXX e.g., -08:00, +05:30, or Z
-    # x e.g., -08 or +0530 (Z is not permitted)
-    # xx e.g., -0800 or +0530 (Z is not permitted)
-    # xxx e.g., -08:00 or +05:30 (Z is not permitted)
     
-    # For example, date format patterns could include yyyy-MM-ddTHH:mm:ssXXX 
-    # for 2015-03-15T15:02:37Z or 2015-03-15T15:02:37-05:00, or HH:mm x for 15:02 -05.
-    
-    # The cell value will one or more dates/time values extracted using the format.
-    
-    # NOTE
-    # For simplicity, this version of this standard does not support 
-    # abbreviated or full month or day names, or double digit years. 
-    # Future versions of this standard may support other date and time 
-    # formats, or general purpose date/time pattern strings. 
-    # Authors of schemas should use appropriate regular expressions, along 
-    # with the string datatype, for dates and times that use a format other 
-    # than that specified here.
+    :returns: (cell_value, errors)
+    :rtype: tuple
     
-    if _print_intermediate_outputs: print('-datatype',datatype)
+    """
+    #...convert null to list if needed
+    if not isinstance(null,list):
+        null=[null]
     
-    datatype_format=datatype.get('format')
+    errors=[]
     
-    if not datatype_format is None and not isinstance(datatype_format,str):
+    # The process of parsing the string value into a single value or a list 
+    # of values is as follows:
         
-        message='datatype format'
         
-        warnings.warn(message)
+    # 1. unless the datatype base is string, json, xml, html or anyAtomicType, 
+    #    replace all carriage return (#xD), line feed (#xA), and tab (#x9) 
+    #    characters with space characters.
+    if datatype['base'] not in ['string','json','xml','html','anyAtomicType']:
         
-        datatype_format=None
+        string_value=string_value.replace('\r',' ')
+        string_value=string_value.replace('\n',' ')
+        string_value=string_value.replace('\t',' ')
+        
+        
+    # 2. unless the datatype base is string, json, xml, html, anyAtomicType, 
+    #    or normalizedString, strip leading and trailing whitespace from the 
+    #    string value and replace all instances of two or more whitespace #
+    #    characters with a single space character.
+    if datatype['base'] not in ['string','json','xml','html','anyAtomicType','normalizedString']:
+        
+        string_value=string_value.strip()
+        
+        string_value=" ".join(string_value.split()) # includes whitespace such as '\n' etc.
+                                                      # if this should be spaces only,  
+                                                      # could use st=re.sub(' +',' ', st)
     
     
-    if not datatype_format is None:
+    # 3. if the normalized string is an empty string, apply the remaining 
+    #    steps to the string given by the column default annotation.
+    if separator is None and string_value=='':
         
-        timezone_format,timezone_gap=\
-            get_timezone_format(
-                    datatype_format
-                    )
+        string_value=str(default)
         
-        #
-        if not timezone_format is None:
         
-            date_format=\
-                datatype_format.removesuffix(
-                    timezone_gap+timezone_format
-                    )
-                
-        else:
-            
-            date_format=datatype_format
+    # 4. if the column separator annotation is not null and the normalized 
+    #    string is an empty string, the cell value is an empty list. If the 
+    #    column required annotation is true, add an error to the list of errors for the cell.
+    if not separator is None and string_value=='':
+        
+        list_of_cell_values=[]
+        
+        if required:
             
-        #
-        if not date_format in [
-            'yyyy-MM-dd',
-            'yyyyMMdd',
-            'dd-MM-yyyy',
-            'd-M-yyyy',
-            'MM-dd-yyyy',
-            'M-d-yyyy',
-            'dd/MM/yyyy',
-            'd/M/yyyy',
-            'MM/dd/yyyy',
-            'M/d/yyyy',
-            'dd.MM.yyyy',
-            'd.M.yyyy',
-            'MM.dd.yyyy',
-            'M.d.yyyy',
-            ]:
+            message='Error in Section 6.4 Step 4. '
+            message+='Separator is not null and string value is an empty string. '
+            message+='Value set to an empty array. '
             
-            message='date format'
+            errors.append(message)
             
-            warnings.warn(message)
+        return list_of_cell_values,errors
+        
+    
+    # 5. if the column separator annotation is not null, the cell value is a 
+    #    list of values; set the list annotation on the cell to true, and create 
+    #    the cell value created by:
+        
+    if not separator is None:  # i.e. a list of value expected
+        
+        #..."set the list annotation on the cell to true"
+        #...- not done, as there is no 'list' annotation on the cell object
+        
+        
+        # 5.1. if the normalized string is the same as any one of the values 
+        #      of the column null annotation, then the resulting value is null.
+        if string_value in null:
             
-            date_format=None
+            cell_value=None
             
-    else:
-        
-        timezone_format=None
-        timezone_gap=''
-        date_format=None
+            return cell_value, errors
             
         
-    if not date_format is None:
-    
-        #...get separator
-        if '-' in date_format:
-            
-            separator='-'
+        # 5.2. split the normalized string at the character specified by the 
+        #      column separator annotation.
+        else:
             
-        elif '/' in date_format:
+            list_of_string_values=string_value.split(separator)
+                
             
-            separator='/'
+            # 5.3. unless the datatype base is string or anyAtomicType, strip 
+            #      leading and trailing whitespace from these strings.  
+            if not datatype['base'] not in ['string','anyAtomicType']:
+                list_of_string_values=[x.strip() for x in list_of_string_values]
+                
+                
+            # 5.4. applying the remaining steps to each of the strings in turn.
             
-        elif '.' in date_format:
+            list_of_cell_values=[]
+            for string_value in list_of_string_values:
+                
+                json_value,language,type_,errors=\
+                    parse_cell_steps_6_to_9(
+                        string_value,
+                        errors,
+                        datatype,
+                        default,
+                        lang,
+                        null,
+                        required,
+                        separator,
+                        datatype_parse_function,
+                        validate
+                        )
+                
+                #...needed for test036 ????????????????
+                if isinstance(json_value,str):
+                    json_value=get_trimmed_cell_value(
+                        json_value,
+                        trim
+                        )
+                
+                cell_value={'@value':json_value,
+                            '@type':datatypes[type_]}
+                
+                if not language is None:
+                    cell_value['@language']=lang
+                
+                list_of_cell_values.append(cell_value)
+                
+            return list_of_cell_values,errors
+                
+       
+    else:  # i.e. a single value expected         
+       
+        json_value,language,type_,errors=\
+            parse_cell_steps_6_to_9(
+                string_value,
+                errors,
+                datatype,
+                default,
+                lang,
+                null,
+                required,
+                separator,
+                datatype_parse_function,
+                validate
+                )
             
-            separator='.'
+        if not json_value is None:
             
+            cell_value={'@value':json_value,
+                        '@type':datatypes[type_]}
+                
+            if not language is None:
+                cell_value['@language']=lang
+                
         else:
             
-            separator=''
+            cell_value=None
             
-    else:
+        return cell_value,errors
+
+
+def parse_cell_steps_6_to_9(
+        string_value,
+        errors,
+        datatype,
+        default,
+        lang,
+        null,
+        required,
+        separator,
+        datatype_parse_function,
+        validate
+        ):
+    """
+    :returns: (json_value, language, value_type, errors)
+    :rtype: tuple
+    
+    """
+    # 6. if the string is an empty string, apply the remaining steps to the 
+    #    string given by the column default annotation.
+    if string_value=='':
         
-        separator=None
+        string_value=str(default)
         
-    
-    #...get separated codes
-    if not date_format is None:
-    
-        if date_format=='yyyyMMdd':
-            
-            separated_codes=['yyyy','MM','dd']
-            
-        else:
-            
-            separated_codes=date_format.split(separator)
-            
-    else:
         
-        separated_codes=None
-    
+    # 7. if the string is the same as any one of the values of the column null 
+    #    annotation, then the resulting value is null. If the column separator 
+    #    annotation is null and the column required annotation is true, add 
+    #    an error to the list of errors for the cell.
+    if string_value in null:
         
-    if _print_intermediate_outputs: print('-timezone_format',timezone_format)
-    if _print_intermediate_outputs: print('-timezone_gap',timezone_gap)
-    if _print_intermediate_outputs: print('-date_format',date_format)
-    if _print_intermediate_outputs: print('-separator',separator)
-    if _print_intermediate_outputs: print('-separated_codes',separated_codes)
-    
-    
-    def parse_date(
-            string_value,
-            errors,
-            validate
-            ):
-        """
-        """
-        if _print_intermediate_outputs: print('-string_value',string_value)
+        json_value=None
         
-        #
-        try:
-            
-            timezone_string=\
-                get_timezone_string(
-                    string_value,
-                    timezone_format
-                    )
+        language=None
         
-        except ValueError:
+        if separator is None and required==True:
             
-            message='date conversion error'
+            # ADD ERROR
+            message='column separator annotation is null and the column required annotation is true'
             
             if validate:
                 
                 raise CSVWError(message)
-                
+            
             else:
             
-                errors.append(message)
                 warnings.warn(message)
-                return string_value,'string',errors
             
-        if _print_intermediate_outputs: print('-timezone_string',timezone_string)
+                errors.append(message)
         
-        #
-        xsd_timezone_string=\
-            parse_timezone_string(
-                timezone_string
-                )
-        if _print_intermediate_outputs: print('-xsd_timezone_string',xsd_timezone_string)
+        return json_value, language, datatype['base'], errors  # returns None
+    
+    
+    # 8. parse the string using the datatype format if one is specified, as 
+    #    described below to give a value with an associated datatype. 
+    #    If the datatype base is string, or there is no datatype, the value has 
+    #    an associated language from the column lang annotation. 
+    #    If there are any errors, add them to the list of errors for the cell; 
+    #    in this case the value has a datatype of string; if the datatype base 
+    #    is string, or there is no datatype, the value has an associated language 
+    #    from the column lang annotation.
+    if datatype['base']=='string' or datatype['base'] is None:
+        
+        language=lang
+        
+    else:
+        
+        language=None
+        
+    json_value,value_type,errors=\
+        datatype_parse_function(
+            string_value,
+            errors,
+            validate
+            )
+        
+    # if error occurs as value not converted
+    if value_type=='string':
+        language=lang
+    
+    
+    # 9. validate the value based on the length constraints described in 
+    #    section 4.6.1 Length Constraints, the value constraints described 
+    #    in section 4.6.2 Value Constraints and the datatype format annotation 
+    #    if one is specified, as described below. 
+    #    If there are any errors, add them to the list of errors for the cell.
+    
+    #...done by datatype_parse_function, see get_datatype_parse_function. 
+    #...If the value does not pass the constraints then the string value is 
+    #...returned with a value type of string, and so has the column language.
+    
+    return json_value, language,value_type, errors
+    
+
+def get_parse_cell_function(
+        annotated_column_dict,
+        trim,
+        validate,
+        warn=warnings.warn
+        ):
+    """Returns a function which parses the string values of the cells in 
+    a column.
+    
+    The function gives the same results as parse_cell_steps_1_to_5, but the 
+    column annotations are read, and the steps which depend on them are 
+    chosen, once for the column rather than once for each cell.
+    
+    :param annotated_column_dict: The annotated column.
+    :type annotated_column_dict: dict
+    :param warn: The function called with the message of each error of a 
+        cell, instead of warnings.warn, see get_datatype_parse_function.
+    
+    :returns: A function with argument (string_value) which returns 
+        (cell_value, errors).
+    
+    """
+    datatype=annotated_column_dict['datatype']
+    default=annotated_column_dict['default']
+    lang=annotated_column_dict['lang']
+    null=annotated_column_dict['null']
+    required=annotated_column_dict['required']
+    separator=annotated_column_dict['separator']
+    
+    datatype_base=datatype['base']
+    
+    datatype_parse_function=\
+        get_datatype_parse_function(
+            datatype,
+            warn
+            )
+    
+    #...convert null to a set if possible
+    if not isinstance(null,list):
+        null=[null]
+        
+    try:
+        null=frozenset(null)
+    except TypeError:
+        pass
+    
+    # 1. unless the datatype base is string, json, xml, html or anyAtomicType, 
+    #    replace all carriage return (#xD), line feed (#xA), and tab (#x9) 
+    #    characters with space characters.
+    
+    # 2. unless the datatype base is string, json, xml, html, anyAtomicType, 
+    #    or normalizedString, strip leading and trailing whitespace from the 
+    #    string value and replace all instances of two or more whitespace #
+    #    characters with a single space character.
+    
+    #...str.split() splits at any whitespace, so step 2 also does step 1
+    if datatype_base in ['string','json','xml','html','anyAtomicType']:
+        
+        normalize_whitespace=None
+        
+    elif datatype_base=='normalizedString':
+        
+        normalize_whitespace=\
+            lambda x: x.replace('\r',' ').replace('\n',' ').replace('\t',' ')
+        
+    else:
+        
+        normalize_whitespace=lambda x: " ".join(x.split())
+    
+    # 5.3. unless the datatype base is string or anyAtomicType, strip 
+    #      leading and trailing whitespace from these strings.  
+    #...as in parse_cell_steps_1_to_5, the strings are stripped only if the 
+    #...datatype base is string or anyAtomicType
+    strip_list_of_string_values=datatype_base in ['string','anyAtomicType']
+    
+    trim_function=get_trim_function(trim)
+    
+    # 8. ... If the datatype base is string, or there is no datatype, the 
+    #    value has an associated language from the column lang annotation. 
+    if datatype_base=='string' or datatype_base is None:
+        
+        language=lang
+        
+    else:
+        
+        language=None
+        
+    #...the @type of the values
+    datatype_iri=datatypes.get(datatype_base)
+    string_iri=datatypes['string']
+    
+    #...the message for step 7
+    null_message='column separator annotation is null and the column required annotation is true'
+    
+    def parse_value(
+            string_value,
+            errors
+            ):
+        """Steps 6 to 9, as parse_cell_steps_6_to_9.
+        
+        :returns: (json_value, language, datatype_iri, errors)
+        
+        """
+        # 6. if the string is an empty string, apply the remaining steps to 
+        #    the string given by the column default annotation.
+        if string_value=='':
             
-        #
-        date_string=\
-            string_value.removesuffix(
-                (timezone_gap or '')
-                +timezone_string
+            string_value=str(default)
+            
+        # 7. if the string is the same as any one of the values of the column 
+        #    null annotation, then the resulting value is null. 
+        if string_value in null:
+            
+            if separator is None and required==True:
+                
+                if validate:
+                    
+                    raise CSVWError(null_message)
+                
+                else:
+                
+                    warn(null_message)
+                
+                    errors.append(null_message)
+            
+            return None, None, datatype_iri, errors
+        
+        # 8. parse the string using the datatype format if one is specified
+        # 9. validate the value (done by datatype_parse_function)
+        json_value,value_type,errors=\
+            datatype_parse_function(
+                string_value,
+                errors,
+                validate
                 )
         
-        if _print_intermediate_outputs: print('-date_string',date_string)
+        if value_type=='string':
+            
+            return json_value, lang, string_iri, errors
         
-        if not date_format is None:
+        elif value_type==datatype_base:
+        
+            return json_value, language, datatype_iri, errors
+        
+        else:
             
-            #
-            if separator=='':
-                
-                separated_date_string=\
-                    (
-                        date_string[:4],
-                        date_string[4:6],
-                        date_string[6:]
-                     )
+            return json_value, language, datatypes[value_type], errors
+    
+    def parse_cell(
+            string_value
+            ):
+        ""
+        
+        errors=[]
+        
+        # 1. and 2.
+        if not normalize_whitespace is None:
             
-            else:
-                
-                separated_date_string=date_string.split(separator)
+            string_value=normalize_whitespace(string_value)
+            
+        # 3. if the normalized string is an empty string, apply the remaining 
+        #    steps to the string given by the column default annotation.
+        # 4. if the column separator annotation is not null and the normalized 
+        #    string is an empty string, the cell value is an empty list. If the 
+        #    column required annotation is true, add an error to the list of 
+        #    errors for the cell.
+        if string_value=='':
+            
+            if separator is None:
                 
-            if _print_intermediate_outputs: print('-separated_date_string',separated_date_string)
+                string_value=str(default)
                 
-            #
-            for code, date_substring in zip(
-                    separated_codes,
-                    separated_date_string
-                    ):
+            else:
                 
-                if code=='yyyy':
-                    
-                    if not len(date_substring)==4:
-                        
-                        message='date conversion error'
-                        
-                        if validate:
-                            
-                            raise CSVWError(message)
-                            
-                        else:
-                            
-                            errors.append(message)
-                            warnings.warn(message)
-                            return string_value,'string',errors
-                    
-                    try:
-                        
-                        year=int(date_substring)
-                    
-                    except ValueError:
-                        
-                        message='date conversion error'
-                        
-                        if validate:
-                            
-                            raise CSVWError(message)
-                            
-                        else:
-                            
-                            errors.append(message)
-                            warnings.warn(message)
-                            return string_value,'string',errors
-                    
-                elif code=='MM':
-                    
-                    if not len(date_substring)==2:
-                        
-                        message='date conversion error'
-                        
-                        if validate:
-                            
-                            raise CSVWError(message)
-                            
-                        else:
-                            
-                            errors.append(message)
-                            warnings.warn(message)
-                            return string_value,'string',errors
-                    
-                    try:
-                    
-                        month=int(date_substring)
-                    
-                    except ValueError:
-                        
-                        message='date conversion error'
-                        
-                        if validate:
-                            
-                            raise CSVWError(message)
-                            
-                        else:
-                            
-                            errors.append(message)
-                            warnings.warn(message)
-                            return string_value,'string',errors
+                if required:
                     
+                    message='Error in Section 6.4 Step 4. '
+                    message+='Separator is not null and string value is an empty string. '
+                    message+='Value set to an empty array. '
                     
-                elif code=='M':
-                    
-                    try:
-                    
-                        month=int(date_substring)
+                    errors.append(message)
                     
-                    except ValueError:
-                        
-                        message='date conversion error'
-                        
-                        if validate:
-                            
-                            raise CSVWError(message)
-                            
-                        else:
-                            
-                            errors.append(message)
-                            warnings.warn(message)
-                            return string_value,'string',errors
+                return [],errors
+                
+        # 5. if the column separator annotation is not null, the cell value is a 
+        #    list of values
+        if not separator is None:
+            
+            # 5.1. if the normalized string is the same as any one of the values 
+            #      of the column null annotation, then the resulting value is null.
+            if string_value in null:
+                
+                return None, errors
+            
+            # 5.2. split the normalized string at the character specified by the 
+            #      column separator annotation.
+            list_of_string_values=string_value.split(separator)
+            
+            # 5.3.
+            if strip_list_of_string_values:
+                list_of_string_values=[x.strip() for x in list_of_string_values]
+                
+            # 5.4. applying the remaining steps to each of the strings in turn.
+            list_of_cell_values=[]
+            
+            for string_value in list_of_string_values:
+                
+                json_value,value_language,value_iri,errors=\
+                    parse_value(
+                        string_value,
+                        errors
+                        )
+                
+                #...as in parse_cell_steps_1_to_5
+                if isinstance(json_value,str) and not trim_function is None:
+                    json_value=trim_function(json_value)
+                
+                cell_value={'@value':json_value,
+                            '@type':value_iri}
+                
+                if not value_language is None:
+                    cell_value['@language']=lang
                     
-                    if month<10:
-                        
-                        if not len(date_substring)==1:
-                            
-                            message='date conversion error'
-                            
-                            if validate:
-                                
-                                raise CSVWError(message)
-                                
-                            else:
-                                
-                                errors.append(message)
-                                warnings.warn(message)
-                                return string_value,'string',errors
-                        
-                    else:
-                        
-                        if not len(date_substring)==2:
-                            
-                            message='date conversion error'
-                            
-                            if validate:
-                                
-                                raise CSVWError(message)
-                                
-                            else:
-                                
-                                errors.append(message)
-                                warnings.warn(message)
-                                return string_value,'string',errors
-                    
-                    
-                        
-                elif code=='dd':
-                    
-                    if not len(date_substring)==2:
-                        
-                        message='date conversion error'
-                        
-                        if validate:
-                            
-                            raise CSVWError(message)
-                            
-                        else:
-                            
-                            errors.append(message)
-                            warnings.warn(message)
-                            return string_value,'string',errors
-                    
-                    try:
-                    
-                        day=int(date_substring)
-                    
-                    except ValueError:
-                        
-                        message='date conversion error'
-                        
-                        if validate:
-                            
-                            raise CSVWError(message)
-                            
-                        else:
-                            
-                            errors.append(message)
-                            warnings.warn(message)
-                            return string_value,'string',errors
-                    
-                    
-                elif code=='d':
-                    
-                    try:
-                    
-                        day=int(date_substring)
-                        
-                    except ValueError:
-                        
-                        message='date conversion error'
-                        
-                        if validate:
-                            
-                            raise CSVWError(message)
-                            
-                        else:
-                            
-                            errors.append(message)
-                            warnings.warn(message)
-                            return string_value,'string',errors
-                    
-                    if day<10:
-                        
-                        if not len(date_substring)==1:
-                            
-                            message='date conversion error'
-                            
-                            if validate:
-                                
-                                raise CSVWError(message)
-                                
-                            else:
-                                
-                                errors.append(message)
-                                warnings.warn(message)
-                                return string_value,'string',errors
-                        
-                    else:
-                        
-                        if not len(date_substring)==2:
-                            
-                            message='date conversion error'
-                            
-                            if validate:
-                                
-                                raise CSVWError(message)
-                                
-                            else:
-                                
-                                errors.append(message)
-                                warnings.warn(message)
-                                return string_value,'string',errors
-                        
-                    
-                else:
-                    
-                    raise Exception
-                    
-            if _print_intermediate_outputs: print('-year,month,day',year,month,day)
+                list_of_cell_values.append(cell_value)
+                
+            return list_of_cell_values,errors
+        
+        else:
             
+            json_value,value_language,value_iri,errors=\
+                parse_value(
+                    string_value,
+                    errors
+                    )
+                
+            if json_value is None:
+                
+                return None,errors
             
-            try:
-        
-                x=datetime.date(year,month,day)
-        
-            except ValueError:
+            cell_value={'@value':json_value,
+                        '@type':value_iri}
+            
+            if not value_language is None:
+                cell_value['@language']=lang
                 
-                message='Invalid value in date string.'
-        
-                if validate:
-                    
-                    raise CSVWError(message)
-                    
-                else:
-        
-                    errors.append(message)
-                    warnings.warn(message)
-                    return string_value, 'string', errors
+            return cell_value,errors
+    
+    return parse_cell
+    
+    
+def get_memoized_parse_cell_function(
+        parse_cell_function,
+        maxsize=1024,
+        minimum_hit_rate=0.5,
+        sample_size=1000
+        ):
+    """Returns a version of a parse cell function which remembers the cell 
+    values of recently parsed string values.
+    
+    This is faster for columns with only a few different values, such as 
+    codes or booleans. The same cell value object is returned for each 
+    occurrence of a string value. 
+    String values which give errors are not remembered, so their errors 
+    and warnings are given for each cell.
+    
+    :param parse_cell_function: A function returned by get_parse_cell_function.
+    :type parse_cell_function: function
+    
+    :param maxsize: The maximum number of cell values remembered. The least 
+        recently used cell value is forgotten when this is exceeded.
+    :type maxsize: int
+    
+    :param minimum_hit_rate: If the proportion of the first sample_size 
+        string values which are found in the memo is less than this, the memo 
+        is cleared and no longer used.
+    :type minimum_hit_rate: float
+    
+    :param sample_size: The number of string values used to check the 
+        hit rate.
+    :type sample_size: int
+    
+    :returns: A function with argument (string_value) which returns 
+        (cell_value, errors). The cache_info attribute of this function 
+        returns the hit and miss statistics as a dictionary.
+    
+    """
+    memo=collections.OrderedDict()
+    
+    statistics=dict(
+        hits=0,
+        misses=0,
+        maxsize=maxsize,
+        enabled=True
+        )
+    
+    def memoized_parse_cell(
+            string_value
+            ):
+        ""
         
+        if not statistics['enabled']:
+            
+            return parse_cell_function(string_value)
         
-        else:
+        if string_value in memo:
             
-            try:
+            memo.move_to_end(string_value)
             
-                x=datetime.date.fromisoformat(date_string)
-        
-            except ValueError:
-                
-                message=f'Invalid isoformat string {string_value} for "date" datatype. '
+            statistics['hits']+=1
+            
+            return memo[string_value],[]
         
-                if validate:
-                    
-                    raise CSVWError(message)
-                    
-                else:
+        statistics['misses']+=1
         
-                    errors.append(message)
-                    warnings.warn(message)
-                    return string_value, 'string', errors
+        cell_value,errors=parse_cell_function(string_value)
         
+        if len(errors)==0:
+            
+            memo[string_value]=cell_value
+            
+            if len(memo)>maxsize:
+                
+                memo.popitem(last=False)
+                
+        #...stop using the memo if too few values are found in it
+        if statistics['hits']+statistics['misses']==sample_size \
+            and statistics['hits']<minimum_hit_rate*sample_size:
+            
+            statistics['enabled']=False
+            
+            memo.clear()
+            
+        return cell_value,errors
     
-        #
-        json_value=x.isoformat()+xsd_timezone_string
-        
-        return json_value, datatype['base'], errors
+    def cache_info():
+        ""
+        return dict(
+            **statistics,
+            currsize=len(memo)
+            )
     
+    memoized_parse_cell.cache_info=cache_info
     
-    return parse_date
+    return memoized_parse_cell
     
-
     
-def get_parse_time_function(
+#%% 6.4.2 Formats for numeric type
+
+
+def get_parse_number_function(
         datatype,
+        warn=warnings.warn,
         _print_intermediate_outputs=False
         ):
     """
     """
-    # By default, dates and times are assumed to be in the format defined 
-    # in [xmlschema11-2]. However dates and times are commonly represented 
-    # in tabular data in other formats.
-
-    # If the datatype base is a date or time type, the datatype format 
-    # annotation indicates the expected format for that date or time.
     
-    # The supported date and time format patterns listed here are 
-    # expressed in terms of the date field symbols defined in [UAX35]. 
-    # These formats must be recognised by implementations and must be 
-    # interpreted as defined in that specification. 
-    # Implementations may additionally recognise other date format patterns. 
-    # Implementations must issue a warning if the date format pattern is 
-    # invalid or not recognised and proceed as if no date format 
-    # pattern had been provided.
+    datatype_format=datatype.get('format')
     
-    if _print_intermediate_outputs: print('-datatype',datatype)
+    datatype_base=datatype['base']
     
-    datatype_format=datatype.get('format')
+    # By default, numeric values must be in the formats defined in
+    # [xmlschema11-2]. 
+    # It is not uncommon for numbers within tabular data to be 
+    # formatted for human consumption, which may involve using 
+    # commas for decimal points, grouping digits in the number 
+    # using commas, or adding percent signs to the number.
+
+    # If the datatype base is a numeric type, the datatype format 
+    # annotation indicates the expected format for that number. 
+    # Its value must be either a single string or an object with 
+    # one or more of the properties:
     
-    if not datatype_format is None:
+    # decimalChar
+    # A string whose value is used to represent a decimal point within the number. 
+    # The default value is ".". If the supplied value is not a string, 
+    # implementations must issue a warning and proceed as if the property 
+    # had not been specified.
+    
+    if isinstance(datatype_format,dict) and 'decimalChar' in datatype_format:
         
-        timezone_format,timezone_gap=\
-            get_timezone_format(
-                    datatype_format
-                    )
+        decimal_char=datatype_format['decimalChar']
         
-        if not timezone_format is None:
+    else:
         
-            time_format=\
-                datatype_format.removesuffix(
-                    timezone_gap+timezone_format
-                    )
-        else:
+        decimal_char='.'
+    
+    
+    # groupChar
+    # A string whose value is used to group digits within the number. 
+    # The default value is null. If the supplied value is not a string, 
+    # implementations must issue a warning and proceed as if the property had 
+    # not been specified.
+    
+    if isinstance(datatype_format,dict) and 'groupChar' in datatype_format:
+        
+        group_char=datatype_format['groupChar']
+        
+    else:
+        
+        group_char=None
+    
+    
+    # pattern
+    # A number format pattern as defined in [UAX35]. 
+    # Implementations must recognise number format patterns containing the 
+    # symbols 0, #, the specified decimalChar (or "." if unspecified), the 
+    # specified groupChar (or "," if unspecified), E, +, % and ‰. 
+    # Implementations may additionally recognise number format patterns 
+    # containing other special pattern characters defined in [UAX35]. 
+    # If the supplied value is not a string, or if it contains an invalid 
+    # number format pattern or uses special pattern characters that the 
+    # implementation does not recognise, implementations must issue a warning 
+    # and proceed as if the property had not been specified.
+    
+    # If the datatype format annotation is a single string, this is 
+    # interpreted in the same way as if it were an object with a pattern 
+    # property whose value is that string.
+    
+    if not datatype_format is None:
+    
+        if isinstance(datatype_format,dict):
             
-            time_format=datatype_format
-
+            pattern=datatype_format.get('pattern')
             
-        #...separate main and fractional part
-        main_time_format,_,fractional_time_format=\
-            time_format.partition('.')
-                
-        #...check if main time format is in the approved list
-        if main_time_format in [
-            'HH:mm:ss',
-            'HHmmss',
-            'HH:mm',
-            'HHmm'
-            ]:
+        else:  #... datatype_format is a string or None
             
-            #...check fractional time format
-            if fractional_time_format:
+            pattern=datatype_format
+            
+        #...check if pattern is valid
+        if not pattern is None:
+            
+            for x in pattern:
                 
-                if not main_time_format=='HH:mm:ss':
+                if not x in ['0','#','.',',','E','+','-','%','‰','\u2030']:
+                
+                    message=f'Number format pattern with value "{pattern}" is invalid '
+                    message+=f'as it contains the character "{x}". '
+                    message+='Pattern is set to None.'
                     
-                    message='fractional time format1'
+                    if _print_intermediate_outputs: print(message)
                     
                     warnings.warn(message)
                     
-                    time_format=None
-                    main_time_format=None
-                    fractional_time_format=None
+                    pattern=None
+                    
+                    break
                 
+        if not pattern is None:
+                
+            pattern_dict=\
+                parse_LDML_number_pattern(
+                    pattern
+                    )
+                
+            #...sets a default group_char if present in the number pattern
+            if not pattern_dict['integral_part_primary_grouping_size'] is None \
+                or not pattern_dict['fractional_part_grouping_size'] is None:
+                
+                group_char=','
+                
+            pattern_dict['regex']=\
+                get_LDML_number_pattern_regex(
+                    pattern_dict,
+                    decimal_char,
+                    group_char
+                    )
+                
+            #print(pattern_dict)
                 
-                if not all(x=='S' for x in fractional_time_format):
-                    
-                    message='fractional time format2'
-                    
-                    warnings.warn(message)
-                    
-                    time_format=None
-                    main_time_format=None
-                    fractional_time_format=None
-            
-        else:
-        
-            message='main time format'
-            
-            warnings.warn(message)
-            
-            time_format=None
-            main_time_format=None
-            fractional_time_format=None
-            
-            
     else:
         
-        time_format=None
-        timezone_format=None
-        timezone_gap=None
-        main_time_format=None
-        fractional_time_format=None
+        pattern=None
+        
+    #print('-datatype',datatype)
+    #print('-pattern',pattern)
+    #print('-decimal_char',decimal_char)
+    #print('-group_char',group_char)
         
     
-    if _print_intermediate_outputs: print('-timezone_format',timezone_format)
-    if _print_intermediate_outputs: print('-timezone_gap',timezone_gap)
-    if _print_intermediate_outputs: print('-time_format',time_format)
-    if _print_intermediate_outputs: print('-main_time_format',main_time_format)
-    if _print_intermediate_outputs: print('-fractional_time_format',fractional_time_format)
-    
-    
-    def parse_time(
+    def parse_number(
             string_value,
             errors,
             validate
             ):
         """
         """
-        if _print_intermediate_outputs: print('-string_value',string_value)
+        #print('-string_value',string_value)
         
-        #
-        try:
+        def convert_string_value_to_number(
+                string_value,
+                datatype_base,
+                decimal_char,
+                group_char
+                ):
+            """
             
-            timezone_string=\
-                get_timezone_string(
-                    string_value,
-                    timezone_format
-                    )
-        
-        except ValueError:
+            :raises ValueError: if string_value cannot be converted
             
-            message='time conversion error'
+            :rtype: int or float
             
-            if validate:
-                
-                raise CSVWError(message)
+            """
+            #...deals with percent and permille
+            modifier=1
             
-            else:
+            if string_value.startswith('%'):
                 
-                errors.append(message)
-                warnings.warn(message)
-                return string_value,'string',errors
+                string_value=string_value[1:]
                 
-        if _print_intermediate_outputs: print('-timezone_string',timezone_string)
-        
-        #
-        xsd_timezone_string=\
-            parse_timezone_string(
-                timezone_string
-                )
-        if _print_intermediate_outputs: print('-xsd_timezone_string',xsd_timezone_string)
-            
-        #
-        time_string=\
-            string_value.removesuffix(
-                (timezone_gap or '')
-                +timezone_string
-                )
-        
-        if _print_intermediate_outputs: print('-time_string',time_string)
-        
-        
-        #
-        if not time_format is None:
-            
+                modifier=0.01
             
-            #
-            main_time_string,_,fractional_time_string=\
-                time_string.partition('.')
-                
-            if main_time_format=='HH:mm:ss':
+            elif string_value.endswith('%'):
                 
-                try:
+                string_value=string_value[:-1]
                 
-                    hour,minute,second=[int(x) for x in main_time_string.split(':')]
+                modifier=0.01
                 
-                except ValueError:
-                    
-                    message=f'time conversion error "{time_string}"'
-                    
-                    if validate:
-                        
-                        raise CSVWError(message)
-                    
-                    else:
-                        
-                        errors.append(message)
-                        warnings.warn(message)
-                        return string_value,'string',errors
+            elif string_value.startswith('‰') or string_value.startswith('\u2030'):
                 
+                string_value=string_value[1:]
                 
+                modifier=0.001
                 
-            elif main_time_format=='HHmmss':
+            elif string_value.endswith('‰') or string_value.endswith('\u2030'):
                 
-                try:
+                string_value=string_value[:-1]
                 
-                    hour=int(main_time_string[:2])
-                    minute=int(main_time_string[2:4])
-                    second=int(main_time_string[4:])
+                modifier=0.001
+            
+            
+            #...replace decimal_char 
+            string_value=string_value.replace(decimal_char,'X')
                 
-                except ValueError:
-                    
-                    message='time conversion error'
-                    
-                    if validate:
-                        
-                        raise CSVWError(message)
-                    
-                    else:
-                        
-                        errors.append(message)
-                        warnings.warn(message)
-                        return string_value,'string',errors
+            
+            #...replace group_char
+            if not group_char is None: 
                 
+                string_value=string_value.replace(group_char,'')
                 
-            elif main_time_format=='HH:mm':
+            string_value=string_value.replace('X','.')
+        
+        
+            #...convert
+            if datatype_base in datatypes_integers:
                 
-                try:
+                return int(string_value)*modifier
+            
+            else:
                 
-                        hour,minute=[int(x) for x in main_time_string.split(':')]
+                return float(string_value)*modifier
+        
+        
+        #---
+        #...convert the string value to a number
+        try:
+            
+            json_value=convert_string_value_to_number(
+                    string_value,
+                    datatype_base,
+                    decimal_char,
+                    group_char
+                    )
+            conversion_error=False
+            
+        except ValueError:
+            
+            json_value=None
+            conversion_error=True
+            
+        #print('-json_value',json_value)
+        #print('-conversion_error',conversion_error)
+        
+        
+        #  If the groupChar is specified, but no pattern is supplied, when parsing 
+        # the string value of a cell against this format specification, 
+        # implementations must recognise and parse numbers that consist of:
+    
+        # 1. an optional + or - sign,
+        # 2. followed by a decimal digit (0-9),
+        # 3. followed by any number of decimal digits (0-9) and the string 
+        #    specified as the groupChar,
+        # 4. followed by an optional decimalChar followed by one or more decimal 
+        #    digits (0-9),
+        # 5. followed by an optional exponent, consisting of an E followed by an 
+        #    optional + or - sign followed by one or more decimal digits (0-9), or
+        # 6. followed by an optional percent (%) or per-mille (‰) sign.
+        
+        #...DONE BELOW
+        
+        
+        # or that are one of the special values:
+        
+        # 1. NaN,
+        # 2. INF, or
+        # 3. -INF.
+        
+        if string_value in ['NaN','INF','-INF']:
+            
+            json_value=string_value
+            
                 
-                except ValueError:
+        # Implementations may also recognise numeric values that are in any of the 
+        # standard-decimal, standard-percent or standard-scientific formats listed 
+        # in the Unicode Common Locale Data Repository.
+        
+        #...NOT DONE, ALTHOUGH ANY NUMBER THAT PYTHON CAN PARSE WILL WORK
+        
+    
+        # Implementations must add a validation error to the errors annotation 
+        # for the cell, and set the cell value to a string rather than a number 
+        # if the string being parsed:
+    
+        # - is not in the format specified in the pattern, if one is defined
+        
+        if not pattern is None:
+            
+            result=validate_LDML_number(
+                string_value,
+                errors,
+                pattern_dict,
+                decimal_char,
+                group_char,
+                warn
+                )
+            
+            if not result:
                 
-                    message='time conversion error'
+                message=f'Cell value "{string_value}" is not in the format '
+                message+=f'specified "{pattern}". '
+                message+='Cell value is not converted to a number. '
+                
+                if validate:
                     
-                    if validate:
-                        
-                        raise CSVWError(message)
+                    raise CSVWError(message)
                     
-                    else:
-                        
-                        errors.append(message)
-                        warnings.warn(message)
-                        return string_value,'string',errors
+                else:
                 
-                second=0
+                    warn(message)
+                    
+                    errors.append(message)
+                    
+                    return string_value, 'string', errors
+            
+            
+        # - otherwise, if the string
+        #     - does not meet the numeric format defined above,
+        
+        else:
+            
+            if conversion_error:
                 
-            elif main_time_format=='HHmm':
+                message=f'Cell string value "{string_value}" is not in a format '
+                message+='which can be converted to a number '
+                message+=f'of type "{datatype_base}". '
+                message+='Cell value is not converted to a number. '
                 
-                try:
+                if validate:
                     
-                    hour=int(main_time_string[:2])
-                    minute=int(main_time_string[2:4])
+                    raise CSVWError(message)
+                    
+                else:
                 
-                except ValueError:
+                    warn(message)
                     
-                    message='time conversion error'
+                    errors.append(message)
                     
-                    if validate:
-                        
-                        raise CSVWError(message)
+                    return string_value, 'string', errors
+                
+            else:
+                
+                result=\
+                    validate_value_for_datatype_base(
+                        json_value,
+                        errors,
+                        datatype_base,
+                        validate,
+                        warn
+                        )
                     
-                    else:
-                        
-                        errors.append(message)
-                        warnings.warn(message)
-                        return string_value,'string',errors
+                if not result:
+                    
+                    return string_value, 'string', errors
+            
+            
+        #     - contains two consecutive groupChar strings,
+        if not group_char is None:
+    
+            if group_char+group_char in string_value:
                 
-                second=0
+                message=f'Cell value "{string_value}" contains '
+                message+='two consecutive groupChar strings. '
+                message+='Cell value is not converted to a number. '
                 
-            if fractional_time_format:
+                if validate:
+                    
+                    raise CSVWError(message)
                 
-                if len(fractional_time_string)>len(fractional_time_format):
+                else:
+                
+                    warn(message)
                     
-                    message='time conversion error'
+                    errors.append(message)
                     
-                    if validate:
-                        
-                        raise CSVWError(message)
+                    return string_value, 'string', errors
+            
+
+        # - contains the decimalChar, if the datatype base is integer or one of 
+        #   its sub-types,
+        
+        if datatype['base'] in datatypes_integers:
+            
+            if decimal_char in string_value:
+                
+                message=f'Cell value "{string_value}" not valid as it '
+                message+=f'contains the decimalChar character "{decimal_char}". '
+                message+='Cell value is not converted to a number. '
+                
+                if validate:
                     
-                    else:
-                        
-                        errors.append(message)
-                        warnings.warn(message)
-                        return string_value,'string',errors
+                    raise CSVWError(message)
                 
                 else:
                 
-                    try:    
+                    warn(message)
                     
-                        microsecond=\
-                            int(float(f'0.{fractional_time_string}')*1000000)
-                            
-                    except ValueError:
-                        
-                        message='time conversion error'
-                        
-                        if validate:
-                            
-                            raise CSVWError(message)
-                        
-                        else:
-                            
-                            errors.append(message)
-                            warnings.warn(message)
-                            return string_value,'string',errors
-                        
-            else:
-                
-                microsecond=0
+                    errors.append(message)
+                    
+                    return string_value, 'string', errors  
                 
-            x=datetime.time(hour,minute,second,microsecond)
-            
-        else:
-            
-            try:
             
-                x=datetime.time.fromisoformat(time_string)
+        # - contains an exponent, if the datatype base is decimal or one of its 
+        #   sub-types, or
         
-            except ValueError:
+        elif datatype['base'] in datatypes_decimals:
+            
+            if 'E' in string_value or 'e' in string_value:
                 
-                message=f'Invalid isoformat string {string_value}. '
+                message=f'Cell value "{string_value}" not valid as it '
+                message+='contains an exponent. '
+                message+='Cell value is not converted to a number. '
                 
                 if validate:
                     
                     raise CSVWError(message)
                 
                 else:
-        
+                
+                    warn(message)
+                    
                     errors.append(message)
-                    warnings.warn(message)
-                    return string_value, 'string', errors
-        
-        #
-        x=x.isoformat()
-        
-        #...format significant digits if needed
-        if fractional_time_format:
+                    
+                    return string_value, 'string', errors  
+                
             
-            x=x.split('.')
+        # - is one of the special values NaN, INF, or -INF, if the datatype base 
+        #   is decimal or one of its sub-types.
             
-            x=x[0]+'.'+x[1][:len(fractional_time_format)]
-        
-        json_value=x+xsd_timezone_string
-        
-        return json_value, datatype['base'], errors
-    
-    
-    return parse_time
-
-
-def get_parse_datetime_function(
-        datatype,
-        timezone_required=False,
-        _print_intermediate_outputs=False
-        ):
-    """
-    """
-    # By default, dates and times are assumed to be in the format defined 
-    # in [xmlschema11-2]. However dates and times are commonly represented 
-    # in tabular data in other formats.
+            if string_value in ['NaN','INF','-INF']:
+                
+                message=f'Cell value "{string_value}" not valid as its '
+                message+='datatype base is decimal or one of its sub-types. '
+                message+='Cell value is not converted to a number. '
+                
+                if validate:
+                    
+                    raise CSVWError(message)
+                
+                else:
+                
+                    warn(message)
+                    
+                    errors.append(message)  
+                    
+                    return string_value, 'string', errors  
+        
+        
+        # Implementations must use the sign, exponent, percent, and per-mille signs 
+        # when parsing the string value of a cell to provide the value of the cell. 
+        # For example, the string value "-25%" must be interpreted as -0.25 and 
+        # the string value "1E6" as 1000000.
+        
+        #...this is done in the convert_string_value_to_number function.
+        
+        
+        #
+        return json_value,  datatype_base, errors
+            
+        
+    return parse_number
+
+
+def get_parse_numbers_function(
+        annotated_column_dict,
+        chunk_size=65536
+        ):
+    """Returns a function which converts the string values of the cells in a 
+    numeric column to numbers in batches using NumPy.
     
-    # If the datatype base is a date or time type, the datatype format 
-    # annotation indicates the expected format for that date or time.
+    Only string values which are plain numbers (an optional sign, digits, 
+    a '.' decimal point for decimals and doubles and an exponent for doubles) 
+    are converted, and only if they are not null values and are valid for 
+    the datatype base and the value constraints of the column. 
+    These give the same values as the function from get_parse_number_function 
+    and have no errors.
+    All other string values are left to be parsed one at a time, so that 
+    their errors and warnings are unchanged.
     
-    # The supported date and time format patterns listed here are 
-    # expressed in terms of the date field symbols defined in [UAX35]. 
-    # These formats must be recognised by implementations and must be 
-    # interpreted as defined in that specification. 
-    # Implementations may additionally recognise other date format patterns. 
-    # Implementations must issue a warning if the date format pattern is 
-    # invalid or not recognised and proceed as if no date format 
-    # pattern had been provided.
+    :param annotated_column_dict: The annotated column.
+    :type annotated_column_dict: dict
     
-    if _print_intermediate_outputs: print('-datatype',datatype)
+    :param chunk_size: The number of string values converted in each batch.
+    :type chunk_size: int
+    
+    :returns: A function with argument (string_values) which returns a list 
+        of the numbers, with None for the string values which are not 
+        converted. None is returned instead of a function if NumPy is not 
+        installed or the column cannot be parsed in batches.
+    
+    """
+    if numpy is None:
+        
+        return None
+    
+    datatype=annotated_column_dict['datatype']
+    datatype_base=datatype['base']
+    null=annotated_column_dict['null']
+    
+    if not datatype_base in datatypes_numbers \
+        or not annotated_column_dict['separator'] is None:
+        
+        return None
     
+    #...the format must not have a pattern, and the decimalChar and groupChar 
+    #...must not change a plain number
     datatype_format=datatype.get('format')
     
     if not datatype_format is None:
         
-        timezone_format,timezone_gap=\
-            get_timezone_format(
-                    datatype_format
-                    )
+        if not isinstance(datatype_format,dict) \
+            or 'pattern' in datatype_format \
+            or datatype_format.get('decimalChar','.')!='.':
             
-        if not timezone_format is None:
+            return None
         
-            datetime_format=\
-                datatype_format.removesuffix(
-                    timezone_gap+timezone_format
-                    )
-                
-        else:
-            
-            datetime_format=datatype_format
+        group_char=datatype_format.get('groupChar')
+        
+        if not group_char is None \
+            and (not isinstance(group_char,str) 
+                 or any(x in '0123456789+-.eE' for x in group_char)):
             
-    else:
+            return None
         
-        datetime_format=None
-        timezone_format=None
-        timezone_gap=None
+    #...numbers do not have length constraints
+    if not (datatype.get('length') is None 
+            and datatype.get('minLength') is None
+            and datatype.get('maxLength') is None):
         
+        return None
         
-    if not datetime_format is None:
+    if datatype_base in datatypes_integers:
+        
+        number_type=numpy.int64
+        allow_point=False
+        allow_exponent=False
+        
+    elif datatype_base in datatypes_decimals:
+        
+        number_type=numpy.float64
+        allow_point=True
+        allow_exponent=False
         
-        #
-        if 'T' in datetime_format:
-            
-            separator='T'
-            
-        else:
-            
-            separator=' '
-            
-        #
-        date_format,_,time_format=\
-            datetime_format.partition(separator)
-            
     else:
         
-        date_format=None
-        time_format=None
-        separator=None
-            
+        number_type=numpy.float64
+        allow_point=True
+        allow_exponent=True
+        
+    #...the value constraints of the datatype base and of the datatype, 
+    #...read as in get_check_constraints_function
+    constraints=[
+        datatype_base_value_constraints.get(datatype_base,{}),
+        dict(minimum=datatype.get('minimum') or datatype.get('minInclusive'),
+             maximum=datatype.get('maximum') or datatype.get('maxInclusive'),
+             minimum_exclusive=datatype.get('minExclusive'),
+             maximum_exclusive=datatype.get('maxExclusive'))
+        ]
     
+    bounds=[]
+    
+    for constraints_dict in constraints:
+        
+        for k,v in constraints_dict.items():
+            
+            if v is None:
+                
+                continue
+            
+            if isinstance(v,bool) or not isinstance(v,(int,float)):
+                
+                return None
+            
+            if number_type is numpy.int64:
+                
+                if not isinstance(v,int):
+                    
+                    return None
+                
+                #...integers have at most 18 digits, so bounds outside 
+                #...+/- 10**18 give the same result as +/- 10**18
+                v=min(max(v,-10**18),10**18)
+                
+            else:
+                
+                #...integer bounds must be exact as floats
+                if isinstance(v,int) and abs(v)>2**53:
+                    
+                    return None
+                
+            bounds.append((k,v))
             
+    #...the null values which are strings
+    if not isinstance(null,list):
+        null=[null]
         
-    if _print_intermediate_outputs: print('-timezone_format',timezone_format)
-    if _print_intermediate_outputs: print('-timezone_gap',timezone_gap)
-    if _print_intermediate_outputs: print('-datetime_format',datetime_format)
-    if _print_intermediate_outputs: print('-separator',separator)
-    if _print_intermediate_outputs: print('-date_format',date_format)
-    if _print_intermediate_outputs: print('-time_format',time_format)
+    null_strings=[x for x in null if isinstance(x,str)]
     
-    
-
-    def parse_datetime(
-            string_value,
-            errors,
-            validate
+    def parse_numbers_chunk(
+            string_values
             ):
-        """
-        """
-        if _print_intermediate_outputs: print('-string_value',string_value)
+        ""
         
-        #
-        try:
-            
-            timezone_string=\
-                get_timezone_string(
-                    string_value,
-                    timezone_format
-                    )
+        n=len(string_values)
         
-        except ValueError:
+        string_array=numpy.array(string_values,dtype=str)
+        
+        lengths=numpy.fromiter(map(len,string_values),dtype=numpy.intp,count=n)
+        
+        #...the characters of each string value as a row of code points, 
+        #...padded with zeros
+        width=string_array.dtype.itemsize//4
+        codes=string_array.view(numpy.uint32).reshape(n,width)
+        
+        is_present=codes!=0
+        is_digit=(codes>=48)&(codes<=57)  # 0-9
+        is_sign=(codes==43)|(codes==45)  # + or -
+        is_point=codes==46  # .
+        is_exponent=(codes==69)|(codes==101)  # E or e
+        
+        digit_count=is_digit.sum(axis=1)
+        point_count=is_point.sum(axis=1)
+        exponent_count=is_exponent.sum(axis=1)
+        
+        positions=numpy.arange(width)
+        
+        exponent_positions=\
+            numpy.where(exponent_count>0,is_exponent.argmax(axis=1),lengths)
             
-            message='datetime conversion error 1'
-            errors.append(message)
-            warnings.warn(message)
-            return string_value,'string',errors
-                
-        if _print_intermediate_outputs: print('-timezone_string',timezone_string)
+        is_mantissa=positions<exponent_positions[:,None]
         
-        #
-        if timezone_required and timezone_string=='':
+        mantissa_digit_count=(is_digit&is_mantissa).sum(axis=1)
+        
+        #...a sign is allowed at the start and directly after the exponent
+        is_sign_position=\
+            (positions==0)|(positions==exponent_positions[:,None]+1)
             
-            message='timezone_required'
+        is_allowed=~is_present|is_digit|(is_sign&is_sign_position)
             
-            errors.append(message)
+        if allow_point:
             
-            warnings.warn(message)
+            is_allowed|=is_point&is_mantissa
             
-            return string_value, 'string', errors
+        if allow_exponent:
             
-        #
-        xsd_timezone_string=\
-            parse_timezone_string(
-                timezone_string
-                )
-        if _print_intermediate_outputs: print('-xsd_timezone_string',xsd_timezone_string)
+            is_allowed|=is_exponent
             
-        #
-        datetime_string=\
-            string_value.removesuffix(
-                (timezone_gap or '')
-                +timezone_string
-                )
-        
-        if _print_intermediate_outputs: print('-datetime_string',datetime_string)
+        #...string values containing null characters are not converted as 
+        #...NumPy removes trailing null characters
+        is_number=(is_present.sum(axis=1)==lengths) \
+            & is_allowed.all(axis=1) \
+            & (point_count<=1) \
+            & (exponent_count<=1) \
+            & (mantissa_digit_count>=1) \
+            & ((exponent_count==0) | (digit_count>mantissa_digit_count))
+            
+        #...integers with up to 18 digits fit in a 64 bit integer
+        if number_type is numpy.int64:
+            
+            is_number&=digit_count<=18
+            
+        if len(null_strings)>0:
+            
+            is_number&=~numpy.isin(string_array,null_strings)
+            
+        #...convert
+        numbers=numpy.zeros(n,dtype=number_type)
         
+        numbers[is_number]=string_array[is_number].astype(number_type)
         
-        if not datetime_format is None:
+        #...check the value constraints
+        for k,v in bounds:
             
-            date_string, _, time_string =\
-                datetime_string.partition(separator)
+            if k=='minimum':
                 
-            #
-            date_datatype=\
-                {'base':'date',
-                 'format':date_format}
+                is_number&=numbers>=v
                 
-            date_errors=[]
+            elif k=='maximum':
                 
-            date_json_value,_,date_errors=\
-                get_parse_date_function(
-                    date_datatype
-                    )(date_string,
-                      date_errors,
-                      validate)
-                      
-            errors.extend(date_errors)
-            
-            #
-            time_datatype=\
-                {'base':'time',
-                 'format':time_format}
+                is_number&=numbers<=v
                 
-            time_errors=[]
+            elif k=='minimum_exclusive':
                 
-            time_json_value,_,time_errors=\
-                get_parse_time_function(
-                    time_datatype
-                    )(time_string,
-                      time_errors,
-                      validate)
-            
-            errors.extend(time_errors)
-                      
-            if len(date_errors)>0 or len(time_errors)>0:
+                is_number&=numbers>v
                 
-                return string_value,'string',errors
-                      
-            #
-
-            try:
-            
-                x=dateutil.parser.isoparse(
-                    f'{date_json_value}T{time_json_value}'
-                    )
-            
-            except ValueError:
+            elif k=='maximum_exclusive':
                 
-                message='datetime conversion error 2' + ' -- ' + f'{date_json_value}T{time_json_value}'
-                #print(message)
-                errors.append(message)
-                warnings.warn(message)
-                return string_value,'string',errors
-            
-            #
-            json_value=f'{date_json_value}T{time_json_value}'+xsd_timezone_string
-            
-            
-        else:
-            
-            x=dateutil.parser.isoparse(datetime_string)
-            
-            json_value=x.isoformat()+xsd_timezone_string
-            
-            
-        #
-        #print('json_value',json_value)
-        return json_value, datatype['base'], errors
+                is_number&=numbers<v
+                
+        return [x if y else None 
+                for x,y in zip(numbers.tolist(),is_number.tolist())]
+    
+    def parse_numbers(
+            string_values
+            ):
+        ""
         
+        json_values=[]
         
-    return parse_datetime
+        for i in range(0,len(string_values),chunk_size):
+            
+            json_values.extend(
+                parse_numbers_chunk(
+                    string_values[i:i+chunk_size]
+                    )
+                )
+            
+        return json_values
     
-
-def get_parse_datetimestamp_function(
-        datatype
+    return parse_numbers
+    
+    
+def parse_LDML_number_pattern(
+        pattern,
+        p=False,
+        _print_intermediate_outputs=False
         ):
-    """
-    """
-    #...timezone is required
+    """Breaks down a number pattern into constituent components.
     
-    return get_parse_datetime_function(
-        datatype,
-        timezone_required=True
-        )
-
-
-#%% 6.4.5 Formats for durations
-
-def get_parse_duration_function(
-        datatype,
-        _print_intermediate_outputs=False
-        ):
-    """
-    """
-    # Durations must be formatted and interpreted as defined in 
-    # [xmlschema11-2], using the [ISO8601] format -?PnYnMnDTnHnMnS. 
-    # For example, the duration P1Y1D is used for a year and a day; 
-    # the duration PT2H30M for 2 hours and 30 minutes.
-
-    # If the datatype base is a duration type, the datatype format 
-    # annotation provides a regular expression for the string values, 
-    # with syntax and processing defined by [ECMASCRIPT]. 
-    # If the supplied value is not a valid regular expression, 
-    # implementations must issue a warning and proceed as if no format 
-    # had been provided.
-    
-    # NOTE
-    # Authors are encouraged to be conservative in the regular expressions 
-    # that they use, sticking to the basic features of regular expressions 
-    # that are likely to be supported across implementations.
-    
-    # The cell value will be one or more durations extracted using the format.
-        
-    if _print_intermediate_outputs: print('-datatype',datatype)
-    
-    datatype_format=datatype.get('format')
-    
-    if not datatype_format is None:
-    
-        try:
-            
-            re_compiled=re.compile(datatype['format'])
-            
-        except re.error:
-            
-            message='Property "format" with value "{datatype["format"]}" '
-            message+='is not a valid regular expression. '
-            message+='Property is removed. '
-            
-            warnings.warn(message)
-            
-            re_compiled=None
-            
-    else:
+    :param pattern: A number pattern as specified in the Unicode Locale
+        Data Markup Language.
         
-        re_compiled=None
-            
-    if _print_intermediate_outputs: print('-re_compiled', re_compiled)
-    
+    :returns: (positive_subpattern, negative_subpattern)
     
-    def parse_duration(
-            string_value,
-            errors,
-            validate
+    """
+    def zero_and_hash_count(
+            pattern2,
+            mode, # "integral" or "fractional"
             ):
         ""
-        if _print_intermediate_outputs: print('-string_value',string_value)
-
-        if not re_compiled is None:
-            
-            if not re_compiled.search(string_value):
-                
-                message=f'duration conversion error 1 - string value ="{string_value}"'
-                
-                if validate:
-                    
-                    raise CSVWError(message)
-                    
-                else:
-                    
-                    errors.append(message)
-                    warnings.warn(message)
-                    return string_value, 'string', errors
-
-        #...parsing -?PnYnMnDTnHnMnS
-        x=string_value
-        
-        # minus sign
+        #print('-pattern2',pattern2)
+        #print('-mode',mode)
         
-        if x[0]=='-':
-            
-            x=x.removeprefix('-')
+        zero_count=0
+        hash_count=0
         
-        #P
+        pattern2=pattern2.replace(',','')
+        i=0
+        end_of_zeros_flag=False
         
-        if not x[0]=='P':
+        #
+        if mode=='integral':
             
-            message=f'duration conversion error 2 - string value ="{string_value}"'
+            pattern2=pattern2[::-1]
             
-            if validate:
-                
-                raise CSVWError(message)
-                
-            else:
-                
-                errors.append(message)
-                warnings.warn(message)
-                return string_value, 'string', errors
-        
-        x=x.removeprefix('P')
+        elif mode=='fractional':
+            
+            pass
         
-        #Y
-        if 'Y' in x:
+        else:
             
-            year_string,_,x=x.partition('Y')
+            raise Exception
+        
+        #
+        while i<len(pattern2):
             
-            try:
-                
-                int(year_string)
-                
-            except ValueError:
-                
-                message=f'duration conversion error 3 - string value ="{string_value}"' + f'"{year_string}"'
+            if pattern2[i]=='0':
                 
-                if validate:
-                    
-                    raise CSVWError(message)
+                if end_of_zeros_flag:
                     
+                    raise Exception
+                
                 else:
                     
-                    errors.append(message)
-                    warnings.warn(message)
-                    return string_value, 'string', errors
-            
-            
-        #M
-        if 'M' in x.split('T')[0]:
-        
-            month_string,_,x=x.partition('M')
+                    zero_count+=1
             
-            if month_string:
+            elif pattern2[i]=='#':
                 
-                try:
-                    
-                    int(month_string)
-                    
-                except ValueError:
-                    
-                    message=f'duration conversion error 4 - string value ="{string_value}"'
-                    
-                    if validate:
-                        
-                        raise CSVWError(message)
-                        
-                    else:
-                        
-                        errors.append(message)
-                        warnings.warn(message)
-                        return string_value, 'string', errors
-        
-        
-        #D
-        if 'D' in x:
-        
-            day_string,_,x=x.partition('D')
+                end_of_zeros_flag=True
             
-            if day_string:
-                
-                try:
-                    
-                    int(day_string)
-                    
-                except ValueError:
-                    
-                    message=f'duration conversion error 5 - string value ="{string_value}"'
-                    
-                    if validate:
-                        
-                        raise CSVWError(message)
-                        
-                    else:
-                        
-                        errors.append(message)
-                        warnings.warn(message)
-                        return string_value, 'string', errors
-                
-        #T
-        if len(x)>0:
+                hash_count+=1
             
-            if not x[0]=='T':
+            else:
                 
-                message=f'duration conversion error 6 - string value ="{string_value}"' + ' -- ' + x
+                raise Exception
                 
-                if validate:
-                    
-                    raise CSVWError(message)
-                    
-                else:
-                    
-                    errors.append(message)
-                    warnings.warn(message)
-                    return string_value, 'string', errors
+            i+=1
+        
+        #
+        return zero_count,hash_count
                 
-        x=x.removeprefix('T')
+    #---
+    
+    if _print_intermediate_outputs: print('-pattern',pattern)
+    
+    # prefix
+    if pattern[0] in ['%','‰','\u2030']:
         
+        prefix=pattern[0]
+        pattern_no_prefix=pattern[1:]
         
-        #H
+    else:
         
-        if 'H' in x:
+        prefix=''
+        pattern_no_prefix=pattern
         
-            hour_string,_,x=x.partition('H')
-            
-            if hour_string:
-                
-                try:
-                    
-                    int(hour_string)
-                    
-                except ValueError:
-                    
-                    message=f'duration conversion error 7 - string value ="{string_value}"'
-                    
-                    if validate:
-                        
-                        raise CSVWError(message)
-                        
-                    else:
-                        
-                        errors.append(message)
-                        warnings.warn(message)
-                        return string_value, 'string', errors
+    #print('-prefix',prefix)
         
-
-        #M
-        if 'M' in x:
+    
+    # prefix_sign
+    if pattern_no_prefix[0] in ['+','-']:
         
-            minute_string,_,x=x.partition('M')
-            
-            if minute_string:
-                
-                try:
-                    
-                    int(minute_string)
-                    
-                except ValueError:
-                    
-                    message=f'duration conversion error 8 - string value ="{string_value}"'
-                    
-                    if validate:
-                        
-                        raise CSVWError(message)
-                        
-                    else:
-                        
-                        errors.append(message)
-                        warnings.warn(message)
-                        return string_value, 'string', errors
-        
-
-        #S
+        prefix_sign=pattern_no_prefix[0]
+        pattern_no_prefix_no_sign=pattern_no_prefix[1:]
         
-        if 'S' in x:
-            
-            second_string,_,x=x.partition('S')
-            
-            if second_string:
-                
-                try:
-                    
-                    int(second_string)
-                    
-                except ValueError:
-                    
-                    message=f'duration conversion error 9 - string value ="{string_value}"'
-                    
-                    if validate:
-                        
-                        raise CSVWError(message)
-                        
-                    else:
-                        
-                        errors.append(message)
-                        warnings.warn(message)
-                        return string_value, 'string', errors
-            
+    else:
         
-        #
-        return string_value, datatype['base'], errors
-
-
-    return parse_duration
-
-
-
+        prefix_sign=''
+        pattern_no_prefix_no_sign=pattern_no_prefix
     
-#%% 6.4.6 Formats for other types
-
-def get_parse_other_types_function(
-        datatype
-        ):
-    """
-    """
-    # If the datatype base is not numeric, boolean, a date/time type, 
-    # or a duration type, the datatype format annotation provides a 
-    # regular expression for the string values, with syntax and 
-    # processing defined by [ECMASCRIPT]. 
-    # If the supplied value is not a valid regular expression, 
-    # implementations must issue a warning and proceed as if no 
-    # format had been provided.
-
-    # NOTE
-    # Authors are encouraged to be conservative in the regular 
-    # expressions that they use, sticking to the basic features of 
-    # regular expressions that are likely to be supported across 
-    # implementations.
+        
+    # suffix
+    if pattern_no_prefix_no_sign[-1] in ['+','-','%','‰','\u2030']:
+        
+        suffix=pattern_no_prefix_no_sign[-1]
+        pattern_no_prefix_and_suffix=pattern_no_prefix_no_sign[:-1]
+        
+    else:
+        
+        suffix=''
+        pattern_no_prefix_and_suffix=pattern_no_prefix_no_sign
+        
+    #print('-suffix',suffix)
+    #print('-pattern_no_prefix_and_suffix',pattern_no_prefix_and_suffix)
     
-    # Values that are labelled as html, xml, or json should not be 
-    # validated against those formats.
+    #...check no invalid prefixes or suffixes remain
+    assert pattern_no_prefix_and_suffix[0] in ['#','0']
+    assert pattern_no_prefix_and_suffix[-1] in ['#','0']
     
-    # NOTE
-    # Metadata creators who wish to check the syntax of HTML, XML, 
-    # or JSON within tabular data should use the datatype format 
-    # annotation to specify a regular expression against which such 
-    # values will be tested.
     
-    if not datatype['base'] in ['html','xml','json'] and \
-        'format' in datatype:
-            
-        try:
-            
-            re.compile(datatype['format'])
-            
-            datatype2=dict(**datatype)
-            
-        except re.error:
-            
-            message='Property "format" with value "{datatype["format"]}" '
-            message+='is not a valid regular expression. '
-            message+='Property is removed. '
-            
-            warnings.warn(message)
-            
-            datatype2={k:v for k,v in datatype.items()
-                       if not k=='format'}
-            
-    else:
-        
-        datatype2=dict(**datatype)
+    # mantissa and exponent in scientific notation
+    mantissa_part, _, exponent_part_with_prefix=\
+        pattern_no_prefix_and_suffix.partition('E')
     
     
-    def parse_other_types(
-            string_value,
-            errors,
-            validate
-            ):
-        """
-        """
-        
-        json_value=string_value
+    # exponent_prefix
+    if exponent_part_with_prefix.startswith('+'):
         
-        value_type=datatype2['base']
+        exponent_prefix='+'
+        exponent_part=exponent_part_with_prefix[1:]
         
-        if not datatype2['base'] in ['html','xml','json'] and \
-            'format' in datatype2:
-            
-            regexp = re.compile(datatype2['format'])
-            
-            if not regexp.fullmatch(string_value):
-                
-                message=f'string_value "{string_value}" does not match '
-                message+=f'regular expression "{datatype["format"]}".'
-                
-                if validate:
-                    
-                    raise CSVWError(message)
-                    
-                else:
-                
-                    warnings.warn(message)
-                
-                    errors.append(message)
+    else:
         
-    
-        return json_value,value_type,errors
-
-
-    return parse_other_types
+        exponent_prefix=''
+        exponent_part=exponent_part_with_prefix
     
     
-#%% 6.6 Validating Tables
-
-    # Validators test whether given tabular data files adhere to the 
-    # structure defined within a schema. 
-    # Validators must raise errors (and halt processing) and issue warnings 
-    # (and continue processing) as defined in [tabular-metadata]. 
-    # In addition, validators must raise errors but may continue 
-    # validating in the following situations:
-
-    # - if the table description is not compatible with the embedded 
-    #   metadata extracted from the tabular data file, as defined in 
-    #   Table Compatibility in [tabular-metadata].
+    # integral and fractional parts
+    integral_part, _, fractional_part=\
+        mantissa_part.partition('.')
     
-    #... ALREADY DONE in compare_table_descriptions
     
-    # - if there is more than one row with the same primary key, that 
-    #   is where the cells listed for the primary key for the row have 
-    #   the same values as the cells listed for the primary key for another row,
+    # integral grouping size
+    reverse_integral_part=integral_part[::-1]
+    integral_part_primary_grouping_size=0
+    integral_part_secondary_grouping_size=0
     
-    #... ALREADY DONE in annotate_schema_dict
+    positions_of_group_char=[i for i, x 
+                             in enumerate(reverse_integral_part) 
+                             if x==',']
     
-    # - for each row that does not have a unique referenced row for each 
-    #   of the foreign keys on the table in which the row appears, or
+    if len(positions_of_group_char)==0:
+        
+        integral_part_primary_grouping_size=None
+        integral_part_secondary_grouping_size=None
     
-    #... ALREADY DONE in create_annotated_table_group
+    elif len(positions_of_group_char)==1:
         
-    # - for each error on each cell. 
+        integral_part_primary_grouping_size=positions_of_group_char[0]
+        integral_part_secondary_grouping_size=integral_part_primary_grouping_size 
+        
+    else:
+        
+        integral_part_primary_grouping_size=positions_of_group_char[0]
+        integral_part_secondary_grouping_size=\
+            positions_of_group_char[1]-positions_of_group_char[0]-1
+                
     
-    #... ALREADY DONE
+    # integral zeros and hashes
+    integral_part_zero_padding_count,\
+        integral_part_hash_padding_count=\
+            zero_and_hash_count(
+                    integral_part,
+                    mode='integral'
+                    )
+            
+    # fractional grouping size
+    positions_of_group_char=[i for i, x 
+                             in enumerate(fractional_part) 
+                             if x==',']
     
-
-def validate_annotated_table_dict(
-        annotated_table_dict,
-        embedded_metadata_dict
-        ):
-    """
-    """
-
+    if len(positions_of_group_char)==0:
+        
+        fractional_part_grouping_size=None
+        
+    elif len(positions_of_group_char)==1:
+        
+        fractional_part_grouping_size=positions_of_group_char[0]
+        
+    else:
+        
+        raise Exception
     
-
-
-#%% 8 - Parsing Tabular Data
-
-def parse_tabular_data_from_text(
-        tabular_data_file_url,
-        dialect_description_dict,
-        _print_intermediate_outputs=False
-        ):
-    """
-    """
     
-    comment_prefix=dialect_description_dict.get('commentPrefix',None)
-    delimiter=dialect_description_dict.get('delimiter',',')
-    encoding=dialect_description_dict.get('encoding','utf-8')
-    escape_character=dialect_description_dict.get('escapeCharacter','"')
-    header=dialect_description_dict.get('headerRowCount',True)
-    header_row_count=dialect_description_dict.get('headerRowCount',1 if header else 0)
-    line_terminators=dialect_description_dict.get('lineTerminators',['\r\n', '\n'])
-    quote_character=dialect_description_dict.get('quoteCharacter','"')
-    skip_blank_rows=dialect_description_dict.get('skipBlankRows',False)
-    skip_columns=dialect_description_dict.get('skipColumns',0)
-    skipInitialSpace=dialect_description_dict.get('skipInitialSpace',False)
-    skip_rows=dialect_description_dict.get('skipRows',0)
-    trim=dialect_description_dict.get('trim',True)  # one of True, False, "true", "false", "start", "end"
+    # fractional zeros and hashes
+    fractional_part_zero_padding_count,\
+        fractional_part_hash_padding_count=\
+            zero_and_hash_count(
+                    fractional_part,
+                    mode='fractional'
+                    )
     
-    #...skipInitialSpace is ignored as there is a contradiction here
-    #...if the trim property has a default of True, then this always overrides
-    #...the skipInitialSpace property
     
-    # skipInitialSpace
-    # A boolean atomic property that, if true, sets the trim flag to "start" 
-    # and if false, to false. If the trim property is provided, the 
-    # skipInitialSpace property is ignored. The default is false.
-    # if trim is None:
+    # exponent zeros and hashes
+    exponent_part_zero_padding_count,\
+        exponent_part_hash_padding_count=\
+            zero_and_hash_count(
+                    exponent_part,
+                    mode='integral'
+                    )
+    
+    return dict(
+        pattern=pattern,
+        prefix=\
+            prefix,
+        prefix_sign=\
+            prefix_sign,
+        suffix=\
+            suffix,
+        mantissa_part=\
+            mantissa_part,
+        integral_part=\
+            integral_part,
+        integral_part_primary_grouping_size=\
+            integral_part_primary_grouping_size,
+        integral_part_secondary_grouping_size=\
+            integral_part_secondary_grouping_size,
+        integral_part_zero_padding_count=\
+            integral_part_zero_padding_count,
+        integral_part_hash_padding_count=\
+            integral_part_hash_padding_count,
+        fractional_part=\
+            fractional_part,
+        fractional_part_grouping_size=\
+            fractional_part_grouping_size,
+        fractional_part_zero_padding_count=\
+            fractional_part_zero_padding_count,
+        fractional_part_hash_padding_count=\
+            fractional_part_hash_padding_count,
+        exponent_prefix=\
+            exponent_prefix,
+        exponent_part=\
+            exponent_part,
+        exponent_part_zero_padding_count=\
+            exponent_part_zero_padding_count,
+        exponent_part_hash_padding_count=\
+            exponent_part_hash_padding_count
+            )
         
-    #     if skipInitialSpace:
-            
-    #         trim='start'
-            
-    #     else:
-            
-    #         trim=False
-            
-    # print('trim',trim)
     
+def get_LDML_number_pattern_regex(
+        pattern_dict,
+        decimal_char,
+        group_char
+        ):
+    """Returns a regular expression which matches the string values which 
+    are valid for a number format pattern.
     
-                
-    #print('dialect_description_obj_dict',dialect_description_obj_dict)
-    #print('header_row_count',header_row_count)
+    A string value matches the regular expression if and only if 
+    validate_LDML_number returns True for it, so most string values can be 
+    checked with a single match.
+    
+    :param pattern_dict: A number format pattern as returned by 
+        parse_LDML_number_pattern.
+    :type pattern_dict: dict
+    
+    :returns: The compiled regular expression, or None if the decimalChar, 
+        groupChar or grouping sizes are not supported.
+    
+    """
+    special_characters='0123456789+-E%\u2030'
+    
+    if not isinstance(decimal_char,str) \
+        or not len(decimal_char)==1 \
+        or decimal_char in special_characters:
             
-    # The algorithm for using these flags to parse a document containing 
-    # tabular data to create a basic annotated tabular data model and to 
-    # extract embedded metadata is as follows:
+        return None
+        
+    if not group_char is None:
+        
+        if not isinstance(group_char,str) \
+            or not len(group_char)==1 \
+            or group_char in special_characters \
+            or group_char==decimal_char:
+                
+            return None
+        
+    gs1=pattern_dict['integral_part_primary_grouping_size']
+    gs2=pattern_dict['integral_part_secondary_grouping_size']
     
-    # 1. Create a new table T with the annotations:
-    #    - columns set to an empty list
-    #    - rows set to an empty list
-    #    - id set to null
-    #    - url set to the location of the file, if known, or null
-    #    - table direction set to auto
-    #    - suppress output set to false
-    #    - notes set to false
-    #    - foreign keys set to an empty list
-    #    - transformations set to an empty list    
+    if not gs1 is None and (gs1<1 or gs2<1):
+        
+        return None
     
-    table_dict=dict(
-        columns=[],
-        rows=[],
-        id=None,
-        url=tabular_data_file_url,
-        tableDirection='auto',
-        suppressOutput=False,
-        notes=[],  # not False as stated in the standard
-        foreignKeys=[],
-        transformations=[]       
-        )
+    D=re.escape(decimal_char)
     
     
-    # 2. Create a metadata document structure M that looks like:
-    #    {
-    #      "@context": "http://www.w3.org/ns/csvw",
-    #      "rdfs:comment": []
-    #      "tableSchema": {
-    #        "columns": []
-    #      }
-    #    }
-
-    metadata_table_dict={
-        "@context": "http://www.w3.org/ns/csvw",
-        "rdfs:comment": [],
-        "tableSchema": {
-            "columns": []
-            }
-      }
+    # prefix
+    prefix=re.escape(pattern_dict['prefix'])
     
-
-    # 3. If the URL of the tabular data file being parsed is known, set the 
-    #    url property on M to that URL.
     
-    if not tabular_data_file_url is None:
-        metadata_table_dict['url']=tabular_data_file_url
-
-
-    # 4. Set source row number to 1.
-    source_row_number=1
+    # prefix sign
+    if pattern_dict['prefix_sign']:
+        
+        prefix_sign=re.escape(pattern_dict['prefix_sign'])
+        
+    else:
+        
+        prefix_sign='[+-]?'
+        
+        
+    # integral part, with the zero padding checked by a lookahead
+    izp=pattern_dict['integral_part_zero_padding_count']
     
+    if gs1 is None:
+        
+        integral_part=f'(?=[0-9]{{{izp}}})[0-9]+'
+        
+    elif group_char is None:
+        
+        #...group characters are not allowed, so there can only be one group
+        integral_part=f'(?=[0-9]{{{izp}}})[0-9]{{1,{gs1}}}'
+        
+    else:
+        
+        G=re.escape(group_char)
+        
+        #...groups of gs2 digits and a final group of gs1 digits
+        integral_part=f'(?=(?:[0-9]{G}?){{{izp}}})'
+        integral_part+=f'(?:[0-9]{{1,{gs2}}}(?:{G}[0-9]{{{gs2}}})*{G}[0-9]{{{gs1}}}'
+        integral_part+=f'|[0-9]{{1,{gs1}}})'
+        
+        
+    # fractional part, where group characters may be anywhere
+    fzp=pattern_dict['fractional_part_zero_padding_count']
+    fhp=pattern_dict['fractional_part_hash_padding_count']
     
-    # 5. Read the file using the encoding, as specified in [encoding], using 
-    #    the replacement error mode. If the encoding is not a Unicode encoding, 
-    #    use a normalizing transcoder to normalize into Unicode Normal Form C 
-    #    as defined in [UAX15].
+    if group_char is None:
+        
+        fractional_part=f'[0-9]{{{fzp},{fzp+fhp}}}'
+        
+    else:
+        
+        G=re.escape(group_char)
+        
+        fractional_part=f'{G}*(?:[0-9]{G}*){{{fzp},{fzp+fhp}}}'
+        
+    fractional_part=f'(?:{D}{fractional_part})'
     
-    #...remove fragments and queries from tabular_data_file_url
-    url=urllib.parse.urljoin(tabular_data_file_url, 
-                         urllib.parse.urlparse(tabular_data_file_url).path)
+    if fzp==0:
+        
+        fractional_part+='?'
+        
+        
+    # exponent, where the zero padding count includes the sign
+    ezp=pattern_dict['exponent_part_zero_padding_count']
     
-    with urllib.request.urlopen(url) as response:
+    if pattern_dict['exponent_prefix']=='+':
+        
+        exponent_sign='[+-]'
+        
+    else:
+        
+        exponent_sign='-'
+        
+    exponent_part=f'(?:E(?:{exponent_sign}[0-9]{{{max(ezp-1,1)},}}'
+    exponent_part+=f'|[0-9]{{{max(ezp,1)},}}))'
     
-        tabular_data_file_text=response.read().decode(encoding)
+    if ezp==0:
+        
+        exponent_part+='?'
+        
+        
+    # suffix, which is not checked against the pattern
+    suffix='[%\u2030]?'
     
+    #...the number must end with a digit
+    return re.compile(
+        prefix
+        + prefix_sign
+        + integral_part
+        + fractional_part
+        + exponent_part
+        + '(?<=[0-9])'
+        + suffix
+        )
     
-    if _print_intermediate_outputs: print('-tabular_data_file_text',tabular_data_file_text)
     
-            
-    #...
-    character_index=0  # index for processing each character in the file
+def validate_LDML_number(
+        string_value,
+        errors,
+        pattern_dict,
+        decimal_char,
+        group_char,
+        warn=warnings.warn
+        ):
+    """
     
+    :returns: True if valid; otherwise False
     
-    # 6. Repeat the following the number of times indicated by skip rows:
+    """
+    #...most string values are checked with the regular expression of the 
+    #...pattern, and the steps below are used for the others so that the 
+    #...same errors and warnings are given
+    regex=pattern_dict.get('regex')
     
-    for _ in range(skip_rows): 
+    if not regex is None and regex.fullmatch(string_value):
         
-        #...for testing
-        #print('-source_row_number',source_row_number)
-        
-        #print(_)
+        return True
+    
+    try:
         
-        # 6.1 Read a row to provide the row content.
-        character_index, row_content=\
-            get_row_content(
-                tabular_data_file_text,
-                character_index,
-                escape_character,
-                quote_character,
-                line_terminators
+        prefix, integral_sign, integral_part, fractional_part, exponent_sign, exponent_part, suffix=\
+            parse_LDML_number(
+                string_value,
+                errors,
+                decimal_char,
+                group_char
                 )
             
-        #print(character_index)
-        #print(row_content)
+    except ValueError:
         
-        # 6.2 If the comment prefix is not null and the row content begins 
-        # with the comment prefix, strip that prefix from the row content, 
-        # and add the resulting string to the M.rdfs:comment array.
-        if not comment_prefix is None \
-            and row_content.startswith(comment_prefix):
-                
-            metadata_table_dict['rdfs:comment'].append(
-                row_content[len(comment_prefix):]
-                )
+        return False
         
-        # 6.3 Otherwise, if the row content is not an empty string, add the 
-        # row content to the M.rdfs:comment array.
-        elif not row_content=='':
-            metadata_table_dict['rdfs:comment'].append(
-                row_content
-                )
+    #print((prefix, integral_sign, integral_part, fractional_part, exponent_sign, exponent_part, suffix))
     
-        # 6.4 Add 1 to the source row number.
-        source_row_number+=1
+    #print(pattern_dict)
         
-    # 7 Repeat the following the number of times indicated by header row count:
+    
+    # prefix
+    if not prefix==pattern_dict['prefix']:
+            
+        message='prefix'
         
-    for _ in range(header_row_count):
+        warn(message)
         
-        #...for testing
-        #print('-source_row_number',source_row_number)
+        return False
+            
+    
+    # prefix sign
+    if pattern_dict['prefix_sign']:
         
-        # 7.1 Read a row to provide the row content.
-        character_index, row_content=\
-            get_row_content(
-                tabular_data_file_text,
-                character_index,
-                escape_character,
-                quote_character,
-                line_terminators
-                )
-        
-        # 7.2 If the comment prefix is not null and the row content begins 
-        # with the comment prefix, strip that prefix from the row content, 
-        # and add the resulting string to the M.rdfs:comment array.
-        if not comment_prefix is None \
-            and row_content.startswith(comment_prefix):
-                
-            metadata_table_dict['rdfs:comment'].append(
-                row_content[len(comment_prefix):]
-                )
-                
-        # 7.3 Otherwise, parse the row to provide a list of cell values, and:
-        else:
+        if not integral_sign==pattern_dict['prefix_sign']:
             
-            list_of_cell_values=\
-                get_list_of_cell_values(
-                    row_content,
-                    escape_character,
-                    quote_character,
-                    delimiter,
-                    trim
-                    )
+            message='prefix sign'
             
-            # 7.3.1 Remove the first skip columns number of values from the 
-            # list of cell values.
-            list_of_cell_values_non_skipped=list_of_cell_values[skip_columns:]
+            warn(message)
             
-            # 7.3.2 For each of the remaining values at index i in the list 
-            # of cell values:
+            return False
+    
+    
+    
+    # integral_part
+    if not group_char is None:
+        
+        x=integral_part.replace(group_char,'')
+        
+    else:
+    
+        x=integral_part
+    
+    if len(x)<pattern_dict['integral_part_zero_padding_count']:
+        
+        message='integral part zero padding'
+        
+        warn(message)
+        
+        return False
+    
+    # integral part group sizes
+    
+    #print(pattern_dict['integral_part_primary_grouping_size'])
+    #print(pattern_dict['integral_part_secondary_grouping_size'])
+    
+    x=integral_part[::-1]
+    
+    # positions_of_group_char=[i for i, y 
+    #                          in enumerate(x) 
+    #                          if y==(group_char or ',')]
+    
+    # print(positions_of_group_char)
+    
+    i=0
+    gs1=pattern_dict['integral_part_primary_grouping_size']
+    gs2=pattern_dict['integral_part_secondary_grouping_size']
+    
+    while i<len(x):
+        
+        #print('i',i, 'x[i]', x[i], 'gs1', gs1, 'gs2', gs2, '(i-gs1)%(gs2+1)', (i-gs1)%(gs2+1) if gs1 else '')
+        
+        if not gs1 is None and i==gs1:
+            
+            if not x[i]==(group_char or ','):
                 
-            # sets up the metatdata column description objects
-            if len(metadata_table_dict['tableSchema']['columns'])==0:
+                message='integral part primary grouping size #1'
                 
-                metadata_table_dict['tableSchema']['columns']=\
-                    [{'titles':[]} 
-                     for x in range(len(list_of_cell_values_non_skipped))]
+                #print(message)
+                            
+                warn(message)
                 
-            for i, value in enumerate(list_of_cell_values_non_skipped):
+                return False
+        
+        elif not gs1 is None and not gs2 is None and i>gs1 and \
+            (i-gs1)%(gs2+1)==0:  # changed from (gs1-i)%gs2==0:
                 
-                # 7.3.2.1 If the value at index i in the list of cell values 
-                # is an empty string or consists only of whitespace, do nothing.
-                if value.strip()=='':
-                    continue
+            if not x[i]==(group_char or ','):
                 
-                # 7.3.2.2 Otherwise, if there is no column description object 
-                # at index i in M.tableSchema.columns, create a new one with 
-                # a title property whose value is an array containing a single 
-                # value that is the value at index i in the list of cell values.
-                # AND
-                # 7.3.2.3 Otherwise, add the value at index i in the list of 
-                # cell values to the array at M.tableSchema.columns[i].titles.
-                metadata_table_dict['tableSchema']['columns'][i]['titles'].append(
-                    value
-                    )
+                #print('x',x)
                 
-        # 7.4 Add 1 to the source row number.
-        source_row_number+=1
-            
+                message='integral part primary grouping size #2'
                 
-    # 8 If header row count is zero, create an empty column description object 
-    # in M.tableSchema.columns for each column in the current row after skip 
-    # columns.
+                #print(message)
+                            
+                warn(message)
+                
+                return False
+            
+        elif x[i]==(group_char or ','):
     
-    if header_row_count==0 or len(metadata_table_dict['tableSchema']['columns'])==0:
-        
-        original_character_index=character_index
-        
-        while True: # loops until a non-comment row is found
-            character_index, row_content=\
-                get_row_content(
-                    tabular_data_file_text,
-                    character_index,
-                    escape_character,
-                    quote_character,
-                    line_terminators
-                    )
-            if comment_prefix is None \
-                or not row_content.startswith(comment_prefix):
-                    break
+            message='integral part primary grouping size #3'
             
-        list_of_cell_values=\
-            get_list_of_cell_values(
-                row_content,
-                escape_character,
-                quote_character,
-                delimiter,
-                trim
-                )
+            #print(message)
+                        
+            warn(message)
             
-        list_of_cell_values_non_skipped=list_of_cell_values[skip_columns:]
+            return False
+    
+        i+=1
+    
+    
+    # if not pattern_dict['integral_part_primary_grouping_size'] is None:
         
-        metadata_table_dict['tableSchema']['columns']=\
-            [{'@type':'Column'} 
-             for x in range(len(list_of_cell_values_non_skipped))]
+    #     try:
             
-        character_index=original_character_index
+    #         if not x[pattern_dict['integral_part_primary_grouping_size']]\
+    #             ==(group_char or ','):
+                
+    #             message='integral part primary grouping size'
+                
+    #             warn(message)
+                
+    #             return False
+    
+    #     except IndexError:
             
+    #         pass
+    
+    
+    
+    
+    
+    
+    
+    
+    
+    
+    
         
-                
-    # 9 Set row number to 1.
-    row_number=1
+    # fractional_part
     
-    # 10 While it is possible to read another row, do the following:
+    if not group_char is None:
+        
+        x=fractional_part.replace(group_char,'')
+        
+    else:
     
-    while True:
+        x=fractional_part
+    
+    if len(x)<pattern_dict['fractional_part_zero_padding_count']:
         
-        #...for testing
-        #if row_number%1000==0:
-        #print('-row_number',row_number)
+        message='fractional part zero padding'
         
+        warn(message)
         
-        if character_index>len(tabular_data_file_text)-1:
-            break
+        return False
         
-        # 10.1 Set the source column number to 1.
-        source_column_number=1
+    if len(x)> \
+        pattern_dict['fractional_part_zero_padding_count']\
+            + pattern_dict['fractional_part_hash_padding_count']:
         
-        # 10.2 Read a row to provide the row content.
-        character_index, row_content=\
-            get_row_content(
-                tabular_data_file_text,
-                character_index,
-                escape_character,
-                quote_character,
-                line_terminators
-                )
+        message='fractional part hash padding'
         
-        # 10.3 If the comment prefix is not null and the row content begins 
-        # with the comment prefix, strip that prefix from the row content, 
-        # and add the resulting string to the M.rdfs:comment array.
-        if not comment_prefix is None \
-            and row_content.startswith(comment_prefix):
-                
-            metadata_table_dict['rdfs:comment'].append(
-                row_content[len(comment_prefix):]
-                )
+        warn(message)
         
-        else:
+        return False
+    
+    
+    # exponent prefix
+    if exponent_sign=='+':
+        
+        if not pattern_dict['exponent_prefix']=='+':
             
-            # 10.4 Otherwise, parse the row to provide a list of cell values, and:
-            list_of_cell_values=\
-                get_list_of_cell_values(
-                    row_content,
-                    escape_character,
-                    quote_character,
-                    delimiter,
-                    trim
-                    )
+            message='exponent prefix'
             
-            # 10.4.1 If all of the values in the list of cell values are empty 
-            # strings, and skip blank rows is true, add 1 to the source row 
-            # number and move on to process the next row.
-            if all(x=='' for x in list_of_cell_values) and skip_blank_rows==True:
-                pass
-                
-            # 10.4.2 Otherwise, create a new row R, with:
-            # table set to T
-            # number set to row number
-            # source number set to source row number
-            # primary key set to an empty list
-            # referenced rows set to an empty list
-            # cells set to an empty list
-            else:
-                row_dict=dict(
-                    table=table_dict, 
-                    number=row_number,
-                    sourceNumber=source_row_number,
-                    primaryKey=[],
-                    referencedRows=[],
-                    cells=[],
-                    titles=[]
-                    )
-                
-            # 10.4.3 Append R to the rows of table T.
-            table_dict['rows'].append(row_dict)
+            warn(message)
             
-            # 10.4.4 Remove the first skip columns number of values from the 
-            # list of cell values and add that number to the source column number.
-            list_of_cell_values_non_skipped=list_of_cell_values[skip_columns:]
-
-            source_column_number+=skip_columns
+            return False
+        
+    
+    # exponent part
+    
+    if not group_char is None:
+        
+        x=exponent_part.replace(group_char,'')
+        
+    else:
+    
+        x=exponent_part
+    
+    if len(x)<pattern_dict['exponent_part_zero_padding_count']:
+        
+        message='exponent part'
+        
+        warn(message)
+        
+        return False
+    
+    
+    #
+    return True
+    
+    
+def parse_LDML_number(
+        string_value,
+        errors,
+        decimal_char,
+        group_char,
+        _print_intermediate_outputs=False
+        ):
+    """
+    
+    :returns: (prefix, 
+              integral_sign,
+            integral_part, 
+            fractional_part, 
+            exponent_prefix, 
+            exponent_part, 
+            suffix)
+    
+    
+    """
+    
+    # prefix
+    if string_value[0] in ['%','‰','\u2030']:
+        
+        prefix=string_value[0]
+        string_value_no_prefix=string_value[1:]
+        
+    else:
+        
+        prefix=''
+        string_value_no_prefix=string_value
+        
+    #print('-prefix',prefix)
+    #print('-string_value_no_prefix',string_value_no_prefix)
+        
+        
+    # integral sign
+    if string_value_no_prefix[0] in ['+','-']:
+        
+        integral_sign=string_value_no_prefix[0]
+        string_value_no_prefix_no_sign=string_value_no_prefix[1:]
+        
+    else:
+        
+        integral_sign=''
+        string_value_no_prefix_no_sign=string_value_no_prefix
+    
+        
+    # suffix
+    if string_value_no_prefix_no_sign[-1] in ['%','‰','\u2030']:
+        
+        suffix=string_value_no_prefix_no_sign[-1]
+        string_value_no_prefix_no_sign_no_suffix=string_value_no_prefix_no_sign[:-1]
+        
+    else:
+        
+        suffix=''
+        string_value_no_prefix_no_sign_no_suffix=string_value_no_prefix_no_sign
+    
+    if _print_intermediate_outputs: print('-string_value_no_prefix_no_sign_no_suffix',string_value_no_prefix_no_sign_no_suffix)
+    
+    #...check start
+    if not string_value_no_prefix_no_sign_no_suffix[0] in ['0','1','2','3','4','5','6','7','8','9']:
+        
+        message='start does not contain a number or sign'
             
-            # 10.4.5 For each of the remaining values at index i in the list 
-            # of cell values (where i starts at 1):
-            for i, value in enumerate(list_of_cell_values_non_skipped):
-                
-                # 10.4.5.1 Identify the column C at index i within the columns 
-                # of table T. If there is no such column:
-                    
-                try:
-                    column_dict=table_dict['columns'][i]
+        errors.append(message)
+            
+        raise ValueError
+        
+        
+    #...check end
+    if not string_value_no_prefix_no_sign_no_suffix[-1] in ['0','1','2','3','4','5','6','7','8','9']:
+        
+        message='end does not contain a number'
+            
+        errors.append(message)
+            
+        raise ValueError
+    
+    
+    # mantissa and exponent in scientific notation
+    mantissa_part, _, exponent_part=\
+        string_value_no_prefix_no_sign_no_suffix.partition('E')
+    
+    
+    # integral and fractional parts
+    integral_part, _, fractional_part=\
+        mantissa_part.partition(decimal_char)
+        
+    #print('-integral_part',integral_part)
+        
+        
+    # exponent sign
+    if exponent_part and exponent_part[0] in ['+','-']:
+        
+        exponent_sign=exponent_part[0]
+        exponent_part_no_sign=exponent_part[1:]
+        
+    else:
+        
+        exponent_sign=''
+        exponent_part_no_sign=exponent_part
+        
+        
+    #...check integral part
+    for x in integral_part:
+        
+        if not x in ['0','1','2','3','4','5','6','7','8','9',group_char]:
+            
+            message='error in integral part'
+            
+            errors.append(message)
+            
+            raise ValueError
+        
+        
+    #...check fractional part
+    for x in fractional_part:
+        
+        if not x in ['0','1','2','3','4','5','6','7','8','9',group_char]:
+            
+            message='error in fractional part'
+            
+            errors.append(message)
+            
+            raise ValueError
+        
+        
+    #...check exponent part
+    for x in exponent_part_no_sign:
+        
+        if not x in ['0','1','2','3','4','5','6','7','8','9']:
+            
+            message='error in exponent part'
+            
+            errors.append(message)
+            
+            raise ValueError
+        
+    
+    #
+    return (prefix, 
+            integral_sign,
+            integral_part, 
+            fractional_part, 
+            exponent_sign, 
+            exponent_part, 
+            suffix)
+    
+    
+    
+            
+    
+        
+        
+
+#%% 6.4.3 Formats for booleans
+
+def get_parse_boolean_function(
+        datatype,
+        warn=warnings.warn
+        ):
+    """
+    """
+    # Boolean values may be represented in many ways aside from the standard 
+    # 1 and 0 or true and false.
+    
+    # If the datatype base for a cell is boolean, the datatype format 
+    # annotation provides the true value followed by the false value, 
+    # separated by |. 
+    # For example if format is Y|N then cells must hold either Y or N with 
+    # Y meaning true and N meaning false. 
+    # If the format does not follow this syntax, implementations must 
+    # issue a warning and proceed as if no format had been provided.
+    
+    # The resulting cell value will be one or more boolean true or false values.
+    
+    datatype_base=datatype['base']
+    
+    datatype_format=datatype.get('format')
+    
+    true_values=['1','true']
+    
+    false_values=['0','false']
+
+    
+    #
+    if isinstance(datatype_format,str):
+    
+        x=datatype_format.split('|')
+        
+        if not len(x)==2:
+            
+            message='Boolean format "{datatype_format}" must contain exactly one "|" character.'
+            
+            warnings.warn(message)
+            
+    
+        elif x[0]==x[1]:
                 
-                except IndexError:
+            message='Boolean format "{datatype_format}" must contain different string values for true and false. '
+            
+            warnings.warn(message)
                     
-                    # 10.4.5.1.1 Create a new column C with:
-                    # table set to T
-                    # number set to i
-                    # source number set to source column number
-                    # name set to null
-                    # titles set to an empty list
-                    # virtual set to false
-                    # suppress output set to false
-                    # datatype set to string
-                    # default set to an empty string
-                    # lang set to und
-                    # null set to an empty string
-                    # ordered set to false
-                    # required set to false
-                    # separator set to null
-                    # text direction set to auto
-                    # about URL set to null
-                    # property URL set to null
-                    # value URL set to null
-                    # cells set to an empty list
+        else:
+            
+            true_values=[x[0]]
+            
+            false_values=[x[1]]
+            
+    else:
+        
+        message='Boolean format "{datatype_format}" must be a string.'
+        
+        warnings.warn(message)
+            
+            
+    #print('-true_values',true_values)
+    #print('-false_values',false_values)
+
+
+    def parse_boolean(
+            string_value,
+            errors,
+            validate
+            ):
+        """
+        """
+        if string_value in true_values:
+            
+            json_value=True
+            
+        elif string_value in false_values:
+            
+            json_value=False
+            
+        else:
+            
+            message=f'Boolean value "{string_value}" does not match either '
+            message+=f'the true values "{true_values}" '
+            message+=f'or false values "{false_values}". '
+            message+='Boolean value is not converted to boolean, string value returned.'
+            
+            if validate:
                 
-                    column_dict=dict(
-                        table=table_dict, #table_name,
-                        number=i+1,
-                        sourceNumber=source_column_number,
-                        name=None,
-                        titles=[],
-                        virtual=False,
-                        suppressOutput=False,
-                        datatype={'base':'string'}, 
-                        default='',
-                        lang='und',
-                        null='',
-                        ordered=False,
-                        required=False,
-                        separator=None,
-                        textDirection='auto',
-                        aboutURL=None,
-                        propertyURL=None,
-                        valueURL=None,
-                        cells=[]
-                        )
+                raise CSVWError(message)
+            
+            else:
+            
+                errors.append(message)
                 
-                    # 10.4.5.1.2 Append C to the columns of table T (at index i).
-                    table_dict['columns'].append(column_dict)
-                    
-                # 10.4.5.2 Create a new cell D, with:
-                # table set to T
-                # column set to C
-                # row set to R
-                # string value set to the value at index i in the list of cell values
-                # value set to the value at index i in the list of cell values
-                # errors set to an empty list
-                # text direction set to auto
-                # ordered set to false
-                # about URL set to null
-                # property URL set to null
-                # value URL set to null
+                warn(message)
                 
-                cell_dict=dict(
-                    table=table_dict, 
-                    column=column_dict, 
-                    row=row_dict, 
-                    stringValue=value,
-                    value=None,   #...this is done later after the annotations from the metadata have been applied
-                    errors=[],
-                    textDirection='auto',
-                    ordered=False,
-                    aboutURL=None,
-                    propertyURL=None,
-                    valueURL=None
-                    )
+                return string_value, 'string', errors
+        
+        
+        #
+        return json_value, datatype_base, errors
+        
+        
+        
+          
+    return parse_boolean
+      
+ 
+#%% 6.4.4. Formats for dates and times
+
+def get_timezone_format(
+        datatype_format
+        ):
+    """
+    """
+    x=datatype_format#  .strip()
+    
+    if x.endswith('XXX'):
+        
+        timezone_format='XXX'
+        
+    elif x.endswith('XX'):
+        
+        timezone_format='XX'
+        
+    elif x.endswith('X'):
+        
+        timezone_format='X'
+        
+    elif x.endswith('xxx'):
+        
+        timezone_format='xxx'
+        
+    elif x.endswith('xx'):
+        
+        timezone_format='xx'
+        
+    elif x.endswith('x'):
+        
+        timezone_format='x'
+        
+    else:
+        
+        timezone_format=None
+        timezone_gap=None
+    
+    #
+    if not timezone_format is None:
+        
+        x=len(timezone_format)
+        
+        if datatype_format[-x-1]==' ':
+            
+            timezone_gap=' '
+            
+        else:
+            
+            timezone_gap=''
+    
+    #
+    return timezone_format,timezone_gap
+
+
+def get_timezone_string(
+        string_value,
+        timezone_format
+        ):
+    """
+    """
+    x=string_value#  .strip()
+    
+    if timezone_format is None:
+    
+        if x.endswith('Z'):
+            
+            return 'Z'
+        
+        elif len(x)>5 and x[-3]==':' and x[-6] in ['+','-']:
+        
+            return x[-6:]
+        
+        else:
+            
+            return ''
+    
+    
+    else:
+    
+        if timezone_format=='':
+            
+            return ''
+        
+        
+        elif timezone_format=='X':
+            
+            if string_value.endswith('Z'):
                 
-                # 10.4.5.3 Append cell D to the cells of column C.
-                column_dict['cells'].append(cell_dict)
+                return 'Z'
+        
+            elif x[-3] in ['+','-']:
                 
-                # 10.4.5.4 Append cell D to the cells of row R (at index i).
-                row_dict['cells'].append(cell_dict)  
-                    # NOTE THAT cell_dict NOW IS STORED IN BOTH column_dict 
-                    # AND row_dict 
+                return x[-3:]
+            
+            elif x[-5] in ['+','-']:
                 
-                # 10.4.5.5 Add 1 to the source column number.
-                source_column_number+=1
+                return x[-5:]
+            
+            else:
                 
-        # 10.5 Add 1 to the source row number.
-        source_row_number+=1
-        row_number+=1  # I also added this to increment the row_number
+                raise ValueError
+            
+    
+        elif timezone_format=='XX':
+            
+            if string_value.endswith('Z'):
+                
+                return 'Z'
+        
+            elif x[-5] in ['+','-']:
+                
+                return x[-5:]
+            
+            else:
+                
+                raise ValueError
+        
+        
+        elif timezone_format=='XXX':
+            
+            if string_value.endswith('Z'):
+                
+                return 'Z'
+        
+            elif x[-6] in ['+','-']:
+                
+                return x[-6:]
+            
+            else:
+                
+                raise ValueError
+                
+        
+        elif timezone_format=='x':
+            
+            if x[-3] in ['+','-']:
+                
+                return x[-3:]
+            
+            elif x[-5] in ['+','-']:
+                
+                return x[-5:]
+            
+            else:
+                
+                raise ValueError
+                
+        
+        elif timezone_format=='xx':
+            
+            if x[-5] in ['+','-']:
+                
+                return x[-5:]
+            
+            else:
+                
+                raise ValueError
+        
+        
+        elif timezone_format=='xxx':
+            
+            if x[-6] in ['+','-']:
+                
+                return x[-6:]
+            
+            else:
+                
+                raise ValueError
+        
+        
+        else:
+            
+            raise Exception
+        
+
+@functools.lru_cache(maxsize=1024)
+def parse_timezone_string(
+        timezone_string
+        ):
+    """Returns the timezone in its XSD form, such as '+05:30'.
+    
+    A column usually has only a few different timezones, so the results 
+    are cached.
+    
+    :raises ValueError: If the timezone string is not valid.
+    
+    """
+    
+    if timezone_string=='':
+        
+        return ''
+    
+    elif timezone_string=='Z':
+        
+        return 'Z'
+    
+    elif len(timezone_string)==3:
+        
+        sign=timezone_string[0]
+        hours=int(timezone_string[1:])
+        minutes=0
+        
+    elif len(timezone_string)==5:
+        
+        sign=timezone_string[0]
+        hours=int(timezone_string[1:3])
+        minutes=int(timezone_string[3:])
+        
+    elif len(timezone_string)==6:
+        
+        sign=timezone_string[0]
+        hours=int(timezone_string[1:3])
+        minutes=int(timezone_string[4:])
+        
+    else:
+        
+        raise ValueError
+    
+    #    
+    if not sign in ['+','-']:
+        
+        raise ValueError
+        
+    if hours<0 or hours>23:
+        
+        raise ValueError
+        
+    if minutes<0 or minutes>59:
+        
+        raise ValueError
+        
+    return f'{sign}{hours:02}:{minutes:02}'
+
+
+def get_parse_date_string_function(
+        date_format
+        ):
+    """Returns a function which parses a date string in one of the supported 
+    date formats using a compiled regular expression.
+    
+    This is used for the date strings which are in the usual form for the 
+    format. 
+    Other date strings are left to the steps in get_parse_date_function, 
+    which give the errors and warnings.
+    
+    :param date_format: One of the date format patterns listed in 
+        get_parse_date_function, such as 'yyyy-MM-dd'.
+    :type date_format: str
+    
+    :returns: A function with argument (date_string) which returns a 
+        datetime.date object, or None if the date string is not parsed.
+    
+    """
+    code_regexes={
+        'yyyy':'([0-9]{4})',
+        'MM':'([0-9]{2})',
+        'dd':'([0-9]{2})',
+        'M':'([0-9]|[1-9][0-9])',  # no leading zero
+        'd':'([0-9]|[1-9][0-9])'
+        }
+    
+    if date_format=='yyyyMMdd':
+        
+        codes=['yyyy','MM','dd']
+        separator=''
+        
+    else:
+        
+        separator=[x for x in '-/.' if x in date_format][0]
+        codes=date_format.split(separator)
+        
+    regex=re.compile(re.escape(separator).join(code_regexes[x] for x in codes))
+    
+    #...the positions of the year, month and day in the date string
+    year_index=[i for i,x in enumerate(codes) if x=='yyyy'][0]+1
+    month_index=[i for i,x in enumerate(codes) if x in ['MM','M']][0]+1
+    day_index=[i for i,x in enumerate(codes) if x in ['dd','d']][0]+1
+    
+    def parse_date_string(
+            date_string
+            ):
+        ""
+        
+        match=regex.fullmatch(date_string)
+        
+        if match is None:
+            
+            return None
+        
+        year,month,day=match.group(year_index,month_index,day_index)
+        
+        try:
+            
+            return datetime.date(int(year),int(month),int(day))
+        
+        except ValueError:
+            
+            return None
+        
+    return parse_date_string
+    
+    
+def get_parse_time_string_function(
+        main_time_format,
+        fractional_time_format
+        ):
+    """Returns a function which parses a time string in one of the supported 
+    time formats using a compiled regular expression.
+    
+    This is used for the time strings which are in the usual form for the 
+    format. 
+    Other time strings are left to the steps in get_parse_time_function, 
+    which give the errors and warnings.
+    
+    :param main_time_format: One of 'HH:mm:ss', 'HHmmss', 'HH:mm' or 'HHmm'.
+    :type main_time_format: str
+    
+    :param fractional_time_format: The fractional seconds part of the time 
+        format, such as 'SSS', or an empty string.
+    :type fractional_time_format: str
+    
+    :returns: A function with argument (time_string) which returns the 
+        time in the format given by get_parse_time_function, or None if the 
+        time string is not parsed.
+    
+    """
+    regex=main_time_format.replace('HH','([0-9]{2})')\
+        .replace('mm','([0-9]{2})')\
+        .replace('ss','([0-9]{2})')
+    
+    if fractional_time_format:
+        
+        regex+=f'(?:\\.([0-9]{{0,{len(fractional_time_format)}}}))?'
+        
+    regex=re.compile(regex)
+    
+    has_seconds='ss' in main_time_format
+    
+    #...the group of the fractional seconds
+    fraction_index=4 if has_seconds else 3
+    
+    def parse_time_string(
+            time_string
+            ):
+        ""
+        
+        match=regex.fullmatch(time_string)
+        
+        if match is None:
+            
+            return None
+        
+        hour=int(match.group(1))
+        minute=int(match.group(2))
+        
+        if has_seconds:
+            
+            second=int(match.group(3))
+            
+        else:
+            
+            second=0
+            
+        #...as in get_parse_time_function
+        if fractional_time_format:
+            
+            fractional_time_string=match.group(fraction_index) or ''
+            
+            microsecond=int(float(f'0.{fractional_time_string}')*1000000)
+                
+        else:
+            
+            microsecond=0
+            
+        try:
+            
+            x=datetime.time(hour,minute,second,microsecond)
+            
+        except ValueError:
+            
+            return None
+        
+        x=x.isoformat()
+        
+        #...format significant digits if needed
+        if fractional_time_format:
+            
+            x=x.split('.')
+            
+            if len(x)==1:
+                
+                return None
+            
+            x=x[0]+'.'+x[1][:len(fractional_time_format)]
+            
+        return x
+        
+    return parse_time_string
+    
+    
+def get_parse_date_function(
+        datatype,
+        warn=warnings.warn,
+        _print_intermediate_outputs=False
+        ):
+    """
+    """
+    # By default, dates and times are assumed to be in the format defined 
+    # in [xmlschema11-2]. However dates and times are commonly represented 
+    # in tabular data in other formats.
+    
+    # If the datatype base is a date or time type, the datatype format 
+    # annotation indicates the expected format for that date or time.
+    
+    # The supported date and time format patterns listed here are 
+    # expressed in terms of the date field symbols defined in [UAX35]. 
+    # These formats must be recognised by implementations and must be 
+    # interpreted as defined in that specification. 
+    # Implementations may additionally recognise other date format patterns. 
+    # Implementations must issue a warning if the date format pattern is 
+    # invalid or not recognised and proceed as if no date format 
+    # pattern had been provided.
+    
+    # NOTE
+    # For interoperability, authors of metadata documents should use 
+    # only the formats listed in this section.
+    
+    # The following date format patterns must be recognized by implementations:
+    # yyyy-MM-dd e.g., 2015-03-22
+    # yyyyMMdd e.g., 20150322
+    # dd-MM-yyyy e.g., 22-03-2015
+    # d-M-yyyy e.g., 22-3-2015
+    # MM-dd-yyyy e.g., 03-22-2015
+    # M-d-yyyy e.g., 3-22-2015
+    # dd/MM/yyyy e.g., 22/03/2015
+    # d/M/yyyy e.g., 22/3/2015
+    # MM/dd/yyyy e.g., 03/22/2015
+    # M/d/yyyy e.g., 3/22/2015
+    # dd.MM.yyyy e.g., 22.03.2015
+    # d.M.yyyy e.g., 22.3.2015
+    # MM.dd.yyyy e.g., 03.22.2015
+    # M.d.yyyy e.g., 3.22.2015
+    
+    # Implementations must also recognise date, time, and date/time format patterns that end with timezone markers consisting of between one and three x or X characters, possibly after a single space. These must be interpreted as follows:
+
+    # X e.g., -08, +0530, or Z (minutes are optional)
+    # XX e.g., -0800, +0530, or Z
+    # XXX e.g., -08:00, +05:30, or Z
+    # x e.g., -08 or +0530 (Z is not permitted)
+    # xx e.g., -0800 or +0530 (Z is not permitted)
+    # xxx e.g., -08:00 or +05:30 (Z is not permitted)
+    
+    # For example, date format patterns could include yyyy-MM-ddTHH:mm:ssXXX 
+    # for 2015-03-15T15:02:37Z or 2015-03-15T15:02:37-05:00, or HH:mm x for 15:02 -05.
+    
+    # The cell value will one or more dates/time values extracted using the format.
+    
+    # NOTE
+    # For simplicity, this version of this standard does not support 
+    # abbreviated or full month or day names, or double digit years. 
+    # Future versions of this standard may support other date and time 
+    # formats, or general purpose date/time pattern strings. 
+    # Authors of schemas should use appropriate regular expressions, along 
+    # with the string datatype, for dates and times that use a format other 
+    # than that specified here.
+    
+    if _print_intermediate_outputs: print('-datatype',datatype)
+    
+    datatype_format=datatype.get('format')
+    
+    if not datatype_format is None and not isinstance(datatype_format,str):
+        
+        message='datatype format'
+        
+        warnings.warn(message)
+        
+        datatype_format=None
+    
+    
+    if not datatype_format is None:
+        
+        timezone_format,timezone_gap=\
+            get_timezone_format(
+                    datatype_format
+                    )
+        
+        #
+        if not timezone_format is None:
+        
+            date_format=\
+                datatype_format.removesuffix(
+                    timezone_gap+timezone_format
+                    )
+                
+        else:
+            
+            date_format=datatype_format
+            
+        #
+        if not date_format in [
+            'yyyy-MM-dd',
+            'yyyyMMdd',
+            'dd-MM-yyyy',
+            'd-M-yyyy',
+            'MM-dd-yyyy',
+            'M-d-yyyy',
+            'dd/MM/yyyy',
+            'd/M/yyyy',
+            'MM/dd/yyyy',
+            'M/d/yyyy',
+            'dd.MM.yyyy',
+            'd.M.yyyy',
+            'MM.dd.yyyy',
+            'M.d.yyyy',
+            ]:
+            
+            message='date format'
+            
+            warnings.warn(message)
+            
+            date_format=None
+            
+    else:
+        
+        timezone_format=None
+        timezone_gap=''
+        date_format=None
+            
+        
+    if not date_format is None:
+    
+        #...get separator
+        if '-' in date_format:
+            
+            separator='-'
+            
+        elif '/' in date_format:
+            
+            separator='/'
+            
+        elif '.' in date_format:
+            
+            separator='.'
+            
+        else:
+            
+            separator=''
+            
+    else:
+        
+        separator=None
+        
+    
+    #...get separated codes
+    if not date_format is None:
+    
+        if date_format=='yyyyMMdd':
+            
+            separated_codes=['yyyy','MM','dd']
+            
+        else:
+            
+            separated_codes=date_format.split(separator)
+            
+    else:
+        
+        separated_codes=None
+    
+        
+    if _print_intermediate_outputs: print('-timezone_format',timezone_format)
+    if _print_intermediate_outputs: print('-timezone_gap',timezone_gap)
+    if _print_intermediate_outputs: print('-date_format',date_format)
+    if _print_intermediate_outputs: print('-separator',separator)
+    if _print_intermediate_outputs: print('-separated_codes',separated_codes)
+    
+    #...the compiled parser of the date format
+    if not date_format is None:
+        
+        parse_date_string=\
+            get_parse_date_string_function(
+                date_format
+                )
+            
+    else:
+        
+        parse_date_string=None
+    
+    
+    def parse_date(
+            string_value,
+            errors,
+            validate
+            ):
+        """
+        """
+        if _print_intermediate_outputs: print('-string_value',string_value)
+        
+        #...date strings in the usual form for the format are parsed by the 
+        #...compiled parser, and the steps below give the errors for the 
+        #...others. These date strings do not end with a timezone.
+        if not parse_date_string is None and timezone_format is None:
+            
+            x=parse_date_string(string_value)
+            
+            if not x is None:
+                
+                json_value=x.isoformat()
+                
+                return json_value, datatype['base'], errors
+        
+        #
+        try:
+            
+            timezone_string=\
+                get_timezone_string(
+                    string_value,
+                    timezone_format
+                    )
+        
+        except ValueError:
+            
+            message='date conversion error'
+            
+            if validate:
+                
+                raise CSVWError(message)
+                
+            else:
+            
+                errors.append(message)
+                warn(message)
+                return string_value,'string',errors
+            
+        if _print_intermediate_outputs: print('-timezone_string',timezone_string)
+        
+        #
+        xsd_timezone_string=\
+            parse_timezone_string(
+                timezone_string
+                )
+        if _print_intermediate_outputs: print('-xsd_timezone_string',xsd_timezone_string)
+            
+        #
+        date_string=\
+            string_value.removesuffix(
+                (timezone_gap or '')
+                +timezone_string
+                )
+        
+        if _print_intermediate_outputs: print('-date_string',date_string)
+        
+        #...as above, for the date strings with a timezone
+        if not parse_date_string is None and not timezone_format is None:
+            
+            x=parse_date_string(date_string)
+            
+            if not x is None:
+                
+                json_value=x.isoformat()+xsd_timezone_string
+                
+                return json_value, datatype['base'], errors
+        
+        if not date_format is None:
+            
+            #
+            if separator=='':
+                
+                separated_date_string=\
+                    (
+                        date_string[:4],
+                        date_string[4:6],
+                        date_string[6:]
+                     )
+            
+            else:
+                
+                separated_date_string=date_string.split(separator)
+                
+            if _print_intermediate_outputs: print('-separated_date_string',separated_date_string)
+                
+            #
+            for code, date_substring in zip(
+                    separated_codes,
+                    separated_date_string
+                    ):
+                
+                if code=='yyyy':
+                    
+                    if not len(date_substring)==4:
+                        
+                        message='date conversion error'
+                        
+                        if validate:
+                            
+                            raise CSVWError(message)
+                            
+                        else:
+                            
+                            errors.append(message)
+                            warn(message)
+                            return string_value,'string',errors
+                    
+                    try:
+                        
+                        year=int(date_substring)
+                    
+                    except ValueError:
+                        
+                        message='date conversion error'
+                        
+                        if validate:
+                            
+                            raise CSVWError(message)
+                            
+                        else:
+                            
+                            errors.append(message)
+                            warn(message)
+                            return string_value,'string',errors
+                    
+                elif code=='MM':
+                    
+                    if not len(date_substring)==2:
+                        
+                        message='date conversion error'
+                        
+                        if validate:
+                            
+                            raise CSVWError(message)
+                            
+                        else:
+                            
+                            errors.append(message)
+                            warn(message)
+                            return string_value,'string',errors
+                    
+                    try:
+                    
+                        month=int(date_substring)
+                    
+                    except ValueError:
+                        
+                        message='date conversion error'
+                        
+                        if validate:
+                            
+                            raise CSVWError(message)
+                            
+                        else:
+                            
+                            errors.append(message)
+                            warn(message)
+                            return string_value,'string',errors
+                    
+                    
+                elif code=='M':
+                    
+                    try:
+                    
+                        month=int(date_substring)
+                    
+                    except ValueError:
+                        
+                        message='date conversion error'
+                        
+                        if validate:
+                            
+                            raise CSVWError(message)
+                            
+                        else:
+                            
+                            errors.append(message)
+                            warn(message)
+                            return string_value,'string',errors
+                    
+                    if month<10:
+                        
+                        if not len(date_substring)==1:
+                            
+                            message='date conversion error'
+                            
+                            if validate:
+                                
+                                raise CSVWError(message)
+                                
+                            else:
+                                
+                                errors.append(message)
+                                warn(message)
+                                return string_value,'string',errors
+                        
+                    else:
+                        
+                        if not len(date_substring)==2:
+                            
+                            message='date conversion error'
+                            
+                            if validate:
+                                
+                                raise CSVWError(message)
+                                
+                            else:
+                                
+                                errors.append(message)
+                                warn(message)
+                                return string_value,'string',errors
+                    
+                    
+                        
+                elif code=='dd':
+                    
+                    if not len(date_substring)==2:
+                        
+                        message='date conversion error'
+                        
+                        if validate:
+                            
+                            raise CSVWError(message)
+                            
+                        else:
+                            
+                            errors.append(message)
+                            warn(message)
+                            return string_value,'string',errors
+                    
+                    try:
+                    
+                        day=int(date_substring)
+                    
+                    except ValueError:
+                        
+                        message='date conversion error'
+                        
+                        if validate:
+                            
+                            raise CSVWError(message)
+                            
+                        else:
+                            
+                            errors.append(message)
+                            warn(message)
+                            return string_value,'string',errors
+                    
+                    
+                elif code=='d':
+                    
+                    try:
+                    
+                        day=int(date_substring)
+                        
+                    except ValueError:
+                        
+                        message='date conversion error'
+                        
+                        if validate:
+                            
+                            raise CSVWError(message)
+                            
+                        else:
+                            
+                            errors.append(message)
+                            warn(message)
+                            return string_value,'string',errors
+                    
+                    if day<10:
+                        
+                        if not len(date_substring)==1:
+                            
+                            message='date conversion error'
+                            
+                            if validate:
+                                
+                                raise CSVWError(message)
+                                
+                            else:
+                                
+                                errors.append(message)
+                                warn(message)
+                                return string_value,'string',errors
+                        
+                    else:
+                        
+                        if not len(date_substring)==2:
+                            
+                            message='date conversion error'
+                            
+                            if validate:
+                                
+                                raise CSVWError(message)
+                                
+                            else:
+                                
+                                errors.append(message)
+                                warn(message)
+                                return string_value,'string',errors
+                        
+                    
+                else:
+                    
+                    raise Exception
+                    
+            if _print_intermediate_outputs: print('-year,month,day',year,month,day)
+            
+            
+            try:
+        
+                x=datetime.date(year,month,day)
+        
+            except ValueError:
+                
+                message='Invalid value in date string.'
+        
+                if validate:
+                    
+                    raise CSVWError(message)
+                    
+                else:
+        
+                    errors.append(message)
+                    warn(message)
+                    return string_value, 'string', errors
+        
+        
+        else:
+            
+            try:
+            
+                x=datetime.date.fromisoformat(date_string)
+        
+            except ValueError:
+                
+                message=f'Invalid isoformat string {string_value} for "date" datatype. '
+        
+                if validate:
+                    
+                    raise CSVWError(message)
+                    
+                else:
+        
+                    errors.append(message)
+                    warn(message)
+                    return string_value, 'string', errors
+        
+    
+        #
+        json_value=x.isoformat()+xsd_timezone_string
+        
+        return json_value, datatype['base'], errors
+    
+    
+    return parse_date
+    
+
+    
+def get_parse_time_function(
+        datatype,
+        warn=warnings.warn,
+        _print_intermediate_outputs=False
+        ):
+    """
+    """
+    # By default, dates and times are assumed to be in the format defined 
+    # in [xmlschema11-2]. However dates and times are commonly represented 
+    # in tabular data in other formats.
+
+    # If the datatype base is a date or time type, the datatype format 
+    # annotation indicates the expected format for that date or time.
+    
+    # The supported date and time format patterns listed here are 
+    # expressed in terms of the date field symbols defined in [UAX35]. 
+    # These formats must be recognised by implementations and must be 
+    # interpreted as defined in that specification. 
+    # Implementations may additionally recognise other date format patterns. 
+    # Implementations must issue a warning if the date format pattern is 
+    # invalid or not recognised and proceed as if no date format 
+    # pattern had been provided.
+    
+    if _print_intermediate_outputs: print('-datatype',datatype)
+    
+    datatype_format=datatype.get('format')
+    
+    if not datatype_format is None:
+        
+        timezone_format,timezone_gap=\
+            get_timezone_format(
+                    datatype_format
+                    )
+        
+        if not timezone_format is None:
+        
+            time_format=\
+                datatype_format.removesuffix(
+                    timezone_gap+timezone_format
+                    )
+        else:
+            
+            time_format=datatype_format
+
+            
+        #...separate main and fractional part
+        main_time_format,_,fractional_time_format=\
+            time_format.partition('.')
+                
+        #...check if main time format is in the approved list
+        if main_time_format in [
+            'HH:mm:ss',
+            'HHmmss',
+            'HH:mm',
+            'HHmm'
+            ]:
+            
+            #...check fractional time format
+            if fractional_time_format:
+                
+                if not main_time_format=='HH:mm:ss':
+                    
+                    message='fractional time format1'
+                    
+                    warnings.warn(message)
+                    
+                    time_format=None
+                    main_time_format=None
+                    fractional_time_format=None
+                
+                
+                if not all(x=='S' for x in fractional_time_format):
+                    
+                    message='fractional time format2'
+                    
+                    warnings.warn(message)
+                    
+                    time_format=None
+                    main_time_format=None
+                    fractional_time_format=None
+            
+        else:
+        
+            message='main time format'
+            
+            warnings.warn(message)
+            
+            time_format=None
+            main_time_format=None
+            fractional_time_format=None
+            
+            
+    else:
+        
+        time_format=None
+        timezone_format=None
+        timezone_gap=None
+        main_time_format=None
+        fractional_time_format=None
+        
+    
+    if _print_intermediate_outputs: print('-timezone_format',timezone_format)
+    if _print_intermediate_outputs: print('-timezone_gap',timezone_gap)
+    if _print_intermediate_outputs: print('-time_format',time_format)
+    if _print_intermediate_outputs: print('-main_time_format',main_time_format)
+    if _print_intermediate_outputs: print('-fractional_time_format',fractional_time_format)
+    
+    #...the compiled parser of the time format
+    if not time_format is None:
+        
+        parse_time_string=\
+            get_parse_time_string_function(
+                main_time_format,
+                fractional_time_format
+                )
+            
+    else:
+        
+        parse_time_string=None
+    
+    
+    def parse_time(
+            string_value,
+            errors,
+            validate
+            ):
+        """
+        """
+        if _print_intermediate_outputs: print('-string_value',string_value)
+        
+        #...time strings in the usual form for the format are parsed by the 
+        #...compiled parser, and the steps below give the errors for the 
+        #...others. These time strings do not end with a timezone.
+        if not parse_time_string is None and timezone_format is None:
+            
+            x=parse_time_string(string_value)
+            
+            if not x is None:
+                
+                json_value=x
+                
+                return json_value, datatype['base'], errors
+        
+        #
+        try:
+            
+            timezone_string=\
+                get_timezone_string(
+                    string_value,
+                    timezone_format
+                    )
+        
+        except ValueError:
+            
+            message='time conversion error'
+            
+            if validate:
+                
+                raise CSVWError(message)
+            
+            else:
+                
+                errors.append(message)
+                warn(message)
+                return string_value,'string',errors
+                
+        if _print_intermediate_outputs: print('-timezone_string',timezone_string)
+        
+        #
+        xsd_timezone_string=\
+            parse_timezone_string(
+                timezone_string
+                )
+        if _print_intermediate_outputs: print('-xsd_timezone_string',xsd_timezone_string)
+            
+        #
+        time_string=\
+            string_value.removesuffix(
+                (timezone_gap or '')
+                +timezone_string
+                )
+        
+        if _print_intermediate_outputs: print('-time_string',time_string)
+        
+        #...as above, for the time strings with a timezone
+        if not parse_time_string is None and not timezone_format is None:
+            
+            x=parse_time_string(time_string)
+            
+            if not x is None:
+                
+                json_value=x+xsd_timezone_string
+                
+                return json_value, datatype['base'], errors
+        
+        #
+        if not time_format is None:
+            
+            
+            #
+            main_time_string,_,fractional_time_string=\
+                time_string.partition('.')
+                
+            if main_time_format=='HH:mm:ss':
+                
+                try:
+                
+                    hour,minute,second=[int(x) for x in main_time_string.split(':')]
+                
+                except ValueError:
+                    
+                    message=f'time conversion error "{time_string}"'
+                    
+                    if validate:
+                        
+                        raise CSVWError(message)
+                    
+                    else:
+                        
+                        errors.append(message)
+                        warn(message)
+                        return string_value,'string',errors
+                
+                
+                
+            elif main_time_format=='HHmmss':
+                
+                try:
+                
+                    hour=int(main_time_string[:2])
+                    minute=int(main_time_string[2:4])
+                    second=int(main_time_string[4:])
+                
+                except ValueError:
+                    
+                    message='time conversion error'
+                    
+                    if validate:
+                        
+                        raise CSVWError(message)
+                    
+                    else:
+                        
+                        errors.append(message)
+                        warn(message)
+                        return string_value,'string',errors
+                
+                
+            elif main_time_format=='HH:mm':
+                
+                try:
+                
+                        hour,minute=[int(x) for x in main_time_string.split(':')]
+                
+                except ValueError:
+                
+                    message='time conversion error'
+                    
+                    if validate:
+                        
+                        raise CSVWError(message)
+                    
+                    else:
+                        
+                        errors.append(message)
+                        warn(message)
+                        return string_value,'string',errors
+                
+                second=0
+                
+            elif main_time_format=='HHmm':
+                
+                try:
+                    
+                    hour=int(main_time_string[:2])
+                    minute=int(main_time_string[2:4])
+                
+                except ValueError:
+                    
+                    message='time conversion error'
+                    
+                    if validate:
+                        
+                        raise CSVWError(message)
+                    
+                    else:
+                        
+                        errors.append(message)
+                        warn(message)
+                        return string_value,'string',errors
+                
+                second=0
+                
+            if fractional_time_format:
+                
+                if len(fractional_time_string)>len(fractional_time_format):
+                    
+                    message='time conversion error'
+                    
+                    if validate:
+                        
+                        raise CSVWError(message)
+                    
+                    else:
+                        
+                        errors.append(message)
+                        warn(message)
+                        return string_value,'string',errors
+                
+                else:
+                
+                    try:    
+                    
+                        microsecond=\
+                            int(float(f'0.{fractional_time_string}')*1000000)
+                            
+                    except ValueError:
+                        
+                        message='time conversion error'
+                        
+                        if validate:
+                            
+                            raise CSVWError(message)
+                        
+                        else:
+                            
+                            errors.append(message)
+                            warn(message)
+                            return string_value,'string',errors
+                        
+            else:
+                
+                microsecond=0
+                
+            x=datetime.time(hour,minute,second,microsecond)
+            
+        else:
+            
+            try:
+            
+                x=datetime.time.fromisoformat(time_string)
+        
+            except ValueError:
+                
+                message=f'Invalid isoformat string {string_value}. '
+                
+                if validate:
+                    
+                    raise CSVWError(message)
+                
+                else:
+        
+                    errors.append(message)
+                    warn(message)
+                    return string_value, 'string', errors
+        
+        #
+        x=x.isoformat()
+        
+        #...format significant digits if needed
+        if fractional_time_format:
+            
+            x=x.split('.')
+            
+            x=x[0]+'.'+x[1][:len(fractional_time_format)]
+        
+        json_value=x+xsd_timezone_string
+        
+        return json_value, datatype['base'], errors
+    
+    
+    return parse_time
+
+
+#...the usual lexical form of an xsd:dateTime without a timezone
+xsd_datetime_regex=re.compile(
+    '[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}(?::[0-9]{2}(?:\\.[0-9]{1,6})?)?'
+    )
+
+
+def parse_isoformat_datetime(
+        datetime_string
+        ):
+    """Parses an ISO 8601 datetime string.
+    
+    Strings in the usual xsd:dateTime form are parsed with 
+    datetime.datetime.fromisoformat, which is faster than 
+    dateutil.parser.isoparse. 
+    dateutil.parser.isoparse is used for all other strings and for any 
+    string which fromisoformat cannot parse, such as a time of 24:00.
+    
+    :raises ValueError: If dateutil.parser.isoparse cannot parse the string.
+    
+    :rtype: datetime.datetime
+    
+    """
+    if xsd_datetime_regex.fullmatch(datetime_string):
+        
+        try:
+            
+            return datetime.datetime.fromisoformat(datetime_string)
+        
+        except ValueError:
+            
+            pass
+        
+    return dateutil.parser.isoparse(datetime_string)
+    
+
+def get_parse_datetime_function(
+        datatype,
+        timezone_required=False,
+        warn=warnings.warn,
+        _print_intermediate_outputs=False
+        ):
+    """
+    """
+    # By default, dates and times are assumed to be in the format defined 
+    # in [xmlschema11-2]. However dates and times are commonly represented 
+    # in tabular data in other formats.
+    
+    # If the datatype base is a date or time type, the datatype format 
+    # annotation indicates the expected format for that date or time.
+    
+    # The supported date and time format patterns listed here are 
+    # expressed in terms of the date field symbols defined in [UAX35]. 
+    # These formats must be recognised by implementations and must be 
+    # interpreted as defined in that specification. 
+    # Implementations may additionally recognise other date format patterns. 
+    # Implementations must issue a warning if the date format pattern is 
+    # invalid or not recognised and proceed as if no date format 
+    # pattern had been provided.
+    
+    if _print_intermediate_outputs: print('-datatype',datatype)
+    
+    datatype_format=datatype.get('format')
+    
+    if not datatype_format is None:
+        
+        timezone_format,timezone_gap=\
+            get_timezone_format(
+                    datatype_format
+                    )
+            
+        if not timezone_format is None:
+        
+            datetime_format=\
+                datatype_format.removesuffix(
+                    timezone_gap+timezone_format
+                    )
+                
+        else:
+            
+            datetime_format=datatype_format
+            
+    else:
+        
+        datetime_format=None
+        timezone_format=None
+        timezone_gap=None
+        
+        
+    if not datetime_format is None:
+        
+        #
+        if 'T' in datetime_format:
+            
+            separator='T'
+            
+        else:
+            
+            separator=' '
+            
+        #
+        date_format,_,time_format=\
+            datetime_format.partition(separator)
+            
+    else:
+        
+        date_format=None
+        time_format=None
+        separator=None
+            
+    
+            
+        
+    if _print_intermediate_outputs: print('-timezone_format',timezone_format)
+    if _print_intermediate_outputs: print('-timezone_gap',timezone_gap)
+    if _print_intermediate_outputs: print('-datetime_format',datetime_format)
+    if _print_intermediate_outputs: print('-separator',separator)
+    if _print_intermediate_outputs: print('-date_format',date_format)
+    if _print_intermediate_outputs: print('-time_format',time_format)
+    
+    #...the parse functions of the date and time formats are created once for 
+    #...the column, unless this gives warnings or errors, in which case they 
+    #...are created for each cell so that these are given for each cell
+    date_parse_function=None
+    time_parse_function=None
+    
+    if not datetime_format is None:
+        
+        with warnings.catch_warnings(record=True) as caught_warnings:
+            
+            warnings.simplefilter('always')
+            
+            try:
+                
+                date_parse_function=\
+                    get_parse_date_function(
+                        {'base':'date',
+                         'format':date_format},
+                        warn=warn
+                        )
+                    
+                time_parse_function=\
+                    get_parse_time_function(
+                        {'base':'time',
+                         'format':time_format},
+                        warn=warn
+                        )
+                    
+            except Exception:
+                
+                date_parse_function=None
+                time_parse_function=None
+                
+        if len(caught_warnings)>0:
+            
+            date_parse_function=None
+            time_parse_function=None
+    
+    
+    def parse_datetime(
+            string_value,
+            errors,
+            validate
+            ):
+        """
+        """
+        if _print_intermediate_outputs: print('-string_value',string_value)
+        
+        #
+        try:
+            
+            timezone_string=\
+                get_timezone_string(
+                    string_value,
+                    timezone_format
+                    )
+        
+        except ValueError:
+            
+            message='datetime conversion error 1'
+            errors.append(message)
+            warn(message)
+            return string_value,'string',errors
+                
+        if _print_intermediate_outputs: print('-timezone_string',timezone_string)
+        
+        #
+        if timezone_required and timezone_string=='':
+            
+            message='timezone_required'
+            
+            errors.append(message)
+            
+            warn(message)
+            
+            return string_value, 'string', errors
+            
+        #
+        xsd_timezone_string=\
+            parse_timezone_string(
+                timezone_string
+                )
+        if _print_intermediate_outputs: print('-xsd_timezone_string',xsd_timezone_string)
+            
+        #
+        datetime_string=\
+            string_value.removesuffix(
+                (timezone_gap or '')
+                +timezone_string
+                )
+        
+        if _print_intermediate_outputs: print('-datetime_string',datetime_string)
+        
+        
+        if not datetime_format is None:
+            
+            date_string, _, time_string =\
+                datetime_string.partition(separator)
+                
+            #
+            date_datatype=\
+                {'base':'date',
+                 'format':date_format}
+                
+            date_errors=[]
+            
+            if not date_parse_function is None:
+                
+                date_json_value,_,date_errors=\
+                    date_parse_function(
+                        date_string,
+                        date_errors,
+                        validate
+                        )
+                    
+            else:
+                
+                date_json_value,_,date_errors=\
+                    get_parse_date_function(
+                        date_datatype,
+                        warn=warn
+                        )(date_string,
+                          date_errors,
+                          validate)
+                      
+            errors.extend(date_errors)
+            
+            #
+            time_datatype=\
+                {'base':'time',
+                 'format':time_format}
+                
+            time_errors=[]
+            
+            if not time_parse_function is None:
+                
+                time_json_value,_,time_errors=\
+                    time_parse_function(
+                        time_string,
+                        time_errors,
+                        validate
+                        )
+                    
+            else:
+                
+                time_json_value,_,time_errors=\
+                    get_parse_time_function(
+                        time_datatype,
+                        warn=warn
+                        )(time_string,
+                          time_errors,
+                          validate)
+            
+            errors.extend(time_errors)
+                      
+            if len(date_errors)>0 or len(time_errors)>0:
+                
+                return string_value,'string',errors
+                      
+            #
+
+            try:
+            
+                x=parse_isoformat_datetime(
+                    f'{date_json_value}T{time_json_value}'
+                    )
+            
+            except ValueError:
+                
+                message='datetime conversion error 2' + ' -- ' + f'{date_json_value}T{time_json_value}'
+                #print(message)
+                errors.append(message)
+                warn(message)
+                return string_value,'string',errors
+            
+            #
+            json_value=f'{date_json_value}T{time_json_value}'+xsd_timezone_string
+            
+            
+        else:
+            
+            x=parse_isoformat_datetime(datetime_string)
+            
+            json_value=x.isoformat()+xsd_timezone_string
+            
+            
+        #
+        #print('json_value',json_value)
+        return json_value, datatype['base'], errors
+        
+        
+    return parse_datetime
+    
+
+def get_parse_datetimestamp_function(
+        datatype,
+        warn=warnings.warn
+        ):
+    """
+    """
+    #...timezone is required
+    
+    return get_parse_datetime_function(
+        datatype,
+        timezone_required=True,
+        warn=warn
+        )
+
+
+#%% 6.4.5 Formats for durations
+
+def get_parse_duration_function(
+        datatype,
+        warn=warnings.warn,
+        _print_intermediate_outputs=False
+        ):
+    """
+    """
+    # Durations must be formatted and interpreted as defined in 
+    # [xmlschema11-2], using the [ISO8601] format -?PnYnMnDTnHnMnS. 
+    # For example, the duration P1Y1D is used for a year and a day; 
+    # the duration PT2H30M for 2 hours and 30 minutes.
+
+    # If the datatype base is a duration type, the datatype format 
+    # annotation provides a regular expression for the string values, 
+    # with syntax and processing defined by [ECMASCRIPT]. 
+    # If the supplied value is not a valid regular expression, 
+    # implementations must issue a warning and proceed as if no format 
+    # had been provided.
+    
+    # NOTE
+    # Authors are encouraged to be conservative in the regular expressions 
+    # that they use, sticking to the basic features of regular expressions 
+    # that are likely to be supported across implementations.
+    
+    # The cell value will be one or more durations extracted using the format.
+        
+    if _print_intermediate_outputs: print('-datatype',datatype)
+    
+    datatype_format=datatype.get('format')
+    
+    if not datatype_format is None:
+    
+        try:
+            
+            re_compiled=re.compile(datatype['format'])
+            
+        except re.error:
+            
+            message='Property "format" with value "{datatype["format"]}" '
+            message+='is not a valid regular expression. '
+            message+='Property is removed. '
+            
+            warnings.warn(message)
+            
+            re_compiled=None
+            
+    else:
+        
+        re_compiled=None
+            
+    if _print_intermediate_outputs: print('-re_compiled', re_compiled)
+    
+    
+    def parse_duration(
+            string_value,
+            errors,
+            validate
+            ):
+        ""
+        if _print_intermediate_outputs: print('-string_value',string_value)
+
+        if not re_compiled is None:
+            
+            if not re_compiled.search(string_value):
+                
+                message=f'duration conversion error 1 - string value ="{string_value}"'
+                
+                if validate:
+                    
+                    raise CSVWError(message)
+                    
+                else:
+                    
+                    errors.append(message)
+                    warn(message)
+                    return string_value, 'string', errors
+
+        #...parsing -?PnYnMnDTnHnMnS
+        x=string_value
+        
+        # minus sign
+        
+        if x[0]=='-':
+            
+            x=x.removeprefix('-')
+        
+        #P
+        
+        if not x[0]=='P':
+            
+            message=f'duration conversion error 2 - string value ="{string_value}"'
+            
+            if validate:
+                
+                raise CSVWError(message)
+                
+            else:
+                
+                errors.append(message)
+                warn(message)
+                return string_value, 'string', errors
+        
+        x=x.removeprefix('P')
+        
+        #Y
+        if 'Y' in x:
+            
+            year_string,_,x=x.partition('Y')
+            
+            try:
+                
+                int(year_string)
+                
+            except ValueError:
+                
+                message=f'duration conversion error 3 - string value ="{string_value}"' + f'"{year_string}"'
+                
+                if validate:
+                    
+                    raise CSVWError(message)
+                    
+                else:
+                    
+                    errors.append(message)
+                    warn(message)
+                    return string_value, 'string', errors
+            
+            
+        #M
+        if 'M' in x.split('T')[0]:
+        
+            month_string,_,x=x.partition('M')
+            
+            if month_string:
+                
+                try:
+                    
+                    int(month_string)
+                    
+                except ValueError:
+                    
+                    message=f'duration conversion error 4 - string value ="{string_value}"'
+                    
+                    if validate:
+                        
+                        raise CSVWError(message)
+                        
+                    else:
+                        
+                        errors.append(message)
+                        warn(message)
+                        return string_value, 'string', errors
+        
+        
+        #D
+        if 'D' in x:
+        
+            day_string,_,x=x.partition('D')
+            
+            if day_string:
+                
+                try:
+                    
+                    int(day_string)
+                    
+                except ValueError:
+                    
+                    message=f'duration conversion error 5 - string value ="{string_value}"'
+                    
+                    if validate:
+                        
+                        raise CSVWError(message)
+                        
+                    else:
+                        
+                        errors.append(message)
+                        warn(message)
+                        return string_value, 'string', errors
+                
+        #T
+        if len(x)>0:
+            
+            if not x[0]=='T':
+                
+                message=f'duration conversion error 6 - string value ="{string_value}"' + ' -- ' + x
+                
+                if validate:
+                    
+                    raise CSVWError(message)
+                    
+                else:
+                    
+                    errors.append(message)
+                    warn(message)
+                    return string_value, 'string', errors
+                
+        x=x.removeprefix('T')
+        
+        
+        #H
+        
+        if 'H' in x:
+        
+            hour_string,_,x=x.partition('H')
+            
+            if hour_string:
+                
+                try:
+                    
+                    int(hour_string)
+                    
+                except ValueError:
+                    
+                    message=f'duration conversion error 7 - string value ="{string_value}"'
+                    
+                    if validate:
+                        
+                        raise CSVWError(message)
+                        
+                    else:
+                        
+                        errors.append(message)
+                        warn(message)
+                        return string_value, 'string', errors
+        
+
+        #M
+        if 'M' in x:
+        
+            minute_string,_,x=x.partition('M')
+            
+            if minute_string:
+                
+                try:
+                    
+                    int(minute_string)
+                    
+                except ValueError:
+                    
+                    message=f'duration conversion error 8 - string value ="{string_value}"'
+                    
+                    if validate:
+                        
+                        raise CSVWError(message)
+                        
+                    else:
+                        
+                        errors.append(message)
+                        warn(message)
+                        return string_value, 'string', errors
+        
+
+        #S
+        
+        if 'S' in x:
+            
+            second_string,_,x=x.partition('S')
+            
+            if second_string:
+                
+                try:
+                    
+                    int(second_string)
+                    
+                except ValueError:
+                    
+                    message=f'duration conversion error 9 - string value ="{string_value}"'
+                    
+                    if validate:
+                        
+                        raise CSVWError(message)
+                        
+                    else:
+                        
+                        errors.append(message)
+                        warn(message)
+                        return string_value, 'string', errors
+            
+        
+        #
+        return string_value, datatype['base'], errors
+
+
+    return parse_duration
+
+
+
+    
+#%% 6.4.6 Formats for other types
+
+def get_parse_other_types_function(
+        datatype,
+        warn=warnings.warn
+        ):
+    """
+    """
+    # If the datatype base is not numeric, boolean, a date/time type, 
+    # or a duration type, the datatype format annotation provides a 
+    # regular expression for the string values, with syntax and 
+    # processing defined by [ECMASCRIPT]. 
+    # If the supplied value is not a valid regular expression, 
+    # implementations must issue a warning and proceed as if no 
+    # format had been provided.
+
+    # NOTE
+    # Authors are encouraged to be conservative in the regular 
+    # expressions that they use, sticking to the basic features of 
+    # regular expressions that are likely to be supported across 
+    # implementations.
+    
+    # Values that are labelled as html, xml, or json should not be 
+    # validated against those formats.
+    
+    # NOTE
+    # Metadata creators who wish to check the syntax of HTML, XML, 
+    # or JSON within tabular data should use the datatype format 
+    # annotation to specify a regular expression against which such 
+    # values will be tested.
+    
+    if not datatype['base'] in ['html','xml','json'] and \
+        'format' in datatype:
+            
+        try:
+            
+            re.compile(datatype['format'])
+            
+            datatype2=dict(**datatype)
+            
+        except re.error:
+            
+            message='Property "format" with value "{datatype["format"]}" '
+            message+='is not a valid regular expression. '
+            message+='Property is removed. '
+            
+            warnings.warn(message)
+            
+            datatype2={k:v for k,v in datatype.items()
+                       if not k=='format'}
+            
+    else:
+        
+        datatype2=dict(**datatype)
+        
+    #...the regular expression is compiled once for all values
+    if not datatype2['base'] in ['html','xml','json'] and \
+        'format' in datatype2:
+            
+        regexp=re.compile(datatype2['format'])
+        
+    else:
+        
+        regexp=None
+        
+    value_type=datatype2['base']
+    
+    
+    def parse_other_types(
+            string_value,
+            errors,
+            validate
+            ):
+        """
+        """
+        
+        json_value=string_value
+        
+        if not regexp is None:
+            
+            if not regexp.fullmatch(string_value):
+                
+                message=f'string_value "{string_value}" does not match '
+                message+=f'regular expression "{datatype["format"]}".'
+                
+                if validate:
+                    
+                    raise CSVWError(message)
+                    
+                else:
+                
+                    warn(message)
+                
+                    errors.append(message)
+        
+    
+        return json_value,value_type,errors
+
+
+    return parse_other_types
+    
+    
+#%% 6.6 Validating Tables
+
+    # Validators test whether given tabular data files adhere to the 
+    # structure defined within a schema. 
+    # Validators must raise errors (and halt processing) and issue warnings 
+    # (and continue processing) as defined in [tabular-metadata]. 
+    # In addition, validators must raise errors but may continue 
+    # validating in the following situations:
+
+    # - if the table description is not compatible with the embedded 
+    #   metadata extracted from the tabular data file, as defined in 
+    #   Table Compatibility in [tabular-metadata].
+    
+    #... ALREADY DONE in compare_table_descriptions
+    
+    # - if there is more than one row with the same primary key, that 
+    #   is where the cells listed for the primary key for the row have 
+    #   the same values as the cells listed for the primary key for another row,
+    
+    #... ALREADY DONE in annotate_schema_dict
+    
+    # - for each row that does not have a unique referenced row for each 
+    #   of the foreign keys on the table in which the row appears, or
+    
+    #... ALREADY DONE in create_annotated_table_group
+        
+    # - for each error on each cell. 
+    
+    #... ALREADY DONE
+    
+
+def validate_annotated_table_dict(
+        annotated_table_dict,
+        embedded_metadata_dict
+        ):
+    """
+    """
+
+
+def add_errors_to_error_report(
+        error_report,
+        max_errors,
+        table_url,
+        column_name,
+        row_number,
+        errors
+        ):
+    """Adds the errors of a cell or a row to an error report, and stops the 
+    processing if the maximum number of errors has been reached.
+    
+    :param error_report: A dictionary with the keys 'error_count' and 
+        'errors', which is updated in place. If it also has the key 
+        'max_examples', only this number of errors are added to 'errors'. 
+        If it also has the keys 'message_types' and 'columns', the number of 
+        errors of each message type, and of each message type for each 
+        column (by table url and column name), are counted in these, as in 
+        add_cell_errors_to_diagnostics.
+    :type error_report: dict
+    :param max_errors: The maximum number of errors.
+    :type max_errors: int
+    :param column_name: The name of the column, or None for errors of a row 
+        such as primary key and foreign key errors.
+    :param errors: The error messages.
+    :type errors: list
+    
+    :raises CSVWMaxErrorsError: If the number of errors in the report 
+        has reached max_errors.
+    
+    """
+    
+    if len(error_report['errors'])<error_report.get('max_examples',max_errors):
+    
+        error_report['errors'].append(
+            {'table':table_url,
+             'column_name':column_name,
+             'row_number':row_number,
+             'errors':list(errors)}
+            )
+    
+    error_report['error_count']+=len(errors)
+    
+    if 'message_types' in error_report:
+        
+        column_message_types=\
+            error_report['columns'].setdefault(table_url,{})\
+                .setdefault(column_name,{})
+        
+        for message in errors:
+            
+            message_type=get_message_type(message)
+            
+            error_report['message_types'][message_type]=\
+                error_report['message_types'].get(message_type,0)+1
+            column_message_types[message_type]=\
+                column_message_types.get(message_type,0)+1
+    
+    if error_report['error_count']>=max_errors:
+        
+        message=f'The maximum number of errors ({max_errors}) has been reached. '
+        message+='Processing has stopped. The first error is: '
+        message+=error_report['errors'][0]['errors'][0]
+        
+        raise CSVWMaxErrorsError(message,error_report['errors'])
+
+
+def validate_csvw(
+        input_file_path_or_url,
+        overriding_metadata_file_path_or_url=None,
+        encoding=None,
+        skip_rows=None,
+        max_errors=None,
+        concurrent_metadata_requests=False,
+        max_error_examples=100,
+        key_index_directory=None,
+        _link_header=None,  # for testing link headers,
+        _well_known_text=None,  # for testing well known paths
+        ):
+    """Validates tabular data files against their metadata without creating 
+    the annotated table group.
+    
+    The rows of each table are read as a stream, using the same tokenizer 
+    and cell parsers as iter_annotated_rows, and each row is discarded once 
+    its cells, primary key and foreign keys have been checked. 
+    The cell checks include the datatype, the length and value constraints 
+    and the required annotation. 
+    The report has the number of errors of each message type and column, 
+    and only the first errors, so its size does not grow with the number 
+    of errors.
+    Only 16 byte digests of the primary key values of each table and of the 
+    values of the columns referenced by foreign keys are kept. These are 
+    held in memory, using about 100 bytes for each row, unless 
+    key_index_directory is given.
+    
+    Errors in the metadata, or metadata which is not compatible with the 
+    tabular data files, are raised as a CSVWError as when validate is True.
+    
+    :param input_file_path_or_url: Path/url to metadata document (json) or 
+        tabular data file (csv). 
+    :type input_file_path_ir_url: str
+    
+    :param overriding_metadata_file_path_or_url: Location of a metadata.json
+        file to be used as "overriding metadata".
+    :type overriding_metadata_file_path_or_url: str
+    
+    :param max_errors: If given, the validation stops when this number of 
+        errors has been found.
+    :type max_errors: int
+    
+    :param concurrent_metadata_requests: See create_annotated_table_group.
+    
+    :param max_error_examples: The maximum number of errors in the 'errors' 
+        item of the report.
+    :type max_error_examples: int
+    
+    :param key_index_directory: OPTIONAL. A directory where the digests of 
+        the keys are stored in temporary SQLite database files rather than 
+        in memory, see SQLiteKeyDigestSet. The memory used then does not 
+        grow with the number of rows. The files are removed afterwards.
+    :type key_index_directory: str
+    
+    :returns: A validation report with the keys 'valid', 'complete' (False if 
+        the validation stopped at max_errors), 'row_count', 'error_count', 
+        'message_types' and 'columns' (the number of errors of each message 
+        type, and of each message type for each column by table url and 
+        column name, which is None for the errors of rows) and 'errors' 
+        (the first errors found, as in CSVWMaxErrorsError).
+    :rtype: dict
+    
+    """
+    
+    annotated_table_group_dict, metadata_table_group_dict, dialect_description_dicts=\
+        get_streaming_annotated_table_group(
+            input_file_path_or_url,
+            overriding_metadata_file_path_or_url,
+            True,
+            encoding,
+            skip_rows,
+            _link_header,
+            _well_known_text,
+            concurrent_metadata_requests
+            )
+        
+    error_report={
+        'error_count':0,
+        'errors':[],
+        'max_examples':max_error_examples,
+        'message_types':{},
+        'columns':{}
+        }
+    
+    report={
+        'valid':True,
+        'complete':True,
+        'row_count':0,
+        'error_count':0,
+        'message_types':error_report['message_types'],
+        'columns':error_report['columns'],
+        'errors':error_report['errors']
+        }
+    
+    #...an error budget which is never used up if max_errors is not given
+    if max_errors is None:
+        
+        max_errors=float('inf')
+        
+    #...the digests of the keys are held in sets in memory, or in database 
+    #...files in a temporary directory
+    key_digest_sets=[]
+    
+    if key_index_directory is None:
+        
+        create_key_digest_set=set
+        
+    else:
+        
+        os.makedirs(key_index_directory,exist_ok=True)
+        
+        temporary_directory=tempfile.TemporaryDirectory(dir=key_index_directory)
+        
+        def create_key_digest_set():
+            
+            key_digest_set=\
+                SQLiteKeyDigestSet(
+                    os.path.join(temporary_directory.name,
+                                 f'{len(key_digest_sets)}.sqlite')
+                    )
+                
+            key_digest_sets.append(key_digest_set)
+            
+            return key_digest_set
+        
+    try:
+        
+        #...the errors are given in the report rather than as warnings
+        with warnings.catch_warnings():
+            
+            warnings.simplefilter('ignore')
+            
+            #...the digests of the values of the referenced columns, and of the 
+            #...values which occur in more than one referenced row, one pair of 
+            #...sets for each foreign key
+            referenced_key_digests=[]
+            
+            for annotated_table_dict in annotated_table_group_dict['tables']:
+                
+                digests=[]
+                
+                for foreign_key_definition in annotated_table_dict['foreignKeys']:
+                    
+                    foreign_key_reference_columns=foreign_key_definition[1]
+                    foreign_key_reference_table=foreign_key_reference_columns[0]['table']
+                    
+                    table_index=\
+                        [i for i,x in enumerate(annotated_table_group_dict['tables'])
+                         if x is foreign_key_reference_table][0]
+                        
+                    column_indexes=\
+                        get_column_indexes(
+                            foreign_key_reference_table,
+                            foreign_key_reference_columns
+                            )
+                        
+                    key_digests=create_key_digest_set()
+                    duplicate_key_digests=create_key_digest_set()
+                        
+                    for row_dict in iter_annotated_rows_from_table(
+                            foreign_key_reference_table,
+                            metadata_table_group_dict['tables'][table_index],
+                            dialect_description_dicts[table_index],
+                            False,
+                            annotate_uris_and_titles=False
+                            ):
+                        
+                        key_digest=\
+                            get_key_digest(
+                                tuple(get_hashable_value(row_dict['cells'][i]['value']) 
+                                      for i in column_indexes)
+                                )
+                            
+                        if key_digest in key_digests:
+                            
+                            duplicate_key_digests.add(key_digest)
+                            
+                        else:
+                            
+                            key_digests.add(key_digest)
+                        
+                    digests.append((key_digests,duplicate_key_digests))
+                    
+                referenced_key_digests.append(digests)
+                
+            try:
+                
+                for table_index,annotated_table_dict in \
+                    enumerate(annotated_table_group_dict['tables']):
+                        
+                    foreign_key_column_indexes=\
+                        [get_column_indexes(annotated_table_dict,
+                                            foreign_key_definition[0])
+                         for foreign_key_definition 
+                         in annotated_table_dict['foreignKeys']]
+                    
+                    for row_dict in iter_annotated_rows_from_table(
+                            annotated_table_dict,
+                            metadata_table_group_dict['tables'][table_index],
+                            dialect_description_dicts[table_index],
+                            False,
+                            error_report,
+                            max_errors,
+                            annotate_uris_and_titles=False,
+                            create_key_digest_set=create_key_digest_set
+                            ):
+                        
+                        report['row_count']+=1
+                        
+                        for column_indexes, (key_digests, duplicate_key_digests) in \
+                            zip(foreign_key_column_indexes,
+                                referenced_key_digests[table_index]):
+                            
+                            foreign_key_definition_values=\
+                                [row_dict['cells'][i]['value'] for i in column_indexes]
+                                
+                            key_digest=\
+                                get_key_digest(
+                                    tuple(get_hashable_value(x) 
+                                          for x in foreign_key_definition_values)
+                                    )
+                                
+                            if not key_digest in key_digests:
+                                
+                                message=f'Columns referenced by foreign key do not contain the value required: {foreign_key_definition_values}'
+                                
+                            elif key_digest in duplicate_key_digests:
+                                
+                                message=f'Columns referenced by foreign key do not a unique row with the values required: {foreign_key_definition_values}'
+                                
+                            else:
+                                
+                                continue
+                            
+                            add_errors_to_error_report(
+                                error_report,
+                                max_errors,
+                                annotated_table_dict['url'],
+                                None,
+                                row_dict['number'],
+                                [message]
+                                )
+                            
+            except CSVWMaxErrorsError:
+                
+                report['complete']=False
+        
+    finally:
+        
+        for key_digest_set in key_digest_sets:
+            
+            key_digest_set.close()
+            
+        if not key_index_directory is None:
+            
+            temporary_directory.cleanup()
+            
+    report['error_count']=error_report['error_count']
+    report['valid']=error_report['error_count']==0
+    
+    return report
+    
+    
+
+
+#%% 8 - Parsing Tabular Data - annotated objects
+
+# The annotated tables, columns, rows and cells created when parsing tabular 
+# data are instances of the classes below rather than dictionaries. The 
+# annotations are stored in slots, which uses less memory than a dictionary 
+# for each of the (possibly millions of) cells. The classes support the 
+# same dictionary interface, so the functions which annotate the tables and 
+# create the JSON and RDF outputs work unchanged.
+
+#...stored in place of an annotation in default_functions which is deleted
+deleted_annotation=object()
+
+class AnnotatedObject(collections.abc.MutableMapping):
+    """Base class for the annotated tables, columns, rows and cells.
+    
+    keys_ lists the annotations of the model, in order. The annotations 
+    in slot_keys are stored in slots. Any other annotations (such as the 
+    notes and common properties of a table) are stored in a dictionary, 
+    which is only created when it is first needed. The annotations in 
+    default_functions are not stored unless they are set, and otherwise 
+    their value is returned by the function. When one of these is deleted, 
+    deleted_annotation is stored in its place so the default is not used.
+    """
+    
+    __slots__=('_other',)
+    
+    keys_=()
+    
+    slot_keys=frozenset()
+    
+    default_functions={}
+    
+    def __getitem__(self,k):
+        
+        if k in self.slot_keys:
+            
+            try:
+                return getattr(self,k)
+            except AttributeError:
+                raise KeyError(k) from None
+        
+        other=self._other
+        
+        if not other is None and k in other:
+            
+            v=other[k]
+            
+            if v is deleted_annotation:
+                raise KeyError(k)
+            
+            return v
+        
+        elif k in self.default_functions:
+            
+            return self.default_functions[k](self)
+            
+        else:
+            
+            raise KeyError(k)
+        
+    def get(self,k,default=None):
+        
+        if k in self.slot_keys:
+            
+            return getattr(self,k,default)
+        
+        other=self._other
+        
+        if not other is None and k in other:
+            
+            v=other[k]
+            
+            return default if v is deleted_annotation else v
+        
+        elif k in self.default_functions:
+            
+            return self.default_functions[k](self)
+        
+        else:
+            
+            return default
+        
+    def __contains__(self,k):
+        
+        if k in self.slot_keys:
+            
+            return hasattr(self,k)
+        
+        other=self._other
+        
+        if not other is None and k in other:
+            
+            return not other[k] is deleted_annotation
+        
+        else:
+            
+            return k in self.default_functions
+        
+    def __setitem__(self,k,v):
+        
+        if k in self.slot_keys:
+            
+            setattr(self,k,v)
+            
+        else:
+            
+            if self._other is None:
+                self._other={}
+            
+            self._other[k]=v
+            
+    def __delitem__(self,k):
+        
+        if k in self.slot_keys:
+            
+            try:
+                delattr(self,k)
+            except AttributeError:
+                raise KeyError(k) from None
+        
+        elif not k in self:
+            
+            raise KeyError(k)
+            
+        elif k in self.default_functions:
+            
+            if self._other is None:
+                self._other={}
+            
+            self._other[k]=deleted_annotation
+            
+        else:
+            
+            del self._other[k]
+    
+    def __iter__(self):
+        
+        for k in self.keys_:
+            if k in self:
+                yield k
+                
+        if not self._other is None:
+            for k,v in self._other.items():
+                if not k in self.keys_ and not v is deleted_annotation:
+                    yield k
+    
+    def __len__(self):
+        return sum(1 for _ in self)
+    
+    def __repr__(self):
+        return f'<{type(self).__name__}: {len(self)} annotations>'
+    
+    
+class AnnotatedTable(AnnotatedObject):
+    """An annotated table, with the same keys as a table dictionary.
+    """
+    
+    keys_=('columns','rows','id','url','tableDirection','suppressOutput',
+           'notes','foreignKeys','transformations')
+    
+    slot_keys=frozenset(keys_)
+    
+    __slots__=keys_
+    
+    def __init__(self,columns,rows,id,url,tableDirection,suppressOutput,
+                 notes,foreignKeys,transformations):
+        self._other=None
+        self.columns=columns
+        self.rows=rows
+        self.id=id
+        self.url=url
+        self.tableDirection=tableDirection
+        self.suppressOutput=suppressOutput
+        self.notes=notes
+        self.foreignKeys=foreignKeys
+        self.transformations=transformations
+        
+        
+class AnnotatedColumn(AnnotatedObject):
+    """An annotated column, with the same keys as a column dictionary.
+    """
+    
+    keys_=('table','number','sourceNumber','name','titles','virtual',
+           'suppressOutput','datatype','default','lang','null','ordered',
+           'required','separator','textDirection','aboutURL','propertyURL',
+           'valueURL','cells')
+    
+    slot_keys=frozenset(keys_)
+    
+    __slots__=keys_
+    
+    def __init__(self,table,number,sourceNumber,name,titles,virtual,
+                 suppressOutput,datatype,default,lang,null,ordered,required,
+                 separator,textDirection,aboutURL,propertyURL,valueURL,cells):
+        self._other=None
+        self.table=table
+        self.number=number
+        self.sourceNumber=sourceNumber
+        self.name=name
+        self.titles=titles
+        self.virtual=virtual
+        self.suppressOutput=suppressOutput
+        self.datatype=datatype
+        self.default=default
+        self.lang=lang
+        self.null=null
+        self.ordered=ordered
+        self.required=required
+        self.separator=separator
+        self.textDirection=textDirection
+        self.aboutURL=aboutURL
+        self.propertyURL=propertyURL
+        self.valueURL=valueURL
+        self.cells=cells
+        
+        
+class AnnotatedRow(AnnotatedObject):
+    """An annotated row, with the same keys as a row dictionary.
+    """
+    
+    keys_=('table','number','sourceNumber','primaryKey','referencedRows',
+           'cells','titles')
+    
+    slot_keys=frozenset(keys_)
+    
+    __slots__=keys_
+    
+    def __init__(self,table,number,sourceNumber,primaryKey,referencedRows,
+                 cells,titles):
+        self._other=None
+        self.table=table
+        self.number=number
+        self.sourceNumber=sourceNumber
+        self.primaryKey=primaryKey
+        self.referencedRows=referencedRows
+        self.cells=cells
+        self.titles=titles
+        
+        
+class AnnotatedCell(AnnotatedObject):
+    """An annotated cell, with the same keys as a cell dictionary.
+    
+    The ordered and text direction annotations are those of the column and 
+    the about URL, property URL and value URL annotations are None, unless 
+    they are set on the cell.
+    """
+    
+    keys_=('table','column','row','stringValue','value','errors',
+           'textDirection','ordered','aboutURL','propertyURL','valueURL')
+    
+    slot_keys=frozenset(keys_[:6])
+    
+    default_functions={
+        'textDirection': lambda cell: cell.column['textDirection'],
+        'ordered': lambda cell: cell.column['ordered'],
+        'aboutURL': lambda cell: None,
+        'propertyURL': lambda cell: None,
+        'valueURL': lambda cell: None
+        }
+    
+    __slots__=keys_[:6]
+    
+    def __init__(self,table,column,row,stringValue,value,errors):
+        self._other=None
+        self.table=table
+        self.column=column
+        self.row=row
+        self.stringValue=stringValue
+        self.value=value
+        self.errors=errors
+        
+    
+
+#%% 8 - Parsing Tabular Data
+
+def parse_tabular_data_from_text(
+        tabular_data_file_url,
+        dialect_description_dict,
+        use_csv_module=False,
+        processes=None,
+        _print_intermediate_outputs=False
+        ):
+    """
+    
+    :param use_csv_module: If True, the rows are read using the csv module 
+        of the Python standard library when the dialect and the tabular data 
+        allow this. Otherwise the rows are read as described in the standard. 
+        The results are the same either way.
+        
+    :param processes: If more than 1 and the tabular data file is a local 
+        file, the file is split into byte ranges at row boundaries and the 
+        byte ranges are read in parallel by this number of worker processes. 
+        The results, including any errors, are the same either way.
+    
+    """
+    
+    comment_prefix=dialect_description_dict.get('commentPrefix',None)
+    delimiter=dialect_description_dict.get('delimiter',',')
+    encoding=dialect_description_dict.get('encoding','utf-8')
+    escape_character=dialect_description_dict.get('escapeCharacter','"')
+    header=dialect_description_dict.get('headerRowCount',True)
+    header_row_count=dialect_description_dict.get('headerRowCount',1 if header else 0)
+    line_terminators=dialect_description_dict.get('lineTerminators',['\r\n', '\n'])
+    quote_character=dialect_description_dict.get('quoteCharacter','"')
+    skip_blank_rows=dialect_description_dict.get('skipBlankRows',False)
+    skip_columns=dialect_description_dict.get('skipColumns',0)
+    skipInitialSpace=dialect_description_dict.get('skipInitialSpace',False)
+    skip_rows=dialect_description_dict.get('skipRows',0)
+    trim=dialect_description_dict.get('trim',True)  # one of True, False, "true", "false", "start", "end"
+    
+    #...skipInitialSpace is ignored as there is a contradiction here
+    #...if the trim property has a default of True, then this always overrides
+    #...the skipInitialSpace property
+    
+    # skipInitialSpace
+    # A boolean atomic property that, if true, sets the trim flag to "start" 
+    # and if false, to false. If the trim property is provided, the 
+    # skipInitialSpace property is ignored. The default is false.
+    # if trim is None:
+        
+    #     if skipInitialSpace:
+            
+    #         trim='start'
+            
+    #     else:
+            
+    #         trim=False
+            
+    # print('trim',trim)
+    
+    
+                
+    #print('dialect_description_obj_dict',dialect_description_obj_dict)
+    #print('header_row_count',header_row_count)
+            
+    # The algorithm for using these flags to parse a document containing 
+    # tabular data to create a basic annotated tabular data model and to 
+    # extract embedded metadata is as follows:
+    
+    # 1. Create a new table T with the annotations:
+    #    - columns set to an empty list
+    #    - rows set to an empty list
+    #    - id set to null
+    #    - url set to the location of the file, if known, or null
+    #    - table direction set to auto
+    #    - suppress output set to false
+    #    - notes set to false
+    #    - foreign keys set to an empty list
+    #    - transformations set to an empty list    
+    
+    table_dict=AnnotatedTable(
+        columns=[],
+        rows=[],
+        id=None,
+        url=tabular_data_file_url,
+        tableDirection='auto',
+        suppressOutput=False,
+        notes=[],  # not False as stated in the standard
+        foreignKeys=[],
+        transformations=[]       
+        )
+    
+    
+    # 2. Create a metadata document structure M that looks like:
+    #    {
+    #      "@context": "http://www.w3.org/ns/csvw",
+    #      "rdfs:comment": []
+    #      "tableSchema": {
+    #        "columns": []
+    #      }
+    #    }
+
+    metadata_table_dict={
+        "@context": "http://www.w3.org/ns/csvw",
+        "rdfs:comment": [],
+        "tableSchema": {
+            "columns": []
+            }
+      }
+    
+
+    # 3. If the URL of the tabular data file being parsed is known, set the 
+    #    url property on M to that URL.
+    
+    if not tabular_data_file_url is None:
+        metadata_table_dict['url']=tabular_data_file_url
+
+
+    # 4. Set source row number to 1.
+    source_row_number=1
+    
+    
+    # 5. Read the file using the encoding, as specified in [encoding], using 
+    #    the replacement error mode. If the encoding is not a Unicode encoding, 
+    #    use a normalizing transcoder to normalize into Unicode Normal Form C 
+    #    as defined in [UAX15].
+    
+    #...remove fragments and queries from tabular_data_file_url
+    url=urllib.parse.urljoin(tabular_data_file_url, 
+                         urllib.parse.urlparse(tabular_data_file_url).path)
+    
+    #...the rows read in advance using a process pool, or None if the rows 
+    #...are read one at a time
+    rows_read_in_advance=None
+    
+    #...a local file is split into byte ranges which are read in parallel 
+    #...by the worker processes, so this process does not read the text
+    if not processes is None and processes>1 and url.startswith('file:'):
+        
+        file_path=urllib.request.url2pathname(urllib.parse.urlparse(url).path)
+        
+    else:
+        
+        file_path=None
+        
+    #...a file which does not exist is opened below to raise the error
+    if not file_path is None and os.path.isfile(file_path):
+        
+        result=\
+            get_rows_using_process_pool(
+                file_path,
+                encoding,
+                escape_character,
+                quote_character,
+                delimiter,
+                line_terminators,
+                trim,
+                use_csv_module,
+                processes
+                )
+            
+        if not result is None:
+            
+            rows_read_in_advance, _=result
+            
+    if rows_read_in_advance is None:
+        
+        #...newline='' so that the line terminators are passed through 
+        #...unchanged, and the response is read in chunks so the body of 
+        #...the file is not held in memory
+        text_stream=io.TextIOWrapper(
+            get_url_fetcher().open(url,stream=True),
+            encoding=encoding,
+            newline=''
+            )
+        
+    def iter_rows_read_in_advance():
+        "Yields the row content and list of cell values of the rows read in advance."
+        
+        for row in rows_read_in_advance.values():
+            
+            #...the error of a row which cannot be read is raised when the row 
+            #...is reached, as it is when the rows are read one at a time
+            if isinstance(row,Exception):
+                raise row
+            
+            yield row[1], row[2]
+            
+    def iter_rows_from_text_stream():
+        "Yields the row content and list of cell values of each row of the text stream."
+        
+        #...the csv module is used for the rows which it can read
+        if use_csv_module:
+            read_rows=iter_row_contents_using_csv_module
+        else:
+            read_rows=iter_row_contents
+        
+        #...the stream is closed when the rows are read or the generator is closed
+        with text_stream:
+            
+            yield from \
+                read_rows(
+                    text_stream,
+                    escape_character,
+                    quote_character,
+                    delimiter,
+                    line_terminators,
+                    trim
+                    )
+    
+    #...yields (row_content, list_of_cell_values) for each row
+    if rows_read_in_advance is None:
+        row_contents=iter_rows_from_text_stream()
+    else:
+        row_contents=iter_rows_read_in_advance()
+    
+    
+    
+    # 6. Repeat the following the number of times indicated by skip rows:
+    
+    for _ in range(skip_rows): 
+        
+        #...for testing
+        #print('-source_row_number',source_row_number)
+        
+        #print(_)
+        
+        # 6.1 Read a row to provide the row content.
+        row_content, list_of_cell_values=next(row_contents,('',None))
+        
+        # 6.2 If the comment prefix is not null and the row content begins 
+        # with the comment prefix, strip that prefix from the row content, 
+        # and add the resulting string to the M.rdfs:comment array.
+        if not comment_prefix is None \
+            and row_content.startswith(comment_prefix):
+                
+            metadata_table_dict['rdfs:comment'].append(
+                row_content[len(comment_prefix):]
+                )
+        
+        # 6.3 Otherwise, if the row content is not an empty string, add the 
+        # row content to the M.rdfs:comment array.
+        elif not row_content=='':
+            metadata_table_dict['rdfs:comment'].append(
+                row_content
+                )
+    
+        # 6.4 Add 1 to the source row number.
+        source_row_number+=1
+        
+    # 7 Repeat the following the number of times indicated by header row count:
+        
+    for _ in range(header_row_count):
+        
+        #...for testing
+        #print('-source_row_number',source_row_number)
+        
+        # 7.1 Read a row to provide the row content.
+        row_content, list_of_cell_values=next(row_contents,('',None))
+        
+        # 7.2 If the comment prefix is not null and the row content begins 
+        # with the comment prefix, strip that prefix from the row content, 
+        # and add the resulting string to the M.rdfs:comment array.
+        if not comment_prefix is None \
+            and row_content.startswith(comment_prefix):
+                
+            metadata_table_dict['rdfs:comment'].append(
+                row_content[len(comment_prefix):]
+                )
+                
+        # 7.3 Otherwise, parse the row to provide a list of cell values, and:
+        else:
+            
+            #...the row cannot be parsed, so parse it again to raise the error
+            if list_of_cell_values is None:
+                
+                list_of_cell_values=\
+                    get_list_of_cell_values(
+                        row_content,
+                        escape_character,
+                        quote_character,
+                        delimiter,
+                        trim
+                        )
+            
+            # 7.3.1 Remove the first skip columns number of values from the 
+            # list of cell values.
+            list_of_cell_values_non_skipped=list_of_cell_values[skip_columns:]
+            
+            # 7.3.2 For each of the remaining values at index i in the list 
+            # of cell values:
+                
+            # sets up the metatdata column description objects
+            if len(metadata_table_dict['tableSchema']['columns'])==0:
+                
+                metadata_table_dict['tableSchema']['columns']=\
+                    [{'titles':[]} 
+                     for x in range(len(list_of_cell_values_non_skipped))]
+                
+            for i, value in enumerate(list_of_cell_values_non_skipped):
+                
+                # 7.3.2.1 If the value at index i in the list of cell values 
+                # is an empty string or consists only of whitespace, do nothing.
+                if value.strip()=='':
+                    continue
+                
+                # 7.3.2.2 Otherwise, if there is no column description object 
+                # at index i in M.tableSchema.columns, create a new one with 
+                # a title property whose value is an array containing a single 
+                # value that is the value at index i in the list of cell values.
+                # AND
+                # 7.3.2.3 Otherwise, add the value at index i in the list of 
+                # cell values to the array at M.tableSchema.columns[i].titles.
+                metadata_table_dict['tableSchema']['columns'][i]['titles'].append(
+                    value
+                    )
+                
+        # 7.4 Add 1 to the source row number.
+        source_row_number+=1
+            
+                
+    # 8 If header row count is zero, create an empty column description object 
+    # in M.tableSchema.columns for each column in the current row after skip 
+    # columns.
+    
+    if header_row_count==0 or len(metadata_table_dict['tableSchema']['columns'])==0:
+        
+        #...the rows read here are read again as data rows below
+        peeked_row_contents=[]
+        
+        while True: # loops until a non-comment row is found
+            
+            x=next(row_contents,None)
+            
+            if x is None:
+                row_content, list_of_cell_values='', None
+                break
+            
+            peeked_row_contents.append(x)
+            
+            row_content, list_of_cell_values=x
+            
+            if comment_prefix is None \
+                or not row_content.startswith(comment_prefix):
+                    break
+            
+        #...the row cannot be parsed, so parse it again to raise the error
+        if list_of_cell_values is None:
+            
+            list_of_cell_values=\
+                get_list_of_cell_values(
+                    row_content,
+                    escape_character,
+                    quote_character,
+                    delimiter,
+                    trim
+                    )
+            
+        list_of_cell_values_non_skipped=list_of_cell_values[skip_columns:]
+        
+        metadata_table_dict['tableSchema']['columns']=\
+            [{'@type':'Column'} 
+             for x in range(len(list_of_cell_values_non_skipped))]
+            
+        row_contents=itertools.chain(peeked_row_contents,row_contents)
+            
+        
+                
+    # 9 Set row number to 1.
+    row_number=1
+    
+    # 10 While it is possible to read another row, do the following:
+    
+    for row_content, list_of_cell_values in row_contents:
+        
+        #...for testing
+        #if row_number%1000==0:
+        #print('-row_number',row_number)
+        
+        # 10.1 Set the source column number to 1.
+        source_column_number=1
+        
+        # 10.2 Read a row to provide the row content.
+        #...done by the for loop
+        
+        # 10.3 If the comment prefix is not null and the row content begins 
+        # with the comment prefix, strip that prefix from the row content, 
+        # and add the resulting string to the M.rdfs:comment array.
+        if not comment_prefix is None \
+            and row_content.startswith(comment_prefix):
+                
+            metadata_table_dict['rdfs:comment'].append(
+                row_content[len(comment_prefix):]
+                )
+        
+        else:
+            
+            # 10.4 Otherwise, parse the row to provide a list of cell values, and:
+            #...the row cannot be parsed, so parse it again to raise the error
+            if list_of_cell_values is None:
+                
+                list_of_cell_values=\
+                    get_list_of_cell_values(
+                        row_content,
+                        escape_character,
+                        quote_character,
+                        delimiter,
+                        trim
+                        )
+            
+            # 10.4.1 If all of the values in the list of cell values are empty 
+            # strings, and skip blank rows is true, add 1 to the source row 
+            # number and move on to process the next row.
+            if all(x=='' for x in list_of_cell_values) and skip_blank_rows==True:
+                pass
+                
+            # 10.4.2 Otherwise, create a new row R, with:
+            # table set to T
+            # number set to row number
+            # source number set to source row number
+            # primary key set to an empty list
+            # referenced rows set to an empty list
+            # cells set to an empty list
+            else:
+                row_dict=AnnotatedRow(
+                    table=table_dict, 
+                    number=row_number,
+                    sourceNumber=source_row_number,
+                    primaryKey=[],
+                    referencedRows=[],
+                    cells=[],
+                    titles=[]
+                    )
+                
+            # 10.4.3 Append R to the rows of table T.
+            table_dict['rows'].append(row_dict)
+            
+            # 10.4.4 Remove the first skip columns number of values from the 
+            # list of cell values and add that number to the source column number.
+            list_of_cell_values_non_skipped=list_of_cell_values[skip_columns:]
+
+            source_column_number+=skip_columns
+            
+            # 10.4.5 For each of the remaining values at index i in the list 
+            # of cell values (where i starts at 1):
+            for i, value in enumerate(list_of_cell_values_non_skipped):
+                
+                # 10.4.5.1 Identify the column C at index i within the columns 
+                # of table T. If there is no such column:
+                    
+                try:
+                    column_dict=table_dict['columns'][i]
+                
+                except IndexError:
+                    
+                    # 10.4.5.1.1 Create a new column C with:
+                    # table set to T
+                    # number set to i
+                    # source number set to source column number
+                    # name set to null
+                    # titles set to an empty list
+                    # virtual set to false
+                    # suppress output set to false
+                    # datatype set to string
+                    # default set to an empty string
+                    # lang set to und
+                    # null set to an empty string
+                    # ordered set to false
+                    # required set to false
+                    # separator set to null
+                    # text direction set to auto
+                    # about URL set to null
+                    # property URL set to null
+                    # value URL set to null
+                    # cells set to an empty list
+                
+                    column_dict=AnnotatedColumn(
+                        table=table_dict, #table_name,
+                        number=i+1,
+                        sourceNumber=source_column_number,
+                        name=None,
+                        titles=[],
+                        virtual=False,
+                        suppressOutput=False,
+                        datatype={'base':'string'}, 
+                        default='',
+                        lang='und',
+                        null='',
+                        ordered=False,
+                        required=False,
+                        separator=None,
+                        textDirection='auto',
+                        aboutURL=None,
+                        propertyURL=None,
+                        valueURL=None,
+                        cells=[]
+                        )
+                
+                    # 10.4.5.1.2 Append C to the columns of table T (at index i).
+                    table_dict['columns'].append(column_dict)
+                    
+                # 10.4.5.2 Create a new cell D, with:
+                # table set to T
+                # column set to C
+                # row set to R
+                # string value set to the value at index i in the list of cell values
+                # value set to the value at index i in the list of cell values
+                # errors set to an empty list
+                # text direction set to auto
+                # ordered set to false
+                # about URL set to null
+                # property URL set to null
+                # value URL set to null
+                
+                #...the text direction and ordered annotations are taken from 
+                #...the column C, and the URL annotations are null, until 
+                #...they are set on the cell (see AnnotatedCell)
+                cell_dict=AnnotatedCell(
+                    table=table_dict, 
+                    column=column_dict, 
+                    row=row_dict, 
+                    stringValue=value,
+                    value=None,   #...this is done later after the annotations from the metadata have been applied
+                    errors=[]
+                    )
+                
+                # 10.4.5.3 Append cell D to the cells of column C.
+                column_dict['cells'].append(cell_dict)
+                
+                # 10.4.5.4 Append cell D to the cells of row R (at index i).
+                row_dict['cells'].append(cell_dict)  
+                    # NOTE THAT cell_dict NOW IS STORED IN BOTH column_dict 
+                    # AND row_dict 
+                
+                # 10.4.5.5 Add 1 to the source column number.
+                source_column_number+=1
+                
+        # 10.5 Add 1 to the source row number.
+        source_row_number+=1
+        row_number+=1  # I also added this to increment the row_number
+        
+    # 11 If M.rdfs:comment is an empty array, remove the rdfs:comment property from M.
+    if len(metadata_table_dict['rdfs:comment'])==0:
+        
+        metadata_table_dict.pop('rdfs:comment')
+    
+    # 12 Return the table T and the embedded metadata M.
+        
+    # validate_and_normalize_metadata_table_dict(
+    #     metadata_table_dict,
+    #     metadata_document_location=None,
+    #     metadata_table_group_dict=None
+    #     )
+    
+    
+    
+    return table_dict, metadata_table_dict
+    
+    
+
+def get_row_content(
+        tabular_data_text,
+        i,
+        escape_character,
+        quote_character,
+        line_terminators
+        ):
+    """
+    """
+    #print(tabular_data_text)
+    #print(i)
+    # print(escape_character)
+    # print(quote_character)
+    # print(line_terminators)
+    
+    # To read a row to provide row content, perform the following steps:
+    
+    # 1 Set the row content to an empty string.
+    row_content=''
+    
+    # 2 Read initial characters and process as follows:
+        
+    while True:
+        
+        #print(i, end=' ')
+        
+        #print('-line_terminators',line_terminators)
+        
+        #...placing this first...
+        # 3 If there are no more characters to read, return the row content.
+        if i>len(tabular_data_text)-1:
+            break
+        
+    
+        # 2.1 If the string starts with the escape character followed by the 
+        # quote character, append both strings to the row content, and move on 
+        # to process the string following the quote character.
+        if tabular_data_text[i]==escape_character \
+            and tabular_data_text[i+1]==quote_character:
+                
+            row_content+=escape_character+quote_character
+            
+            i+=2
+            
+            continue
+            
+        
+        
+        # 2.2 Otherwise, if the string starts with the escape character and the 
+        # escape character is not the same as the quote character, append the 
+        # escape character and the single character following it to the row 
+        # content and move on to process the string following that character.
+        if tabular_data_text[i]==escape_character \
+            and escape_character!=quote_character:
+                
+            row_content+=tabular_data_text[i:i+2]
+            
+            i+=2
+            
+            continue
+        
+        # 2.3 Otherwise, if the string starts with the quote character, append 
+        # the quoted value obtained by reading a quoted value to the row content 
+        # and move on to process the string following the quoted value.
+        if tabular_data_text[i]==quote_character:
+            
+            i, quoted_value=get_quoted_value(
+                tabular_data_text,
+                i,
+                escape_character,
+                quote_character
+                )
+            
+            row_content+=quoted_value
+            
+            # TO BE DELETED
+            # j, quoted_value=get_quoted_value(
+            #     tabular_data_text[i:],
+            #     escape_character,
+            #     quote_character
+            #     )
+            
+            # row_content+=quoted_value
+            
+            # i+=j
+            
+            continue
+            
+        # 2.4 Otherwise, if the string starts with one of the line terminators, 
+        # return the row content.
+        
+        line_terminator_flag=False
+        
+        for x in line_terminators:
+            
+            #print('-x',x)
+            #print(tabular_data_text[i:i+len(x)-1])
+        
+            if tabular_data_text[i:i+len(x)]==x:
+                
+                #print('TEST')
+                
+                i+=len(x)
+                
+                line_terminator_flag=True
+                
+                break
+            
+        if line_terminator_flag:
+            
+            break
+            
+        # 2.5 Otherwise, append the first character to the row content and move 
+        # on to process the string following that character.
+        row_content+=tabular_data_text[i]
+        
+        i+=1
+    
+        
+    #print(i, row_content)
+    
+    return i, row_content
+    
+    
+def get_quoted_value(
+        tabular_data_text,
+        i,
+        escape_character,
+        quote_character,
+        ):
+    """
+    """
+    
+    # To read a quoted value to provide a quoted value, perform the following steps:
+        
+    # 1 Set the quoted value to an empty string.
+    quoted_value=''
+    
+    # 2 Read the initial quote character and add a quote character to the quoted value.
+    initial_quote_character=tabular_data_text[i]
+    quoted_value+=initial_quote_character
+    
+    # 3 Read initial characters and process as follows:
+    
+    i+=1
+    
+    while True:    
+        
+        current_character=tabular_data_text[i]
+        
+        try:
+            
+            next_character=tabular_data_text[i+1]
+            
+        except IndexError:
+            
+            next_character=None
+    
+        # 3.1 If the string starts with the escape character followed by the quote 
+        # character, append both strings to the quoted value, and move on to 
+        # process the string following the quote character.
+        if (current_character==escape_character 
+            and next_character==quote_character):
+            
+            quoted_value+=escape_character+quote_character
+            
+            i+=2
+        
+        # 3.2 Otherwise, if string starts with the escape character and the escape 
+        # character is not the same as the quote character, append the escape 
+        # character and the character following it to the quoted value and move 
+        # on to process the string following that character.
+        elif (current_character==escape_character 
+              and escape_character!=quote_character):
+            
+            quoted_value+=escape_character+next_character
+            
+            i+=2
+        
+        # 3.3 Otherwise, if the string starts with the quote character, return 
+        # the quoted value.
+        elif current_character==quote_character:
+            quoted_value+=quote_character
+            
+            i+=1
+            
+            break
+        
+        # 3.4 Otherwise, append the first character to the quoted value and move 
+        # on to process the string following that character.
+        else:
+            
+            quoted_value+=current_character
+            
+            i+=1
+            
+            
+    return i, quoted_value
+    
+    
+# TO BE DELETED
+# def get_quoted_value(
+#         characters,
+#         escape_character,
+#         quote_character,
+#         ):
+#     """
+#     """
+    
+    
+#     logging=False
+    
+#     if logging: logging.info('    FUNCTION: get_quoted_value')
+#     if logging: logging.debug(f'        ARGUMENT: characters: {characters}')
+#     if logging: logging.debug(f'        ARGUMENT: escape_character: {escape_character}')
+#     if logging: logging.debug(f'        ARGUMENT: quote_character: {quote_character}')
+    
+#     # To read a quoted value to provide a quoted value, perform the following steps:
+        
+#     # 1 Set the quoted value to an empty string.
+#     quoted_value=''
+    
+#     # 2 Read the initial quote character and add a quote character to the quoted value.
+#     initial_quote_character=characters[0]
+#     quoted_value+=initial_quote_character
+    
+#     # 3 Read initial characters and process as follows:
+#     i=1
+    
+#     while True:    
+        
+#         current_character=characters[i]
+        
+#         try:
+            
+#             next_character=characters[i+1]
+            
+#         except IndexError:
+            
+#             next_character=None
+    
+#         # 3.1 If the string starts with the escape character followed by the quote 
+#         # character, append both strings to the quoted value, and move on to 
+#         # process the string following the quote character.
+#         if (current_character==escape_character 
+#             and next_character==quote_character):
+            
+#             quoted_value+=escape_character+quote_character
+            
+#             i+=2
+        
+#         # 3.2 Otherwise, if string starts with the escape character and the escape 
+#         # character is not the same as the quote character, append the escape 
+#         # character and the character following it to the quoted value and move 
+#         # on to process the string following that character.
+#         elif (current_character==escape_character 
+#               and escape_character!=quote_character):
+            
+#             quoted_value+=escape_character+next_character
+            
+#             i+=2
+        
+#         # 3.3 Otherwise, if the string starts with the quote character, return 
+#         # the quoted value.
+#         elif current_character==quote_character:
+#             quoted_value+=quote_character
+            
+#             i+=1
+            
+#             break
+        
+#         # 3.4 Otherwise, append the first character to the quoted value and move 
+#         # on to process the string following that character.
+#         else:
+            
+#             quoted_value+=current_character
+            
+#             i+=1
+            
+#     if logging: logging.debug(f'        RETURN VALUE: i, quoted_value: {i}, {quoted_value}')
+            
+#     return i, quoted_value
+
+    
+def get_list_of_cell_values(
+        characters, ## the row_content
+        escape_character,
+        quote_character,
+        delimiter,
+        trim
+        ):
+    """
+    """
+    #print('-characters',characters.encode())
+    #print('-quote_character',quote_character)
+    
+    # To parse a row to provide a list of cell values, perform the following steps:
+        
+    # 1 Set the list of cell values to an empty list and the current cell 
+    # value to an empty string.
+    list_of_cell_values=[]
+    current_cell_value=''
+    
+    # 2 Set the quoted flag to false.
+    quoted_flag=False
+    
+    # 3 Read initial characters and process as follows:
+    i=0
+    while True:
+    
+        current_character=characters[i]
+        try:
+            next_character=characters[i+1]
+        except IndexError:
+            next_character=None
+    
+        #print('-current_character',current_character)
+        #print('-next_character',next_character)#,type(next_character))
+    
+        # 3.1 If the string starts with the escape character followed by the 
+        # quote character, append the quote character to the current cell 
+        # value, and move on to process the string following the quote character.
+        if (current_character==escape_character
+            and next_character==quote_character):
+            current_cell_value+=quote_character
+            i+=2
+        
+        # 3.2 Otherwise, if the string starts with the escape character and 
+        # the escape character is not the same as the quote character, append 
+        # the character following the escape character to the current cell 
+        # value and move on to process the string following that character.
+        elif (current_character==escape_character 
+              and escape_character!=quote_character):
+            current_cell_value+=next_character
+            i+=2
+        
+        # 3.3 Otherwise, if the string starts with the quote character then:
+        elif current_character==quote_character:
+            
+            # 3.3.1 If quoted is false, set the quoted flag to true, and move on 
+            # to process the remaining string. If the current cell value is not 
+            # an empty string, raise an error.
+            if quoted_flag==False:
+                quoted_flag=True
+                if not current_cell_value=='':
+                    #logging.critical(f'characters: {characters}')
+                    #print(f'characters: {characters}')
+                    #logging.critical(f'i: {i}')
+                    #print(f'i: {i}')
+                    #logging.critical(f'current_cell_value: {current_cell_value}')
+                    #print(f'current_cell_value: "{current_cell_value}"')
+                    raise Exception('quote character encountered not at start of cell')
+                i+=1
+        
+            # 3.3.2 Otherwise, set quoted to false, and move on to process the 
+            # remaining string. If the remaining string does not start with the 
+            # delimiter, raise an error.
+            else:
+                quoted_flag=False
+                if not next_character is None:
+                    if not next_character==delimiter:
+                        #logging.critical(f'characters: {characters}')
+                        #logging.critical(f'i: {i}')
+                        #logging.critical(f'current_cell_value: {current_cell_value}')
+                        #logging.critical(f'next_character: {next_character}')
+                        raise Exception('No delimiter after quote character')
+                i+=1
+        
+        # 3.4 Otherwise, if the string starts with the delimiter, then:
+        elif current_character==delimiter:
+        
+            # 3.4.1 If quoted is true, append the delimiter string to the current 
+            # cell value and move on to process the remaining string.
+            if quoted_flag==True:
+                current_cell_value+=delimiter
+                i+=1
+            
+            # 3.4.2 Otherwise, conditionally trim the current cell value, add the 
+            # resulting trimmed cell value to the list of cell values and move on 
+            # to process the following string.
+            else:
+                trimmed_cell_value=get_trimmed_cell_value(
+                    current_cell_value,
+                    trim
+                    )
+                #print('trimmed_cell_value',trimmed_cell_value)
+                list_of_cell_values.append(trimmed_cell_value)
+                current_cell_value=''
+                i+=1
+        
+        # 3.5 Otherwise, append the first character to the current cell value 
+        # and move on to process the remaining string.
+        else:
+            current_cell_value+=current_character
+            i+=1
+            
+        # 4 If there are no more characters to read, conditionally trim the 
+        # current cell value, add the resulting trimmed cell value to the list 
+        # of cell values and return the list of cell values.
+        if i>len(characters)-1:
+            trimmed_cell_value=get_trimmed_cell_value(
+                current_cell_value,
+                trim
+                )
+            list_of_cell_values.append(trimmed_cell_value)
+            break
+
+    #print(list_of_cell_values)
+
+    #logging.debug(f'    RETURN VALUE: list_of_cell_values: {list_of_cell_values}')
+
+    return list_of_cell_values
+
+
+def get_trimmed_cell_value(
+        cell_value,
+        trim
+        ):
+    """
+    """
+    
+    
+    
+    # To conditionally trim a cell value to provide a trimmed cell value, 
+    # perform the following steps:
+        
+    # 1 Set the trimmed cell value to the provided cell value.
+    trimmed_cell_value=cell_value
+    
+    # 2 If trim is true or start then remove any leading whitespace from 
+    # the start of the trimmed cell value and move on to the next step.
+    if trim==True or trim=='true' or trim=='start':
+        trimmed_cell_value=trimmed_cell_value.lstrip()
+
+    # 3 If trim is true or end then remove any trailing whitespace from 
+    # the end of the trimmed cell value and move on to the next step.
+    if trim==True or trim=='true' or trim=='end':
+        trimmed_cell_value=trimmed_cell_value.rstrip()
+
+    # 4 Return the trimmed cell value.
+    return trimmed_cell_value
+
+
+def get_trim_function(
+        trim
+        ):
+    """Returns the string method which gives the same result as 
+    get_trimmed_cell_value, for trimming many cell values at once.
+    
+    :returns: str.strip, str.lstrip, str.rstrip or None if the cell values 
+        are not trimmed.
+    
+    """
+    if trim==True or trim=='true':
+        return str.strip
+    
+    elif trim=='start':
+        return str.lstrip
+    
+    elif trim=='end':
+        return str.rstrip
+    
+    else:
+        return None
+
+
+
+            
+
+
+        
+#%% 8 - Parsing Tabular Data - tokenizer
+
+# The functions above follow the steps of the standard one character at a 
+# time, and each row is read twice: once to provide the row content and 
+# again to provide the list of cell values.
+# The functions below give the same results but read each row only once. 
+# A regular expression is used to find the next characters which need to be 
+# processed (an escape sequence, quote character, line terminator or 
+# delimiter) and all the characters before them are copied in one go.
+
+def get_tokenizer_regexes(
+        escape_character,
+        quote_character,
+        delimiter,
+        line_terminators
+        ):
+    """Returns the compiled regular expressions used by 
+    get_row_content_and_list_of_cell_values.
+    
+    The regular expressions have the named groups 'escape', 'quote', 
+    'line_terminator' and 'delimiter', in the order these are tested for 
+    in the steps of the standard.
+    
+    :returns: (unquoted_regex, quoted_regex, row_regex). The quoted_regex 
+        is used inside a quoted value and only has the 'escape' and 'quote' 
+        groups. The row_regex has the 'escape', 'quote' and 'line_terminator' 
+        groups and is used to find rows which have no escape or quote 
+        characters.
+    :rtype: tuple
+    
+    """
+    
+    #...the steps of the standard compare single characters, so an escape 
+    #...character, quote character or delimiter which is not a single character 
+    #...is never matched
+    def is_character(x):
+        return isinstance(x,str) and len(x)==1
+    
+    escape_sequences=[]
+    
+    if is_character(escape_character):
         
-    # 11 If M.rdfs:comment is an empty array, remove the rdfs:comment property from M.
-    if len(metadata_table_dict['rdfs:comment'])==0:
+        if is_character(quote_character):
+            
+            escape_sequences.append(re.escape(escape_character+quote_character))
         
-        metadata_table_dict.pop('rdfs:comment')
+        if escape_character!=quote_character:
+            
+            #...the escape character followed by any character, 
+            #...or on its own at the end of the text
+            escape_sequences.append(re.escape(escape_character)+'(?s:.)?')
+            
+    groups=[]
     
-    # 12 Return the table T and the embedded metadata M.
+    if len(escape_sequences)>0:
+        groups.append(f'(?P<escape>{"|".join(escape_sequences)})')
+    
+    if is_character(quote_character):
+        groups.append(f'(?P<quote>{re.escape(quote_character)})')
         
-    # validate_and_normalize_metadata_table_dict(
-    #     metadata_table_dict,
-    #     metadata_document_location=None,
-    #     metadata_table_group_dict=None
-    #     )
+    quoted_regex=re.compile('|'.join(groups) or '(?!)')
     
+    #...line terminators are tested in the order they are given
+    line_terminators=[re.escape(x) for x in line_terminators if x!='']
     
+    if len(line_terminators)>0:
+        groups.append(f'(?P<line_terminator>{"|".join(line_terminators)})')
+        
+    row_regex=re.compile('|'.join(groups) or '(?!)')
     
-    return table_dict, metadata_table_dict
+    if is_character(delimiter):
+        groups.append(f'(?P<delimiter>{re.escape(delimiter)})')
     
+    unquoted_regex=re.compile('|'.join(groups) or '(?!)')
     
+    return unquoted_regex, quoted_regex, row_regex
 
-def get_row_content(
+
+def get_row_content_and_list_of_cell_values(
         tabular_data_text,
         i,
         escape_character,
         quote_character,
-        line_terminators
+        delimiter,
+        line_terminators,
+        trim,
+        tokenizer_regexes=None
         ):
+    """Reads a row and parses it in a single pass.
+    
+    This gives the same results as calling get_row_content followed by 
+    get_list_of_cell_values.
+    
+    If the row cannot be parsed to a list of cell values (an empty row, a 
+    quote character which is not at the start of a cell or a quoted value 
+    which is not followed by a delimiter) then None is returned in place of 
+    the list of cell values. 
+    The error is not raised here as comment rows are not parsed; 
+    get_list_of_cell_values can be called on the row content to raise it.
+    
+    An IndexError is raised if the text ends part way through a quoted value 
+    or escape sequence.
+    
+    :param tokenizer_regexes: OPTIONAL. The output of get_tokenizer_regexes, 
+        which can be provided so the regular expressions are only compiled 
+        once per file.
+    
+    :returns: (i, row_content, list_of_cell_values)
+    :rtype: tuple
+    
     """
-    """
-    #print(tabular_data_text)
-    #print(i)
-    # print(escape_character)
-    # print(quote_character)
-    # print(line_terminators)
     
-    # To read a row to provide row content, perform the following steps:
+    if tokenizer_regexes is None:
+        
+        tokenizer_regexes=\
+            get_tokenizer_regexes(
+                escape_character,
+                quote_character,
+                delimiter,
+                line_terminators
+                )
     
-    # 1 Set the row content to an empty string.
-    row_content=''
+    unquoted_regex, quoted_regex, row_regex=tokenizer_regexes
     
-    # 2 Read initial characters and process as follows:
+    text_length=len(tabular_data_text)
+    row_start=i
+    
+    #...a row with no escape or quote characters is split on the delimiter
+    match=row_regex.search(tabular_data_text,i)
+    
+    if match is None or match.lastgroup=='line_terminator':
         
-    while True:
+        if match is None:
+            row_end=text_length
+            i=text_length
+        else:
+            row_end=match.start()
+            i=match.end()
+            
+        row_content=tabular_data_text[row_start:row_end]
         
-        #print(i, end=' ')
+        #...an empty row has no cell values
+        if row_content=='':
+            return i, row_content, None
         
-        #print('-line_terminators',line_terminators)
+        if isinstance(delimiter,str) and len(delimiter)==1:
+            list_of_cell_values=row_content.split(delimiter)
+        else:
+            list_of_cell_values=[row_content]
+            
+        trim_function=get_trim_function(trim)
+            
+        if not trim_function is None:
+            list_of_cell_values=list(map(trim_function,list_of_cell_values))
         
-        #...placing this first...
-        # 3 If there are no more characters to read, return the row content.
-        if i>len(tabular_data_text)-1:
+        return i, row_content, list_of_cell_values
+    
+    #...otherwise the row is read one token at a time
+    
+    list_of_cell_values=[]
+    current_cell_value=[]  # the parts of the current cell value
+    
+    quoted_flag=False
+    after_quoted_value_flag=False
+    valid_flag=True  # set to False if the row cannot be parsed to cell values
+    
+    while True:
+        
+        match=(quoted_regex if quoted_flag else unquoted_regex).search(
+            tabular_data_text,
+            i
+            )
+        
+        if match is None:
+            
+            #...the end of the text is reached in a quoted value
+            if quoted_flag:
+                raise IndexError('End of text reached in a quoted value.')
+                
+            #...the end of the text is reached
+            if after_quoted_value_flag and i<text_length:
+                valid_flag=False  # no delimiter after the quote character
+                
+            current_cell_value.append(tabular_data_text[i:])
+            
+            row_end=text_length
+            i=text_length
+            
             break
         
-    
-        # 2.1 If the string starts with the escape character followed by the 
-        # quote character, append both strings to the row content, and move on 
-        # to process the string following the quote character.
-        if tabular_data_text[i]==escape_character \
-            and tabular_data_text[i+1]==quote_character:
+        j=match.start()
+        token=match.group()
+        group=match.lastgroup
+        
+        if j>i:
+            
+            if after_quoted_value_flag and not quoted_flag:
+                valid_flag=False  # no delimiter after the quote character
                 
-            row_content+=escape_character+quote_character
+            current_cell_value.append(tabular_data_text[i:j])
             
-            i+=2
+        i=j+len(token)
+        
+        # an escape or quote character which is the last character of the 
+        # text, other than a closing quote character, cannot be read
+        if i==text_length and len(token)==1 \
+            and (group=='escape' or (group=='quote' and not quoted_flag)):
+                
+            raise IndexError('End of text reached in an escape sequence or quoted value.')
             
-            continue
+        # line terminator, which ends the row
+        if group=='line_terminator':
+            
+            row_end=j
+            
+            break
+            
+        # delimiter, which ends the cell
+        elif group=='delimiter':
+            
+            list_of_cell_values.append(
+                get_trimmed_cell_value(
+                    ''.join(current_cell_value),
+                    trim
+                    )
+                )
+            current_cell_value=[]
+            
+            after_quoted_value_flag=False
             
+        # escape character followed by a character, 
+        # which appends that character
+        elif group=='escape':
+            
+            if after_quoted_value_flag and not quoted_flag:
+                valid_flag=False  # no delimiter after the quote character
+            
+            current_cell_value.append(token[1])
+            
+        # quote character which ends a quoted value
+        elif quoted_flag:
+            
+            quoted_flag=False
+            after_quoted_value_flag=True
+            
+        # quote character which starts a quoted value
+        else:
+            
+            if any(current_cell_value) or after_quoted_value_flag:
+                valid_flag=False  # quote character not at start of cell
+                
+            quoted_flag=True
+            
+    row_content=tabular_data_text[row_start:row_end]
+    
+    #...an empty row has no cell values
+    if row_content=='':
+        valid_flag=False
+    
+    if not valid_flag:
+        
+        return i, row_content, None
+    
+    list_of_cell_values.append(
+        get_trimmed_cell_value(
+            ''.join(current_cell_value),
+            trim
+            )
+        )
+    
+    return i, row_content, list_of_cell_values
+
+
+
+#%% 8 - Parsing Tabular Data - csv module
+
+# The csv module of the Python standard library reads rows much faster than 
+# the functions above. 
+# It gives the same results as the steps of the standard when:
+# - the escape character is the same as the quote character and both are a 
+#   single character, and the delimiter is a single character;
+# - the line terminators are "\r\n" and "\n";
+# - every cell is either unquoted and contains no quote characters, or is 
+#   quoted and is followed by a delimiter or the end of the row. 
+#   A quoted cell cannot start with two quote characters as the standard 
+#   reads these as an escaped quote character (so the standard reads "" as 
+#   a cell containing a single quote character, not an empty cell).
+# If these are not met, the rows are read using the steps of the standard.
+
+def iter_row_contents_using_csv_module(
+        text_stream,
+        escape_character,
+        quote_character,
+        delimiter,
+        line_terminators,
+        trim,
+        chunk_size=65536
+        ):
+    """Reads the rows of a text stream using the csv module and yields the 
+    row content and list of cell values of each row, as iter_row_contents 
+    does.
+    
+    Each row is checked as it is read. If the dialect is not compatible with 
+    the csv module, the rows are read using iter_row_contents. If a row is 
+    not compatible with the csv module, that row and the rows after it are 
+    read using iter_row_contents.
+    
+    """
+    
+    # check the dialect
+    if not (isinstance(quote_character,str) and len(quote_character)==1
+            and escape_character==quote_character
+            and isinstance(delimiter,str) and len(delimiter)==1
+            and not delimiter in (quote_character,'\r','\n')
+            and not quote_character in ('\r','\n')
+            and sorted(line_terminators)==['\n','\r\n']):
+        
+        yield from \
+            iter_row_contents(
+                text_stream,
+                escape_character,
+                quote_character,
+                delimiter,
+                line_terminators,
+                trim,
+                chunk_size
+                )
         
+        return
+    
+    #...the text of a row, including its line terminator, which can be read 
+    #...using the csv module
+    q=re.escape(quote_character)
+    d=re.escape(delimiter)
+    
+    unquoted_cell=f'[^{q}{d}\\r\\n]*'
+    quoted_cell=f'{q}(?!{q})[^{q}]*(?:{q}{q}[^{q}]*)*{q}'
+    cell=f'(?:{quoted_cell}|{unquoted_cell})'
+    row_regex=re.compile(f'{cell}(?:{d}{cell})*(?:\\r?\\n)?')
+    
+    buffer=''
+    line_end=0
+    row_lines=[]  # the lines read by the csv module for the current row
+    
+    def iter_lines():
+        "Yields the lines of the text stream, keeping the lines of the current row."
+        nonlocal buffer, line_end
         
-        # 2.2 Otherwise, if the string starts with the escape character and the 
-        # escape character is not the same as the quote character, append the 
-        # escape character and the single character following it to the row 
-        # content and move on to process the string following that character.
-        if tabular_data_text[i]==escape_character \
-            and escape_character!=quote_character:
+        while True:
+            
+            line_start=line_end
+            line_end=buffer.find('\n',line_start)+1
+            
+            #...a line which reaches the end of the buffer may continue 
+            #...in the next chunk
+            if line_end==0:
                 
-            row_content+=tabular_data_text[i:i+2]
+                chunk=text_stream.read(chunk_size)
+                
+                if chunk=='':
+                    
+                    line_end=len(buffer)
+                    
+                    if line_start==line_end:
+                        return
+                    
+                else:
+                    
+                    buffer=buffer[line_start:]+chunk
+                    line_end=0
+                    
+                    continue
+                
+            line=buffer[line_start:line_end]
             
-            i+=2
+            row_lines.append(line)
             
-            continue
+            yield line
+    
+    trim_function=get_trim_function(trim)
+    
+    reader=csv.reader(
+        iter_lines(),
+        delimiter=delimiter,
+        quotechar=quote_character,
+        doublequote=True,
+        quoting=csv.QUOTE_MINIMAL,
+        strict=True
+        )
+    
+    while True:
         
-        # 2.3 Otherwise, if the string starts with the quote character, append 
-        # the quoted value obtained by reading a quoted value to the row content 
-        # and move on to process the string following the quoted value.
-        if tabular_data_text[i]==quote_character:
+        try:
             
-            i, quoted_value=get_quoted_value(
-                tabular_data_text,
-                i,
-                escape_character,
-                quote_character
-                )
+            list_of_cell_values=next(reader,None)
             
-            row_content+=quoted_value
+        except csv.Error:  # for example a cell larger than the csv module field size limit
             
-            # TO BE DELETED
-            # j, quoted_value=get_quoted_value(
-            #     tabular_data_text[i:],
-            #     escape_character,
-            #     quote_character
-            #     )
+            break
+        
+        if list_of_cell_values is None:
             
-            # row_content+=quoted_value
+            return
+        
+        row_text=''.join(row_lines)
+        
+        if row_regex.fullmatch(row_text) is None:
             
-            # i+=j
+            break
+        
+        row_lines.clear()
+        
+        #...remove the line terminator
+        if row_text.endswith('\r\n'):
+            row_content=row_text[:-2]
+        elif row_text.endswith('\n'):
+            row_content=row_text[:-1]
+        else:
+            row_content=row_text
+        
+        #...an empty row has no cell values
+        if row_content=='':
+            list_of_cell_values=None
+        elif not trim_function is None:
+            list_of_cell_values=list(map(trim_function,list_of_cell_values))
+        
+        yield row_content, list_of_cell_values
+        
+    #...the row which is not compatible with the csv module is read again, 
+    #...followed by the rest of the text stream
+    yield from \
+        iter_row_contents(
+            text_stream,
+            escape_character,
+            quote_character,
+            delimiter,
+            line_terminators,
+            trim,
+            chunk_size,
+            buffer=''.join(row_lines)+buffer[line_end:]
+            )
+
+
+#%% 8 - Parsing Tabular Data - process pool
+
+# A large local tabular data file can be read in parallel by splitting the 
+# file into byte ranges which start and end on row boundaries. 
+# The boundaries are found by scanning the bytes of the file, without 
+# decoding it, so only encodings where the quote character, escape character 
+# and line terminators are always single bytes are supported. 
+# When the escape character is the same as the quote character (or there is 
+# no escape character), a line terminator ends a row if it is not in a quoted 
+# value, which is the case when there are an even number of quote characters 
+# before it (as an escaped quote character is two quote characters). 
+# Otherwise the escape sequences, quote characters and line terminators are 
+# read in order, as get_row_content_and_list_of_cell_values does.
+# Each worker process opens the file and reads its own byte range, and the 
+# rows of all the byte ranges are then processed in order, so the row 
+# numbers, source row numbers and any errors are the same as when the text 
+# is read in one go.
+
+def get_byte_range_boundaries(
+        file_path,
+        encoding,
+        escape_character,
+        quote_character,
+        line_terminators,
+        chunk_size
+        ):
+    """Returns the byte offsets where a file can be split into byte ranges 
+    of about chunk_size bytes, so that each byte range starts and ends on a 
+    row boundary.
+    
+    :returns: A list of byte offsets, starting with 0 and ending with the 
+        size of the file. None is returned if the encoding or the dialect 
+        are not supported.
+    :rtype: list
+    
+    """
+    
+    def is_ascii_character(x):
+        return isinstance(x,str) and len(x)==1 and x.isascii() \
+            and not x in ('\r','\n')
+    
+    #...an escape character which is not a single character is never matched
+    escape_flag=isinstance(escape_character,str) and len(escape_character)==1
+    
+    #...only encodings where the ASCII characters are single bytes which are 
+    #...never part of another character, and only the default line 
+    #...terminators, are supported
+    try:
+        encoding_name=codecs.lookup(encoding).name
+    except LookupError:
+        return None
+    
+    if not (encoding_name in ('utf-8','ascii','iso8859-1')
+            and is_ascii_character(quote_character)
+            and (not escape_flag or is_ascii_character(escape_character))
+            and len(line_terminators)>0
+            and set(line_terminators).issubset({'\r\n','\n'})):
+        
+        return None
+    
+    quote_byte=quote_character.encode('ascii')
+    line_terminator=b'\n' if '\n' in line_terminators else b'\r\n'
+    
+    #...the escape sequences are only read when they are not doubled quote 
+    #...characters
+    if escape_flag and escape_character!=quote_character:
+        
+        token_regex=re.compile(
+            re.escape(escape_character.encode('ascii'))+b'(?s:.)?'
+            +b'|'+re.escape(quote_byte)
+            +b'|'+re.escape(line_terminator)
+            )
+        
+    else:
+        
+        token_regex=None
+    
+    with open(file_path,'rb') as f:
+        
+        file_size=os.fstat(f.fileno()).st_size
+        
+        boundaries=[0]
+        
+        #...a file which is not split, including an empty file which cannot 
+        #...be mapped to memory
+        if file_size<=chunk_size:
             
-            continue
+            boundaries.append(file_size)
+            
+            return boundaries
+        
+        with mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ) as file_bytes:
+        
+            position=0  # the position up to which the bytes have been read
+            quoted=False
+            
+            while True:
+                
+                target=boundaries[-1]+chunk_size
+                
+                if target>=file_size:
+                    break
+                
+                #...the next line terminator at or after the target which is 
+                #...not in a quoted value
+                if token_regex is None:
+                
+                    quoted^=file_bytes[position:target].count(quote_byte)%2==1
+                    position=target
+                    
+                    while True:
+                        
+                        j=file_bytes.find(line_terminator,position)
+                        
+                        if j==-1:
+                            position=file_size
+                            break
+                        
+                        quoted^=file_bytes[position:j].count(quote_byte)%2==1
+                        position=j+len(line_terminator)
+                        
+                        if not quoted:
+                            break
+                        
+                else:
+                    
+                    for match in token_regex.finditer(file_bytes,position):
+                        
+                        token=match.group()
+                        
+                        if token==quote_byte:
+                            
+                            quoted=not quoted
+                            
+                        elif token==line_terminator and not quoted \
+                            and match.end()>=target:
+                            
+                            position=match.end()
+                            break
+                        
+                    else:
+                        
+                        position=file_size
+                    
+                if position>=file_size:
+                    break
+                
+                boundaries.append(position)
+            
+    boundaries.append(file_size)
+    
+    return boundaries
+
+
+def get_rows_from_text_chunk(
+        tabular_data_text_chunk,
+        escape_character,
+        quote_character,
+        delimiter,
+        line_terminators,
+        trim,
+        use_csv_module
+        ):
+    """Reads all the rows of a chunk of text which starts and ends on row 
+    boundaries.
+    
+    If a row cannot be read (for example as the text ends in a quoted 
+    value) the error is stored in place of the row and no further rows are 
+    read, so it can be raised when the row is processed.
+    
+    :returns: A dictionary with the character index of the start of each row 
+        in the chunk as the keys and (i, row_content, list_of_cell_values) 
+        tuples (or an exception) as the values, as returned by 
+        get_row_content_and_list_of_cell_values.
+    :rtype: dict
+    
+    """
+    
+    if use_csv_module:
+        
+        row_contents=\
+            iter_row_contents_using_csv_module(
+                io.StringIO(tabular_data_text_chunk),
+                escape_character,
+                quote_character,
+                delimiter,
+                line_terminators,
+                trim
+                )
             
-        # 2.4 Otherwise, if the string starts with one of the line terminators, 
-        # return the row content.
+    else:
         
-        line_terminator_flag=False
+        #...the chunk is already in memory so it is all placed in the buffer
+        row_contents=\
+            iter_row_contents(
+                io.StringIO(),
+                escape_character,
+                quote_character,
+                delimiter,
+                line_terminators,
+                trim,
+                buffer=tabular_data_text_chunk
+                )
+    
+    #...line terminators are tested in the order they are given
+    line_terminators=[x for x in line_terminators if x!='']
+    
+    rows={}
+    i=0
+    
+    try:
         
-        for x in line_terminators:
+        for row_content, list_of_cell_values in row_contents:
             
-            #print('-x',x)
-            #print(tabular_data_text[i:i+len(x)-1])
-        
-            if tabular_data_text[i:i+len(x)]==x:
-                
-                #print('TEST')
-                
-                i+=len(x)
-                
-                line_terminator_flag=True
-                
-                break
+            #...the row content is followed by the line terminator, if any
+            j=i+len(row_content)
+            j+=next((len(x) for x in line_terminators 
+                     if tabular_data_text_chunk.startswith(x,j)),0)
             
-        if line_terminator_flag:
+            rows[i]=(j,row_content,list_of_cell_values)
             
-            break
+            i=j
             
-        # 2.5 Otherwise, append the first character to the row content and move 
-        # on to process the string following that character.
-        row_content+=tabular_data_text[i]
+    except IndexError as e:
         
-        i+=1
+        rows[i]=e
+            
+    return rows
+
+
+def get_rows_from_byte_range(
+        file_path,
+        start,
+        end,
+        encoding,
+        escape_character,
+        quote_character,
+        delimiter,
+        line_terminators,
+        trim,
+        use_csv_module
+        ):
+    """Reads all the rows of a byte range of a file which starts and ends on 
+    row boundaries.
     
-        
-    #print(i, row_content)
+    This is run in the worker processes of get_rows_using_process_pool, 
+    each of which opens the file and reads only its own byte range.
     
-    return i, row_content
+    :returns: (character_count, rows) where character_count is the number 
+        of characters in the byte range and rows is as returned by 
+        get_rows_from_text_chunk. None is returned if the bytes cannot be 
+        decoded.
+    :rtype: tuple
     
+    """
     
-def get_quoted_value(
-        tabular_data_text,
-        i,
+    with open(file_path,'rb') as f:
+        
+        f.seek(start)
+        
+        tabular_data_bytes=f.read(end-start)
+        
+    try:
+        
+        tabular_data_text_chunk=tabular_data_bytes.decode(encoding)
+        
+    except UnicodeDecodeError:
+        
+        return None
+    
+    return (
+        len(tabular_data_text_chunk),
+        get_rows_from_text_chunk(
+            tabular_data_text_chunk,
+            escape_character,
+            quote_character,
+            delimiter,
+            line_terminators,
+            trim,
+            use_csv_module
+            )
+        )
+
+
+def get_rows_using_process_pool(
+        file_path,
+        encoding,
         escape_character,
         quote_character,
+        delimiter,
+        line_terminators,
+        trim,
+        use_csv_module,
+        processes,
+        chunk_size=2**20
         ):
-    """
-    """
+    """Reads all the rows of a local tabular data file in parallel using a 
+    pool of worker processes.
     
-    # To read a quoted value to provide a quoted value, perform the following steps:
-        
-    # 1 Set the quoted value to an empty string.
-    quoted_value=''
+    :param processes: The number of worker processes.
+    :type processes: int
     
-    # 2 Read the initial quote character and add a quote character to the quoted value.
-    initial_quote_character=tabular_data_text[i]
-    quoted_value+=initial_quote_character
+    :param chunk_size: The approximate number of bytes in each byte range.
+    :type chunk_size: int
     
-    # 3 Read initial characters and process as follows:
+    :returns: (rows, text_length) where rows is a dictionary as returned by 
+        get_rows_from_text_chunk, with an exception in place of the row 
+        which cannot be read if there is one, and text_length is the number 
+        of characters in the file. None is returned if the file cannot be 
+        split into byte ranges, or cannot be decoded, in which case it 
+        should be read in one go.
+    :rtype: tuple
     
-    i+=1
+    """
     
-    while True:    
+    boundaries=\
+        get_byte_range_boundaries(
+            file_path,
+            encoding,
+            escape_character,
+            quote_character,
+            line_terminators,
+            chunk_size
+            )
         
-        current_character=tabular_data_text[i]
+    if boundaries is None:
         
-        try:
-            
-            next_character=tabular_data_text[i+1]
-            
-        except IndexError:
-            
-            next_character=None
+        return None
+        
+    args=[(file_path,
+           start,
+           end,
+           encoding,
+           escape_character,
+           quote_character,
+           delimiter,
+           line_terminators,
+           trim,
+           use_csv_module)
+          for start,end in zip(boundaries[:-1],boundaries[1:])]
     
-        # 3.1 If the string starts with the escape character followed by the quote 
-        # character, append both strings to the quoted value, and move on to 
-        # process the string following the quote character.
-        if (current_character==escape_character 
-            and next_character==quote_character):
-            
-            quoted_value+=escape_character+quote_character
-            
-            i+=2
+    rows={}
+    text_length=0
+    
+    def add_rows(result):
+        "Adds the rows of a byte range, moved to their character index in the file."
+        nonlocal text_length
         
-        # 3.2 Otherwise, if string starts with the escape character and the escape 
-        # character is not the same as the quote character, append the escape 
-        # character and the character following it to the quoted value and move 
-        # on to process the string following that character.
-        elif (current_character==escape_character 
-              and escape_character!=quote_character):
-            
-            quoted_value+=escape_character+next_character
-            
-            i+=2
+        character_count, chunk_rows=result
         
-        # 3.3 Otherwise, if the string starts with the quote character, return 
-        # the quoted value.
-        elif current_character==quote_character:
-            quoted_value+=quote_character
+        for i,row in chunk_rows.items():
             
-            i+=1
+            rows[i+text_length]=\
+                row if isinstance(row,Exception) \
+                else (row[0]+text_length,row[1],row[2])
+        
+        text_length+=character_count
+    
+    #...a single byte range is read in this process
+    if len(args)==1:
+        
+        results=[get_rows_from_byte_range(*args[0])]
+        
+    else:
+        
+        executor=concurrent.futures.ProcessPoolExecutor(max_workers=processes)
+        
+        results=executor.map(get_rows_from_byte_range,*zip(*args))
             
-            break
+    try:
         
-        # 3.4 Otherwise, append the first character to the quoted value and move 
-        # on to process the string following that character.
-        else:
+        for result in results:
             
-            quoted_value+=current_character
+            if result is None:
+                
+                return None
             
-            i+=1
+            add_rows(result)
+            
+    finally:
+        
+        if len(args)>1:
             
+            executor.shutdown(cancel_futures=True)
             
-    return i, quoted_value
+    return rows, text_length
+
+
+#%% 8 - Parsing Tabular Data - streaming
+
+# The functions above keep all the rows of the tabular data file in memory 
+# in the annotated table. 
+# The functions below follow the same algorithm but yield the rows of the 
+# tabular data file as they are read, so that large files can be processed 
+# one row at a time.
+
+def stream_tabular_data_from_text(
+        tabular_data_file_url,
+        dialect_description_dict,
+        table_dict=None,
+        chunk_size=65536,
+        row_error_function=None
+        ):
+    """Streaming version of parse_tabular_data_from_text.
     
+    The skipped rows and header rows are read straight away. The remaining 
+    rows are returned as a generator which only creates each row (and its 
+    cells) when it is requested. 
     
-# TO BE DELETED
-# def get_quoted_value(
-#         characters,
-#         escape_character,
-#         quote_character,
-#         ):
-#     """
-#     """
+    The rows created by the generator are not appended to the rows of the 
+    table, and their cells are not appended to the cells of the columns, so 
+    only the current row is held in memory.
     
+    :param table_dict: OPTIONAL. An existing (annotated) table to use as the 
+        table T. If provided, its columns are used for the cells of each row.
+    :type table_dict: dict
     
-#     logging=False
+    :param chunk_size: The number of characters read from the file at a time.
+    :type chunk_size: int
     
-#     if logging: logging.info('    FUNCTION: get_quoted_value')
-#     if logging: logging.debug(f'        ARGUMENT: characters: {characters}')
-#     if logging: logging.debug(f'        ARGUMENT: escape_character: {escape_character}')
-#     if logging: logging.debug(f'        ARGUMENT: quote_character: {quote_character}')
+    :param row_error_function: OPTIONAL. A function with arguments 
+        (message, row_number) which is called when a row after the header 
+        rows cannot be parsed. The row is then skipped. If None, the error 
+        is raised.
     
-#     # To read a quoted value to provide a quoted value, perform the following steps:
+    :returns: (table_dict, metadata_table_dict, row_dicts)
+    :rtype: tuple
+    
+    """
+    
+    comment_prefix=dialect_description_dict.get('commentPrefix',None)
+    delimiter=dialect_description_dict.get('delimiter',',')
+    encoding=dialect_description_dict.get('encoding','utf-8')
+    escape_character=dialect_description_dict.get('escapeCharacter','"')
+    header=dialect_description_dict.get('headerRowCount',True)
+    header_row_count=dialect_description_dict.get('headerRowCount',1 if header else 0)
+    line_terminators=dialect_description_dict.get('lineTerminators',['\r\n', '\n'])
+    quote_character=dialect_description_dict.get('quoteCharacter','"')
+    skip_blank_rows=dialect_description_dict.get('skipBlankRows',False)
+    skip_columns=dialect_description_dict.get('skipColumns',0)
+    skip_rows=dialect_description_dict.get('skipRows',0)
+    trim=dialect_description_dict.get('trim',True)
+    
+    # 1. Create a new table T
+    
+    if table_dict is None:
+    
+        table_dict=AnnotatedTable(
+            columns=[],
+            rows=[],
+            id=None,
+            url=tabular_data_file_url,
+            tableDirection='auto',
+            suppressOutput=False,
+            notes=[],  # not False as stated in the standard
+            foreignKeys=[],
+            transformations=[]       
+            )
+    
+    # 2. Create a metadata document structure M
+    
+    metadata_table_dict={
+        "@context": "http://www.w3.org/ns/csvw",
+        "rdfs:comment": [],
+        "tableSchema": {
+            "columns": []
+            }
+      }
+    
+    # 3. If the URL of the tabular data file being parsed is known, set the 
+    #    url property on M to that URL.
+    
+    if not tabular_data_file_url is None:
+        metadata_table_dict['url']=tabular_data_file_url
+        
+    # 4. Set source row number to 1.
+    source_row_number=1
+    
+    # 5. Read the file using the encoding.
+    
+    #...remove fragments and queries from tabular_data_file_url
+    url=urllib.parse.urljoin(tabular_data_file_url, 
+                         urllib.parse.urlparse(tabular_data_file_url).path)
+    
+    #...newline='' so that the line terminators are passed through unchanged
+    text_stream=io.TextIOWrapper(
+        get_url_fetcher().open(url,stream=True),
+        encoding=encoding,
+        newline=''
+        )
+    
+    row_contents=\
+        iter_row_contents(
+            text_stream,
+            escape_character,
+            quote_character,
+            delimiter,
+            line_terminators,
+            trim,
+            chunk_size
+            )
+    
+    # 6. Repeat the following the number of times indicated by skip rows:
+    
+    for _ in range(skip_rows): 
+        
+        # 6.1 Read a row to provide the row content.
+        row_content, list_of_cell_values=next(row_contents,('',None))
+        
+        # 6.2 If the comment prefix is not null and the row content begins 
+        # with the comment prefix, strip that prefix from the row content, 
+        # and add the resulting string to the M.rdfs:comment array.
+        if not comment_prefix is None \
+            and row_content.startswith(comment_prefix):
+                
+            metadata_table_dict['rdfs:comment'].append(
+                row_content[len(comment_prefix):]
+                )
+        
+        # 6.3 Otherwise, if the row content is not an empty string, add the 
+        # row content to the M.rdfs:comment array.
+        elif not row_content=='':
+            metadata_table_dict['rdfs:comment'].append(
+                row_content
+                )
+    
+        # 6.4 Add 1 to the source row number.
+        source_row_number+=1
+        
+    # 7 Repeat the following the number of times indicated by header row count:
+        
+    for _ in range(header_row_count):
+        
+        # 7.1 Read a row to provide the row content.
+        row_content, list_of_cell_values=next(row_contents,('',None))
+        
+        # 7.2 If the comment prefix is not null and the row content begins 
+        # with the comment prefix, strip that prefix from the row content, 
+        # and add the resulting string to the M.rdfs:comment array.
+        if not comment_prefix is None \
+            and row_content.startswith(comment_prefix):
+                
+            metadata_table_dict['rdfs:comment'].append(
+                row_content[len(comment_prefix):]
+                )
+                
+        # 7.3 Otherwise, parse the row to provide a list of cell values, and:
+        else:
+            
+            #...the row cannot be parsed, so parse it again to raise the error
+            if list_of_cell_values is None:
+                
+                list_of_cell_values=\
+                    get_list_of_cell_values(
+                        row_content,
+                        escape_character,
+                        quote_character,
+                        delimiter,
+                        trim
+                        )
+            
+            # 7.3.1 Remove the first skip columns number of values from the 
+            # list of cell values.
+            list_of_cell_values_non_skipped=list_of_cell_values[skip_columns:]
+            
+            # 7.3.2 For each of the remaining values at index i in the list 
+            # of cell values:
+            if len(metadata_table_dict['tableSchema']['columns'])==0:
+                
+                metadata_table_dict['tableSchema']['columns']=\
+                    [{'titles':[]} 
+                     for x in range(len(list_of_cell_values_non_skipped))]
+                
+            for i, value in enumerate(list_of_cell_values_non_skipped):
+                
+                # 7.3.2.1 If the value at index i in the list of cell values 
+                # is an empty string or consists only of whitespace, do nothing.
+                if value.strip()=='':
+                    continue
+                
+                # 7.3.2.2 and 7.3.2.3
+                metadata_table_dict['tableSchema']['columns'][i]['titles'].append(
+                    value
+                    )
+                
+        # 7.4 Add 1 to the source row number.
+        source_row_number+=1
         
-#     # 1 Set the quoted value to an empty string.
-#     quoted_value=''
-    
-#     # 2 Read the initial quote character and add a quote character to the quoted value.
-#     initial_quote_character=characters[0]
-#     quoted_value+=initial_quote_character
-    
-#     # 3 Read initial characters and process as follows:
-#     i=1
+    # 8 If header row count is zero, create an empty column description object 
+    # in M.tableSchema.columns for each column in the current row after skip 
+    # columns.
     
-#     while True:    
+    if header_row_count==0 or len(metadata_table_dict['tableSchema']['columns'])==0:
         
-#         current_character=characters[i]
+        #...the rows read here are read again as data rows below
+        peeked_row_contents=[]
         
-#         try:
+        while True: # loops until a non-comment row is found
             
-#             next_character=characters[i+1]
+            x=next(row_contents,None)
             
-#         except IndexError:
+            if x is None:
+                row_content, list_of_cell_values='', None
+                break
             
-#             next_character=None
-    
-#         # 3.1 If the string starts with the escape character followed by the quote 
-#         # character, append both strings to the quoted value, and move on to 
-#         # process the string following the quote character.
-#         if (current_character==escape_character 
-#             and next_character==quote_character):
+            peeked_row_contents.append(x)
             
-#             quoted_value+=escape_character+quote_character
+            row_content, list_of_cell_values=x
             
-#             i+=2
-        
-#         # 3.2 Otherwise, if string starts with the escape character and the escape 
-#         # character is not the same as the quote character, append the escape 
-#         # character and the character following it to the quoted value and move 
-#         # on to process the string following that character.
-#         elif (current_character==escape_character 
-#               and escape_character!=quote_character):
+            if comment_prefix is None \
+                or not row_content.startswith(comment_prefix):
+                    break
             
-#             quoted_value+=escape_character+next_character
+        #...the row cannot be parsed, so parse it again to raise the error
+        if list_of_cell_values is None:
             
-#             i+=2
+            list_of_cell_values=\
+                get_list_of_cell_values(
+                    row_content,
+                    escape_character,
+                    quote_character,
+                    delimiter,
+                    trim
+                    )
+            
+        list_of_cell_values_non_skipped=list_of_cell_values[skip_columns:]
         
-#         # 3.3 Otherwise, if the string starts with the quote character, return 
-#         # the quoted value.
-#         elif current_character==quote_character:
-#             quoted_value+=quote_character
+        metadata_table_dict['tableSchema']['columns']=\
+            [{'@type':'Column'} 
+             for x in range(len(list_of_cell_values_non_skipped))]
             
-#             i+=1
+        row_contents=itertools.chain(peeked_row_contents,row_contents)
             
-#             break
+    # 11 If M.rdfs:comment is an empty array, remove the rdfs:comment property from M.
+    #...any comments in the remaining rows are added to M as they are read
+    if len(metadata_table_dict['rdfs:comment'])==0:
         
-#         # 3.4 Otherwise, append the first character to the quoted value and move 
-#         # on to process the string following that character.
-#         else:
+        metadata_table_dict.pop('rdfs:comment')
+        
+    
+    def iter_row_contents_until_error(
+            row_contents
+            ):
+        """Yields the row contents until a row cannot be read, such as a 
+        quoted value which is not closed before the end of the text. 
+        The error is then passed to row_error_function, as the rest of the 
+        text cannot be read as rows.
+        """
+        
+        try:
             
-#             quoted_value+=current_character
+            yield from row_contents
             
-#             i+=1
+        except Exception as e:
             
-#     if logging: logging.debug(f'        RETURN VALUE: i, quoted_value: {i}, {quoted_value}')
+            if row_error_function is None:
+                
+                raise
+                
+            row_error_function(
+                f'Row cannot be parsed: {e}',
+                row_number
+                )
             
-#     return i, quoted_value
-
-    
-def get_list_of_cell_values(
-        characters, ## the row_content
-        escape_character,
-        quote_character,
-        delimiter,
-        trim
-        ):
-    """
-    """
-    #print('-characters',characters.encode())
-    #print('-quote_character',quote_character)
-    
-    # To parse a row to provide a list of cell values, perform the following steps:
-        
-    # 1 Set the list of cell values to an empty list and the current cell 
-    # value to an empty string.
-    list_of_cell_values=[]
-    current_cell_value=''
-    
-    # 2 Set the quoted flag to false.
-    quoted_flag=False
-    
-    # 3 Read initial characters and process as follows:
-    i=0
-    while True:
-    
-        current_character=characters[i]
-        try:
-            next_character=characters[i+1]
-        except IndexError:
-            next_character=None
-    
-        #print('-current_character',current_character)
-        #print('-next_character',next_character)#,type(next_character))
-    
-        # 3.1 If the string starts with the escape character followed by the 
-        # quote character, append the quote character to the current cell 
-        # value, and move on to process the string following the quote character.
-        if (current_character==escape_character
-            and next_character==quote_character):
-            current_cell_value+=quote_character
-            i+=2
-        
-        # 3.2 Otherwise, if the string starts with the escape character and 
-        # the escape character is not the same as the quote character, append 
-        # the character following the escape character to the current cell 
-        # value and move on to process the string following that character.
-        elif (current_character==escape_character 
-              and escape_character!=quote_character):
-            current_cell_value+=next_character
-            i+=2
-        
-        # 3.3 Otherwise, if the string starts with the quote character then:
-        elif current_character==quote_character:
             
-            # 3.3.1 If quoted is false, set the quoted flag to true, and move on 
-            # to process the remaining string. If the current cell value is not 
-            # an empty string, raise an error.
-            if quoted_flag==False:
-                quoted_flag=True
-                if not current_cell_value=='':
-                    #logging.critical(f'characters: {characters}')
-                    #print(f'characters: {characters}')
-                    #logging.critical(f'i: {i}')
-                    #print(f'i: {i}')
-                    #logging.critical(f'current_cell_value: {current_cell_value}')
-                    #print(f'current_cell_value: "{current_cell_value}"')
-                    raise Exception('quote character encountered not at start of cell')
-                i+=1
+    def iter_row_dicts(
+            row_contents,
+            source_row_number
+            ):
+        ""
         
-            # 3.3.2 Otherwise, set quoted to false, and move on to process the 
-            # remaining string. If the remaining string does not start with the 
-            # delimiter, raise an error.
-            else:
-                quoted_flag=False
-                if not next_character is None:
-                    if not next_character==delimiter:
-                        #logging.critical(f'characters: {characters}')
-                        #logging.critical(f'i: {i}')
-                        #logging.critical(f'current_cell_value: {current_cell_value}')
-                        #logging.critical(f'next_character: {next_character}')
-                        raise Exception('No delimiter after quote character')
-                i+=1
+        nonlocal row_number
         
-        # 3.4 Otherwise, if the string starts with the delimiter, then:
-        elif current_character==delimiter:
+        try:
         
-            # 3.4.1 If quoted is true, append the delimiter string to the current 
-            # cell value and move on to process the remaining string.
-            if quoted_flag==True:
-                current_cell_value+=delimiter
-                i+=1
+            # 9 Set row number to 1.
+            row_number=1
+            
+            # 10 While it is possible to read another row, do the following:
+            
+            for row_content, list_of_cell_values in \
+                iter_row_contents_until_error(row_contents):
+                
+                # 10.1 Set the source column number to 1.
+                source_column_number=1
+                
+                # 10.2 Read a row to provide the row content.
+                #...done by the for loop
+                
+                # 10.3 If the comment prefix is not null and the row content 
+                # begins with the comment prefix, strip that prefix from the 
+                # row content, and add the resulting string to the 
+                # M.rdfs:comment array.
+                if not comment_prefix is None \
+                    and row_content.startswith(comment_prefix):
+                        
+                    metadata_table_dict.setdefault('rdfs:comment',[]).append(
+                        row_content[len(comment_prefix):]
+                        )
+                
+                else:
+                    
+                    # 10.4 Otherwise, parse the row to provide a list of cell 
+                    # values, and:
+                    #...the row cannot be parsed, so parse it again to raise the error
+                    if list_of_cell_values is None:
+                        
+                        try:
+                        
+                            list_of_cell_values=\
+                                get_list_of_cell_values(
+                                    row_content,
+                                    escape_character,
+                                    quote_character,
+                                    delimiter,
+                                    trim
+                                    )
+                            
+                        except Exception as e:
+                            
+                            if row_error_function is None:
+                                
+                                raise
+                            
+                            #...the row is skipped
+                            row_error_function(
+                                f'Row cannot be parsed: {e}',
+                                row_number
+                                )
+                            
+                    # 10.4.1 If all of the values in the list of cell values 
+                    # are empty strings, and skip blank rows is true, add 1 to 
+                    # the source row number and move on to process the next row.
+                    if list_of_cell_values is None:
+                        
+                        pass
+                        
+                    elif not (all(x=='' for x in list_of_cell_values) 
+                              and skip_blank_rows==True):
+                        
+                        # 10.4.2 Otherwise, create a new row R
+                        row_dict=AnnotatedRow(
+                            table=table_dict, 
+                            number=row_number,
+                            sourceNumber=source_row_number,
+                            primaryKey=[],
+                            referencedRows=[],
+                            cells=[],
+                            titles=[]
+                            )
+                        
+                        # 10.4.3 Append R to the rows of table T.
+                        #...not done, the row is yielded instead
+                        
+                        # 10.4.4 Remove the first skip columns number of values 
+                        # from the list of cell values and add that number to 
+                        # the source column number.
+                        list_of_cell_values_non_skipped=\
+                            list_of_cell_values[skip_columns:]
+            
+                        source_column_number+=skip_columns
+                        
+                        # 10.4.5 For each of the remaining values at index i in 
+                        # the list of cell values (where i starts at 1):
+                        for i, value in enumerate(list_of_cell_values_non_skipped):
+                            
+                            # 10.4.5.1 Identify the column C at index i within 
+                            # the columns of table T. If there is no such column:
+                            try:
+                                column_dict=table_dict['columns'][i]
+                            
+                            except IndexError:
+                                
+                                # 10.4.5.1.1 Create a new column C
+                                column_dict=AnnotatedColumn(
+                                    table=table_dict,
+                                    number=i+1,
+                                    sourceNumber=source_column_number,
+                                    name=None,
+                                    titles=[],
+                                    virtual=False,
+                                    suppressOutput=False,
+                                    datatype={'base':'string'}, 
+                                    default='',
+                                    lang='und',
+                                    null='',
+                                    ordered=False,
+                                    required=False,
+                                    separator=None,
+                                    textDirection='auto',
+                                    aboutURL=None,
+                                    propertyURL=None,
+                                    valueURL=None,
+                                    cells=[]
+                                    )
+                            
+                                # 10.4.5.1.2 Append C to the columns of table T 
+                                # (at index i).
+                                table_dict['columns'].append(column_dict)
+                                
+                            # 10.4.5.2 Create a new cell D
+                            cell_dict=AnnotatedCell(
+                                table=table_dict, 
+                                column=column_dict, 
+                                row=row_dict, 
+                                stringValue=value,
+                                value=None,
+                                errors=[]
+                                )
+                            
+                            # 10.4.5.3 Append cell D to the cells of column C.
+                            #...not done, only the row holds the cell
+                            
+                            # 10.4.5.4 Append cell D to the cells of row R 
+                            # (at index i).
+                            row_dict['cells'].append(cell_dict)  
+                            
+                            # 10.4.5.5 Add 1 to the source column number.
+                            source_column_number+=1
+                            
+                        yield row_dict
+                        
+                # 10.5 Add 1 to the source row number.
+                source_row_number+=1
+                row_number+=1
+                
+        finally:
+            
+            text_stream.close()
             
-            # 3.4.2 Otherwise, conditionally trim the current cell value, add the 
-            # resulting trimmed cell value to the list of cell values and move on 
-            # to process the following string.
-            else:
-                trimmed_cell_value=get_trimmed_cell_value(
-                    current_cell_value,
-                    trim
-                    )
-                #print('trimmed_cell_value',trimmed_cell_value)
-                list_of_cell_values.append(trimmed_cell_value)
-                current_cell_value=''
-                i+=1
-        
-        # 3.5 Otherwise, append the first character to the current cell value 
-        # and move on to process the remaining string.
-        else:
-            current_cell_value+=current_character
-            i+=1
             
-        # 4 If there are no more characters to read, conditionally trim the 
-        # current cell value, add the resulting trimmed cell value to the list 
-        # of cell values and return the list of cell values.
-        if i>len(characters)-1:
-            trimmed_cell_value=get_trimmed_cell_value(
-                current_cell_value,
-                trim
-                )
-            list_of_cell_values.append(trimmed_cell_value)
-            break
-
-    #print(list_of_cell_values)
-
-    #logging.debug(f'    RETURN VALUE: list_of_cell_values: {list_of_cell_values}')
-
-    return list_of_cell_values
-
+    # 12 Return the table T and the embedded metadata M.
+    #...together with the generator of the rows
+    
+    #...the row number of the current row, see iter_row_contents_until_error
+    row_number=1
+    
+    row_dicts=iter_row_dicts(row_contents,source_row_number)
+    
+    return table_dict, metadata_table_dict, row_dicts
+    
 
-def get_trimmed_cell_value(
-        cell_value,
-        trim
+def iter_row_contents(
+        text_stream,
+        escape_character,
+        quote_character,
+        delimiter,
+        line_terminators,
+        trim,
+        chunk_size=65536,
+        buffer=''
         ):
-    """
-    """
+    """Reads the rows of a text stream and yields the row content and list 
+    of cell values of each row.
     
+    The stream is read into a buffer in chunks and each row is read from the 
+    buffer using get_row_content_and_list_of_cell_values. 
+    If a row runs past the end of the buffer, the next chunk is read and the 
+    row is read again.
     
+    :param buffer: Text which has already been read from the text stream, 
+        which is read before the rest of the text stream.
     
-    # To conditionally trim a cell value to provide a trimmed cell value, 
-    # perform the following steps:
-        
-    # 1 Set the trimmed cell value to the provided cell value.
-    trimmed_cell_value=cell_value
+    """
+    tokenizer_regexes=\
+        get_tokenizer_regexes(
+            escape_character,
+            quote_character,
+            delimiter,
+            line_terminators
+            )
     
-    # 2 If trim is true or start then remove any leading whitespace from 
-    # the start of the trimmed cell value and move on to the next step.
-    if trim==True or trim=='true' or trim=='start':
-        trimmed_cell_value=trimmed_cell_value.lstrip()
-
-    # 3 If trim is true or end then remove any trailing whitespace from 
-    # the end of the trimmed cell value and move on to the next step.
-    if trim==True or trim=='true' or trim=='end':
-        trimmed_cell_value=trimmed_cell_value.rstrip()
-
-    # 4 Return the trimmed cell value.
-    return trimmed_cell_value
-
-
-
+    i=0
+    end_of_stream=False
+    
+    while True:
+        
+        # If there are no more characters to read, stop.
+        if i>len(buffer)-1 and end_of_stream:
+            break
+        
+        try:
+            
+            j, row_content, list_of_cell_values=\
+                get_row_content_and_list_of_cell_values(
+                    buffer,
+                    i,
+                    escape_character,
+                    quote_character,
+                    delimiter,
+                    line_terminators,
+                    trim,
+                    tokenizer_regexes
+                    )
+                
+            #...a row which reaches the end of the buffer may continue 
+            #...in the next chunk
+            row_is_complete=j<len(buffer) or end_of_stream
+        
+        except IndexError:  # i.e. a quoted value which runs past the end of the buffer
+            
+            if end_of_stream:
+                raise
+                
+            row_is_complete=False
+            
+        if row_is_complete:
+            
+            i=j
+            
+            yield row_content, list_of_cell_values
+            
+        else:
+            
+            chunk=text_stream.read(chunk_size)
+            
+            if chunk=='':
+                end_of_stream=True
+            
+            buffer=buffer[i:]+chunk
+            i=0
             
 
 
-        
 #%% ---Metadata Vocabulary for Tabular Data---
 
 #%% 4- Annotating Tables
@@ -7113,6 +13326,38 @@ def get_URI_from_URI_template(
         table_url,
         ):
     """
+    """
+    return get_URI_template_function(
+        uri_template_string,
+        annotated_cell_dict['column']
+        )(annotated_cell_dict,
+          table_url)
+        
+        
+def get_URI_template_function(
+        uri_template_string,
+        annotated_column_dict
+        ):
+    """Returns a function which expands a URI template for the cells of 
+    a column.
+    
+    The template is parsed, and the columns which set its variables are 
+    found, once for the column rather than once for each cell. 
+    The parts of the URI which do not depend on the row, whether a prefix 
+    can be expanded and how the URI is resolved against the table url are 
+    also found once, so only the expressions which depend on the row are 
+    expanded for each cell.
+    
+    :param uri_template_string: The URI template, i.e. the about URL, 
+        property URL or value URL annotation of the column.
+    :type uri_template_string: str
+    
+    :param annotated_column_dict: The annotated column.
+    :type annotated_column_dict: dict
+    
+    :returns: A function with arguments (annotated_cell_dict, table_url) 
+        which returns the URI for a cell in the column, or None.
+    
     """
     # URI template properties contain a [URI-TEMPLATE] which can be 
     # used to generate a URI.
@@ -7120,8 +13365,9 @@ def get_URI_from_URI_template(
     # combining the template with a set of variables with values as 
     # defined in [URI-TEMPLATE]. 
     
+    uri_template=uritemplate.URITemplate(uri_template_string)
+    
     # The following variables are set:
-    variables={}
     
     # column names
     # a variable is set for each column within the schema; the name of the 
@@ -7133,115 +13379,281 @@ def get_URI_from_URI_template(
         #  its datatype as defined in [xmlschema11-2], if it has a single value, or
         # a list of canonical representations of the values of the cell, 
         #  if it has a sequence value.
+        
+    #...the variables being asked for in the URI template, with the index 
+    #...of the column of the same name
+    column_variables=[]
     
-    #print(uritemplate.variables(uri_template_string))
-    
-    for variable in uritemplate.variables(uri_template_string):  # loops through variables being asked for in the URI template
+    for variable in uritemplate.variables(uri_template_string):
         
         if not variable.startswith('_'):
             
-            for cell in annotated_cell_dict['row']['cells']:
-                
-                name=cell['column']['name']
+            for i,x in enumerate(annotated_column_dict['table']['columns']):
                 
-                if name==variable:
-                    
-                    #...set value if not passed into the function
-                    value=cell['value']
-                    
-                    if value is None:
-                        
-                        return None  # if a variable has value of None, then the returned URI is None
+                if x['name']==variable:
                     
-                    elif isinstance(value,list):
-                        
-                        value=[x['@value'] for x in value]
-                        
-                    else:
-                        
-                        value=[value['@value']]
-                        
-                    variables[name]=value
+                    column_variables.append((variable,i,x))
                     
                     break
-                        
+    
     # _column
     # _column is set to the column number of the column from the annotated 
     # table that is currently being processed.
-    variables['_column']=annotated_cell_dict['column']['number']
+    column_number=annotated_column_dict['number']
     
     # _sourceColumn
     #_sourceColumn is set to the source number of the column that is currently 
     # being processed; this usually varies from _column by skip columns.
-    variables['_sourceColumn']=annotated_cell_dict['column']['sourceNumber']
-
-    #_row
-    #_row is set to the row number of the row from the annotated table that is 
-    # currently being processed.
-    variables['_row']=annotated_cell_dict['row']['number']
-
-    #_sourceRow
-    #_sourceRow is set to the source number of the row that is currently 
-    # being processed; this usually varies from _row by skip rows and header rows.
-    variables['_sourceRow']=annotated_cell_dict['row']['sourceNumber']
-
+    source_column_number=annotated_column_dict['sourceNumber']
+    
     #_name
     #_name is set to the URI decoded column name annotation, as defined 
     # in [tabular-data-model], for the column that is currently being 
     # processed. (Percent-decoding is necessary as name may have been encoded 
     # if taken from titles; this prevents double percent-encoding.)
-    variables['_name']=urllib.parse.unquote(annotated_cell_dict['column']['name'])        
-        
-    # The annotation value is the result of:
+    name=urllib.parse.unquote(annotated_column_dict['name'])
+    
+    #...the template is split into its literal text and its expressions, 
+    #...and the expressions which do not depend on the row being processed 
+    #...are expanded here, so that only the other expressions are expanded 
+    #...for each cell
+    column_variable_names=\
+        set(variable for variable,i,x in column_variables)|{'_row','_sourceRow'}
+    
+    constant_variables={
+        '_column':column_number,
+        '_sourceColumn':source_column_number,
+        '_name':name
+        }
+    
+    def get_expand_function(
+            uri_variable
+            ):
+        "Returns a function which expands an expression of the template using the variables."
         
-    # 1 applying the template against the cell in that column in the row that 
-    # is currently being processed.
-    uri=uritemplate.expand(uri_template_string,
-                           variables)
-    uri=uri.replace('%2F','/')  # reverses changes to forward slashes in the expand process
+        #...a single variable without an operator or modifiers, such as 
+        #...{code}, is a simple string expansion of the values of the 
+        #...variable, which are percent encoded and separated by commas
+        if re.fullmatch('[A-Za-z0-9_%][A-Za-z0-9_%.]*',uri_variable.original):
+            
+            variable_name=uri_variable.original
+            
+            def expand_function(variables):
+                
+                value=variables.get(variable_name)
+                
+                if value is None:
+                    return ''
+                
+                if not isinstance(value,list):
+                    value=[value]
+                    
+                return ','.join([urllib.parse.quote(x if isinstance(x,str) else str(x),
+                                                    safe='') 
+                                 for x in value])
+                
+        else:
+            
+            def expand_function(variables):
+                
+                return uri_variable.expand(variables)[uri_variable.original]
+            
+        return expand_function
     
+    template_parts=['']  # strings for the literal text, functions for the expressions
     
-    # 2 expanding any prefixes as if the value were the name of a common 
-    # property, as described in section 5.8 Common Properties.
-    if ':' in uri:
-        x=uri.split(':')
-    else:
-        x=uri.split('%3A')  # this is the percent encoded version
+    for i,x in enumerate(uritemplate.template.template_re.split(uri_template_string)):
         
-    if len(x)==2:
-        
-        if x[0] in prefixes:
+        #...the odd parts are the expressions, in the same order as the 
+        #...variables of the template
+        if i%2==1:
+            
+            x=uri_template.variables[i//2]
             
-            uri=prefixes[x[0]]+x[1]
+            if column_variable_names.isdisjoint(x.variable_names):
+                
+                x=x.expand(constant_variables)[x.original]
+                
+            else:
+                
+                x=get_expand_function(x)
+                
+        if isinstance(x,str) and isinstance(template_parts[-1],str):
+            
+            template_parts[-1]+=x
+            
+        else:
+            
+            template_parts.append(x)
+            
+    #...the literal text at the start of the template, which starts every URI
+    head=template_parts[0]
     
+    #...a prefix can only apply if the text before the first colon is a 
+    #...prefix, which is known here if the colon is in the literal text
+    prefix_may_apply=not (':' in head and not head.split(':')[0] in prefixes)
     
-    #print('-uri',uri)
-    #print('-table_url',table_url)
+    #...the scheme of every URI, if it is in the literal text and no prefix 
+    #...can apply, and whether every URI then has a host
+    head_scheme=None
+    head_has_netloc=False
+    
+    if not prefix_may_apply \
+        and head[:1].isascii() and head[:1].isalpha() \
+        and not any(c in head for c in '\t\r\n') \
+        and all(c in urllib.parse.scheme_chars for c in head.split(':')[0]):
+        
+        head_scheme=head.split(':')[0].lower()
+        
+        head_has_netloc=\
+            re.match('[^:]*://[^/?#%]',head) is not None
+            
+    def get_join_function(
+            table_url
+            ):
+        """Returns the function which resolves a URI against the table url, 
+        or None if the URI is not changed by this.
+        """
+        
+        if table_url is None:
+            
+            return None
+        
+        if not head_scheme is None:
+            
+            #...a URI with a different scheme to the table url is not changed
+            if head_scheme!=urllib.parse.urlparse(table_url).scheme \
+                or not head_scheme in urllib.parse.uses_relative:
+                    
+                return None
+            
+            #...a URI with a host does not depend on the table url
+            if head_scheme in urllib.parse.uses_netloc and head_has_netloc:
+                
+                def join_function(uri):
+                    return urllib.parse.urlunparse(urllib.parse.urlparse(uri))
+                
+                return join_function
+            
+        return functools.partial(urllib.parse.urljoin,table_url)
     
-    # 3 resolving the resulting URL against the base URL of the table url if not null.
+    #...the table url -> the join function
+    join_functions={}
     
-    if not table_url is None:
+    def uri_template_function(
+            annotated_cell_dict,
+            table_url
+            ):
+        ""
+        
+        annotated_row_dict=annotated_cell_dict['row']
+        
+        cells=annotated_row_dict['cells']
+        
+        variables={}
+        
+        for variable,i,annotated_column_dict in column_variables:
+            
+            #...the cell at the index of the column, unless the row has 
+            #...fewer cells than the table has columns
+            if i<len(cells) and cells[i]['column'] is annotated_column_dict:
                 
-        url=\
-            urllib.parse.urljoin(
-                table_url,
-                uri
-                )  
+                cell=cells[i]
+                
+            else:
+                
+                for cell in cells:
+                    
+                    if cell['column']['name']==variable:
+                        
+                        break
+                    
+                else:
+                    
+                    continue
+                
+            value=cell['value']
+            
+            if value is None:
+                
+                return None  # if a variable has value of None, then the returned URI is None
+            
+            elif isinstance(value,list):
+                
+                value=[x['@value'] for x in value]
+                
+            else:
+                
+                value=[value['@value']]
+                
+            variables[variable]=value
+            
+        variables['_column']=column_number
+        variables['_sourceColumn']=source_column_number
+        
+        #_row
+        #_row is set to the row number of the row from the annotated table that is 
+        # currently being processed.
+        variables['_row']=annotated_row_dict['number']
     
-    else:
+        #_sourceRow
+        #_sourceRow is set to the source number of the row that is currently 
+        # being processed; this usually varies from _row by skip rows and header rows.
+        variables['_sourceRow']=annotated_row_dict['sourceNumber']
         
-        url=uri
+        variables['_name']=name
+            
+        # The annotation value is the result of:
+            
+        # 1 applying the template against the cell in that column in the row that 
+        # is currently being processed.
+        uri=''.join([x if isinstance(x,str) else x(variables) 
+                     for x in template_parts])
+        uri=uri.replace('%2F','/')  # reverses changes to forward slashes in the expand process
         
         
-    #... percent encoding any spaces
-    url=urllib.parse.quote(
-        url.encode('utf8'),
-        safe='/:#%=%'
-        )
+        # 2 expanding any prefixes as if the value were the name of a common 
+        # property, as described in section 5.8 Common Properties.
+        if prefix_may_apply:
+            
+            if ':' in uri:
+                x=uri.split(':')
+            else:
+                x=uri.split('%3A')  # this is the percent encoded version
+                
+            if len(x)==2:
+                
+                if x[0] in prefixes:
+                    
+                    uri=prefixes[x[0]]+x[1]
+        
+        
+        # 3 resolving the resulting URL against the base URL of the table url if not null.
         
-    #print('-url',url)
+        if not table_url in join_functions:
+            
+            join_functions[table_url]=get_join_function(table_url)
+            
+        join_function=join_functions[table_url]
+        
+        if not join_function is None:
+                    
+            url=join_function(uri)
         
-    return url
+        else:
+            
+            url=uri
+            
+            
+        #... percent encoding any spaces
+        url=urllib.parse.quote(
+            url.encode('utf8'),
+            safe='/:#%=%'
+            )
+            
+        return url
+    
+    return uri_template_function
     
     
   
@@ -7949,7 +14361,7 @@ def validate_table_group_metadata(
         
         try:
             
-            with urllib.request.urlopen(metadata_document_location) as f:
+            with get_url_fetcher().open(metadata_document_location) as f:
                 
                 metadata_table_group_dict=json.load(f)
                 
@@ -8714,7 +15126,7 @@ def validate_table_metadata(
         
         try:
             
-            with urllib.request.urlopen(metadata_document_location) as f:
+            with get_url_fetcher().open(metadata_document_location) as f:
                 
                 metadata_table_dict=json.load(f)
                 
@@ -9283,7 +15695,7 @@ def validate_schema_metadata(
         
         try:
             
-            with urllib.request.urlopen(metadata_document_location) as f:
+            with get_url_fetcher().open(metadata_document_location) as f:
                 
                 metadata_schema_dict=json.load(f)
                 
@@ -9682,7 +16094,7 @@ def annotate_schema_dict(
             
             if metadata_column_dict.get('virtual')==True:
                 
-                annotated_column_dict=dict(
+                annotated_column_dict=AnnotatedColumn(
                     table=annotated_table_dict, 
                     number=i+1,
                     sourceNumber=None,
@@ -9706,18 +16118,13 @@ def annotate_schema_dict(
                 
                 for annotated_row_dict in annotated_table_dict['rows']:
                 
-                    annotated_cell_dict=dict(
+                    annotated_cell_dict=AnnotatedCell(
                         table=annotated_table_dict, 
                         column=annotated_column_dict, 
                         row=annotated_row_dict, 
                         stringValue='',
                         value=None,
-                        errors=[],
-                        textDirection='auto',
-                        ordered=False,
-                        aboutURL=None,
-                        propertyURL=None,
-                        valueURL=None
+                        errors=[]
                         )
                 
                     annotated_column_dict['cells'].append(annotated_cell_dict)
@@ -9781,22 +16188,86 @@ def annotate_schema_dict(
         
         if validate:
             
-            cache=[]
-            
-            for annotated_row_dict in annotated_table_dict['rows']:
+            duplicate_primary_keys=\
+                get_duplicate_primary_keys(
+                    annotated_table_dict['rows']
+                    )
             
-                pk=[x['stringValue'] for x in annotated_row_dict['primaryKey']]
-                
-                if pk in cache:
-                    
-                    message=f'Primary key does not have a unique comination of values: {pk}.'
+            if len(duplicate_primary_keys)>0:
                 
-                    raise CSVWError(message)
-                    
-                else:
-                    
-                    cache.append(pk)
+                raise CSVWPrimaryKeyError(
+                    get_duplicate_primary_keys_message(duplicate_primary_keys),
+                    duplicate_primary_keys
+                    )
+        
+    
+def get_duplicate_primary_keys(
+        annotated_row_dicts
+        ):
+    """Returns the primary key values which occur in more than one row.
+    
+    :param annotated_row_dicts: The rows of an annotated table, with 
+        the primary key annotation set.
+    :type annotated_row_dicts: list
+    
+    :returns: A list of (primary key values, row numbers) tuples, one for 
+        each primary key value which is not unique, in the order the 
+        values first occur.
+    :rtype: list
+    
+    """
+    
+    row_numbers={}
+    
+    for annotated_row_dict in annotated_row_dicts:
+        
+        pk=tuple(x['stringValue'] for x in annotated_row_dict['primaryKey'])
+        
+        row_numbers.setdefault(pk,[]).append(annotated_row_dict['number'])
+        
+    return [(list(pk),x) for pk,x in row_numbers.items() if len(x)>1]
+    
+    
+def get_duplicate_primary_keys_message(
+        duplicate_primary_keys,
+        max_primary_keys=10,
+        max_row_numbers=10
+        ):
+    """Returns the error message for the duplicate primary keys of a table.
+    
+    Only the first primary keys, and the first row numbers of each, are 
+    included so the length of the message does not grow with the number of 
+    rows.
+    
+    :param duplicate_primary_keys: The output of get_duplicate_primary_keys.
+    :type duplicate_primary_keys: list
+    
+    :rtype: str
+    
+    """
+    
+    parts=[]
+    
+    for pk,row_numbers in duplicate_primary_keys[:max_primary_keys]:
+        
+        if len(row_numbers)>max_row_numbers:
+            
+            row_numbers_text=str(row_numbers[:max_row_numbers])[:-1]+', ...]'
+            
+        else:
+            
+            row_numbers_text=str(row_numbers)
+            
+        parts.append(f'{pk} in rows {row_numbers_text}')
+        
+    message='Primary key does not have a unique comination of values: ' \
+        + '; '.join(parts)
+    
+    if len(duplicate_primary_keys)>max_primary_keys:
+        
+        message+=f'; and {len(duplicate_primary_keys)-max_primary_keys} more'
         
+    return message+'.'
     
     
 def get_referenced_table_and_columns_from_foreign_key_reference(
@@ -10410,9 +16881,7 @@ def annotate_column_dict(
         
         annotated_column_dict['ordered']=ordered
         
-        for annotated_cell_dict in annotated_column_dict['cells']:
-            
-            annotated_cell_dict['ordered']=ordered
+        #...the cells take their ordered annotation from the column
     
     # required
     if 'required' in column_inherited_properties_cache:
@@ -10436,9 +16905,7 @@ def annotate_column_dict(
         
         annotated_column_dict['textDirection']=text_direction
         
-        for annotated_cell_dict in annotated_column_dict['cells']:
-            
-            annotated_cell_dict['textDirection']=text_direction
+        #...the cells take their text direction annotation from the column
     
     # aboutURL
     if 'aboutUrl' in column_inherited_properties_cache:
@@ -11316,7 +17783,7 @@ def validate_dialect_metadata(
         
         try:
             
-            with urllib.request.urlopen(metadata_document_location) as f:
+            with get_url_fetcher().open(metadata_document_location) as f:
                 
                 metadata_dialect_dict=json.load(f)
                 
@@ -11740,7 +18207,7 @@ def validate_transformation_metadata(
         
         try:
             
-            with urllib.request.urlopen(metadata_document_location) as f:
+            with get_url_fetcher().open(metadata_document_location) as f:
                 
                 metadata_transformation_dict=json.load(f)
                 
@@ -12816,7 +19283,7 @@ def normalize_object_property(
         
         #...load metadata document
         
-        with urllib.request.urlopen(metadata_document_location) as metadata_response:
+        with get_url_fetcher().open(metadata_document_location) as metadata_response:
         
             metadata_text=metadata_response.read().decode()
         
@@ -17,6 +17,9 @@ import rdflib.compare
 
 test_dir='_github_w3c_csvw_tests'
 
+#...the benchmark tests are only run if this environment variable is set to 1
+run_benchmarks=os.environ.get('CSVW_FUNCTIONS_BENCHMARKS')=='1'
+
 
     
 
@@ -1768,6 +1771,2221 @@ class Test_RDF_Section_7(unittest.TestCase):
         
 
 
+#%% ---TESTCASE - Parsing Tabular Data---
+
+class Test_Parsing_Tabular_Data(unittest.TestCase):
+    ""
+    
+    def test_get_row_content_and_list_of_cell_values(self):
+        "Compares the single pass tokenizer with get_row_content and get_list_of_cell_values"
+        
+        from csvw_functions.csvw_functions import get_row_content, \
+            get_list_of_cell_values, get_row_content_and_list_of_cell_values
+        import random
+        
+        def reference(text,i,escape_character,quote_character,delimiter,line_terminators,trim):
+            try:
+                i,row_content=get_row_content(text,i,escape_character,quote_character,line_terminators)
+            except (IndexError,TypeError):
+                return 'error'
+            try:
+                list_of_cell_values=get_list_of_cell_values(row_content,escape_character,quote_character,delimiter,trim)
+            except Exception:
+                list_of_cell_values=None
+            return i, row_content, list_of_cell_values
+        
+        def tokenizer(text,i,escape_character,quote_character,delimiter,line_terminators,trim):
+            try:
+                return get_row_content_and_list_of_cell_values(text,i,escape_character,quote_character,delimiter,line_terminators,trim)
+            except IndexError:
+                return 'error'
+        
+        dialects=[
+            ('"','"',',',['\r\n','\n']),
+            ('\\','"',',',['\r\n','\n']),
+            ('"','"',';',['\n']),
+            ('\\',"'",'\t',['\r\n','\r','\n']),
+            ('"','"',',',['##','\n'])
+            ]
+        
+        r=random.Random(0)
+        
+        for _ in range(5000):
+            
+            escape_character,quote_character,delimiter,line_terminators=r.choice(dialects)
+            trim=r.choice([True,False,'start','end'])
+            characters=[escape_character,quote_character,delimiter,'a',' ','#','\r','\n']
+            text=''.join(r.choice(characters) for _ in range(r.randint(0,30)))
+            
+            i=0
+            
+            while i<len(text):
+                
+                result=reference(text,i,escape_character,quote_character,delimiter,line_terminators,trim)
+                
+                self.assertEqual(
+                    tokenizer(text,i,escape_character,quote_character,delimiter,line_terminators,trim),
+                    result,
+                    msg=repr(text)
+                    )
+                
+                if result=='error':
+                    break
+                    
+                i=result[0]
+                
+                
+    def test_iter_row_contents_using_csv_module(self):
+        "Compares reading the rows using the csv module with the single pass tokenizer"
+        
+        from csvw_functions.csvw_functions import \
+            iter_row_contents_using_csv_module, iter_row_contents
+        import io
+        
+        def read_rows(function,text,delimiter=',',line_terminators=['\r\n','\n'],
+                      chunk_size=65536):
+            "Returns the rows read from the text, or the type of the error raised"
+            try:
+                return list(function(io.StringIO(text),'"','"',delimiter,
+                                     line_terminators,True,chunk_size))
+            except IndexError as e:
+                return type(e)
+        
+        texts=[
+            'a,b,c\r\n1, 2 ,3\r\n',
+            'a,b\n"x, ""y""",z\n\n"multi\r\nline",\n# comment',
+            '"a","b"\n"c",d'
+            ]
+        
+        for text in texts:
+            
+            for chunk_size in [1,5,65536]:
+                
+                self.assertEqual(
+                    read_rows(iter_row_contents_using_csv_module,text,chunk_size=chunk_size),
+                    read_rows(iter_row_contents,text)
+                    )
+                
+        # the dialect or the tabular data are not compatible with the csv module, 
+        # so the rows are read from that row onwards using the single pass tokenizer
+        for text,delimiter,line_terminators in [
+                ('a,"",b',',',['\r\n','\n']),  # the standard reads "" as an escaped quote character
+                ('a, "b"',',',['\r\n','\n']),
+                ('a,b"c',',',['\r\n','\n']),
+                ('a\rb',',',['\r\n','\n']),
+                ('a,b\nc,"d',',',['\r\n','\n']),
+                ('a,b\n"c\nd",e\nf,"g""h"\ni,j"k\nl,m\n',',',['\r\n','\n']),
+                ('a,b','::',['\r\n','\n']),
+                ('a,b',',',['\n'])
+                ]:
+            
+            self.assertEqual(
+                read_rows(iter_row_contents_using_csv_module,text,delimiter,line_terminators,3),
+                read_rows(iter_row_contents,text,delimiter,line_terminators)
+                )
+            
+        # the rows are read as the text stream is read
+        text_stream=io.StringIO('a,b\n'*100000)
+        
+        row_contents=\
+            iter_row_contents_using_csv_module(text_stream,'"','"',',',
+                                               ['\r\n','\n'],True,1000)
+        
+        self.assertEqual(next(row_contents),('a,b',['a','b']))
+        self.assertEqual(text_stream.tell(),1000)
+                
+                
+    def test_get_rows_using_process_pool(self):
+        "Compares reading the rows in byte ranges with reading the rows in one go"
+        
+        from csvw_functions.csvw_functions import get_rows_using_process_pool, \
+            get_rows_from_text_chunk, get_byte_range_boundaries, \
+            parse_tabular_data_from_text
+        import tempfile
+        
+        with tempfile.TemporaryDirectory(dir='.') as directory:
+            
+            fp=os.path.join(directory,'rows.csv')
+            
+            for text,escape_character in [
+                    ('id,text\r\n1,"a\r\nb"\r\n2,"c, ""d"""\r\n\r\n3,é\r\n'*20,'"'),
+                    # an escaped quote character and an escaped line terminator
+                    ('id,text\n1,"a\\"\nb"\n2,c\\"d\n3,é\\\nf\n'*20,'\\')
+                    ]:
+                
+                with open(fp,'w',encoding='utf-8',newline='') as f:
+                    f.write(text)
+                
+                boundaries=\
+                    get_byte_range_boundaries(fp,'utf-8',escape_character,'"',
+                                              ['\r\n','\n'],10)
+                    
+                # byte ranges start at the start of a row
+                rows=get_rows_from_text_chunk(text,escape_character,'"',',',
+                                              ['\r\n','\n'],True,False)
+                row_starts=set(len(text[:i].encode('utf-8')) for i in rows)
+                
+                self.assertTrue(len(boundaries)>20)
+                self.assertTrue(set(boundaries[:-1]).issubset(row_starts))
+                
+                self.assertEqual(
+                    get_rows_using_process_pool(fp,'utf-8',escape_character,'"',',',
+                                                ['\r\n','\n'],True,True,2,
+                                                chunk_size=50),
+                    (rows,len(text))
+                    )
+                
+            # a row which cannot be read raises the same error when it is reached
+            with open(fp,'w') as f:
+                f.write('id,text\n1,a\n2,"b\n'+'3,c\n'*100)
+                
+            for processes in [None,2]:
+                
+                with self.assertRaises(IndexError):
+                    
+                    parse_tabular_data_from_text(
+                        'file:///'+os.path.abspath(fp).replace('\\','/'),
+                        {},
+                        processes=processes
+                        )
+                
+                
+    def test_annotated_objects(self):
+        "Checks the annotated cells support the same interface as dictionaries"
+        
+        from csvw_functions.csvw_functions import AnnotatedCell
+        import sys
+        
+        column_dict=dict(
+            ordered=True,
+            textDirection='rtl'
+            )
+        
+        kwargs=dict(
+            table=None,
+            column=column_dict,
+            row=None,
+            stringValue='1',
+            value=None,
+            errors=[]
+            )
+        
+        cell=AnnotatedCell(**kwargs)
+        cell_dict=dict(
+            **kwargs,
+            textDirection='rtl',
+            ordered=True,
+            aboutURL=None,
+            propertyURL=None,
+            valueURL=None
+            )
+        
+        self.assertEqual(cell,cell_dict)
+        self.assertEqual(list(cell.items()),list(cell_dict.items()))
+        
+        cell['value']=1
+        cell['lang']='en'
+        cell['valueURL']='http://example.org/1'
+        del cell['errors']
+        del cell['ordered']
+        self.assertEqual(cell.pop('textDirection'),'rtl')
+        del cell['valueURL']
+        
+        cell_dict['value']=1
+        cell_dict['lang']='en'
+        cell_dict['valueURL']='http://example.org/1'
+        del cell_dict['errors']
+        del cell_dict['ordered']
+        cell_dict.pop('textDirection')
+        del cell_dict['valueURL']
+        
+        self.assertEqual(list(cell.items()),list(cell_dict.items()))
+        self.assertEqual(cell.get('errors','missing'),'missing')
+        self.assertEqual(cell.get('ordered','missing'),'missing')
+        self.assertFalse('valueURL' in cell)
+        self.assertRaises(KeyError,lambda: cell['keys'])
+        self.assertRaises(KeyError,lambda: cell['ordered'])
+        
+        def delete_ordered():
+            del cell['ordered']
+        
+        self.assertRaises(KeyError,delete_ordered)
+        
+        # a deleted annotation can be set again
+        cell['ordered']=False
+        cell_dict['ordered']=False
+        self.assertEqual(cell,cell_dict)
+        
+        # the ordered and text direction annotations are taken from the column
+        column_dict['textDirection']='ltr'
+        self.assertEqual(AnnotatedCell(**kwargs)['textDirection'],'ltr')
+        
+        # the annotations are stored in slots, not in a dictionary
+        self.assertFalse(hasattr(cell,'__dict__'))
+        self.assertLess(
+            sys.getsizeof(AnnotatedCell(**kwargs)),
+            sys.getsizeof(dict(**kwargs))
+            )
+        
+        
+    @unittest.skipUnless(run_benchmarks,'set CSVW_FUNCTIONS_BENCHMARKS=1 to run')
+    def test_annotated_objects_memory_benchmark(self):
+        "Checks the memory used per cell by an annotated table group of 1M cells"
+        
+        from csvw_functions.csvw_functions import AnnotatedCell
+        import gc
+        import random
+        import tempfile
+        import tracemalloc
+        
+        row_count=100000
+        column_count=10
+        cell_count=row_count*column_count
+        
+        random.seed(0)
+        
+        #...a relative path, as for the other test files
+        with tempfile.TemporaryDirectory(dir='.') as directory:
+            
+            fp=os.path.join(os.path.basename(directory),'big.csv')
+            
+            with open(fp,'w') as f:
+                f.write(','.join(f'c{i}' for i in range(column_count))+'\n')
+                for _ in range(row_count):
+                    f.write(','.join(str(random.randrange(10**6)) 
+                                     for _ in range(column_count))+'\n')
+                    
+            with open(fp+'-metadata.json','w') as f:
+                json.dump(
+                    {'@context':'http://www.w3.org/ns/csvw',
+                     'url':'big.csv',
+                     'tableSchema':{
+                         'columns':[{'name':f'c{i}','titles':f'c{i}',
+                                     'datatype':'integer'}
+                                    for i in range(column_count)]}},
+                    f
+                    )
+                
+            gc.collect()
+            tracemalloc.start()
+            
+            try:
+                
+                annotated_table_group_dict=\
+                    csvw_functions.create_annotated_table_group(
+                        fp+'-metadata.json'
+                        )
+                    
+                gc.collect()
+                table_group_bytes_per_cell=tracemalloc.get_traced_memory()[0]/cell_count
+                
+            finally:
+                
+                tracemalloc.stop()
+                
+        self.assertEqual(
+            len(annotated_table_group_dict['tables'][0]['rows']),
+            row_count
+            )
+        
+        del annotated_table_group_dict
+        gc.collect()
+        
+        # the cells alone, as annotated cells and as the dictionaries 
+        # which were used before
+        kwargs=dict(table=None,column=None,row=None,stringValue='1',
+                    value=None,errors=[])
+        
+        def get_bytes_per_cell(create_cell):
+            gc.collect()
+            tracemalloc.start()
+            try:
+                cells=[create_cell() for _ in range(cell_count)]
+                bytes_per_cell=tracemalloc.get_traced_memory()[0]/cell_count
+            finally:
+                tracemalloc.stop()
+            del cells
+            return bytes_per_cell
+        
+        annotated_cell_bytes_per_cell=\
+            get_bytes_per_cell(
+                lambda: AnnotatedCell(**kwargs)
+                )
+            
+        dict_bytes_per_cell=\
+            get_bytes_per_cell(
+                lambda: dict(**kwargs,textDirection='auto',ordered=False,
+                             aboutURL=None,propertyURL=None,valueURL=None)
+                )
+        
+        message=f'table group: {table_group_bytes_per_cell:.0f} bytes per cell; '
+        message+=f'AnnotatedCell: {annotated_cell_bytes_per_cell:.0f} bytes per cell; '
+        message+=f'dict: {dict_bytes_per_cell:.0f} bytes per cell'
+        
+        self.assertLess(annotated_cell_bytes_per_cell,dict_bytes_per_cell/2,message)
+        
+        # with dictionaries the annotated table group used 837 bytes per cell
+        self.assertLess(table_group_bytes_per_cell,600,message)
+                
+                
+#%% ---TESTCASE - Streaming annotated rows---
+
+class Test_Streaming(unittest.TestCase):
+    ""
+    
+    def test_iter_annotated_rows(self):
+        ""
+        
+        fp=r'generating_json_from_tabular_data_example_files/section_6_4/csv-metadata.json'
+        annotated_table_group_dict=\
+            csvw_functions.create_annotated_table_group(fp)
+            
+        annotated_row_dicts=[annotated_row_dict 
+                             for annotated_table_dict in annotated_table_group_dict['tables']
+                             for annotated_row_dict in annotated_table_dict['rows']]
+        
+        streamed_row_dicts=list(csvw_functions.iter_annotated_rows(fp))
+        
+        # number of rows
+        self.assertEqual(
+            len(streamed_row_dicts),
+            len(annotated_row_dicts)
+            )
+        
+        for streamed_row_dict,annotated_row_dict in \
+            zip(streamed_row_dicts,annotated_row_dicts):
+            
+            # table url and row numbers
+            self.assertEqual(
+                (streamed_row_dict['table']['url'],
+                 streamed_row_dict['number'],
+                 streamed_row_dict['sourceNumber']),
+                (annotated_row_dict['table']['url'],
+                 annotated_row_dict['number'],
+                 annotated_row_dict['sourceNumber'])
+                )
+            
+            # cells
+            for k in ['stringValue','value','errors','aboutURL','propertyURL',
+                      'valueURL','ordered','textDirection']:
+                
+                self.assertEqual(
+                    [x[k] for x in streamed_row_dict['cells']],
+                    [x[k] for x in annotated_row_dict['cells']]
+                    )
+                
+            # titles and primary key
+            self.assertEqual(
+                streamed_row_dict['titles'],
+                annotated_row_dict['titles']
+                )
+            
+            self.assertEqual(
+                [x['stringValue'] for x in streamed_row_dict['primaryKey']],
+                [x['stringValue'] for x in annotated_row_dict['primaryKey']]
+                )
+            
+            # referenced rows
+            self.assertEqual(
+                [(x[1]['table']['url'],x[1]['number']) 
+                 for x in streamed_row_dict['referencedRows']],
+                [(x[1]['table']['url'],x[1]['number']) 
+                 for x in annotated_row_dict['referencedRows']]
+                )
+            
+            
+    def test_create_columnar_annotated_table_group(self):
+        ""
+        
+        import warnings
+        
+        for fp in [r'generating_json_from_tabular_data_example_files/section_6_4/csv-metadata.json',
+                   r'diagnostics_example_files/invalid-values.csv-metadata.json']:
+        
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                
+                annotated_table_group_dict=\
+                    csvw_functions.create_annotated_table_group(fp)
+                    
+                columnar_annotated_table_group_dict=\
+                    csvw_functions.create_columnar_annotated_table_group(fp)
+                
+            # display
+            self.assertEqual(
+                csvw_functions.display_annotated_table_group_dict(columnar_annotated_table_group_dict),
+                csvw_functions.display_annotated_table_group_dict(annotated_table_group_dict)
+                )
+            
+            # json-ld
+            for mode in ['standard','minimal']:
+                
+                self.assertEqual(
+                    csvw_functions.create_json_ld(columnar_annotated_table_group_dict,mode=mode),
+                    csvw_functions.create_json_ld(annotated_table_group_dict,mode=mode)
+                    )
+                
+            # errors
+            self.assertEqual(
+                csvw_functions.get_errors(columnar_annotated_table_group_dict),
+                csvw_functions.get_errors(annotated_table_group_dict)
+                )
+            
+        # the columns store the @value of the values of the same type, 
+        # and the values of other types in full
+        column_store=\
+            columnar_annotated_table_group_dict['tables'][0]['columns'][0]['cells']\
+                .table_store['columns'][0]
+            
+        self.assertEqual(column_store['value'][:4],[1,None,None,3])
+        self.assertEqual(
+            column_store['value_dicts'][1],
+            {'@value':'x',
+             '@type':'http://www.w3.org/2001/XMLSchema#string',
+             '@language':'und'}
+            )
+            
+        # cells are views of the columns
+        annotated_column_dict=columnar_annotated_table_group_dict['tables'][0]['columns'][0]
+        annotated_cell_dict=annotated_column_dict['cells'][0]
+        
+        self.assertIs(
+            annotated_cell_dict['column'],
+            annotated_column_dict
+            )
+        
+        self.assertEqual(
+            annotated_cell_dict['row']['cells'][0],
+            annotated_cell_dict
+            )
+            
+            
+    def test_validate_csvw(self):
+        "Checks the report has the same errors as the streamed rows"
+        
+        import warnings
+        
+        for fp in [r'generating_json_from_tabular_data_example_files/section_6_4/csv-metadata.json',
+                   r'diagnostics_example_files/duplicate-keys.csv-metadata.json',
+                   r'diagnostics_example_files/invalid-values.csv-metadata.json']:
+            
+            report=csvw_functions.validate_csvw(fp)
+            
+            with warnings.catch_warnings(record=True) as caught_warnings:
+                warnings.simplefilter('always')
+                
+                row_count=len(list(
+                    csvw_functions.iter_annotated_rows(fp,max_errors=100)
+                    ))
+                
+            self.assertEqual(report['row_count'],row_count)
+            self.assertEqual(report['valid'],len(caught_warnings)==0)
+            self.assertEqual(
+                [x['errors'][0] for x in report['errors']],
+                [str(x.message) for x in caught_warnings]
+                )
+            
+        # the validation stops at max_errors
+        report=\
+            csvw_functions.validate_csvw(
+                r'diagnostics_example_files/invalid-values.csv-metadata.json',
+                max_errors=2
+                )
+            
+        self.assertEqual(
+            (report['complete'],report['error_count'],report['row_count']),
+            (False,2,1)
+            )
+        
+        
+    def test_validate_csvw_error_counts(self):
+        "Checks the report counts all errors but keeps only the first examples"
+        
+        fp=r'diagnostics_example_files/invalid-values.csv-metadata.json'
+        
+        report=csvw_functions.validate_csvw(fp)
+        
+        limited_report=csvw_functions.validate_csvw(fp,max_error_examples=1)
+        
+        self.assertTrue(report['error_count']>1)
+        self.assertEqual(limited_report['error_count'],report['error_count'])
+        self.assertEqual(limited_report['errors'],report['errors'][:1])
+        
+        self.assertEqual(
+            sum(limited_report['message_types'].values()),
+            report['error_count']
+            )
+        self.assertEqual(
+            sum(y for x in limited_report['columns'].values() 
+                for column_message_types in x.values()
+                for y in column_message_types.values()),
+            report['error_count']
+            )
+        self.assertEqual(limited_report['message_types'],report['message_types'])
+        
+        
+    def test_validate_csvw_key_index_directory(self):
+        "Checks the keys stored on disk give the same report as in memory"
+        
+        import os
+        import tempfile
+        
+        for fp in [r'generating_json_from_tabular_data_example_files/section_6_4/csv-metadata.json',
+                   r'diagnostics_example_files/duplicate-keys.csv-metadata.json',
+                   r'diagnostics_example_files/invalid-values.csv-metadata.json']:
+            
+            with tempfile.TemporaryDirectory(dir='.') as directory:
+                
+                report=\
+                    csvw_functions.validate_csvw(
+                        fp,
+                        key_index_directory=directory
+                        )
+                    
+                # the database files are removed
+                self.assertEqual(os.listdir(directory),[])
+                
+            self.assertEqual(report,csvw_functions.validate_csvw(fp))
+            
+            
+#%% ---TESTCASE - Parsing cells---
+
+class Test_Parsing_Cells(unittest.TestCase):
+    ""
+    
+    def get_column_dicts(self):
+        "Returns columns with a range of datatypes and annotations"
+        
+        import itertools
+        
+        datatypes=[
+            {'base':'string'},
+            {'base':'string','format':'[a-z ]+','maxLength':5},
+            {'base':'normalizedString'},
+            {'base':'anyAtomicType'},
+            {'base':'json'},
+            {'base':'token'},
+            {'base':'integer','minimum':0},
+            {'base':'decimal'},
+            {'base':'boolean'},
+            {'base':'date'}
+            ]
+        
+        return [
+            dict(datatype=datatype,default=default,lang='en',null=null,
+                 required=required,separator=separator)
+            for datatype,default,null,required,separator in itertools.product(
+                    datatypes,['','1'],['',['NA','']],[False,True],[None,' '])
+            ]
+    
+    def test_get_parse_cell_function(self):
+        "Compares get_parse_cell_function with parse_cell_steps_1_to_5"
+        
+        from csvw_functions.csvw_functions import get_parse_cell_function, \
+            get_datatype_parse_function, parse_cell_steps_1_to_5
+        import random
+        import warnings
+        
+        def parse(function):
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    return function()
+            except Exception as e:
+                return type(e), str(e)
+        
+        random.seed(1)
+        
+        string_values=['','NA',' 1 ','12','-3','1.50','abc','a b\tc\n',
+                       'true','0','2023-01-31','{"a": 1}','  x  y ']
+        
+        for column_dict in self.get_column_dicts():
+            
+            for trim,validate in [(True,False),('start',False),(False,True)]:
+                
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    
+                    parse_cell_function=\
+                        get_parse_cell_function(column_dict,trim,validate)
+                    
+                    datatype_parse_function=\
+                        get_datatype_parse_function(column_dict['datatype'])
+                
+                for _ in range(20):
+                    
+                    string_value=' '.join(random.choices(string_values,
+                                                         k=random.randint(1,3)))
+                    
+                    self.assertEqual(
+                        parse(lambda: parse_cell_function(string_value)),
+                        parse(lambda: parse_cell_steps_1_to_5(
+                            string_value,
+                            column_dict['datatype'],
+                            column_dict['default'],
+                            column_dict['lang'],
+                            column_dict['null'],
+                            column_dict['required'],
+                            column_dict['separator'],
+                            datatype_parse_function,
+                            trim,
+                            validate
+                            )),
+                        (column_dict,trim,validate,string_value)
+                        )
+        
+        
+    @unittest.skipUnless(run_benchmarks,'set CSVW_FUNCTIONS_BENCHMARKS=1 to run')
+    def test_get_parse_cell_function_benchmark(self):
+        "Checks the cost per cell of get_parse_cell_function is less than parse_cell_steps_1_to_5"
+        
+        from csvw_functions.csvw_functions import get_parse_cell_function, \
+            get_datatype_parse_function, parse_cell_steps_1_to_5
+        import timeit
+        
+        string_values=[str(i) for i in range(10000)]
+        
+        for datatype in [{'base':'string'},{'base':'integer'}]:
+        
+            column_dict=dict(datatype=datatype,default='',lang='und',null='',
+                             required=False,separator=None)
+            
+            parse_cell_function=\
+                get_parse_cell_function(column_dict,True,False)
+            
+            datatype_parse_function=\
+                get_datatype_parse_function(datatype)
+            
+            def compiled():
+                for string_value in string_values:
+                    parse_cell_function(string_value)
+            
+            def reference():
+                for string_value in string_values:
+                    parse_cell_steps_1_to_5(
+                        string_value,datatype,'','und','',False,None,
+                        datatype_parse_function,True,False
+                        )
+            
+            compiled_cost=min(timeit.repeat(compiled,number=1,repeat=3))/len(string_values)
+            reference_cost=min(timeit.repeat(reference,number=1,repeat=3))/len(string_values)
+            
+            self.assertLess(
+                compiled_cost,
+                reference_cost,
+                f'{datatype["base"]}: {compiled_cost*1e6:.2f} us per cell '
+                f'(parse_cell_steps_1_to_5: {reference_cost*1e6:.2f} us per cell)'
+                )
+        
+        
+    def test_get_memoized_parse_cell_function(self):
+        "Checks the memo, its statistics and that it is switched off"
+        
+        from csvw_functions.csvw_functions import get_parse_cell_function, \
+            get_memoized_parse_cell_function
+        import warnings
+        
+        column_dict=dict(datatype={'base':'integer'},default='',lang='und',
+                         null='',required=False,separator=None)
+        
+        parse_cell_function=get_parse_cell_function(column_dict,True,False)
+        
+        memoized_parse_cell_function=\
+            get_memoized_parse_cell_function(
+                parse_cell_function,
+                maxsize=2
+                )
+            
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            
+            results=[memoized_parse_cell_function(x) 
+                     for x in ['1','1','2','x','x','1','3','2','2','1']]
+            
+        self.assertEqual(
+            results,
+            [parse_cell_function(x) for x in ['1','1','2']]
+            + [(results[3][0],results[3][1])]*2
+            + [parse_cell_function(x) for x in ['1','3','2','2','1']]
+            )
+        
+        # the same value object is returned
+        self.assertIs(results[0][0],results[1][0])
+        
+        # 'x' gives an error so is not remembered, and as only 2 values are 
+        # remembered '2' is forgotten when '3' is added
+        self.assertEqual(
+            memoized_parse_cell_function.cache_info(),
+            dict(hits=3,misses=7,maxsize=2,enabled=True,currsize=2)
+            )
+        
+        # the hit rate of the first 10 values is less than 0.5
+        memoized_parse_cell_function=\
+            get_memoized_parse_cell_function(
+                parse_cell_function,
+                sample_size=10
+                )
+        
+        for i in range(20):
+            memoized_parse_cell_function(str(i))
+            
+        self.assertEqual(
+            memoized_parse_cell_function.cache_info(),
+            dict(hits=0,misses=10,maxsize=1024,enabled=False,currsize=0)
+            )
+        
+        
+    def test_memo_statistics(self):
+        "Checks the statistics of the memo of each column are in the diagnostics"
+        
+        import warnings
+        
+        fp=r'generating_json_from_tabular_data_example_files/section_6_4/csv-metadata.json'
+        
+        # with and without an error budget, which reads the rows as streams
+        for max_errors in [None,100]:
+            
+            diagnostics={}
+            
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+            
+                annotated_table_group_dict=\
+                    csvw_functions.create_annotated_table_group(
+                        fp,
+                        memoize_cell_values=True,
+                        diagnostics=diagnostics,
+                        max_errors=max_errors
+                        )
+                
+            # each string value is a miss the first time it is found (the 
+            # numbers may be parsed in batches without the memo)
+            for annotated_table_dict in annotated_table_group_dict['tables']:
+                
+                for annotated_column_dict in annotated_table_dict['columns']:
+                    
+                    if annotated_column_dict['datatype']['base']!='string':
+                        continue
+                    
+                    string_values=[x['stringValue'] 
+                                   for x in annotated_column_dict['cells']]
+                    
+                    statistics=\
+                        diagnostics['memo'][annotated_table_dict['url']]\
+                            [annotated_column_dict['name']]
+                    
+                    self.assertEqual(
+                        (statistics['hits'],statistics['misses']),
+                        (len(string_values)-len(set(string_values)),
+                         len(set(string_values)))
+                        )
+            
+            self.assertTrue(
+                sum(y['hits'] for x in diagnostics['memo'].values() 
+                    for y in x.values())>0
+                )
+        
+        
+    @unittest.skipIf(csvw_functions.csvw_functions.numpy is None,
+                     'NumPy is not installed')
+    def test_get_parse_numbers_function(self):
+        "Compares get_parse_numbers_function with get_parse_cell_function"
+        
+        from csvw_functions.csvw_functions import get_parse_cell_function, \
+            get_parse_numbers_function
+        import random
+        import warnings
+        
+        random.seed(1)
+        
+        datatypes=[
+            {'base':'integer'},
+            {'base':'byte'},
+            {'base':'unsignedInt'},
+            {'base':'positiveInteger','maxExclusive':1000},
+            {'base':'long','minInclusive':-5},
+            {'base':'decimal','minimum':-1.5,'maximum':100},
+            {'base':'double'},
+            {'base':'float','format':{'groupChar':','}},
+            ]
+        
+        characters='0123456789+-.eE%, x'
+        
+        string_values=['','NA','-0','+7','007','.5','5.','1e5','1E-3','1.5e+2',
+                       'e5','5e','1e999','NaN','INF','-INF','1,000','1,,0',
+                       '4294967296','99999999999999999999','1\x00','\u0663']
+        
+        string_values+=[''.join(random.choices(characters,k=random.randint(1,6))) 
+                        for _ in range(2000)]
+        
+        string_values+=[str(random.randint(-10**20,10**20)) for _ in range(200)]
+        
+        for datatype in datatypes:
+            
+            column_dict=dict(datatype=datatype,default='',lang='und',
+                             null=['NA','7'],required=False,separator=None)
+            
+            parse_cell_function=get_parse_cell_function(column_dict,True,False)
+            
+            json_values=\
+                get_parse_numbers_function(
+                    column_dict,
+                    chunk_size=100
+                    )(string_values)
+            
+            self.assertGreater(len([x for x in json_values if not x is None]),100)
+            
+            for string_value,json_value in zip(string_values,json_values):
+                
+                if json_value is None:
+                    continue
+                
+                with warnings.catch_warnings():
+                    warnings.simplefilter('error')
+                    cell_value,errors=parse_cell_function(string_value)
+                
+                self.assertEqual(errors,[],(datatype,string_value))
+                self.assertEqual(type(cell_value['@value']),type(json_value))
+                self.assertEqual(cell_value['@value'],json_value,(datatype,string_value))
+        
+        # columns with a pattern are parsed one value at a time
+        column_dict['datatype']={'base':'decimal','format':'#,##0.0'}
+        
+        self.assertIsNone(get_parse_numbers_function(column_dict))
+        
+        
+    def test_get_LDML_number_pattern_regex(self):
+        "Compares the regular expression of a number pattern with validate_LDML_number"
+        
+        from csvw_functions.csvw_functions import parse_LDML_number_pattern, \
+            get_LDML_number_pattern_regex, validate_LDML_number
+        import random
+        import warnings
+        
+        random.seed(1)
+        
+        patterns=['#,##0.##','#0.0#','#,##,##0','0.###E0','+0','-0','%000',
+                  '‰000','000%','0.0E+00','##0.00','0.#,#']
+        
+        string_values=['1','-1','+1','01','1.5','1,234.5','12,34,567','1E5',
+                       '1E+05','1.0E-3','%001','‰123','001%','1,2','1.','1.E5']
+        
+        string_values+=[''.join(random.choices('0123456789,.E+-%‰',
+                                               k=random.randint(1,8)))
+                        for _ in range(1000)]
+        
+        for pattern in patterns:
+            
+            pattern_dict=parse_LDML_number_pattern(pattern)
+            
+            for decimal_char,group_char in [('.',None),('.',','),(',','.')]:
+                
+                regex=\
+                    get_LDML_number_pattern_regex(
+                        pattern_dict,
+                        decimal_char,
+                        group_char
+                        )
+                
+                for string_value in string_values:
+                    
+                    errors=[]
+                    
+                    with warnings.catch_warnings(record=True) as w:
+                        warnings.simplefilter('always')
+                        try:
+                            result=validate_LDML_number(string_value,errors,
+                                                        pattern_dict,decimal_char,
+                                                        group_char)
+                        except Exception:
+                            result=False
+                    
+                    if regex.fullmatch(string_value):
+                        self.assertEqual((result,errors,len(w)),(True,[],0),
+                                         (pattern,decimal_char,group_char,string_value))
+                    else:
+                        self.assertFalse(result,(pattern,decimal_char,group_char,string_value))
+        
+        
+    date_formats=['yyyy-MM-dd','yyyyMMdd','dd-MM-yyyy','d-M-yyyy','MM-dd-yyyy',
+                  'M-d-yyyy','dd/MM/yyyy','d/M/yyyy','MM/dd/yyyy','M/d/yyyy',
+                  'dd.MM.yyyy','d.M.yyyy','MM.dd.yyyy','M.d.yyyy']
+    
+    def format_date(self,date,date_format):
+        "Returns the date as a string in one of the date formats"
+        
+        import re
+        
+        if date_format is None:
+            return date.isoformat()
+        
+        codes={'yyyy':f'{date.year:04}','MM':f'{date.month:02}',
+               'dd':f'{date.day:02}','M':str(date.month),'d':str(date.day)}
+        
+        return re.sub('yyyy|MM|dd|M|d',lambda x: codes[x.group()],date_format)
+        
+    
+    def test_get_parse_date_string_function(self):
+        "Checks the compiled parsers of the date formats"
+        
+        from csvw_functions.csvw_functions import get_parse_date_string_function, \
+            get_parse_date_function
+        import datetime
+        
+        date=datetime.date(2015,3,2)
+        
+        for date_format in self.date_formats:
+            
+            parse_date_string=get_parse_date_string_function(date_format)
+            
+            self.assertEqual(
+                parse_date_string(self.format_date(date,date_format)),
+                date
+                )
+            
+            # not in the usual form for the format, or not a valid date
+            for string_value in ['2015-3-02','02/03/15','2015-02-30','+2015-03-02',
+                                 '20150302 ','30.02.2015','03-2-2015']:
+                
+                if parse_date_string(string_value) is None:
+                    continue
+                
+                self.assertEqual(
+                    get_parse_date_function(
+                        {'base':'date','format':date_format}
+                        )(string_value,[],False),
+                    (parse_date_string(string_value).isoformat(),'date',[])
+                    )
+                
+        
+    def test_get_parse_time_string_function(self):
+        "Checks the compiled parsers of the time formats"
+        
+        from csvw_functions.csvw_functions import get_parse_time_string_function
+        
+        parse_time_string=get_parse_time_string_function('HH:mm:ss','SSS')
+        
+        self.assertEqual(parse_time_string('15:02:37.12'),'15:02:37.120')
+        self.assertEqual(parse_time_string('15:02:37'),None)  # no fraction
+        self.assertEqual(parse_time_string('15:02:37.1234'),None)
+        self.assertEqual(parse_time_string('25:02:37.1'),None)
+        self.assertEqual(parse_time_string('15:02'),None)
+        
+        parse_time_string=get_parse_time_string_function('HHmm','')
+        
+        self.assertEqual(parse_time_string('1502'),'15:02:00')
+        self.assertEqual(parse_time_string('15:02'),None)
+        
+        
+    def test_parse_isoformat_datetime(self):
+        "Compares parse_isoformat_datetime with dateutil.parser.isoparse"
+        
+        from csvw_functions.csvw_functions import parse_isoformat_datetime
+        import dateutil.parser
+        
+        for string_value in ['2015-03-22T15:02:37','2015-03-22T15:02',
+                             '2015-03-22T15:02:37.5','2015-03-22T15:02:37.123456',
+                             '2015-03-22T24:00:00','2015-03-22','2015-03-22T15:02:37+05:30',
+                             '20150322T150237']:
+            
+            self.assertEqual(
+                parse_isoformat_datetime(string_value),
+                dateutil.parser.isoparse(string_value)
+                )
+            
+        with self.assertRaises(ValueError):
+            parse_isoformat_datetime('2015-02-30T15:02:37')
+            
+            
+    def test_parse_timezone_string(self):
+        "Checks the timezones and that they are cached"
+        
+        from csvw_functions.csvw_functions import parse_timezone_string
+        
+        parse_timezone_string.cache_clear()
+        
+        for _ in range(3):
+            
+            self.assertEqual(
+                [parse_timezone_string(x) for x in ['','Z','-08','+0530','-08:00']],
+                ['','Z','-08:00','+05:30','-08:00']
+                )
+            
+            # errors are raised each time
+            with self.assertRaises(ValueError):
+                parse_timezone_string('+25:00')
+                
+        self.assertEqual(parse_timezone_string.cache_info().hits,10)
+        self.assertEqual(parse_timezone_string.cache_info().currsize,5)
+            
+            
+    @unittest.skipUnless(run_benchmarks,'set CSVW_FUNCTIONS_BENCHMARKS=1 to run')
+    def test_parse_date_and_time_benchmark(self):
+        "Checks the cost per cell of parsing each date format, times and datetimes"
+        
+        from csvw_functions.csvw_functions import get_datatype_parse_function
+        import datetime
+        import dateutil.parser
+        import timeit
+        
+        dates=[datetime.date(2000,1,1)+datetime.timedelta(days=i*7) 
+               for i in range(1000)]
+        
+        datatypes_and_string_values=\
+            [({'base':'date','format':date_format},
+              [self.format_date(x,date_format) for x in dates])
+             for date_format in [None]+self.date_formats]
+            
+        datatypes_and_string_values+=[
+            ({'base':'time','format':'HH:mm:ss.SSS'},
+             [f'{x.month:02}:{x.day:02}:{x.year%60:02}.{x.day}' for x in dates]),
+            ({'base':'dateTime'},
+             [f'{x.isoformat()}T15:02:37' for x in dates]),
+            ({'base':'dateTime','format':'dd/MM/yyyy HH:mm'},
+             [self.format_date(x,'dd/MM/yyyy 15:02') for x in dates]),
+            ({'base':'dateTimeStamp','format':'yyyy-MM-ddTHH:mm:ssXXX'},
+             [f'{x.isoformat()}T15:02:37+05:30' for x in dates])
+            ]
+        
+        for datatype,string_values in datatypes_and_string_values:
+            
+            parse_function=get_datatype_parse_function(datatype)
+            
+            def parse():
+                for string_value in string_values:
+                    parse_function(string_value,[],False)
+            
+            cost=min(timeit.repeat(parse,number=1,repeat=3))/len(string_values)
+            
+            # a loose limit, as parsing each cell step by step cost up to 
+            # 19 us per cell
+            self.assertLess(
+                cost,
+                15e-6,
+                f'{datatype["base"]} {datatype.get("format")}: '
+                f'{cost*1e6:.2f} us per cell'
+                )
+            
+            # datetimes without a format are parsed faster than by 
+            # dateutil.parser.isoparse, which was used for each cell before
+            if datatype=={'base':'dateTime'}:
+                
+                def isoparse():
+                    for string_value in string_values:
+                        dateutil.parser.isoparse(string_value)
+                        
+                isoparse_cost=min(timeit.repeat(isoparse,number=1,repeat=3))/len(string_values)
+                
+                self.assertLess(
+                    cost,
+                    isoparse_cost,
+                    f'dateTime: {cost*1e6:.2f} us per cell '
+                    f'(dateutil.parser.isoparse: {isoparse_cost*1e6:.2f} us per cell)'
+                    )
+        
+        
+#%% ---TESTCASE - Annotated table group---
+
+class Test_Annotated_Table_Group(unittest.TestCase):
+    ""
+    
+    def test_parse_cells_using_process_pool(self):
+        "Checks the cells parsed by worker processes have the same values, errors and warnings"
+        
+        from csvw_functions.csvw_functions import parse_cells_in_annotated_table_dict
+        import concurrent.futures
+        
+        fp=r'diagnostics_example_files/invalid-values.csv-metadata.json'
+        
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            annotated_table_dict=\
+                csvw_functions.create_annotated_table_group(fp)['tables'][0]
+        
+        def parse_cells(executor):
+            
+            for annotated_column_dict in annotated_table_dict['columns']:
+                for annotated_cell_dict in annotated_column_dict['cells']:
+                    annotated_cell_dict['value']=None
+                    annotated_cell_dict['errors']=[]
+            
+            with warnings.catch_warnings(record=True) as caught_warnings:
+                warnings.simplefilter('always')
+                
+                parse_cells_in_annotated_table_dict(
+                    annotated_table_dict,
+                    True,
+                    False,
+                    executor=executor,
+                    minimum_cell_count=0,
+                    chunk_size=2
+                    )
+                
+            return ([(x['value'],x['errors']) 
+                     for y in annotated_table_dict['columns'] for x in y['cells']],
+                    [str(x.message) for x in caught_warnings])
+        
+        with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+            
+            result=parse_cells(executor)
+            
+        self.assertEqual(result,parse_cells(None))
+        self.assertEqual(len(result[1]),4)
+        
+        
+    @unittest.skipUnless(run_benchmarks and (os.cpu_count() or 1)>=4,
+                         'set CSVW_FUNCTIONS_BENCHMARKS=1 on a machine with 4 or more CPUs to run')
+    def test_parse_tabular_data_from_text_process_pool_benchmark(self):
+        "Checks a large table is converted faster using the process pool"
+        
+        import random
+        import tempfile
+        import time
+        
+        row_count=200000
+        
+        random.seed(0)
+        
+        #...a relative path, as for the other test files
+        with tempfile.TemporaryDirectory(dir='.') as directory:
+            
+            fp=os.path.join(os.path.basename(directory),'big.csv')
+            
+            with open(fp,'w') as f:
+                f.write('id,day,amount,stamp,flag\n')
+                for i in range(row_count):
+                    f.write(f'{i},{random.randint(1,28):02}/{random.randint(1,12):02}/2020,'
+                            f'"{random.randrange(10**6):,}.{random.randrange(100):02}",'
+                            f'2020-01-01T10:{random.randrange(60):02}:00+01:00,'
+                            f'{random.choice(["Y","N"])}\n')
+                    
+            with open(fp+'-metadata.json','w') as f:
+                json.dump(
+                    {'@context':'http://www.w3.org/ns/csvw',
+                     'url':'big.csv',
+                     'tableSchema':{
+                         'columns':[
+                             {'name':'id','titles':'id','datatype':'integer'},
+                             {'name':'day','titles':'day',
+                              'datatype':{'base':'date','format':'dd/MM/yyyy'}},
+                             {'name':'amount','titles':'amount',
+                              'datatype':{'base':'decimal','format':'#,##0.00'}},
+                             {'name':'stamp','titles':'stamp',
+                              'datatype':'dateTimeStamp'},
+                             {'name':'flag','titles':'flag',
+                              'datatype':{'base':'boolean','format':'Y|N'}}]}},
+                    f
+                    )
+                
+            def convert(parse_tabular_data_function):
+                start=time.perf_counter()
+                annotated_table_group_dict=\
+                    csvw_functions.create_annotated_table_group(
+                        fp+'-metadata.json',
+                        parse_tabular_data_function=parse_tabular_data_function
+                        )
+                return (time.perf_counter()-start,
+                        [x['value'] for y in annotated_table_group_dict['tables'][0]['columns'] 
+                         for x in y['cells']])
+            
+            serial_time,serial_values=\
+                convert(csvw_functions.csvw_functions.parse_tabular_data_from_text_csv_module)
+            process_pool_time,process_pool_values=\
+                convert(csvw_functions.csvw_functions.parse_tabular_data_from_text_process_pool)
+            
+        self.assertEqual(process_pool_values,serial_values)
+        self.assertLess(
+            process_pool_time,
+            serial_time,
+            f'process pool: {process_pool_time:.2f} s; '
+            f'serial: {serial_time:.2f} s; {os.cpu_count()} CPUs'
+            )
+        
+    
+    def test_foreign_keys(self):
+        "Checks each row references the row with the values of its foreign key"
+        
+        fp=r'generating_json_from_tabular_data_example_files/section_6_4/csv-metadata.json'
+        annotated_table_group_dict=\
+            csvw_functions.create_annotated_table_group(fp)
+        
+        number_of_referenced_rows=0
+        
+        for annotated_table_dict in annotated_table_group_dict['tables']:
+            
+            for annotated_row_dict in annotated_table_dict['rows']:
+                
+                for foreign_key_definition, referenced_row_dict in \
+                    annotated_row_dict['referencedRows']:
+                    
+                    self.assertEqual(
+                        [annotated_row_dict['cells'][x['number']-1]['value'] 
+                         for x in foreign_key_definition[0]],
+                        [referenced_row_dict['cells'][x['number']-1]['value'] 
+                         for x in foreign_key_definition[1]]
+                        )
+                    
+                    number_of_referenced_rows+=1
+                    
+        self.assertTrue(number_of_referenced_rows>0)
+        
+        
+    def test_diagnostics(self):
+        "Checks the errors are collected with a single summary warning"
+        
+        import warnings
+        
+        fp=r'diagnostics_example_files/invalid-values.csv-metadata.json'
+        
+        diagnostics={}
+        
+        with warnings.catch_warnings(record=True) as caught_warnings:
+            warnings.simplefilter('always')
+            
+            annotated_table_group_dict=\
+                csvw_functions.create_annotated_table_group(
+                    fp,
+                    diagnostics=diagnostics,
+                    max_diagnostic_examples=3
+                    )
+                
+        self.assertEqual(len(caught_warnings),1)
+        self.assertTrue(
+            str(caught_warnings[0].message).startswith('4 errors found')
+            )
+        
+        self.assertEqual(diagnostics['error_count'],4)
+        self.assertEqual(
+            diagnostics['message_types'],
+            {'Cell string value ... is not in a format which can be converted '
+             'to a number of type .... Cell value is not converted to a '
+             'number.':2,
+             'Invalid isoformat string ... for ... datatype.':2}
+            )
+        self.assertEqual(
+            [{k:v for k,v in x.items() if k!='table'} 
+             for x in diagnostics['examples']],
+            [{'column':'code','row_number':2,'stringValue':'x',
+              'message':'Cell string value "x" is not in a format which can '
+              'be converted to a number of type "integer". Cell value is '
+              'not converted to a number. '},
+             {'column':'code','row_number':3,'stringValue':'y',
+              'message':'Cell string value "y" is not in a format which can '
+              'be converted to a number of type "integer". Cell value is '
+              'not converted to a number. '},
+             {'column':'date','row_number':2,'stringValue':'2020-13-01',
+              'message':'Invalid isoformat string 2020-13-01 for "date" '
+              'datatype. '}]
+            )
+        
+        # the errors are still in the errors annotations of the cells
+        self.assertEqual(
+            sum(len(x['errors']) 
+                for x in csvw_functions.get_errors(annotated_table_group_dict)),
+            4
+            )
+        
+        # without diagnostics a warning is given for each error
+        with warnings.catch_warnings(record=True) as caught_warnings:
+            warnings.simplefilter('always')
+            
+            csvw_functions.create_annotated_table_group(fp)
+            
+        self.assertEqual(len(caught_warnings),4)
+        
+        
+    def test_max_errors(self):
+        "Checks the processing stops when the number of errors is reached"
+        
+        import warnings
+        
+        fp=r'diagnostics_example_files/duplicate-keys.csv-metadata.json'
+        
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            
+            # the rows are read and checked one at a time
+            with self.assertRaises(csvw_functions.CSVWMaxErrorsError) as cm:
+                csvw_functions.create_annotated_table_group(fp,max_errors=2)
+                
+            self.assertEqual(
+                [(x['column_name'],x['row_number']) 
+                 for x in cm.exception.errors],
+                [(None,2),('date',3)]
+                )
+            
+            # the rows are read one at a time
+            with self.assertRaises(csvw_functions.CSVWMaxErrorsError) as cm:
+                list(csvw_functions.iter_annotated_rows(fp,max_errors=2))
+                
+            self.assertEqual(
+                [(x['column_name'],x['row_number']) 
+                 for x in cm.exception.errors],
+                [(None,2),('date',3)]
+                )
+            
+            # fewer errors than max_errors
+            self.assertEqual(
+                len(list(csvw_functions.iter_annotated_rows(fp,max_errors=3))),
+                3
+                )
+            
+            
+    def test_max_errors_malformed_rows(self):
+        "Checks rows which cannot be parsed count as errors when max_errors is given"
+        
+        import warnings
+        
+        fp=r'diagnostics_example_files/malformed-rows.csv-metadata.json'
+        
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            
+            # the error is raised if there is no error budget
+            with self.assertRaises(Exception):
+                csvw_functions.create_annotated_table_group(fp)
+                
+            # the rows which cannot be parsed are skipped, and a quoted 
+            # value which is not closed ends the table
+            annotated_table_group_dict=\
+                csvw_functions.create_annotated_table_group(fp,max_errors=10)
+                
+            self.assertEqual(
+                [x['number'] for x in annotated_table_group_dict['tables'][0]['rows']],
+                [1,2,4]
+                )
+            
+            self.assertEqual(
+                [len(x['cells']) for x in annotated_table_group_dict['tables'][0]['columns']],
+                [3,3]
+                )
+            
+            # each duplicate primary key is an error
+            with self.assertRaises(csvw_functions.CSVWMaxErrorsError) as cm:
+                csvw_functions.create_annotated_table_group(fp,max_errors=4)
+                
+            self.assertEqual(
+                [(x['row_number'],x['errors'][0]) for x in cm.exception.errors],
+                [(2,"Primary key does not have a unique comination of values: ['1']."),
+                 (3,'Row cannot be parsed: quote character encountered not at start of cell'),
+                 (4,"Primary key does not have a unique comination of values: ['1']."),
+                 (5,'Row cannot be parsed: End of text reached in a quoted value.')]
+                )
+            
+            
+    def test_max_errors_stops_reading(self):
+        "Checks a tabular data file is not read in full when max_errors is reached"
+        
+        import io
+        import json
+        import warnings
+        
+        text='code\n'+'x\n'*200000
+        
+        class ByteCountingStream(io.BytesIO):
+            "Records the number of bytes read"
+            
+            def read(self, *args):
+                content=super().read(*args)
+                self.bytes_read+=len(content)
+                return content
+            
+            def read1(self, *args):
+                content=super().read1(*args)
+                self.bytes_read+=len(content)
+                return content
+            
+        class StreamRecordingURLFetcher(csvw_functions.MemoryURLFetcher):
+            "Records the streams which are opened"
+            
+            def open(self, url, stream=False):
+                f=ByteCountingStream(self.get_content_and_headers('GET', url)[0])
+                f.bytes_read=0
+                self.streams.append((url,f))
+                return f
+            
+        url_fetcher=\
+            StreamRecordingURLFetcher(
+                {'http://example.org/data.csv':
+                 (text,{'Content-Type':'text/csv'}),
+                 'http://example.org/data.csv-metadata.json':
+                 json.dumps({'@context':'http://www.w3.org/ns/csvw',
+                             'url':'data.csv',
+                             'tableSchema':{'columns':[{'name':'code',
+                                                        'titles':'code',
+                                                        'datatype':'integer'}]}})}
+                )
+        url_fetcher.streams=[]
+            
+        previous_url_fetcher=csvw_functions.set_url_fetcher(url_fetcher)
+        
+        try:
+            
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                
+                with self.assertRaises(csvw_functions.CSVWMaxErrorsError):
+                    csvw_functions.create_annotated_table_group(
+                        'http://example.org/data.csv-metadata.json',
+                        max_errors=10
+                        )
+                    
+        finally:
+            
+            csvw_functions.set_url_fetcher(previous_url_fetcher)
+            
+        bytes_read=[f.bytes_read for url,f in url_fetcher.streams 
+                    if url=='http://example.org/data.csv']
+            
+        self.assertTrue(len(bytes_read)>0)
+        self.assertTrue(all(x<len(text)/4 for x in bytes_read),bytes_read)
+            
+            
+    def test_parse_tabular_data_from_text_stream(self):
+        "Checks a remote tabular data file is read from a stream in chunks"
+        
+        import io
+        
+        text='code\n'+'x\n'*200000
+        
+        class ReadRecordingStream(io.BytesIO):
+            "Records the largest number of bytes returned by a read"
+            
+            def read(self, *args):
+                content=super().read(*args)
+                self.max_read=max(self.max_read,len(content))
+                return content
+            
+            def read1(self, *args):
+                content=super().read1(*args)
+                self.max_read=max(self.max_read,len(content))
+                return content
+            
+        class StreamRecordingURLFetcher(csvw_functions.MemoryURLFetcher):
+            "Records the streams which are opened"
+            
+            def open(self, url, stream=False):
+                f=ReadRecordingStream(self.get_content_and_headers('GET', url)[0])
+                f.max_read=0
+                self.streams.append((stream,f))
+                return f
+            
+        for use_csv_module in [False,True]:
+            
+            url_fetcher=\
+                StreamRecordingURLFetcher(
+                    {'http://example.org/data.csv':
+                     (text,{'Content-Type':'text/csv'})}
+                    )
+            url_fetcher.streams=[]
+                
+            previous_url_fetcher=csvw_functions.set_url_fetcher(url_fetcher)
+            
+            try:
+                
+                table_dict, metadata_table_dict=\
+                    csvw_functions.csvw_functions.parse_tabular_data_from_text(
+                        'http://example.org/data.csv',
+                        {},
+                        use_csv_module=use_csv_module
+                        )
+                    
+            finally:
+                
+                csvw_functions.set_url_fetcher(previous_url_fetcher)
+                
+            self.assertEqual(len(table_dict['rows']),200000)
+            self.assertEqual(metadata_table_dict['tableSchema']['columns'],
+                             [{'titles':['code']}])
+            
+            self.assertEqual(len(url_fetcher.streams),1)
+            stream, f=url_fetcher.streams[0]
+            self.assertTrue(stream)
+            self.assertTrue(f.closed)
+            self.assertTrue(0<f.max_read<len(text)/4,f.max_read)
+        
+        
+    def test_memory_url_fetcher(self):
+        "Checks a remote CSV file is read using the URL fetcher"
+        
+        import warnings
+        
+        fp=r'generating_json_from_tabular_data_example_files/section_6_1/countries.csv'
+        
+        with open(fp) as f:
+            text=f.read()
+        
+        url_fetcher=\
+            csvw_functions.MemoryURLFetcher(
+                {'http://example.org/countries.csv':
+                 (text,{'Content-Type':'text/csv'})}
+                )
+            
+        previous_url_fetcher=csvw_functions.set_url_fetcher(url_fetcher)
+        
+        try:
+            
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                
+                annotated_table_group_dict=\
+                    csvw_functions.create_annotated_table_group(
+                        'http://example.org/countries.csv'
+                        )
+                    
+        finally:
+            
+            csvw_functions.set_url_fetcher(previous_url_fetcher)
+            
+        self.assertEqual(
+            annotated_table_group_dict['tables'][0]['url'],
+            'http://example.org/countries.csv'
+            )
+        
+        self.assertEqual(
+            [[x['value'] for x in annotated_row_dict['cells']]
+             for annotated_row_dict in annotated_table_group_dict['tables'][0]['rows']],
+            [[x['value'] for x in annotated_row_dict['cells']]
+             for annotated_row_dict in 
+             csvw_functions.create_annotated_table_group(fp)['tables'][0]['rows']]
+            )
+        
+        # the well known path and default metadata locations are tried
+        self.assertEqual(
+            url_fetcher.requests,
+            [('HEAD','http://example.org/countries.csv'),
+             ('GET','http://example.org/.well-known/csvm'),
+             ('GET','http://example.org/countries.csv-metadata.json'),
+             ('GET','http://example.org/csv-metadata.json'),
+             ('HEAD','http://example.org/countries.csv'),
+             ('GET','http://example.org/countries.csv')]
+            )
+        
+        
+    def test_site_wide_location_cache(self):
+        "Checks /.well-known/csvm is requested once for each origin"
+        
+        import warnings
+        
+        url_fetcher=\
+            csvw_functions.MemoryURLFetcher(
+                {'http://example.org/data/a.csv':
+                 ('name\nx\n',{'Content-Type':'text/csv'}),
+                 'http://example.org/data/b.csv':
+                 ('name\ny\n',{'Content-Type':'text/csv'})}
+                )
+            
+        previous_url_fetcher=csvw_functions.set_url_fetcher(url_fetcher)
+        
+        try:
+            
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                
+                for url in ['http://example.org/data/a.csv',
+                            'http://example.org/data/b.csv']:
+                
+                    csvw_functions.create_annotated_table_group(url)
+                    
+        finally:
+            
+            csvw_functions.set_url_fetcher(previous_url_fetcher)
+            
+        # the well known path and the shared csv-metadata.json file are 
+        # not found and are not requested again
+        self.assertEqual(
+            [x for x in url_fetcher.requests if x[0]=='GET'],
+            [('GET','http://example.org/.well-known/csvm'),
+             ('GET','http://example.org/data/a.csv-metadata.json'),
+             ('GET','http://example.org/data/csv-metadata.json'),
+             ('GET','http://example.org/data/a.csv'),
+             ('GET','http://example.org/data/b.csv-metadata.json'),
+             ('GET','http://example.org/data/b.csv')]
+            )
+        
+        
+    def test_site_wide_location_cache_headers(self):
+        "Checks the cache headers of the /.well-known/csvm response are followed"
+        
+        import warnings
+        
+        url_fetcher=\
+            csvw_functions.MemoryURLFetcher(
+                {'http://example.org/.well-known/csvm':
+                 ('{+url}-metadata.json',{'Cache-Control':'no-store'}),
+                 'http://example.org/a.csv':
+                 ('name\nx\n',{'Content-Type':'text/csv'}),
+                 'http://example.com/.well-known/csvm':
+                 ('{+url}-metadata.json',{'Cache-Control':'max-age=3600'}),
+                 'http://example.com/a.csv':
+                 ('name\nx\n',{'Content-Type':'text/csv'})}
+                )
+            
+        previous_url_fetcher=csvw_functions.set_url_fetcher(url_fetcher)
+        
+        try:
+            
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                
+                for url in ['http://example.org/a.csv',
+                            'http://example.com/a.csv']*2:
+                
+                    csvw_functions.create_annotated_table_group(url)
+                    
+        finally:
+            
+            csvw_functions.set_url_fetcher(previous_url_fetcher)
+            
+        # the no-store response is requested each time, and the max-age 
+        # response only once
+        self.assertEqual(
+            [x[1] for x in url_fetcher.requests 
+             if x[1].endswith('/.well-known/csvm')],
+            ['http://example.org/.well-known/csvm',
+             'http://example.com/.well-known/csvm',
+             'http://example.org/.well-known/csvm']
+            )
+        
+        
+    def test_site_wide_location_cache_server_error(self):
+        "Checks a response with a server error is not cached as not found"
+        
+        import json
+        import urllib.error
+        import warnings
+        
+        class UnavailableURLFetcher(csvw_functions.MemoryURLFetcher):
+            "Gives a 500 Internal Server Error for the first request of each unavailable URL"
+            
+            def __init__(self, resources, unavailable_urls):
+                super().__init__(resources)
+                self.unavailable_urls=set(unavailable_urls)
+                
+            def get_content_and_headers(self, method, url):
+                if method=='GET' and url in self.unavailable_urls:
+                    self.unavailable_urls.remove(url)
+                    self.requests.append((method, url))
+                    raise urllib.error.HTTPError(url, 500, 'Internal Server Error', {}, None)
+                return super().get_content_and_headers(method, url)
+        
+        url_fetcher=\
+            UnavailableURLFetcher(
+                {'http://example.org/data/a.csv':
+                 ('name\nx\n',{'Content-Type':'text/csv'}),
+                 'http://example.org/data/csv-metadata.json':
+                 json.dumps({'@context':'http://www.w3.org/ns/csvw',
+                             'url':'a.csv',
+                             'tableSchema':{'columns':[{'name':'given_name',
+                                                        'titles':'name'}]}})},
+                ['http://example.org/.well-known/csvm',
+                 'http://example.org/data/csv-metadata.json']
+                )
+            
+        previous_url_fetcher=csvw_functions.set_url_fetcher(url_fetcher)
+        
+        try:
+            
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                
+                annotated_table_group_dicts=\
+                    [csvw_functions.create_annotated_table_group(
+                        'http://example.org/data/a.csv'
+                        )
+                     for _ in range(2)]
+                    
+        finally:
+            
+            csvw_functions.set_url_fetcher(previous_url_fetcher)
+            
+        # the errors are not cached, so the well known path and the 
+        # metadata file are requested again, and the metadata file is 
+        # then found
+        self.assertEqual(
+            [x for x in url_fetcher.requests if x[0]=='GET'],
+            [('GET','http://example.org/.well-known/csvm'),
+             ('GET','http://example.org/data/a.csv-metadata.json'),
+             ('GET','http://example.org/data/csv-metadata.json'),
+             ('GET','http://example.org/data/a.csv'),
+             ('GET','http://example.org/.well-known/csvm'),
+             ('GET','http://example.org/data/csv-metadata.json'),
+             ('GET','http://example.org/data/a.csv')]
+            )
+        
+        self.assertEqual(
+            [x['tables'][0]['columns'][0]['name'] for x in annotated_table_group_dicts],
+            ['name','given_name']
+            )
+        
+        
+    def test_concurrent_metadata_requests(self):
+        "Checks the metadata found is the same when the candidate metadata documents are requested at the same time"
+        
+        import json
+        import warnings
+        
+        def get_metadata_text(title):
+            return json.dumps(
+                {'@context':'http://www.w3.org/ns/csvw',
+                 'url':'http://example.org/data/a.csv',
+                 'dc:title':title}
+                )
+        
+        resources={
+            'http://example.org/data/a.csv':
+                ('name\nx\n',
+                 {'Content-Type':'text/csv',
+                  'Link':'<linked-metadata.json>; rel="describedby"; type="application/csvm+json"'}),
+            'http://example.org/data/linked-metadata.json':
+                get_metadata_text('linked'),
+            'http://example.org/data/a.csv-metadata.json':
+                get_metadata_text('default')
+            }
+        
+        titles=[]
+        
+        for concurrent_metadata_requests in [False,True]:
+            
+            url_fetcher=csvw_functions.MemoryURLFetcher(resources)
+            
+            previous_url_fetcher=csvw_functions.set_url_fetcher(url_fetcher)
+            
+            try:
+                
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    
+                    annotated_table_group_dict=\
+                        csvw_functions.create_annotated_table_group(
+                            'http://example.org/data/a.csv',
+                            concurrent_metadata_requests=concurrent_metadata_requests
+                            )
+                        
+            finally:
+                
+                csvw_functions.set_url_fetcher(previous_url_fetcher)
+                
+            titles.append(
+                annotated_table_group_dict['tables'][0]['dc:title']['@value']
+                )
+            
+            requested_urls=set(x[1] for x in url_fetcher.requests)
+            
+        # the Link header takes precedence over the default locations
+        self.assertEqual(titles,['linked','linked'])
+        
+        # all candidates are requested when concurrent
+        self.assertTrue(
+            {'http://example.org/.well-known/csvm',
+             'http://example.org/data/linked-metadata.json',
+             'http://example.org/data/a.csv-metadata.json',
+             'http://example.org/data/csv-metadata.json'}.issubset(requested_urls)
+            )
+        
+        
+    def test_default_url_fetcher(self):
+        "Checks the default URL fetcher is created when it is first used"
+        
+        import subprocess
+        import sys
+        
+        # importing the package does not create a URL fetcher
+        self.assertEqual(
+            subprocess.run(
+                [sys.executable,'-c',
+                 'import csvw_functions.csvw_functions as m; print(m.url_fetcher)'],
+                cwd='..',
+                capture_output=True,
+                text=True,
+                check=True
+                ).stdout.strip(),
+            'None'
+            )
+        
+        previous_url_fetcher=csvw_functions.set_url_fetcher(None)
+        
+        try:
+            
+            url_fetcher=csvw_functions.get_url_fetcher()
+            
+            self.assertIsInstance(url_fetcher,csvw_functions.URLFetcher)
+            self.assertIs(csvw_functions.get_url_fetcher(),url_fetcher)
+            
+        finally:
+            
+            csvw_functions.set_url_fetcher(previous_url_fetcher)
+            
+        
+    def test_url_fetcher(self):
+        "Checks a remote CSV file is requested once, without a HEAD request"
+        
+        import io
+        import warnings
+        import requests
+        import urllib3
+        
+        fp=r'generating_json_from_tabular_data_example_files/section_6_1/countries.csv'
+        
+        with open(fp,'rb') as f:
+            content=f.read()
+        
+        class Adapter(requests.adapters.BaseAdapter):
+            "Serves the CSV file and records the requests"
+            
+            requests=[]
+            
+            def send(self, request, **kwargs):
+                self.requests.append((request.method,request.url))
+                found=request.url=='http://example.org/countries.csv'
+                raw=urllib3.response.HTTPResponse(
+                    body=io.BytesIO(content if found else b''),
+                    preload_content=False,
+                    status=200 if found else 404,
+                    headers={'Content-Type':'text/csv'}
+                    )
+                return requests.adapters.HTTPAdapter().build_response(request,raw)
+            
+            def close(self):
+                pass
+            
+        session=requests.Session()
+        session.mount('http://',Adapter())
+        
+        previous_url_fetcher=\
+            csvw_functions.set_url_fetcher(csvw_functions.URLFetcher(session))
+        
+        try:
+            
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                
+                annotated_table_group_dict=\
+                    csvw_functions.create_annotated_table_group(
+                        'http://example.org/countries.csv'
+                        )
+                    
+        finally:
+            
+            csvw_functions.set_url_fetcher(previous_url_fetcher)
+            
+        self.assertEqual(len(annotated_table_group_dict['tables'][0]['rows']),3)
+        
+        self.assertEqual(
+            [x for x in Adapter.requests if x[1].endswith('countries.csv')],
+            [('GET','http://example.org/countries.csv')]
+            )
+        
+        
+    def test_url_fetcher_cache(self):
+        "Checks JSON documents are cached following their HTTP headers"
+        
+        import io
+        import tempfile
+        import requests
+        import urllib3
+        
+        content=b'{"columns": [{"name": "code"}]}'
+        
+        class Adapter(requests.adapters.BaseAdapter):
+            "Serves JSON documents and records the requests"
+            
+            headers={
+                'http://example.org/fresh.json':{'Cache-Control':'max-age=60'},
+                'http://example.org/etag.json':{'Cache-Control':'no-cache',
+                                                'ETag':'"1"'},
+                'http://example.org/no-store.json':{'Cache-Control':'no-store'}
+                }
+            
+            def __init__(self):
+                super().__init__()
+                self.requests=[]
+            
+            def send(self, request, **kwargs):
+                self.requests.append(
+                    (request.url,request.headers.get('If-None-Match'))
+                    )
+                not_modified=request.headers.get('If-None-Match')=='"1"'
+                raw=urllib3.response.HTTPResponse(
+                    body=io.BytesIO(b'' if not_modified else content),
+                    preload_content=False,
+                    status=304 if not_modified else 200,
+                    headers=dict(self.headers[request.url],
+                                 **{'Content-Type':'application/json'})
+                    )
+                return requests.adapters.HTTPAdapter().build_response(request,raw)
+            
+            def close(self):
+                pass
+            
+        with tempfile.TemporaryDirectory() as cache_directory:
+            
+            adapter=Adapter()
+            session=requests.Session()
+            session.mount('http://',adapter)
+            
+            url_fetcher=\
+                csvw_functions.URLFetcher(
+                    session,
+                    cache_directory=cache_directory
+                    )
+            
+            for url in Adapter.headers:
+                
+                for _ in range(2):
+                    
+                    with url_fetcher.open(url) as f:
+                        self.assertEqual(f.read(),content)
+                        
+            self.assertEqual(
+                adapter.requests,
+                [('http://example.org/fresh.json',None),
+                 ('http://example.org/etag.json',None),
+                 ('http://example.org/etag.json','"1"'),
+                 ('http://example.org/no-store.json',None),
+                 ('http://example.org/no-store.json',None)]
+                )
+            
+            # a new fetcher uses the documents stored in the cache directory
+            adapter=Adapter()
+            session=requests.Session()
+            session.mount('http://',adapter)
+            
+            url_fetcher=\
+                csvw_functions.URLFetcher(
+                    session,
+                    cache_directory=cache_directory
+                    )
+            
+            with url_fetcher.open('http://example.org/fresh.json') as f:
+                self.assertEqual(f.read(),content)
+                
+            self.assertEqual(adapter.requests,[])
+        
+        
+    def test_url_fetcher_cache_size(self):
+        "Checks the least recently used JSON documents are removed from the cache"
+        
+        import io
+        import requests
+        import urllib3
+        
+        class Adapter(requests.adapters.BaseAdapter):
+            "Serves fresh JSON documents and records the requests"
+            
+            def __init__(self):
+                super().__init__()
+                self.requests=[]
+            
+            def send(self, request, **kwargs):
+                self.requests.append(request.url)
+                raw=urllib3.response.HTTPResponse(
+                    body=io.BytesIO(b'{}'),
+                    preload_content=False,
+                    status=200,
+                    headers={'Cache-Control':'max-age=60',
+                             'Content-Type':'application/json'}
+                    )
+                return requests.adapters.HTTPAdapter().build_response(request,raw)
+            
+            def close(self):
+                pass
+            
+        adapter=Adapter()
+        session=requests.Session()
+        session.mount('http://',adapter)
+        
+        url_fetcher=\
+            csvw_functions.URLFetcher(
+                session,
+                max_cache_entries=2
+                )
+            
+        for name in ['a','b','a','c','a','b']:
+            
+            with url_fetcher.open(f'http://example.org/{name}.json') as f:
+                self.assertEqual(f.read(),b'{}')
+                
+        # b.json is removed when c.json is cached, as a.json was used more 
+        # recently
+        self.assertEqual(
+            adapter.requests,
+            ['http://example.org/a.json',
+             'http://example.org/b.json',
+             'http://example.org/c.json',
+             'http://example.org/b.json']
+            )
+        
+        self.assertEqual(
+            list(url_fetcher.cache_entries),
+            ['http://example.org/a.json',
+             'http://example.org/b.json']
+            )
+        
+        
+    def test_get_duplicate_primary_keys(self):
+        "Checks all the duplicate primary keys are found"
+        
+        from csvw_functions.csvw_functions import get_duplicate_primary_keys
+        
+        annotated_row_dicts=[
+            dict(number=i+1,
+                 primaryKey=[dict(stringValue=x) for x in pk])
+            for i,pk in enumerate([('a','1'),('b','1'),('a','1'),('a','2'),
+                                   ('b','1'),('a','1')])
+            ]
+        
+        self.assertEqual(
+            get_duplicate_primary_keys(annotated_row_dicts),
+            [(['a','1'],[1,3,6]),
+             (['b','1'],[2,5])]
+            )
+        
+        
+    def test_primary_key_error(self):
+        "Checks all the duplicate primary keys are in the error, and only the first in its message"
+        
+        import json
+        import tempfile
+        
+        with tempfile.TemporaryDirectory(dir='.') as directory:
+            
+            fp=os.path.join(os.path.basename(directory),'keys.csv')
+            
+            # 12 duplicate primary keys, the first in 12 rows
+            with open(fp,'w') as f:
+                f.write('code\n'+'0\n'*10+''.join(f'{i}\n{i}\n' for i in range(12)))
+                
+            with open(fp+'-metadata.json','w') as f:
+                json.dump(
+                    {'@context':'http://www.w3.org/ns/csvw',
+                     'url':'keys.csv',
+                     'tableSchema':{'columns':[{'name':'code','titles':'code'}],
+                                    'primaryKey':'code'}},
+                    f
+                    )
+            
+            with self.assertRaises(csvw_functions.CSVWPrimaryKeyError) as context:
+                
+                csvw_functions.create_annotated_table_group(
+                    fp+'-metadata.json',
+                    validate=True
+                    )
+                
+        self.assertEqual(
+            context.exception.duplicate_primary_keys,
+            [(['0'],list(range(1,13)))]
+            +[([str(i)],[11+2*i,12+2*i]) for i in range(1,12)]
+            )
+        
+        self.assertEqual(
+            str(context.exception),
+            "Primary key does not have a unique comination of values: "
+            "['0'] in rows [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, ...]; "
+            +"; ".join(f"['{i}'] in rows [{11+2*i}, {12+2*i}]" for i in range(1,10))
+            +"; and 2 more."
+            )
+        
+        
+    def test_get_URI_template_function(self):
+        "Checks the variables are found when a row has fewer cells than columns"
+        
+        from csvw_functions.csvw_functions import get_URI_template_function
+        
+        table_dict=dict(columns=[])
+        
+        for i,name in enumerate(['a','b','c']):
+            table_dict['columns'].append(
+                dict(table=table_dict,number=i+1,sourceNumber=i+1,name=name)
+                )
+        
+        a,b,c=table_dict['columns']
+        
+        # the row has no cell for column b
+        row_dict=dict(number=1,sourceNumber=2,cells=[])
+        
+        for column_dict,value in [(a,'x'),(c,'z')]:
+            row_dict['cells'].append(
+                dict(column=column_dict,row=row_dict,value={'@value':value})
+                )
+        
+        uri_template_function=\
+            get_URI_template_function(
+                'http://example.org/{a}/{b}/{c}/{_name}/{_row}',
+                c
+                )
+        
+        self.assertEqual(
+            uri_template_function(row_dict['cells'][1],None),
+            'http://example.org/x//z/c/1'
+            )
+        
+        # the URIs are the same when the parts which do not depend on the row 
+        # are expanded once for the column
+        row_dict['cells'][0]['value']=[{'@value':'x y'},{'@value':1}]
+        
+        for uri_template_string,table_url,uri in [
+                ('{a}-{_name}{#_column}','http://example.org/data/t.csv',
+                 'http://example.org/data/x%20y%2C1-c#3'),
+                ('xsd:{c}',None,'http://www.w3.org/2001/XMLSchema#z'),
+                ('http://example.org/{c}?{+_name}','http://example.org/t.csv',
+                 'http://example.org/z%3Fc'),
+                ('https://example.org/{c}/../{_row}','http://example.org/t.csv',
+                 'https://example.org/z/../1'),
+                ('../{c}{/_sourceRow}','http://example.org/data/t.csv',
+                 'http://example.org/z/2')
+                ]:
+            
+            uri_template_function=\
+                get_URI_template_function(
+                    uri_template_string,
+                    c
+                    )
+                
+            for _ in range(2):
+                
+                self.assertEqual(
+                    uri_template_function(row_dict['cells'][1],table_url),
+                    uri
+                    )
+        
+        
+    def test_get_datatype_parse_function(self):
+        "Checks the format and constraints of a string datatype"
+        
+        from csvw_functions.csvw_functions import get_datatype_parse_function
+        import warnings
+        
+        datatype_parse_function=\
+            get_datatype_parse_function(
+                {'base':'string',
+                 'format':'[A-Z]+[0-9]*',
+                 'maxLength':4}
+                )
+        
+        self.assertEqual(
+            datatype_parse_function('AB12',[],False),
+            ('AB12','string',[])
+            )
+        
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            
+            # does not match the format
+            json_value,value_type,errors=datatype_parse_function('ab',[],False)
+            self.assertEqual(len(errors),1)
+            
+            # longer than the maximum length
+            json_value,value_type,errors=datatype_parse_function('ABCDE',[],False)
+            self.assertEqual(len(errors),1)
+            
+        self.assertRaises(
+            csvw_functions.CSVWError,
+            datatype_parse_function,
+            'ABCDE',[],True
+            )
+        
+        
 #%% ---TESTCASE - W3C CSVW Test Suite---
 
 # This section runs the tests described in the W3C CSVW Test Cases 